@@ -1,17 +1,65 @@
-from flask import Flask, request
+from flask import Flask, request, has_request_context
 from flask_cors import CORS
-from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
 from flask_compress import Compress
+from sqlalchemy import orm
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
 import os
+import re
 import time
 
+
+# 只读的文本语句；其余 text() 语句（INSERT/UPDATE/DELETE/PRAGMA 等）视为写入
+_READ_STATEMENT_RE = re.compile(r'^\s*(SELECT|WITH|EXPLAIN|VALUES)\b', re.IGNORECASE)
+
+
+def is_write_clause(clause):
+    if isinstance(clause, UpdateBase):
+        return True
+    if isinstance(clause, TextClause):
+        return not _READ_STATEMENT_RE.match(clause.text)
+    return False
+
+
+class RoutingSession(SignallingSession):
+    """
+    读写分离会话：GET/HEAD 请求中的查询走只读引擎；flush、DML 与 text() 写语句，
+    以及不指定映射和语句的 connection()（之后可能执行任意语句）走读写引擎。
+    会话一旦使用读写引擎便固定在读写引擎上直到关闭，同一请求中写入后的查询能读到尚未提交的写入
+    """
+    _write_bound = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        read_engine = self.app.extensions.get('sqlalchemy_read_engine')
+        if (read_engine is not None
+                and not self._write_bound
+                and has_request_context()
+                and request.method in ('GET', 'HEAD')):
+            if (not self._flushing
+                    and (mapper is not None or clause is not None)
+                    and not is_write_clause(clause)):
+                return read_engine
+            self._write_bound = True
+        return super().get_bind(mapper, clause)
+
+    def close(self):
+        self._write_bound = False
+        super().close()
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
 # 创建数据库实例
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
 
 # 创建压缩实例
 compress = Compress()
 
-def create_app():
+def create_app(config=None):
     # 创建Flask应用
     app = Flask(__name__)
     
@@ -19,8 +67,9 @@ def create_app():
     CORS(app, resources={
         r"/api/*": {
             "origins": ["http://localhost:5173", "http://127.0.0.1:5173"],
-            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization"]
+            "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+            "allow_headers": ["Content-Type", "Authorization"],
+            "expose_headers": ["Server-Timing", "X-Response-Time"]
         }
     })
     
@@ -29,30 +78,51 @@ def create_app():
     db_path = os.path.join(basedir, 'novel_editor.db')
     app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # 是否为 GET 请求启用独立的只读引擎
+    app.config['SQLALCHEMY_READ_ENGINE'] = True
+    # 启动时是否回收心跳超时的AI后台任务并定期重复回收
+    app.config['AI_JOB_RECOVERY'] = os.getenv('AI_JOB_RECOVERY', '1') not in ('0', 'false', 'False')
     
     # 配置压缩
     app.config['COMPRESS_MIMETYPES'] = ['text/html', 'text/css', 'text/xml', 'application/json', 'application/javascript']
     app.config['COMPRESS_LEVEL'] = 6
     app.config['COMPRESS_MIN_SIZE'] = 500
     
+    # 应用外部传入的配置（如测试时使用独立数据库）
+    if config:
+        app.config.update(config)
+    
+    # 配置数据库引擎：连接池与 SQLite PRAGMA
+    from app.config.db_config import get_engine_options, register_sqlite_pragmas, create_read_engine
+    engine_options = get_engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+    engine_options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+    
     # 初始化数据库和压缩
     db.init_app(app)
     compress.init_app(app)
     
+    with app.app_context():
+        register_sqlite_pragmas(db.engine)
+    
     # 添加响应时间中间件
+    from app.services.metrics_service import start_request, finish_request
+    
     @app.before_request
     def before_request():
         request.start_time = time.time()
+        start_request()
     
     @app.after_request
     def after_request(response):
-        # 计算响应时间
+        # 计算响应时间，记录请求延迟与SQL统计（写入 Server-Timing 头）
         if hasattr(request, 'start_time'):
             response_time = time.time() - request.start_time
             response.headers['X-Response-Time'] = str(response_time)
+            finish_request(response, response_time)
         
-        # 添加缓存控制头
-        if response.mimetype == 'application/json':
+        # 添加缓存控制头：带 ETag 的响应由条件请求层设置为 no-cache（可缓存但每次校验），其余 JSON 不缓存
+        if response.mimetype == 'application/json' and 'ETag' not in response.headers:
             response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
             response.headers['Pragma'] = 'no-cache'
             response.headers['Expires'] = '0'
@@ -60,7 +130,7 @@ def create_app():
         # 添加 CORS 头
         response.headers.add('Access-Control-Allow-Origin', '*')
         response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-        response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+        response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,PATCH,POST,DELETE,OPTIONS')
         
         return response
     
@@ -70,17 +140,39 @@ def create_app():
         response = app.make_response('')
         response.headers.add('Access-Control-Allow-Origin', '*')
         response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-        response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+        response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,PATCH,POST,DELETE,OPTIONS')
         return response
     
     # 导入并注册蓝图
     from app.api import api_bp
     # 导入 API 模块以注册路由
-    from app.api import project, chapter, character, location, item, faction, relationship, export, ai, analysis, blueprint, setting
+    from app.api import project, chapter, character, location, item, faction, relationship, export, ai, analysis, blueprint, setting, jobs, search, metrics
     app.register_blueprint(api_bp, url_prefix='/api')
     
     # 创建数据库表
     with app.app_context():
+        from app.services.stats_service import rebuild_world_stat_counters
+        from app.services.search_service import ensure_search_index, rebuild_search_index
+        counters_existed = db.inspect(db.engine).has_table('world_stat_counters')
         db.create_all()
+        # 计数表首次创建时根据已有数据回填
+        if not counters_existed:
+            rebuild_world_stat_counters()
+            db.session.commit()
+        # 检索索引首次创建时根据已有数据建立
+        if ensure_search_index(db.session.connection()):
+            rebuild_search_index()
+        db.session.commit()
+    
+    # 回收已退出进程遗留的后台任务（测试、基准等临时应用可通过配置关闭）
+    if app.config['AI_JOB_RECOVERY']:
+        from app.services.job_service import job_queue
+        job_queue.start(app)
+    
+    # 表创建完成后再建立只读引擎（只读连接要求数据库文件已存在）
+    if app.config['SQLALCHEMY_READ_ENGINE']:
+        read_engine = create_read_engine(app.config['SQLALCHEMY_DATABASE_URI'])
+        if read_engine is not None:
+            app.extensions['sqlalchemy_read_engine'] = read_engine
     
     return app
\ No newline at end of file
@@ -2,7 +2,7 @@ from flask import Blueprint
 
 api_bp = Blueprint('api', __name__)
 
-from app.api import project, chapter, character, location, item, faction, relationship, export, ai, analysis, navigation, blueprint, setting, worlds, world_setting, energy_society, history_timeline, tags_relations
+from app.api import project, chapter, character, location, item, faction, relationship, export, ai, analysis, navigation, blueprint, setting, worlds, world_setting, energy_society, history_timeline, tags_relations, jobs, search, metrics
 from app.api.navigation import navigation_bp
 from app.api.worlds import worlds_bp
 from app.api.world_setting import world_setting_bp
@@ -2,90 +2,143 @@ from flask import request, jsonify, current_app
 from app.api import api_bp
 from app.services.ai_service import ai_service
 from app.config.ai_config import ai_config
+from app.services.stream_decoder import relay_with_heartbeat
+from app.services.context_service import build_writing_context, get_context_budget, estimate_tokens
+from app.services.job_service import job_queue, register_job
 import logging
+import os
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 流式输出的心跳间隔（秒）
+STREAM_HEARTBEAT_INTERVAL = float(os.getenv('AI_STREAM_HEARTBEAT_INTERVAL', 15))
+
 # 检查默认AI服务提供商是否配置
 if not ai_config.is_provider_configured():
     logger.warning(f'默认AI服务提供商 {ai_config.get_default_provider()} 未配置，可能无法正常工作')
 
+# 多候选开篇的切入角度，每个候选独立生成
+OPENING_ANGLES = [
+    '以环境与场景描写切入',
+    '以人物对话切入',
+    '以悬念或突发事件切入',
+    '以主角内心独白切入',
+    '以倒叙或回忆切入',
+    '以极具冲击力的动作场面切入',
+]
+# 候选数不超过切入角度数，否则重复的角度会得到相同的请求（temperature 为 0 时还会命中同一条缓存）
+MAX_OPENING_COUNT = len(OPENING_ANGLES)
+
+
+def _positive_number(value, cast):
+    """把可选的客户端参数转换为正数（int 或 float），None 原样返回；无效时抛出 ValueError"""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise ValueError(value)
+    try:
+        number = cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(value)
+    if not 0 < number < float('inf'):
+        raise ValueError(value)
+    return number
+
+
 @api_bp.route('/ai/generate-opening', methods=['POST'])
 def generate_opening():
     """
     智能开篇生成
+    每个开篇作为独立请求并发生成，可通过 providers 分散到多个服务提供商
     """
     data = request.json
     prompt = data.get('prompt', '')
     genre = data.get('genre', '')
     length = data.get('length', 300)
     provider = data.get('provider', None)  # 可选的服务提供商
+    providers = data.get('providers')  # 可选：轮流分配给多个服务提供商
     temperature = data.get('temperature', 0.7)  # 温度设置
     max_tokens = data.get('max_tokens', length * 2)  # token限制设置
     count = data.get('count', 3)  # 生成多个开篇选项
     writing_style = data.get('writing_style', '')  # 写作风格
+    concurrency = data.get('concurrency')  # 可选：并发上限
+    timeout = data.get('timeout')  # 可选：整体截止时间（秒）
     
     if not prompt:
         return jsonify({'error': '缺少提示词'}), 400
     
-    # 构建系统提示
-    system_prompt = '你是一位专业的小说作家，擅长创作引人入胜的开篇。请根据提供的信息，创作多个不同风格和切入点的开篇选项。'
+    try:
+        count = int(count)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'count必须为整数'}), 400
+    if count < 1 or count > MAX_OPENING_COUNT:
+        return jsonify({'error': f'count必须在1到{MAX_OPENING_COUNT}之间'}), 400
     
-    # 构建用户提示
-    user_prompt = f'请为以下故事创意创作{count}个不同风格的精彩开篇，每个控制在{length}字左右：\n\n'
-    user_prompt += f'故事创意：{prompt}\n'
-    if genre:
-        user_prompt += f'作品类型：{genre}\n'
-    if writing_style:
-        user_prompt += f'写作风格：{writing_style}\n'
-    user_prompt += '\n请为每个开篇提供不同的风格标签和切入点，确保每个开篇都有独特性。'
+    if providers is None:
+        providers = [provider]
+    elif not isinstance(providers, list) or not providers:
+        return jsonify({'error': 'providers必须为非空的服务提供商列表'}), 400
+    else:
+        unknown = [name for name in providers if name not in ai_service.get_available_providers()]
+        if unknown:
+            return jsonify({'error': f'未知的服务提供商: {unknown}'}), 400
     
-    messages = [
-        {
-            'role': 'system',
-            'content': system_prompt
-        },
-        {
-            'role': 'user',
-            'content': user_prompt
-        }
-    ]
+    try:
+        concurrency = _positive_number(concurrency, int)
+        timeout = _positive_number(timeout, float)
+    except ValueError:
+        return jsonify({'error': 'concurrency和timeout必须为正数'}), 400
     
-    logger.info(f'开始生成开篇，prompt: {prompt[:100]}..., genre: {genre}, length: {length}, count: {count}, provider: {provider}, temperature: {temperature}, max_tokens: {max_tokens}')
+    # 构建系统提示
+    system_prompt = '你是一位专业的小说作家，擅长创作引人入胜的开篇。请根据提供的信息创作一个开篇，只输出开篇正文。'
+    
+    # 为每个候选构建独立请求
+    calls = []
+    for index in range(count):
+        user_prompt = f'请为以下故事创意创作一个精彩开篇，控制在{length}字左右：\n\n'
+        user_prompt += f'故事创意：{prompt}\n'
+        if genre:
+            user_prompt += f'作品类型：{genre}\n'
+        if writing_style:
+            user_prompt += f'写作风格：{writing_style}\n'
+        user_prompt += f'切入点：{OPENING_ANGLES[index % len(OPENING_ANGLES)]}'
+        
+        calls.append({
+            'messages': [
+                {
+                    'role': 'system',
+                    'content': system_prompt
+                },
+                {
+                    'role': 'user',
+                    'content': user_prompt
+                }
+            ],
+            'provider': providers[index % len(providers)],
+            'max_tokens': max_tokens,
+            'temperature': temperature
+        })
+    
+    logger.info(f'开始生成开篇，prompt: {prompt[:100]}..., genre: {genre}, length: {length}, count: {count}, providers: {providers}, temperature: {temperature}, max_tokens: {max_tokens}')
     
     try:
-        # 使用统一AI服务接口
-        result = ai_service.chat_completion(
-            messages=messages,
-            provider=provider,
-            max_tokens=max_tokens * count,  # 增加token限制以容纳多个开篇
-            temperature=temperature
-        )
+        results = ai_service.gather_completions(calls, concurrency=concurrency, timeout=timeout)
+        
+        openings = [result['content'] for result in results if isinstance(result, dict)]
+        errors = [result for result in results if isinstance(result, BaseException)]
+        for error in errors:
+            logger.warning(f'开篇候选生成失败: {error}')
+        
+        # 全部失败时按第一个错误返回
+        if not openings:
+            raise errors[0]
         
-        opening = result['content']
-        logger.info(f'开篇生成成功，长度: {len(opening)}, provider: {result.get("provider")}')
-        
-        # 解析多个开篇选项
-        openings = []
-        # 简单的解析逻辑，根据数字序号分割
-        parts = opening.split('\n')
-        current_opening = ''
-        for part in parts:
-            if part.strip().startswith(('1.', '2.', '3.', '4.', '5.')) and current_opening:
-                openings.append(current_opening.strip())
-                current_opening = part
-            else:
-                current_opening += '\n' + part
-        if current_opening:
-            openings.append(current_opening.strip())
-        
-        # 确保返回指定数量的开篇
-        if len(openings) > count:
-            openings = openings[:count]
-        
-        return jsonify({'success': True, 'openings': openings, 'provider': result.get("provider")})
+        used_providers = [result.get('provider') for result in results if isinstance(result, dict)]
+        logger.info(f'开篇生成成功，数量: {len(openings)}/{count}, provider: {used_providers[0]}')
+        
+        return jsonify({'success': True, 'openings': openings, 'provider': used_providers[0], 'providers': used_providers})
     
     except ValueError as e:
         logger.error(f'AI服务错误: {str(e)}')
@@ -102,14 +155,23 @@ def continue_writing():
     AI续写功能
     """
     data = request.json
-    context = data.get('context', '')
+    context = data.get('context')
+    chapter_id = data.get('chapter_id')  # 可选：由服务端按章节组装上下文
     length = data.get('length', 500)
     direction = data.get('direction', '')
     provider = data.get('provider', None)  # 可选的服务提供商
     temperature = data.get('temperature', 0.7)  # 温度设置
     max_tokens = data.get('max_tokens', length * 2)  # token限制设置
     
-    if not context:
+    if not context and not chapter_id:
+        return jsonify({'error': '缺少上下文内容'}), 400
+    
+    try:
+        # 按提供商的token预算截取正文末尾，并附加上一章摘要与相关设定
+        assembled = build_writing_context(chapter_id, text=context, provider=provider, max_tokens=max_tokens)
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    if not assembled['body']:
         return jsonify({'error': '缺少上下文内容'}), 400
     
     messages = [
@@ -119,11 +181,11 @@ def continue_writing():
         },
         {
             'role': 'user',
-            'content': f'请根据以下上下文继续创作，控制在{length}字左右：\n\n{context}'
+            'content': f'请根据以下上下文继续创作，控制在{length}字左右：\n\n{assembled["context"]}'
         }
     ]
     
-    logger.info(f'开始AI续写，context_length: {len(context)}, length: {length}, provider: {provider}, temperature: {temperature}, max_tokens: {max_tokens}')
+    logger.info(f'开始AI续写，context_length: {len(context or "")}, context_tokens: {assembled["tokens"]}/{assembled["budget"]}, length: {length}, provider: {provider}, temperature: {temperature}, max_tokens: {max_tokens}')
     
     try:
         # 使用统一AI服务接口
@@ -131,7 +193,9 @@ def continue_writing():
             messages=messages,
             provider=provider,
             max_tokens=max_tokens,
-            temperature=temperature
+            temperature=temperature,
+            cache=data.get('cache'),  # 可选：显式开启/关闭响应缓存
+            hedge=data.get('hedge')  # 可选：首选提供商过慢时发起对冲请求
         )
         
         continuation = result['content']
@@ -163,6 +227,20 @@ def rewrite():
     if not text:
         return jsonify({'error': '缺少需要润色的文本'}), 400
     
+    prompt = f'请按照{style}的风格润色以下文本，保持原意不变：\n\n{text}'
+    chapter_id = data.get('chapter_id')
+    if chapter_id:
+        # 待润色文本必须完整发送，剩余预算用于上一章摘要与文本中提及的设定
+        try:
+            budget = get_context_budget(provider, max_tokens) - estimate_tokens(text)
+            assembled = build_writing_context(
+                chapter_id, text=text, provider=provider, budget=max(0, budget), include_body=False
+            )
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        if assembled['context']:
+            prompt += f'\n\n以下为背景信息，仅供参考，不需要润色：\n{assembled["context"]}'
+    
     messages = [
         {
             'role': 'system',
@@ -170,7 +248,7 @@ def rewrite():
         },
         {
             'role': 'user',
-            'content': f'请按照{style}的风格润色以下文本，保持原意不变：\n\n{text}'
+            'content': prompt
         }
     ]
     
@@ -182,7 +260,9 @@ def rewrite():
             messages=messages,
             provider=provider,
             max_tokens=max_tokens,
-            temperature=temperature
+            temperature=temperature,
+            cache=data.get('cache'),  # 可选：显式开启/关闭响应缓存
+            hedge=data.get('hedge')  # 可选：首选提供商过慢时发起对冲请求
         )
         
         rewritten = result['content']
@@ -199,6 +279,34 @@ def rewrite():
         logger.error(f'AI润色时发生错误: {str(e)}')
         return jsonify({'error': f'润色失败: {str(e)}'}), 500
 
+def _world_messages(prompt):
+    return [
+        {
+            'role': 'system',
+            'content': '你是一位专业的小说世界观设定师，擅长构建完整、丰富的虚构世界。'
+        },
+        {
+            'role': 'user',
+            'content': f'请根据以下创意生成一个详细的小说世界观设定，包括但不限于：世界起源、地理环境、种族、文化、历史、魔法/科技体系、重要势力等。\n\n创意：{prompt}'
+        }
+    ]
+
+
+@register_job('generate_world')
+def run_generate_world_job(data, job):
+    """
+    世界观生成后台任务
+    """
+    result = job.complete(
+        _world_messages(data.get('prompt', '')),
+        provider=data.get('provider'),
+        max_tokens=data.get('max_tokens', 2000),
+        temperature=data.get('temperature', 0.7),
+        cache=data.get('cache')
+    )
+    return {'world': result['content'], 'provider': result.get('provider')}
+
+
 @api_bp.route('/ai/generate-world', methods=['POST'])
 def generate_world():
     """
@@ -214,16 +322,12 @@ def generate_world():
     if not prompt:
         return jsonify({'error': '缺少世界观创意'}), 400
     
-    messages = [
-        {
-            'role': 'system',
-            'content': '你是一位专业的小说世界观设定师，擅长构建完整、丰富的虚构世界。'
-        },
-        {
-            'role': 'user',
-            'content': f'请根据以下创意生成一个详细的小说世界观设定，包括但不限于：世界起源、地理环境、种族、文化、历史、魔法/科技体系、重要势力等。\n\n创意：{prompt}'
-        }
-    ]
+    if data.get('async'):
+        # 后台任务：立即返回任务ID，通过 /api/jobs/<id> 查询或流式读取结果
+        job = job_queue.submit('generate_world', data)
+        return jsonify({'success': True, 'job_id': job.id, 'status': job.status}), 202
+    
+    messages = _world_messages(prompt)
     
     logger.info(f'开始生成世界观，prompt: {prompt[:100]}..., elements: {elements}, provider: {provider}, temperature: {temperature}, max_tokens: {max_tokens}')
     
@@ -233,7 +337,8 @@ def generate_world():
             messages=messages,
             provider=provider,
             max_tokens=max_tokens,
-            temperature=temperature
+            temperature=temperature,
+            cache=data.get('cache')  # 可选：显式开启/关闭响应缓存
         )
         
         world = result['content']
@@ -250,6 +355,34 @@ def generate_world():
         logger.error(f'生成世界观时发生错误: {str(e)}')
         return jsonify({'error': f'生成失败: {str(e)}'}), 500
 
+def _character_messages(prompt):
+    return [
+        {
+            'role': 'system',
+            'content': '你是一位专业的小说角色设计师，擅长创建立体、丰满的人物形象。'
+        },
+        {
+            'role': 'user',
+            'content': f'请根据以下创意生成一个详细的小说角色设定，包括但不限于：基本信息、外貌特征、性格特点、背景故事、人物弧光、动机目标、秘密与谎言等。\n\n创意：{prompt}'
+        }
+    ]
+
+
+@register_job('generate_character')
+def run_generate_character_job(data, job):
+    """
+    角色生成后台任务
+    """
+    result = job.complete(
+        _character_messages(data.get('prompt', '')),
+        provider=data.get('provider'),
+        max_tokens=data.get('max_tokens', 1500),
+        temperature=data.get('temperature', 0.7),
+        cache=data.get('cache')
+    )
+    return {'character': result['content'], 'provider': result.get('provider')}
+
+
 @api_bp.route('/ai/generate-character', methods=['POST'])
 def generate_character():
     """
@@ -264,16 +397,11 @@ def generate_character():
     if not prompt:
         return jsonify({'error': '缺少角色创意'}), 400
     
-    messages = [
-        {
-            'role': 'system',
-            'content': '你是一位专业的小说角色设计师，擅长创建立体、丰满的人物形象。'
-        },
-        {
-            'role': 'user',
-            'content': f'请根据以下创意生成一个详细的小说角色设定，包括但不限于：基本信息、外貌特征、性格特点、背景故事、人物弧光、动机目标、秘密与谎言等。\n\n创意：{prompt}'
-        }
-    ]
+    if data.get('async'):
+        job = job_queue.submit('generate_character', data)
+        return jsonify({'success': True, 'job_id': job.id, 'status': job.status}), 202
+    
+    messages = _character_messages(prompt)
     
     logger.info(f'开始生成角色，prompt: {prompt[:100]}..., provider: {provider}, temperature: {temperature}, max_tokens: {max_tokens}')
     
@@ -283,7 +411,8 @@ def generate_character():
             messages=messages,
             provider=provider,
             max_tokens=max_tokens,
-            temperature=temperature
+            temperature=temperature,
+            cache=data.get('cache')  # 可选：显式开启/关闭响应缓存
         )
         
         character = result['content']
@@ -326,14 +455,14 @@ def stream_chat_completion():
             temperature=temperature
         )
         
-        # 流式响应
-        def generate():
-            for chunk in stream:
-                import json
-                yield f"data: {json.dumps(chunk)}\n\n"
-            yield "data: [DONE]\n\n"
-        
-        return current_app.response_class(generate(), mimetype='text/event-stream')
+        # 流式响应：每个增量立即发送，上游空闲时发送心跳
+        response = current_app.response_class(
+            relay_with_heartbeat(stream, interval=STREAM_HEARTBEAT_INTERVAL),
+            mimetype='text/event-stream'
+        )
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'  # 禁止反向代理缓冲
+        return response
         
     except ValueError as e:
         logger.error(f'AI服务错误: {str(e)}')
@@ -373,6 +502,46 @@ def get_ai_config():
         return jsonify({'error': str(e)}), 500
 
 
+@api_bp.route('/ai/cache/stats', methods=['GET'])
+def get_ai_cache_stats():
+    """
+    获取AI响应缓存的命中统计
+    """
+    try:
+        return jsonify({'success': True, 'stats': ai_service.response_cache.stats()})
+        
+    except Exception as e:
+        logger.error(f'获取AI缓存统计失败: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/ai/cache', methods=['DELETE'])
+def clear_ai_cache():
+    """
+    清空AI响应缓存
+    """
+    try:
+        ai_service.response_cache.clear()
+        return jsonify({'success': True})
+        
+    except Exception as e:
+        logger.error(f'清空AI缓存失败: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/ai/router/stats', methods=['GET'])
+def get_ai_router_stats():
+    """
+    获取各提供商/模型的滚动延迟（p50/p95）、错误率与切换/对冲次数
+    """
+    try:
+        return jsonify({'success': True, 'stats': ai_service.router.stats()})
+        
+    except Exception as e:
+        logger.error(f'获取AI路由统计失败: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+
 @api_bp.route('/ai/config/provider', methods=['PUT'])
 def set_default_provider():
     """
@@ -1,7 +1,9 @@
 from flask import request, jsonify
 from app.api import api_bp
 from app import db
-from app.models import Project, Chapter, Character, Relationship
+from app.models import Project, Chapter, Character, Relationship, World
+from app.services.analysis_service import get_project_analyses, get_chapter_analysis
+from app.services.mention_service import MENTION_MODELS, get_appearance_timeline, get_cooccurrence
 import logging
 import json
 from datetime import datetime
@@ -77,22 +79,19 @@ def get_emotion_data(project_id):
     获取项目的情绪曲线数据
     """
     try:
-        # 获取项目的所有章节
-        chapters = Chapter.query.filter_by(project_id=project_id).order_by(Chapter.order_index).all()
-        
-        # 构建情绪数据（这里使用模拟数据，实际项目中可以通过AI分析获取）
+        # 按章节读取持久化的分析结果，正文有变化的章节才重新分析
         emotion_data = []
-        for chapter in chapters:
-            # 基于章节内容长度和ID生成模拟情绪值
-            content_length = len(chapter.content)
-            emotion_value = (content_length % 100 - 50) * 0.8 + (chapter.id % 10 - 5)
-            emotion_value = max(-50, min(50, emotion_value))
-            
+        for item in get_project_analyses(project_id):
+            metrics = item['metrics']
             emotion_data.append({
-                'chapter_id': chapter.id,
-                'chapter_title': chapter.title,
-                'emotion_value': emotion_value,
-                'word_count': chapter.word_count
+                'chapter_id': item['chapter_id'],
+                'chapter_title': item['chapter_title'],
+                # 情感倾向 -1~1 映射到 -50~50
+                'emotion_value': round(metrics['sentiment'] * 50, 2),
+                'sentiment': metrics['sentiment'],
+                'positive_hits': metrics['positive_hits'],
+                'negative_hits': metrics['negative_hits'],
+                'word_count': item['word_count']
             })
         
         logger.info(f'获取情绪曲线数据成功，项目ID: {project_id}, 章节数: {len(emotion_data)}')
@@ -108,25 +107,22 @@ def get_rhythm_data(project_id):
     获取项目的节奏分析数据
     """
     try:
-        # 获取项目的所有章节
-        chapters = Chapter.query.filter_by(project_id=project_id).order_by(Chapter.order_index).all()
-        
-        # 构建节奏数据（这里使用模拟数据，实际项目中可以通过文本分析获取）
         rhythm_data = []
-        for chapter in chapters:
-            # 生成模拟的动作、对话、描写比例
-            total = 100
-            action = (hash(chapter.title) % 40) + 20
-            dialogue = (hash(chapter.content) % 30) + 10
-            description = total - action - dialogue
-            
+        for item in get_project_analyses(project_id):
+            metrics = item['metrics']
+            # 比例换算为百分比，三者之和为100
+            dialogue = round(metrics['dialogue_ratio'] * 100)
+            action = round(metrics['action_ratio'] * 100)
+            description = 100 - dialogue - action if metrics['char_count'] else 0
             rhythm_data.append({
-                'chapter_id': chapter.id,
-                'chapter_title': chapter.title,
+                'chapter_id': item['chapter_id'],
+                'chapter_title': item['chapter_title'],
                 'action': action,
                 'dialogue': dialogue,
                 'description': description,
-                'word_count': chapter.word_count
+                'sentence_count': metrics['sentence_count'],
+                'sentence_length': metrics['sentence_length'],
+                'word_count': item['word_count']
             })
         
         logger.info(f'获取节奏分析数据成功，项目ID: {project_id}, 章节数: {len(rhythm_data)}')
@@ -355,3 +351,96 @@ def generate_project_report(project_id):
     except Exception as e:
         logger.error(f'生成项目分析报告失败: {str(e)}')
         return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/analysis/chapter/<int:chapter_id>', methods=['GET'])
+def get_chapter_analysis_data(chapter_id):
+    """
+    获取单个章节的文本分析指标
+    """
+    try:
+        chapter = Chapter.query.get(chapter_id)
+        if not chapter:
+            return jsonify({'error': '章节不存在'}), 404
+        
+        metrics = get_chapter_analysis(chapter)
+        return jsonify({'success': True, 'data': dict(metrics, chapter_id=chapter.id, chapter_title=chapter.title)})
+        
+    except Exception as e:
+        logger.error(f'获取章节分析数据失败: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/analysis/project/<int:project_id>/mentions', methods=['GET'])
+def get_mention_timeline(project_id):
+    """
+    获取实体的出场时间线
+    查询参数: entity_type（character/location/item/faction，默认全部）, entity_id（可多个）, positions=1 返回出现位置
+    """
+    try:
+        project = Project.query.get(project_id)
+        if not project:
+            return jsonify({'error': '项目不存在'}), 404
+
+        entity_type = request.args.get('entity_type') or None
+        if entity_type and entity_type not in MENTION_MODELS:
+            return jsonify({'error': f'未知的实体类型: {entity_type}'}), 400
+        entity_ids = request.args.getlist('entity_id', type=int)
+        timeline = get_appearance_timeline(project_id, entity_type, entity_ids,
+                                           include_positions=request.args.get('positions') == '1')
+        return jsonify({'success': True, 'data': timeline})
+
+    except Exception as e:
+        logger.error(f'获取出场时间线失败: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/analysis/project/<int:project_id>/cooccurrence', methods=['GET'])
+def get_mention_cooccurrence(project_id):
+    """
+    获取实体共现矩阵
+    查询参数: entity_type（默认character）, window（按字数窗口统计，缺省按章节统计）, limit（默认50）
+    """
+    try:
+        project = Project.query.get(project_id)
+        if not project:
+            return jsonify({'error': '项目不存在'}), 404
+
+        entity_type = request.args.get('entity_type', 'character')
+        if entity_type not in MENTION_MODELS:
+            return jsonify({'error': f'未知的实体类型: {entity_type}'}), 400
+        window = request.args.get('window', type=int)
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+        data = get_cooccurrence(project_id, entity_type, window=window if window and window > 0 else None,
+                                limit=limit)
+        return jsonify({'success': True, 'data': data})
+
+    except Exception as e:
+        logger.error(f'获取共现矩阵失败: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/analysis/character/<int:character_id>/appearances', methods=['GET'])
+def get_character_appearances(character_id):
+    """
+    获取角色在各章节的出场情况（名称与别名均计入）
+    """
+    try:
+        character = Character.query.get(character_id)
+        if not character:
+            return jsonify({'error': '角色不存在'}), 404
+        project_id = character.project_id
+        if not project_id and character.world_id:
+            world = World.query.get(character.world_id)
+            project_id = world.project_id if world else None
+        if not project_id:
+            return jsonify({'error': '角色未关联项目'}), 400
+
+        timeline = get_appearance_timeline(project_id, 'character', [character.id],
+                                           include_positions=request.args.get('positions') == '1')
+        data = timeline[0] if timeline else {
+            'entity_type': 'character', 'entity_id': character.id, 'name': character.name,
+            'total_mentions': 0, 'chapter_count': 0, 'first_chapter_id': None, 'last_chapter_id': None,
+            'chapters': []
+        }
+        return jsonify({'success': True, 'data': data})
+
+    except Exception as e:
+        logger.error(f'获取角色出场情况失败: {str(e)}')
+        return jsonify({'error': str(e)}), 500
@@ -1,6 +1,8 @@
 from app.api import api_bp
 from app import db
 from app.models import Outline, Volume, Chapter, Project, StoryModel
+from app.services.bulk_service import bulk_upsert
+from app.services.analysis_service import get_chapter_analysis
 from flask import request, jsonify
 import json
 
@@ -59,11 +61,13 @@ def delete_outline(id):
     return jsonify({'message': 'Outline deleted successfully'})
 
 from app.services.ai_service import ai_service
+from app.services.job_service import job_queue, register_job, JobCancelled
 
 # AI生成大纲
-@api_bp.route('/ai/generate_outline', methods=['POST'])
-def generate_outline():
-    data = request.json
+def _build_outline_request(data):
+    """
+    根据请求参数构建大纲生成的提示消息，返回 (messages, 大纲信息)
+    """
     project_id = data.get('project_id')
     story_model = data.get('story_model', 'hero_journey')
     params = data.get('params', {})
@@ -162,73 +166,174 @@ def generate_outline():
     user_prompt += f"\n"
     user_prompt += f"请严格按照上述格式生成大纲，确保结构完整、内容丰富，符合所选的故事模型和小说类型。"
     
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+    info = {
+        'project_id': project_id,
+        'story_model': story_model,
+        'outline_title': outline_title,
+        'genre': genre,
+        'core_theme': core_theme,
+        'target_audience': target_audience
+    }
+    return messages, info
+
+
+def _save_generated_outline(info, ai_content):
+    """
+    解析AI生成的大纲内容并保存
+    """
+    project_id = info['project_id']
+    story_model = info['story_model']
+    outline_title = info['outline_title']
+    genre = info['genre']
+    core_theme = info['core_theme']
+    target_audience = info['target_audience']
+    
+    # 构建大纲结构
+    outline_content = {
+        'main_plot': '主线剧情',
+        'sub_plots': ['次要情节1', '次要情节2'],
+        'key_events': ['关键事件1', '关键事件2', '关键事件3', '关键事件4', '关键事件5'],
+        'character_arcs': ['角色弧线1', '角色弧线2'],
+        'theme': core_theme,
+        'target_audience': target_audience,
+        'genre': genre,
+        'ai_generated_content': ai_content
+    }
+    
+    # 尝试从AI生成的内容中提取结构化信息
+    lines = ai_content.split('\n')
+    current_section = None
+    
+    for line in lines:
+        line = line.strip()
+        if line.startswith('1. 主线剧情：'):
+            current_section = 'main_plot'
+            outline_content['main_plot'] = line.replace('1. 主线剧情：', '').strip()
+        elif line.startswith('2. 次要情节：'):
+            current_section = 'sub_plots'
+            outline_content['sub_plots'] = []
+        elif line.startswith('3. 关键事件：'):
+            current_section = 'key_events'
+            outline_content['key_events'] = []
+        elif line.startswith('4. 角色弧线：'):
+            current_section = 'character_arcs'
+            outline_content['character_arcs'] = []
+        elif line.startswith('5. 主题：'):
+            current_section = 'theme'
+            outline_content['theme'] = line.replace('5. 主题：', '').strip()
+        elif current_section == 'sub_plots' and line and not line.startswith('3. '):
+            outline_content['sub_plots'].append(line)
+        elif current_section == 'key_events' and line and not line.startswith('4. '):
+            outline_content['key_events'].append(line)
+        elif current_section == 'character_arcs' and line and not line.startswith('5. '):
+            outline_content['character_arcs'].append(line)
+    
+    # 创建大纲
+    new_outline = Outline(
+        project_id=project_id,
+        title=f'{outline_title} - 大纲',
+        content=json.dumps(outline_content, ensure_ascii=False),
+        story_model=story_model
+    )
+    db.session.add(new_outline)
+    db.session.commit()
+    return new_outline
+
+
+def _save_fallback_outline(info):
+    """
+    AI服务调用失败时，保存基于项目信息的默认大纲
+    """
+    project_id = info['project_id']
+    story_model = info['story_model']
+    outline_title = info['outline_title']
+    genre = info['genre']
+    core_theme = info['core_theme']
+    target_audience = info['target_audience']
+    
+    # 固定但合理的大纲格式
+    fallback_outline = {
+        'title': f'{outline_title} - 大纲',
+        'content': json.dumps({
+            'main_plot': f'{genre}类型故事的主线剧情，围绕{core_theme}展开',
+            'sub_plots': [
+                f'{genre}类型的次要情节1',
+                f'{genre}类型的次要情节2'
+            ],
+            'key_events': [
+                '故事开端：介绍主要角色和世界观',
+                '冲突引入：主角面临挑战',
+                '情节发展：主角克服困难',
+                '高潮：主角面临最终挑战',
+                '结局：故事收尾'
+            ],
+            'character_arcs': [
+                '主角的成长历程',
+                '反派的动机和转变'
+            ],
+            'theme': core_theme,
+            'target_audience': target_audience,
+            'genre': genre,
+            'note': 'AI服务不可用，返回默认大纲'
+        }, ensure_ascii=False),
+        'story_model': story_model
+    }
+    
+    new_outline = Outline(
+        project_id=project_id,
+        title=fallback_outline['title'],
+        content=fallback_outline['content'],
+        story_model=fallback_outline['story_model']
+    )
+    db.session.add(new_outline)
+    db.session.commit()
+    return new_outline
+
+
+@register_job('generate_outline')
+def run_generate_outline_job(data, job):
+    """
+    大纲生成后台任务：逐段输出AI生成的内容，结束后保存大纲
+    """
+    messages, info = _build_outline_request(data)
+    try:
+        ai_response = job.complete(messages, max_tokens=2000, temperature=0.7, cache=data.get('cache'))
+        new_outline = _save_generated_outline(info, ai_response['content'])
+    except JobCancelled:
+        raise
+    except Exception as e:
+        db.session.rollback()
+        print(f"AI服务调用失败: {e}")
+        new_outline = _save_fallback_outline(info)
+    return new_outline.to_dict()
+
+
+@api_bp.route('/ai/generate_outline', methods=['POST'])
+def generate_outline():
+    data = request.json
+    
+    if data.get('async'):
+        # 后台任务：立即返回任务ID，通过 /api/jobs/<id> 查询或流式读取生成进度
+        job = job_queue.submit('generate_outline', data)
+        return jsonify({'success': True, 'job_id': job.id, 'status': job.status}), 202
+    
+    messages, info = _build_outline_request(data)
+    
     # 调用AI服务生成大纲
     try:
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
-        
         # 调用AI服务
         ai_response = ai_service.chat_completion(
             messages,
             max_tokens=2000,
-            temperature=0.7
-        )
-        
-        # 解析AI生成的大纲内容
-        ai_content = ai_response['content']
-        
-        # 构建大纲结构
-        outline_content = {
-            'main_plot': '主线剧情',
-            'sub_plots': ['次要情节1', '次要情节2'],
-            'key_events': ['关键事件1', '关键事件2', '关键事件3', '关键事件4', '关键事件5'],
-            'character_arcs': ['角色弧线1', '角色弧线2'],
-            'theme': core_theme,
-            'target_audience': target_audience,
-            'genre': genre,
-            'ai_generated_content': ai_content
-        }
-        
-        # 尝试从AI生成的内容中提取结构化信息
-        lines = ai_content.split('\n')
-        current_section = None
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith('1. 主线剧情：'):
-                current_section = 'main_plot'
-                outline_content['main_plot'] = line.replace('1. 主线剧情：', '').strip()
-            elif line.startswith('2. 次要情节：'):
-                current_section = 'sub_plots'
-                outline_content['sub_plots'] = []
-            elif line.startswith('3. 关键事件：'):
-                current_section = 'key_events'
-                outline_content['key_events'] = []
-            elif line.startswith('4. 角色弧线：'):
-                current_section = 'character_arcs'
-                outline_content['character_arcs'] = []
-            elif line.startswith('5. 主题：'):
-                current_section = 'theme'
-                outline_content['theme'] = line.replace('5. 主题：', '').strip()
-            elif current_section == 'sub_plots' and line and not line.startswith('3. '):
-                outline_content['sub_plots'].append(line)
-            elif current_section == 'key_events' and line and not line.startswith('4. '):
-                outline_content['key_events'].append(line)
-            elif current_section == 'character_arcs' and line and not line.startswith('5. '):
-                outline_content['character_arcs'].append(line)
-        
-        # 创建大纲
-        new_outline = Outline(
-            project_id=project_id,
-            title=f'{outline_title} - 大纲',
-            content=json.dumps(outline_content, ensure_ascii=False),
-            story_model=story_model
+            temperature=0.7,
+            cache=data.get('cache')  # 可选：项目信息未变化时复用已生成的大纲
         )
-        db.session.add(new_outline)
-        db.session.commit()
         
+        new_outline = _save_generated_outline(info, ai_response['content'])
         return jsonify(new_outline.to_dict()), 201
         
     except Exception as e:
@@ -237,43 +342,7 @@ def generate_outline():
         traceback.print_exc()
         print(f"AI服务调用失败: {e}")
         
-        # 固定但合理的大纲格式
-        fallback_outline = {
-            'title': f'{outline_title} - 大纲',
-            'content': json.dumps({
-                'main_plot': f'{genre}类型故事的主线剧情，围绕{core_theme}展开',
-                'sub_plots': [
-                    f'{genre}类型的次要情节1',
-                    f'{genre}类型的次要情节2'
-                ],
-                'key_events': [
-                    '故事开端：介绍主要角色和世界观',
-                    '冲突引入：主角面临挑战',
-                    '情节发展：主角克服困难',
-                    '高潮：主角面临最终挑战',
-                    '结局：故事收尾'
-                ],
-                'character_arcs': [
-                    '主角的成长历程',
-                    '反派的动机和转变'
-                ],
-                'theme': core_theme,
-                'target_audience': target_audience,
-                'genre': genre,
-                'note': 'AI服务不可用，返回默认大纲'
-            }, ensure_ascii=False),
-            'story_model': story_model
-        }
-        
-        new_outline = Outline(
-            project_id=project_id,
-            title=fallback_outline['title'],
-            content=fallback_outline['content'],
-            story_model=fallback_outline['story_model']
-        )
-        db.session.add(new_outline)
-        db.session.commit()
-        
+        new_outline = _save_fallback_outline(info)
         return jsonify(new_outline.to_dict()), 201
 
 # 分解大纲为卷纲
@@ -283,71 +352,31 @@ def decompose_outline(id):
     if not outline:
         return jsonify({'error': 'Outline not found'}), 404
     
-    # 从请求中获取卷纲数据
+    # 从请求中获取卷纲数据（单个卷纲或卷纲列表）
     data = request.json
+    items = data if isinstance(data, list) else [data]
+    rows = []
+    for index, vol_data in enumerate(items):
+        row = dict(vol_data)
+        # 未指定 order_index 时按提交顺序编号
+        if row.get('order_index') is None:
+            row['order_index'] = index + 1
+        row.update(project_id=outline.project_id, outline_id=outline.id)
+        rows.append(row)
     
-    # 检查是否是批量创建
-    if isinstance(data, list):
-        created_volumes = []
-        for vol_data in data:
-            # 检查是否已存在相同order_index的卷纲
-            existing_volume = Volume.query.filter_by(
-                project_id=outline.project_id,
-                outline_id=outline.id,
-                order_index=vol_data.get('order_index')
-            ).first()
-            
-            if existing_volume:
-                # 更新现有卷纲，增加版本号
-                existing_volume.title = vol_data.get('title', existing_volume.title)
-                existing_volume.content = vol_data.get('content', existing_volume.content)
-                existing_volume.core_conflict = vol_data.get('core_conflict', existing_volume.core_conflict)
-                existing_volume.version += 1
-                created_volumes.append(existing_volume)
-            else:
-                # 创建新卷纲
-                new_volume = Volume(
-                    project_id=outline.project_id,
-                    outline_id=outline.id,
-                    title=vol_data.get('title', '未命名卷'),
-                    content=vol_data.get('content', ''),
-                    core_conflict=vol_data.get('core_conflict', ''),
-                    order_index=vol_data.get('order_index', len(created_volumes) + 1),
-                    version=1
-                )
-                db.session.add(new_volume)
-                created_volumes.append(new_volume)
-    else:
-        # 单个卷纲创建
-        existing_volume = Volume.query.filter_by(
-            project_id=outline.project_id,
-            outline_id=outline.id,
-            order_index=data.get('order_index', 1)
-        ).first()
-        
-        if existing_volume:
-            # 更新现有卷纲，增加版本号
-            existing_volume.title = data.get('title', existing_volume.title)
-            existing_volume.content = data.get('content', existing_volume.content)
-            existing_volume.core_conflict = data.get('core_conflict', existing_volume.core_conflict)
-            existing_volume.version += 1
-            created_volumes = [existing_volume]
-        else:
-            # 创建新卷纲
-            new_volume = Volume(
-                project_id=outline.project_id,
-                outline_id=outline.id,
-                title=data.get('title', '未命名卷'),
-                content=data.get('content', ''),
-                core_conflict=data.get('core_conflict', ''),
-                order_index=data.get('order_index', 1),
-                version=1
-            )
-            db.session.add(new_volume)
-            created_volumes = [new_volume]
-    
+    # 已存在相同 order_index 的卷纲更新内容并增加版本号，其余新建
+    created_volumes, _, _ = bulk_upsert(
+        Volume, rows,
+        key_fields=('project_id', 'outline_id', 'order_index'),
+        fields=('title', 'content', 'core_conflict'),
+        scope=(Volume.project_id == outline.project_id, Volume.outline_id == outline.id),
+        defaults={'title': '未命名卷'},
+        bump_version=True
+    )
+    # 提交前序列化，避免提交后逐条重新加载过期的对象
+    result = [volume.to_dict() for volume in created_volumes]
     db.session.commit()
-    return jsonify([volume.to_dict() for volume in created_volumes]), 201
+    return jsonify(result), 201
 
 # 卷纲相关接口
 @api_bp.route('/volumes/<int:id>', methods=['GET'])
@@ -389,79 +418,31 @@ def decompose_volume(id):
     if not volume:
         return jsonify({'error': 'Volume not found'}), 404
     
-    # 从请求中获取章纲数据
+    # 从请求中获取章纲数据（单个章纲或章纲列表）
     data = request.json
+    items = data if isinstance(data, list) else [data]
+    rows = []
+    for index, chap_data in enumerate(items):
+        row = dict(chap_data)
+        # 未指定 order_index 时按提交顺序编号
+        if row.get('order_index') is None:
+            row['order_index'] = index + 1
+        row.update(project_id=volume.project_id, volume_id=volume.id)
+        rows.append(row)
     
-    # 检查是否是批量创建
-    if isinstance(data, list):
-        created_chapters = []
-        for chap_data in data:
-            # 检查是否已存在相同order_index的章纲
-            existing_chapter = Chapter.query.filter_by(
-                project_id=volume.project_id,
-                volume_id=volume.id,
-                order_index=chap_data.get('order_index')
-            ).first()
-            
-            if existing_chapter:
-                # 更新现有章纲，增加版本号
-                existing_chapter.title = chap_data.get('title', existing_chapter.title)
-                existing_chapter.content = chap_data.get('content', existing_chapter.content)
-                existing_chapter.core_event = chap_data.get('core_event', existing_chapter.core_event)
-                existing_chapter.emotional_goal = chap_data.get('emotional_goal', existing_chapter.emotional_goal)
-                existing_chapter.word_count_estimate = chap_data.get('word_count_estimate', existing_chapter.word_count_estimate)
-                existing_chapter.version += 1
-                created_chapters.append(existing_chapter)
-            else:
-                # 创建新章纲
-                new_chapter = Chapter(
-                    project_id=volume.project_id,
-                    volume_id=volume.id,
-                    title=chap_data.get('title', '未命名章'),
-                    content=chap_data.get('content', ''),
-                    core_event=chap_data.get('core_event', ''),
-                    emotional_goal=chap_data.get('emotional_goal', ''),
-                    word_count_estimate=chap_data.get('word_count_estimate', 2000),
-                    order_index=chap_data.get('order_index', len(created_chapters) + 1),
-                    version=1
-                )
-                db.session.add(new_chapter)
-                created_chapters.append(new_chapter)
-    else:
-        # 单个章纲创建
-        existing_chapter = Chapter.query.filter_by(
-            project_id=volume.project_id,
-            volume_id=volume.id,
-            order_index=data.get('order_index', 1)
-        ).first()
-        
-        if existing_chapter:
-            # 更新现有章纲，增加版本号
-            existing_chapter.title = data.get('title', existing_chapter.title)
-            existing_chapter.content = data.get('content', existing_chapter.content)
-            existing_chapter.core_event = data.get('core_event', existing_chapter.core_event)
-            existing_chapter.emotional_goal = data.get('emotional_goal', existing_chapter.emotional_goal)
-            existing_chapter.word_count_estimate = data.get('word_count_estimate', existing_chapter.word_count_estimate)
-            existing_chapter.version += 1
-            created_chapters = [existing_chapter]
-        else:
-            # 创建新章纲
-            new_chapter = Chapter(
-                project_id=volume.project_id,
-                volume_id=volume.id,
-                title=data.get('title', '未命名章'),
-                content=data.get('content', ''),
-                core_event=data.get('core_event', ''),
-                emotional_goal=data.get('emotional_goal', ''),
-                word_count_estimate=data.get('word_count_estimate', 2000),
-                order_index=data.get('order_index', 1),
-                version=1
-            )
-            db.session.add(new_chapter)
-            created_chapters = [new_chapter]
-    
+    # 已存在相同 order_index 的章纲更新内容并增加版本号，其余新建
+    created_chapters, _, _ = bulk_upsert(
+        Chapter, rows,
+        key_fields=('project_id', 'volume_id', 'order_index'),
+        fields=('title', 'content', 'core_event', 'emotional_goal', 'word_count_estimate'),
+        scope=(Chapter.project_id == volume.project_id, Chapter.volume_id == volume.id),
+        defaults={'title': '未命名章', 'word_count_estimate': 2000},
+        bump_version=True
+    )
+    # 提交前序列化，避免提交后逐条重新加载过期的对象
+    result = [chapter.to_dict() for chapter in created_chapters]
     db.session.commit()
-    return jsonify([chapter.to_dict() for chapter in created_chapters]), 201
+    return jsonify(result), 201
 
 # 章纲相关接口
 @api_bp.route('/chapters/<int:id>', methods=['PUT'])
@@ -489,18 +470,41 @@ def evaluate_chapter(id):
     if not chapter:
         return jsonify({'error': 'Chapter not found'}), 404
     
-    # 这里应该实现章纲评估逻辑
-    # 暂时返回模拟数据
+    metrics = get_chapter_analysis(chapter)
+    sentence_length = metrics['sentence_length']
+    # 句长变化小说明句式单一；对话或动作占比高节奏偏快，描写占比高节奏偏慢
+    variation = sentence_length['stdev'] / sentence_length['mean'] if sentence_length['mean'] else 0
+    if not metrics['sentence_count']:
+        rhythm = 'Unknown'
+    elif variation < 0.35:
+        rhythm = 'Monotonous'
+    elif metrics['description_ratio'] > 0.7:
+        rhythm = 'Slow'
+    elif metrics['dialogue_ratio'] + metrics['action_ratio'] > 0.75:
+        rhythm = 'Fast'
+    else:
+        rhythm = 'Good'
+    # 冲突密度：动作占比与每千字负面情绪词数
+    negative_density = metrics['negative_hits'] * 1000 / metrics['char_count'] if metrics['char_count'] else 0
+    conflict_score = metrics['action_ratio'] * 10 + negative_density
+    if conflict_score >= 6:
+        conflict = 'High'
+    elif conflict_score >= 2.5:
+        conflict = 'Moderate'
+    else:
+        conflict = 'Low'
+    
     evaluation = {
         'chapter_id': id,
-        'function_distribution': {
-            'main_plot': 70,
-            'character_development': 20,
-            'foreshadowing': 10
+        'segment_distribution': {
+            'dialogue': round(metrics['dialogue_ratio'] * 100),
+            'action': round(metrics['action_ratio'] * 100),
+            'description': round(metrics['description_ratio'] * 100)
         },
-        'rhythm_evaluation': 'Good',
-        'conflict_density': 'Moderate',
-        'character_balance': 'Balanced'
+        'rhythm_evaluation': rhythm,
+        'conflict_density': conflict,
+        'sentiment': metrics['sentiment'],
+        'sentence_length': sentence_length
     }
     
     return jsonify(evaluation)
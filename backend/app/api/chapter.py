@@ -1,10 +1,92 @@
 from app.api import api_bp
 from app import db
 from app.models import Chapter
+from app.services.search_service import reindex_entities
+from app.services.etag_service import conditional_get, ALL_SCOPE, path_scope
 from flask import request, jsonify
+from datetime import datetime, date
+
+# 章节目录默认返回的元数据列（不含正文）
+CHAPTER_SUMMARY_FIELDS = ('id', 'title', 'order_index', 'status', 'word_count', 'updated_at')
+
+# 分页大小限制
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
+
+def _parse_chapter_cursor(cursor):
+    """解析游标，格式为 "order_index:id" """
+    try:
+        order_index, chapter_id = cursor.split(':', 1)
+        return int(order_index), int(chapter_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _serialize_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _list_chapter_summaries(project_id):
+    """
+    章节目录模式：只查询元数据列，按 (order_index, id) 做游标分页
+    """
+    fields_param = request.args.get('fields')
+    if fields_param:
+        fields = [f.strip() for f in fields_param.split(',') if f.strip()]
+        invalid = [f for f in fields if f not in Chapter.__table__.columns]
+        if invalid:
+            return jsonify({'error': f'Invalid fields: {", ".join(invalid)}'}), 400
+    else:
+        fields = list(CHAPTER_SUMMARY_FIELDS)
+
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    # 游标需要 order_index 和 id，即使客户端未请求这两列也要查询
+    columns = [getattr(Chapter, f) for f in fields]
+    extra = [c for c in (Chapter.order_index, Chapter.id) if c.key not in fields]
+    query = db.session.query(*(columns + extra)).filter(Chapter.project_id == project_id)
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        position = _parse_chapter_cursor(cursor)
+        if position is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        last_order, last_id = position
+        query = query.filter(db.or_(
+            Chapter.order_index > last_order,
+            db.and_(Chapter.order_index == last_order, Chapter.id > last_id)
+        ))
+
+    # 多取一行用于判断是否还有下一页
+    rows = query.order_by(Chapter.order_index, Chapter.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items = [{f: _serialize_value(getattr(row, f)) for f in fields} for row in rows]
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = f'{last.order_index}:{last.id}'
+
+    return jsonify({
+        'items': items,
+        'next_cursor': next_cursor,
+        'has_more': has_more
+    })
+
 
 @api_bp.route('/projects/<int:project_id>/chapters', methods=['GET'])
+@conditional_get(Chapter, scope=path_scope('project', 'project_id'))
 def get_chapters(project_id):
+    # 传入 view=summary、fields、limit 或 cursor 时使用章节目录模式，不加载正文
+    if request.args.get('view') == 'summary' or any(
+            key in request.args for key in ('fields', 'limit', 'cursor')):
+        return _list_chapter_summaries(project_id)
+
     chapters = Chapter.query.filter_by(project_id=project_id).order_by(Chapter.order_index).all()
     # 使用模型的to_dict()方法
     result = [chapter.to_dict() for chapter in chapters]
@@ -41,6 +123,7 @@ def create_chapter():
     return jsonify(new_chapter.to_dict()), 201
 
 @api_bp.route('/chapters/<int:id>', methods=['GET'])
+@conditional_get(Chapter, scope=ALL_SCOPE)
 def get_chapter(id):
     chapter = Chapter.query.get(id)
     if not chapter:
@@ -55,15 +138,108 @@ def update_chapter(id):
         return jsonify({'error': 'Chapter not found'}), 404
     data = request.json
     chapter.title = data.get('title', chapter.title)
-    chapter.content = data.get('content', chapter.content)
+    if 'content' in data and data['content'] != chapter.content:
+        chapter.content = data['content']
+        chapter.word_count = len(chapter.content)
+        # 整体覆盖正文同样推进版本，使基于旧版本的增量补丁失效
+        chapter.version = (chapter.version or 1) + 1
     chapter.status = data.get('status', chapter.status)
     chapter.type = data.get('type', chapter.type)
     chapter.order_index = data.get('order_index', chapter.order_index)
-    chapter.word_count = len(chapter.content)
     db.session.commit()
     # 使用模型的to_dict()方法
     return jsonify(chapter.to_dict())
 
+
+def apply_text_operations(text, operations):
+    """
+    按顺序应用文本操作，返回 (新文本, 字数变化)
+
+    每个操作的偏移量基于前一个操作执行后的文本：
+    {"op": "insert", "offset": 10, "text": "..."}
+    {"op": "delete", "offset": 10, "length": 5}
+    """
+    delta = 0
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            raise ValueError(f'Operation {index} must be an object')
+        op = operation.get('op')
+        offset = operation.get('offset')
+        if not isinstance(offset, int) or isinstance(offset, bool) or offset < 0 or offset > len(text):
+            raise ValueError(f'Operation {index} has invalid offset')
+
+        if op == 'insert':
+            inserted = operation.get('text')
+            if not isinstance(inserted, str):
+                raise ValueError(f'Operation {index} is missing text')
+            text = text[:offset] + inserted + text[offset:]
+            delta += len(inserted)
+        elif op == 'delete':
+            length = operation.get('length')
+            if not isinstance(length, int) or isinstance(length, bool) or length < 0 or offset + length > len(text):
+                raise ValueError(f'Operation {index} has invalid length')
+            text = text[:offset] + text[offset + length:]
+            delta -= length
+        else:
+            raise ValueError(f'Operation {index} has unknown op: {op}')
+    return text, delta
+
+
+@api_bp.route('/chapters/<int:id>/content', methods=['PATCH'])
+def patch_chapter_content(id):
+    """
+    增量更新章节正文：客户端只提交基于 version 的插入/删除操作
+    """
+    data = request.json
+    if not data:
+        return jsonify({'error': 'No data received'}), 400
+    if 'version' not in data:
+        return jsonify({'error': 'Missing required field: version'}), 400
+    operations = data.get('operations')
+    if not isinstance(operations, list):
+        return jsonify({'error': 'Missing required field: operations'}), 400
+
+    chapter = Chapter.query.get(id)
+    if not chapter:
+        return jsonify({'error': 'Chapter not found'}), 404
+
+    base_version = data['version']
+    if not isinstance(base_version, int) or isinstance(base_version, bool):
+        return jsonify({'error': 'version must be an integer'}), 400
+    if chapter.version != base_version:
+        return jsonify({'error': 'Version conflict', 'version': chapter.version}), 409
+
+    try:
+        content, _ = apply_text_operations(chapter.content or '', operations)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    new_version = base_version + 1
+    # 与其他保存路径一致按正文长度计算，不沿用可能未维护的旧字数
+    word_count = len(content)
+    updated_at = datetime.utcnow()
+    # 条件更新：只有版本仍为 base_version 时才写入，防止并发保存互相覆盖
+    updated = Chapter.query.filter_by(id=id, version=base_version).update({
+        Chapter.content: content,
+        Chapter.word_count: word_count,
+        Chapter.version: new_version,
+        Chapter.updated_at: updated_at
+    }, synchronize_session=False)
+    if not updated:
+        db.session.rollback()
+        current = db.session.query(Chapter.version).filter_by(id=id).scalar()
+        return jsonify({'error': 'Version conflict', 'version': current}), 409
+    # 条件更新不触发模型事件，手动更新检索索引
+    reindex_entities(db.session.connection(), 'chapter', [id])
+    db.session.commit()
+
+    return jsonify({
+        'id': id,
+        'version': new_version,
+        'word_count': word_count,
+        'updated_at': updated_at.isoformat()
+    })
+
 @api_bp.route('/chapters/<int:id>', methods=['DELETE'])
 def delete_chapter(id):
     chapter = Chapter.query.get(id)
@@ -2,8 +2,11 @@ from flask import jsonify, request
 from app import db
 from app.models import Character, Project, CharacterBackground, CharacterAbilityDetail
 from app.api import api_bp
+from app.services.bulk_service import upsert_project_settings
+from app.services.etag_service import conditional_get, ALL_SCOPE
 
 @api_bp.route('/characters', methods=['GET'])
+@conditional_get(Character)
 def get_characters():
     project_id = request.args.get('project_id')
     world_id = request.args.get('world_id')
@@ -22,12 +25,17 @@ def get_characters():
         except ValueError:
             pass
     
+    # 默认只加载列表摘要字段，detail=full 时一并加载详情字段
+    if request.args.get('detail') == 'full':
+        characters = query.options(db.undefer_group('detail')).all()
+        return jsonify([character.to_dict() for character in characters])
     characters = query.all()
-    return jsonify([character.to_dict() for character in characters])
+    return jsonify([character.to_summary_dict() for character in characters])
 
 @api_bp.route('/characters/<int:character_id>', methods=['GET'])
+@conditional_get(Character, CharacterBackground, CharacterAbilityDetail, scope=ALL_SCOPE)
 def get_character(character_id):
-    character = Character.query.get_or_404(character_id)
+    character = Character.query.options(db.undefer_group('detail')).get_or_404(character_id)
     result = character.to_dict()
     
     # 获取角色的背景故事
@@ -274,6 +282,7 @@ def delete_character(character_id):
 
 # 角色背景故事API
 @api_bp.route('/characters/<int:character_id>/backgrounds', methods=['GET'])
+@conditional_get(CharacterBackground, scope=ALL_SCOPE)
 def get_character_backgrounds(character_id):
     backgrounds = CharacterBackground.query.filter_by(character_id=character_id).all()
     return jsonify([bg.to_dict() for bg in backgrounds])
@@ -299,6 +308,7 @@ def add_character_background(character_id):
 
 # 角色能力详情API
 @api_bp.route('/characters/<int:character_id>/ability-details', methods=['GET'])
+@conditional_get(CharacterAbilityDetail, scope=ALL_SCOPE)
 def get_character_ability_details(character_id):
     abilities = CharacterAbilityDetail.query.filter_by(character_id=character_id).all()
     return jsonify([ability.to_dict() for ability in abilities])
@@ -320,3 +330,23 @@ def add_character_ability_detail(character_id):
     db.session.add(ability)
     db.session.commit()
     return jsonify(ability.to_dict()), 201
+
+
+@api_bp.route('/characters/bulk', methods=['POST'])
+def bulk_upsert_characters():
+    """
+    批量导入角色：同一项目、同一世界中同名的角色更新，其余新建，一次请求、一个事务
+    """
+    try:
+        characters, created, updated = upsert_project_settings(Character, request.get_json())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    result = {
+        'created': created,
+        'updated': updated,
+        'characters': [character.to_summary_dict() for character in characters]
+    }
+    db.session.commit()
+    return jsonify(result), 201
@@ -381,8 +381,13 @@ def get_civilizations():
         if not world_id:
             return error_response('缺少world_id参数', 400)
         
-        civilizations = Civilization.query.filter_by(world_id=world_id).order_by(Civilization.order_index).all()
-        return success_response([c.to_dict() for c in civilizations], '获取文明列表成功')
+        query = Civilization.query.filter_by(world_id=world_id).order_by(Civilization.order_index)
+        # 默认只加载列表摘要字段，detail=full 时一并加载详情字段
+        if request.args.get('detail') == 'full':
+            civilizations = query.options(db.undefer_group('detail')).all()
+            return success_response([c.to_dict() for c in civilizations], '获取文明列表成功')
+        civilizations = query.all()
+        return success_response([c.to_summary_dict() for c in civilizations], '获取文明列表成功')
     except Exception as e:
         return error_response(f'获取文明列表失败: {str(e)}', 500)
 
@@ -432,7 +437,7 @@ def create_civilization():
 def get_civilization(civilization_id):
     """获取文明详情"""
     try:
-        civilization = Civilization.query.get(civilization_id)
+        civilization = Civilization.query.options(db.undefer_group('detail')).get(civilization_id)
         if not civilization:
             return error_response('文明不存在', 404)
         return success_response(civilization.to_dict(), '获取文明详情成功')
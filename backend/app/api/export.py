@@ -1,202 +1,128 @@
-from flask import request, jsonify, send_file
-from app import db
-from app.models import Chapter, Project
+from flask import request, jsonify, send_file, current_app, stream_with_context
+from app.models import Project
 from app.api import api_bp
-import os
-import tempfile
-import gc
-from docx import Document
+from app.services.export_service import (
+    EXPORT_FORMATS, normalize_format, iter_project_sections, content_sections,
+    export_file, write_docx, stream_export, content_version, artifact_key, export_artifact
+)
+from urllib.parse import quote
+import io
+import logging
 
-# 简化的内存使用监控函数
-def get_memory_usage():
-    # 移除psutil依赖，返回固定值
-    return 0.0
+logger = logging.getLogger(__name__)
+
+
+def _attachment(body, filename, mimetype):
+    """
+    以附件形式返回导出内容：文件对象分块发送，生成器直接流式写入响应
+    """
+    if hasattr(body, 'read'):
+        return send_file(body, mimetype=mimetype, as_attachment=True, download_name=filename)
+    response = current_app.response_class(stream_with_context(body), mimetype=mimetype)
+    # 文件名可能包含中文，按 RFC 5987 编码
+    response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(filename)}"
+    return response
+
+
+@api_bp.route('/projects/<int:project_id>/export/<fmt>', methods=['GET'])
+def export_project(project_id, fmt):
+    """
+    服务端导出整本书（或部分卷、章节），章节从数据库分批读取并逐章写出。
+    渲染结果按内容版本缓存，重复下载支持 ETag/If-None-Match 与 Range 请求
+
+    fmt: text/txt、markdown/md、html/pdf、docx/word
+    volume_id: 只导出该卷
+    chapter_ids: 只导出指定章节（逗号分隔）
+    start / end: 章节 order_index 范围
+    cache: 为 0 时不使用产物缓存，直接流式导出
+    """
+    try:
+        fmt = normalize_format(fmt)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    project = Project.query.get(project_id)
+    if not project:
+        return jsonify({'error': 'Project not found'}), 404
+
+    try:
+        chapter_ids = [int(value) for value in request.args.get('chapter_ids', '').split(',') if value.strip()]
+    except ValueError:
+        return jsonify({'error': 'Invalid chapter_ids'}), 400
+
+    scope = {
+        'volume_id': request.args.get('volume_id', type=int),
+        'chapter_ids': chapter_ids or None,
+        'start': request.args.get('start', type=int),
+        'end': request.args.get('end', type=int)
+    }
+    extension, mimetype = EXPORT_FORMATS[fmt]
+    filename = f'{project.title}.{extension}'
+    try:
+        if request.args.get('cache', '1') == '0':
+            # 不使用缓存时直接流式生成
+            return _attachment(export_file(fmt, iter_project_sections(project, **scope)), filename, mimetype)
+
+        version = content_version(project, **scope)
+        etag = artifact_key(project.id, fmt, version, **scope)
+        # 客户端已有相同内容版本的产物：无需读取或渲染
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+
+        path, hit = export_artifact(project, fmt, version, **scope)
+        # conditional=True 处理 If-None-Match / If-Range 与 Range 请求
+        response = send_file(path, mimetype=mimetype, as_attachment=True, download_name=filename,
+                             conditional=True, etag=etag, max_age=0)
+        response.headers['X-Export-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+    except Exception as e:
+        logger.error(f'导出项目失败: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+
+# 以下接口导出客户端提交的正文，保留给编辑器中尚未保存的内容使用
 
 @api_bp.route('/export/word', methods=['POST'])
 def export_to_word():
-    temp_file_path = None
     try:
         data = request.json
-        content = data.get('content', '')
         title = data.get('title', 'Document')
-        
-        # 监控内存使用
-        print(f"Memory usage before creating document: {get_memory_usage():.2f} MB")
-        
-        # 创建Word文档
-        doc = Document()
-        doc.add_heading(title, level=1)
-        
-        # 分批添加内容，避免一次性加载大文件
-        paragraphs = content.split('\n')
-        batch_size = 100
-        for i in range(0, len(paragraphs), batch_size):
-            batch_paragraphs = paragraphs[i:i+batch_size]
-            for paragraph in batch_paragraphs:
-                if paragraph.strip():
-                    doc.add_paragraph(paragraph)
-            # 每处理一批后清理内存
-            gc.collect()
-        
-        # 监控内存使用
-        print(f"Memory usage before saving document: {get_memory_usage():.2f} MB")
-        
-        # 保存到临时文件
-        with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as temp_file:
-            doc.save(temp_file.name)
-            temp_file_path = temp_file.name
-        
-        # 清理文档对象
-        del doc
-        gc.collect()
-        
-        # 监控内存使用
-        print(f"Memory usage before sending file: {get_memory_usage():.2f} MB")
-        
-        # 发送文件
-        return send_file(temp_file_path, as_attachment=True, download_name=f'{title}.docx')
-    
+        output = write_docx(content_sections(title, data.get('content', '')))
+        return _attachment(output, f'{title}.docx', EXPORT_FORMATS['docx'][1])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        # 清理临时文件
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.remove(temp_file_path)
-            except:
-                pass
-        # 清理内存
-        gc.collect()
+
 
 @api_bp.route('/export/pdf', methods=['POST'])
 def export_to_pdf():
-    temp_file_path = None
+    # 发送HTML文件，让前端使用降级方案
     try:
         data = request.json
-        content = data.get('content', '')
         title = data.get('title', 'Document')
-        
-        # 分批处理内容，避免一次性加载大文件
-        paragraphs = content.split('\n')
-        html_paragraphs = []
-        batch_size = 100
-        for i in range(0, len(paragraphs), batch_size):
-            batch_paragraphs = paragraphs[i:i+batch_size]
-            for para in batch_paragraphs:
-                if para.strip():
-                    html_paragraphs.append(f'<p>{para}</p>')
-            # 每处理一批后清理内存
-            gc.collect()
-        
-        # 创建HTML内容
-        html_content = f'''
-        <html>
-            <head>
-                <meta charset="utf-8">
-                <title>{title}</title>
-                <style>
-                    body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                    h1 {{ color: #333; }}
-                    p {{ line-height: 1.6; margin-bottom: 10px; }}
-                </style>
-            </head>
-            <body>
-                <h1>{title}</h1>
-                {''.join(html_paragraphs)}
-            </body>
-        </html>
-        '''
-        
-        # 保存到临时HTML文件
-        with tempfile.NamedTemporaryFile(suffix='.html', delete=False) as temp_file:
-            temp_file.write(html_content.encode('utf-8'))
-            temp_file_path = temp_file.name
-        
-        # 清理变量
-        del html_paragraphs, html_content
-        gc.collect()
-        
-        # 发送HTML文件，让前端使用降级方案
-        return send_file(temp_file_path, as_attachment=True, download_name=f'{title}.html')
-    
+        body = b''.join(stream_export('html', content_sections(title, data.get('content', ''))))
+        return _attachment(io.BytesIO(body), f'{title}.html', EXPORT_FORMATS['html'][1])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        # 清理临时文件
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.remove(temp_file_path)
-            except:
-                pass
-        # 清理内存
-        gc.collect()
+
 
 @api_bp.route('/export/markdown', methods=['POST'])
 def export_to_markdown():
-    temp_file_path = None
     try:
         data = request.json
-        content = data.get('content', '')
         title = data.get('title', 'Document')
-        
-        # 创建Markdown内容
-        markdown_content = f'# {title}\n\n{content}'
-        
-        # 保存到临时文件
-        with tempfile.NamedTemporaryFile(suffix='.md', delete=False) as temp_file:
-            temp_file.write(markdown_content.encode('utf-8'))
-            temp_file_path = temp_file.name
-        
-        # 清理变量
-        del markdown_content
-        gc.collect()
-        
-        # 发送文件
-        return send_file(temp_file_path, as_attachment=True, download_name=f'{title}.md')
-    
+        markdown_content = f"# {title}\n\n{data.get('content', '')}"
+        return _attachment(io.BytesIO(markdown_content.encode('utf-8')), f'{title}.md', EXPORT_FORMATS['markdown'][1])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        # 清理临时文件
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.remove(temp_file_path)
-            except:
-                pass
-        # 清理内存
-        gc.collect()
+
 
 @api_bp.route('/export/text', methods=['POST'])
 def export_to_text():
-    temp_file_path = None
     try:
         data = request.json
-        content = data.get('content', '')
         title = data.get('title', 'Document')
-        
-        # 创建文本内容
-        text_content = f'{title}\n\n{content}'
-        
-        # 保存到临时文件
-        with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as temp_file:
-            temp_file.write(text_content.encode('utf-8'))
-            temp_file_path = temp_file.name
-        
-        # 清理变量
-        del text_content
-        gc.collect()
-        
-        # 发送文件
-        return send_file(temp_file_path, as_attachment=True, download_name=f'{title}.txt')
-    
+        text_content = f"{title}\n\n{data.get('content', '')}"
+        return _attachment(io.BytesIO(text_content.encode('utf-8')), f'{title}.txt', EXPORT_FORMATS['text'][1])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        # 清理临时文件
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.remove(temp_file_path)
-            except:
-                pass
-        # 清理内存
-        gc.collect()
@@ -2,8 +2,10 @@ from flask import jsonify, request
 from app import db
 from app.models import Faction, Project
 from app.api import api_bp
+from app.services.etag_service import conditional_get, ALL_SCOPE
 
 @api_bp.route('/factions', methods=['GET'])
+@conditional_get(Faction)
 def get_factions():
     project_id = request.args.get('project_id')
     world_id = request.args.get('world_id')
@@ -12,12 +14,17 @@ def get_factions():
         query = query.filter_by(project_id=project_id)
     if world_id:
         query = query.filter_by(world_id=world_id)
+    # 默认只加载列表摘要字段，detail=full 时一并加载详情字段
+    if request.args.get('detail') == 'full':
+        factions = query.options(db.undefer_group('detail')).all()
+        return jsonify([faction.to_dict() for faction in factions])
     factions = query.all()
-    return jsonify([faction.to_dict() for faction in factions])
+    return jsonify([faction.to_summary_dict() for faction in factions])
 
 @api_bp.route('/factions/<int:faction_id>', methods=['GET'])
+@conditional_get(Faction, scope=ALL_SCOPE)
 def get_faction(faction_id):
-    faction = Faction.query.get_or_404(faction_id)
+    faction = Faction.query.options(db.undefer_group('detail')).get_or_404(faction_id)
     return jsonify(faction.to_dict())
 
 @api_bp.route('/factions', methods=['POST'])
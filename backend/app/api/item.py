@@ -2,8 +2,11 @@ from flask import jsonify, request
 from app import db
 from app.models import Item, Project
 from app.api import api_bp
+from app.services.bulk_service import upsert_project_settings
+from app.services.etag_service import conditional_get, ALL_SCOPE
 
 @api_bp.route('/items', methods=['GET'])
+@conditional_get(Item)
 def get_items():
     project_id = request.args.get('project_id')
     world_id = request.args.get('world_id')
@@ -12,12 +15,17 @@ def get_items():
         query = query.filter_by(project_id=project_id)
     if world_id:
         query = query.filter_by(world_id=world_id)
+    # 默认只加载列表摘要字段，detail=full 时一并加载详情字段
+    if request.args.get('detail') == 'full':
+        items = query.options(db.undefer_group('detail')).all()
+        return jsonify([item.to_dict() for item in items])
     items = query.all()
-    return jsonify([item.to_dict() for item in items])
+    return jsonify([item.to_summary_dict() for item in items])
 
 @api_bp.route('/items/<int:item_id>', methods=['GET'])
+@conditional_get(Item, scope=ALL_SCOPE)
 def get_item(item_id):
-    item = Item.query.get_or_404(item_id)
+    item = Item.query.options(db.undefer_group('detail')).get_or_404(item_id)
     return jsonify(item.to_dict())
 
 @api_bp.route('/items', methods=['POST'])
@@ -72,4 +80,24 @@ def delete_item(item_id):
     item = Item.query.get_or_404(item_id)
     db.session.delete(item)
     db.session.commit()
-    return jsonify({'message': 'Item deleted successfully'}), 200
\ No newline at end of file
+    return jsonify({'message': 'Item deleted successfully'}), 200
+
+
+@api_bp.route('/items/bulk', methods=['POST'])
+def bulk_upsert_items():
+    """
+    批量导入物品：同一项目、同一世界中同名的物品更新，其余新建，一次请求、一个事务
+    """
+    try:
+        items, created, updated = upsert_project_settings(Item, request.get_json(), require_project=True)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    result = {
+        'created': created,
+        'updated': updated,
+        'items': [item.to_summary_dict() for item in items]
+    }
+    db.session.commit()
+    return jsonify(result), 201
@@ -0,0 +1,93 @@
+from flask import request, jsonify, current_app
+from app.api import api_bp
+from app.models import AIJob
+from app.services.job_service import job_queue, FINISHED_STATUSES
+from app.services.stream_decoder import relay_with_heartbeat
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# 任务输出流的心跳间隔（秒）
+JOB_STREAM_HEARTBEAT_INTERVAL = float(os.getenv('AI_STREAM_HEARTBEAT_INTERVAL', 15))
+
+
+@api_bp.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    提交后台任务：{'type': 任务类型, 'params': 任务参数}，立即返回任务ID
+    """
+    data = request.json or {}
+    job_type = data.get('type')
+    if not job_type:
+        return jsonify({'error': '缺少任务类型'}), 400
+
+    try:
+        job = job_queue.submit(job_type, data.get('params') or {})
+        return jsonify({'success': True, 'job_id': job.id, 'status': job.status}), 202
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f'提交任务失败: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/jobs', methods=['GET'])
+def list_jobs():
+    """
+    最近的任务列表（不含输出），可按 status、type 过滤
+    """
+    try:
+        query = AIJob.query
+        if request.args.get('status'):
+            query = query.filter_by(status=request.args['status'])
+        if request.args.get('type'):
+            query = query.filter_by(job_type=request.args['type'])
+        limit = min(request.args.get('limit', 50, type=int), 200)
+        jobs = query.order_by(AIJob.created_at.desc()).limit(limit).all()
+        return jsonify({'success': True, 'jobs': [job.to_dict(include_output=False) for job in jobs]})
+
+    except Exception as e:
+        logger.error(f'获取任务列表失败: {str(e)}')
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    查询任务状态、进度、部分输出与结果
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在'}), 404
+    return jsonify({'success': True, 'job': job})
+
+
+@api_bp.route('/jobs/<int:job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """
+    取消任务
+    """
+    job = job_queue.cancel(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在'}), 404
+    return jsonify({'success': True, 'job_id': job.id, 'status': job.status, 'finished': job.status in FINISHED_STATUSES})
+
+
+@api_bp.route('/jobs/<int:job_id>/stream', methods=['GET'])
+def stream_job(job_id):
+    """
+    以SSE流式读取任务的部分输出与进度，任务结束时发送最终状态与结果
+    """
+    events = job_queue.events(job_id)
+    if events is None:
+        return jsonify({'error': '任务不存在'}), 404
+
+    response = current_app.response_class(
+        relay_with_heartbeat(events, interval=JOB_STREAM_HEARTBEAT_INTERVAL),
+        mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
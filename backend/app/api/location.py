@@ -2,8 +2,11 @@ from flask import jsonify, request
 from app import db
 from app.models import Location, Project
 from app.api import api_bp
+from app.services.bulk_service import upsert_project_settings
+from app.services.etag_service import conditional_get, ALL_SCOPE
 
 @api_bp.route('/locations', methods=['GET'])
+@conditional_get(Location)
 def get_locations():
     project_id = request.args.get('project_id')
     world_id = request.args.get('world_id')
@@ -12,12 +15,17 @@ def get_locations():
         query = query.filter_by(project_id=project_id)
     if world_id:
         query = query.filter_by(world_id=world_id)
+    # 默认只加载列表摘要字段，detail=full 时一并加载详情字段
+    if request.args.get('detail') == 'full':
+        locations = query.options(db.undefer_group('detail')).all()
+        return jsonify([location.to_dict() for location in locations])
     locations = query.all()
-    return jsonify([location.to_dict() for location in locations])
+    return jsonify([location.to_summary_dict() for location in locations])
 
 @api_bp.route('/locations/<int:location_id>', methods=['GET'])
+@conditional_get(Location, scope=ALL_SCOPE)
 def get_location(location_id):
-    location = Location.query.get_or_404(location_id)
+    location = Location.query.options(db.undefer_group('detail')).get_or_404(location_id)
     return jsonify(location.to_dict())
 
 @api_bp.route('/locations', methods=['POST'])
@@ -95,4 +103,24 @@ def delete_location(location_id):
     location = Location.query.get_or_404(location_id)
     db.session.delete(location)
     db.session.commit()
-    return jsonify({'message': 'Location deleted successfully'}), 200
\ No newline at end of file
+    return jsonify({'message': 'Location deleted successfully'}), 200
+
+
+@api_bp.route('/locations/bulk', methods=['POST'])
+def bulk_upsert_locations():
+    """
+    批量导入地点：同一项目、同一世界中同名的地点更新，其余新建，一次请求、一个事务
+    """
+    try:
+        locations, created, updated = upsert_project_settings(Location, request.get_json())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    result = {
+        'created': created,
+        'updated': updated,
+        'locations': [location.to_summary_dict() for location in locations]
+    }
+    db.session.commit()
+    return jsonify(result), 201
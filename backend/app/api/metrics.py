@@ -0,0 +1,13 @@
+from flask import current_app
+from app.api import api_bp
+from app.services.metrics_service import registry
+
+
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Prometheus 文本格式的运行指标：请求延迟、SQL 查询数与耗时、N+1 警告、AI 调用延迟与 token 用量
+    """
+    response = current_app.response_class(registry.render(), mimetype='text/plain')
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    return response
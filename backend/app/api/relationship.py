@@ -2,8 +2,10 @@ from flask import jsonify, request
 from app import db
 from app.models import Relationship, Project
 from app.api import api_bp
+from app.services.etag_service import conditional_get, ALL_SCOPE
 
 @api_bp.route('/relationships', methods=['GET'])
+@conditional_get(Relationship)
 def get_relationships():
     project_id = request.args.get('project_id')
     if project_id:
@@ -13,6 +15,7 @@ def get_relationships():
     return jsonify([relationship.to_dict() for relationship in relationships])
 
 @api_bp.route('/relationships/<int:relationship_id>', methods=['GET'])
+@conditional_get(Relationship, scope=ALL_SCOPE)
 def get_relationship(relationship_id):
     relationship = Relationship.query.get_or_404(relationship_id)
     return jsonify(relationship.to_dict())
@@ -0,0 +1,39 @@
+from flask import request, jsonify
+from app.api import api_bp
+from app.services.search_service import search
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@api_bp.route('/search', methods=['GET'])
+def search_entities():
+    """
+    全文检索章节、角色、地点、物品、势力、历史事件与笔记
+
+    q: 检索词，多个检索词以空格分隔，须同时命中
+    type: 实体类型，可重复或以逗号分隔（chapter/character/location/item/faction/event/note）
+    project_id / world_id: 按项目、世界过滤
+    page / per_page: 分页
+    """
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'error': '缺少检索词'}), 400
+
+    entity_types = [t for value in request.args.getlist('type') for t in value.split(',') if t]
+    try:
+        result = search(
+            query,
+            entity_types=entity_types or None,
+            project_id=request.args.get('project_id', type=int),
+            world_id=request.args.get('world_id', type=int),
+            page=request.args.get('page', 1, type=int),
+            per_page=request.args.get('per_page', 20, type=int)
+        )
+        return jsonify(result)
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f'检索失败: {str(e)}')
+        return jsonify({'error': str(e)}), 500
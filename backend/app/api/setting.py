@@ -9,9 +9,11 @@ from app.models import (
     EquipmentSystem, SpecialItem
 )
 from app.api import api_bp
+from app.services.etag_service import conditional_get, ALL_SCOPE
 
 # WorldSetting APIs
 @api_bp.route('/settings/world', methods=['GET'])
+@conditional_get(WorldSetting)
 def get_world_settings():
     try:
         project_id = request.args.get('project_id')
@@ -29,6 +31,7 @@ def get_world_settings():
         return jsonify({'error': str(e)}), 500
 
 @api_bp.route('/settings/world/<int:setting_id>', methods=['GET'])
+@conditional_get(WorldSetting, scope=ALL_SCOPE)
 def get_world_setting(setting_id):
     setting = WorldSetting.query.get_or_404(setting_id)
     return jsonify(setting.to_dict())
@@ -94,6 +97,7 @@ def delete_world_setting(setting_id):
 
 # EnergySystem APIs
 @api_bp.route('/settings/energy', methods=['GET'])
+@conditional_get(EnergySystem)
 def get_energy_systems():
     project_id = request.args.get('project_id')
     if project_id:
@@ -103,6 +107,7 @@ def get_energy_systems():
     return jsonify([system.to_dict() for system in systems])
 
 @api_bp.route('/settings/energy/<int:system_id>', methods=['GET'])
+@conditional_get(EnergySystem, scope=ALL_SCOPE)
 def get_energy_system(system_id):
     system = EnergySystem.query.get_or_404(system_id)
     return jsonify(system.to_dict())
@@ -158,6 +163,7 @@ def delete_energy_system(system_id):
 
 # SocietyCulture APIs
 @api_bp.route('/settings/society', methods=['GET'])
+@conditional_get(SocietyCulture)
 def get_society_cultures():
     project_id = request.args.get('project_id')
     if project_id:
@@ -167,6 +173,7 @@ def get_society_cultures():
     return jsonify([culture.to_dict() for culture in cultures])
 
 @api_bp.route('/settings/society/<int:culture_id>', methods=['GET'])
+@conditional_get(SocietyCulture, scope=ALL_SCOPE)
 def get_society_culture(culture_id):
     culture = SocietyCulture.query.get_or_404(culture_id)
     return jsonify(culture.to_dict())
@@ -224,6 +231,7 @@ def delete_society_culture(culture_id):
 
 # History APIs
 @api_bp.route('/settings/history', methods=['GET'])
+@conditional_get(History)
 def get_histories():
     project_id = request.args.get('project_id')
     if project_id:
@@ -233,6 +241,7 @@ def get_histories():
     return jsonify([history.to_dict() for history in histories])
 
 @api_bp.route('/settings/history/<int:history_id>', methods=['GET'])
+@conditional_get(History, scope=ALL_SCOPE)
 def get_history(history_id):
     history = History.query.get_or_404(history_id)
     return jsonify(history.to_dict())
@@ -286,6 +295,7 @@ def delete_history(history_id):
 
 # Ability APIs
 @api_bp.route('/settings/abilities', methods=['GET'])
+@conditional_get(Ability)
 def get_abilities():
     project_id = request.args.get('project_id')
     if project_id:
@@ -295,6 +305,7 @@ def get_abilities():
     return jsonify([ability.to_dict() for ability in abilities])
 
 @api_bp.route('/settings/abilities/<int:ability_id>', methods=['GET'])
+@conditional_get(Ability, scope=ALL_SCOPE)
 def get_ability(ability_id):
     ability = Ability.query.get_or_404(ability_id)
     return jsonify(ability.to_dict())
@@ -350,6 +361,7 @@ def delete_ability(ability_id):
 
 # Skill APIs
 @api_bp.route('/settings/skills', methods=['GET'])
+@conditional_get(Skill)
 def get_skills():
     project_id = request.args.get('project_id')
     if project_id:
@@ -359,6 +371,7 @@ def get_skills():
     return jsonify([skill.to_dict() for skill in skills])
 
 @api_bp.route('/settings/skills/<int:skill_id>', methods=['GET'])
+@conditional_get(Skill, scope=ALL_SCOPE)
 def get_skill(skill_id):
     skill = Skill.query.get_or_404(skill_id)
     return jsonify(skill.to_dict())
@@ -418,6 +431,7 @@ def delete_skill(skill_id):
 
 # Talent APIs
 @api_bp.route('/settings/talents', methods=['GET'])
+@conditional_get(Talent)
 def get_talents():
     project_id = request.args.get('project_id')
     if project_id:
@@ -427,6 +441,7 @@ def get_talents():
     return jsonify([talent.to_dict() for talent in talents])
 
 @api_bp.route('/settings/talents/<int:talent_id>', methods=['GET'])
+@conditional_get(Talent, scope=ALL_SCOPE)
 def get_talent(talent_id):
     talent = Talent.query.get_or_404(talent_id)
     return jsonify(talent.to_dict())
@@ -490,6 +505,7 @@ def delete_talent(talent_id):
 
 # Race APIs
 @api_bp.route('/settings/races', methods=['GET'])
+@conditional_get(Race)
 def get_races():
     project_id = request.args.get('project_id')
     if project_id:
@@ -499,6 +515,7 @@ def get_races():
     return jsonify([race.to_dict() for race in races])
 
 @api_bp.route('/settings/races/<int:race_id>', methods=['GET'])
+@conditional_get(Race, scope=ALL_SCOPE)
 def get_race(race_id):
     race = Race.query.get_or_404(race_id)
     return jsonify(race.to_dict())
@@ -558,6 +575,7 @@ def delete_race(race_id):
 
 # Creature APIs
 @api_bp.route('/settings/creatures', methods=['GET'])
+@conditional_get(Creature)
 def get_creatures():
     project_id = request.args.get('project_id')
     if project_id:
@@ -567,6 +585,7 @@ def get_creatures():
     return jsonify([creature.to_dict() for creature in creatures])
 
 @api_bp.route('/settings/creatures/<int:creature_id>', methods=['GET'])
+@conditional_get(Creature, scope=ALL_SCOPE)
 def get_creature(creature_id):
     creature = Creature.query.get_or_404(creature_id)
     return jsonify(creature.to_dict())
@@ -624,6 +643,7 @@ def delete_creature(creature_id):
 
 # SpecialCreature APIs
 @api_bp.route('/settings/special-creatures', methods=['GET'])
+@conditional_get(SpecialCreature)
 def get_special_creatures():
     project_id = request.args.get('project_id')
     if project_id:
@@ -633,6 +653,7 @@ def get_special_creatures():
     return jsonify([creature.to_dict() for creature in creatures])
 
 @api_bp.route('/settings/special-creatures/<int:creature_id>', methods=['GET'])
+@conditional_get(SpecialCreature, scope=ALL_SCOPE)
 def get_special_creature(creature_id):
     creature = SpecialCreature.query.get_or_404(creature_id)
     return jsonify(creature.to_dict())
@@ -688,6 +709,7 @@ def delete_special_creature(creature_id):
 
 # Timeline APIs
 @api_bp.route('/settings/timelines', methods=['GET'])
+@conditional_get(Timeline)
 def get_timelines():
     project_id = request.args.get('project_id')
     if project_id:
@@ -697,6 +719,7 @@ def get_timelines():
     return jsonify([timeline.to_dict() for timeline in timelines])
 
 @api_bp.route('/settings/timelines/<int:timeline_id>', methods=['GET'])
+@conditional_get(Timeline, scope=ALL_SCOPE)
 def get_timeline(timeline_id):
     timeline = Timeline.query.get_or_404(timeline_id)
     return jsonify(timeline.to_dict())
@@ -766,6 +789,7 @@ def delete_timeline(timeline_id):
 
 # DataAssociation APIs
 @api_bp.route('/settings/associations', methods=['GET'])
+@conditional_get(DataAssociation)
 def get_associations():
     project_id = request.args.get('project_id')
     if project_id:
@@ -775,6 +799,7 @@ def get_associations():
     return jsonify([association.to_dict() for association in associations])
 
 @api_bp.route('/settings/associations/<int:association_id>', methods=['GET'])
+@conditional_get(DataAssociation, scope=ALL_SCOPE)
 def get_association(association_id):
     association = DataAssociation.query.get_or_404(association_id)
     return jsonify(association.to_dict())
@@ -818,6 +843,7 @@ def delete_association(association_id):
 
 # CharacterTrait APIs
 @api_bp.route('/settings/character-trait', methods=['GET'])
+@conditional_get(CharacterTrait)
 def get_character_traits():
     project_id = request.args.get('project_id')
     if project_id:
@@ -827,6 +853,7 @@ def get_character_traits():
     return jsonify([trait.to_dict() for trait in traits])
 
 @api_bp.route('/settings/character-trait/<int:trait_id>', methods=['GET'])
+@conditional_get(CharacterTrait, scope=ALL_SCOPE)
 def get_character_trait(trait_id):
     trait = CharacterTrait.query.get_or_404(trait_id)
     return jsonify(trait.to_dict())
@@ -879,6 +906,7 @@ def delete_character_trait(trait_id):
 
 # CharacterAbility APIs
 @api_bp.route('/settings/character-ability', methods=['GET'])
+@conditional_get(CharacterAbility)
 def get_character_abilities():
     project_id = request.args.get('project_id')
     if project_id:
@@ -888,6 +916,7 @@ def get_character_abilities():
     return jsonify([ability.to_dict() for ability in abilities])
 
 @api_bp.route('/settings/character-ability/<int:ability_id>', methods=['GET'])
+@conditional_get(CharacterAbility, scope=ALL_SCOPE)
 def get_character_ability(ability_id):
     ability = CharacterAbility.query.get_or_404(ability_id)
     return jsonify(ability.to_dict())
@@ -940,6 +969,7 @@ def delete_character_ability(ability_id):
 
 # CharacterRelationship APIs
 @api_bp.route('/settings/character-relationship', methods=['GET'])
+@conditional_get(CharacterRelationship)
 def get_character_relationships():
     project_id = request.args.get('project_id')
     if project_id:
@@ -949,6 +979,7 @@ def get_character_relationships():
     return jsonify([relationship.to_dict() for relationship in relationships])
 
 @api_bp.route('/settings/character-relationship/<int:relationship_id>', methods=['GET'])
+@conditional_get(CharacterRelationship, scope=ALL_SCOPE)
 def get_character_relationship(relationship_id):
     relationship = CharacterRelationship.query.get_or_404(relationship_id)
     return jsonify(relationship.to_dict())
@@ -1001,6 +1032,7 @@ def delete_character_relationship(relationship_id):
 
 # FactionStructure APIs
 @api_bp.route('/settings/faction-structure', methods=['GET'])
+@conditional_get(FactionStructure)
 def get_faction_structures():
     project_id = request.args.get('project_id')
     if project_id:
@@ -1010,6 +1042,7 @@ def get_faction_structures():
     return jsonify([structure.to_dict() for structure in structures])
 
 @api_bp.route('/settings/faction-structure/<int:structure_id>', methods=['GET'])
+@conditional_get(FactionStructure, scope=ALL_SCOPE)
 def get_faction_structure(structure_id):
     structure = FactionStructure.query.get_or_404(structure_id)
     return jsonify(structure.to_dict())
@@ -1062,6 +1095,7 @@ def delete_faction_structure(structure_id):
 
 # FactionGoal APIs
 @api_bp.route('/settings/faction-goal', methods=['GET'])
+@conditional_get(FactionGoal)
 def get_faction_goals():
     project_id = request.args.get('project_id')
     if project_id:
@@ -1071,6 +1105,7 @@ def get_faction_goals():
     return jsonify([goal.to_dict() for goal in goals])
 
 @api_bp.route('/settings/faction-goal/<int:goal_id>', methods=['GET'])
+@conditional_get(FactionGoal, scope=ALL_SCOPE)
 def get_faction_goal(goal_id):
     goal = FactionGoal.query.get_or_404(goal_id)
     return jsonify(goal.to_dict())
@@ -1123,6 +1158,7 @@ def delete_faction_goal(goal_id):
 
 # LocationStructure APIs
 @api_bp.route('/settings/location-structure', methods=['GET'])
+@conditional_get(LocationStructure)
 def get_location_structures():
     project_id = request.args.get('project_id')
     if project_id:
@@ -1132,6 +1168,7 @@ def get_location_structures():
     return jsonify([structure.to_dict() for structure in structures])
 
 @api_bp.route('/settings/location-structure/<int:structure_id>', methods=['GET'])
+@conditional_get(LocationStructure, scope=ALL_SCOPE)
 def get_location_structure(structure_id):
     structure = LocationStructure.query.get_or_404(structure_id)
     return jsonify(structure.to_dict())
@@ -1184,6 +1221,7 @@ def delete_location_structure(structure_id):
 
 # SpecialLocation APIs
 @api_bp.route('/settings/special-location', methods=['GET'])
+@conditional_get(SpecialLocation)
 def get_special_locations():
     project_id = request.args.get('project_id')
     if project_id:
@@ -1193,6 +1231,7 @@ def get_special_locations():
     return jsonify([location.to_dict() for location in locations])
 
 @api_bp.route('/settings/special-location/<int:location_id>', methods=['GET'])
+@conditional_get(SpecialLocation, scope=ALL_SCOPE)
 def get_special_location(location_id):
     location = SpecialLocation.query.get_or_404(location_id)
     return jsonify(location.to_dict())
@@ -1245,6 +1284,7 @@ def delete_special_location(location_id):
 
 # EquipmentSystem APIs
 @api_bp.route('/settings/equipment-system', methods=['GET'])
+@conditional_get(EquipmentSystem)
 def get_equipment_systems():
     project_id = request.args.get('project_id')
     if project_id:
@@ -1254,6 +1294,7 @@ def get_equipment_systems():
     return jsonify([system.to_dict() for system in systems])
 
 @api_bp.route('/settings/equipment-system/<int:system_id>', methods=['GET'])
+@conditional_get(EquipmentSystem, scope=ALL_SCOPE)
 def get_equipment_system(system_id):
     system = EquipmentSystem.query.get_or_404(system_id)
     return jsonify(system.to_dict())
@@ -1306,6 +1347,7 @@ def delete_equipment_system(system_id):
 
 # SpecialItem APIs
 @api_bp.route('/settings/special-item', methods=['GET'])
+@conditional_get(SpecialItem)
 def get_special_items():
     project_id = request.args.get('project_id')
     if project_id:
@@ -1315,6 +1357,7 @@ def get_special_items():
     return jsonify([item.to_dict() for item in items])
 
 @api_bp.route('/settings/special-item/<int:item_id>', methods=['GET'])
+@conditional_get(SpecialItem, scope=ALL_SCOPE)
 def get_special_item(item_id):
     item = SpecialItem.query.get_or_404(item_id)
     return jsonify(item.to_dict())
@@ -2,11 +2,16 @@
 标签与关系网络模块API
 包含标签管理、实体标签关联、实体关系网络的管理
 """
+from collections import defaultdict
 from flask import Blueprint, request, jsonify
 from app.models import (
     Tag, EntityTag, EntityRelation,
     World, Character, Location, Item, Faction, db
 )
+from sqlalchemy import func
+from app.services.cache_service import LRUCache
+from app.services.etag_service import get_versions
+from app.services.stats_service import get_world_counts
 
 tags_relations_bp = Blueprint('tags_relations', __name__, url_prefix='/tags-relations')
 
@@ -402,6 +407,10 @@ ENTITY_TYPE_CONFIG = {
 }
 
 
+# IN 查询每批的ID数量，避免超过SQLite绑定参数上限
+ENTITY_NAME_BATCH_SIZE = 500
+
+
 def get_entity_name(entity_type, entity_id):
     """获取实体名称"""
     model = ENTITY_MODEL_MAP.get(entity_type)
@@ -411,6 +420,124 @@ def get_entity_name(entity_type, entity_id):
     return entity.name if entity else f"已删除{entity_type}"
 
 
+def get_entity_names(entity_keys):
+    """
+    批量获取实体名称：每种实体类型只执行一次（分批的）IN 查询
+    entity_keys 为 (entity_type, entity_id) 的集合，返回 {(entity_type, entity_id): name}
+    """
+    ids_by_type = defaultdict(set)
+    for entity_type, entity_id in entity_keys:
+        ids_by_type[entity_type].add(entity_id)
+
+    names = {}
+    for entity_type, ids in ids_by_type.items():
+        model = ENTITY_MODEL_MAP.get(entity_type)
+        if not model:
+            for entity_id in ids:
+                names[(entity_type, entity_id)] = f"未知{entity_type}"
+            continue
+
+        ids = list(ids)
+        found = {}
+        for i in range(0, len(ids), ENTITY_NAME_BATCH_SIZE):
+            batch = ids[i:i + ENTITY_NAME_BATCH_SIZE]
+            rows = db.session.query(model.id, model.name).filter(model.id.in_(batch)).all()
+            found.update(rows)
+        for entity_id in ids:
+            names[(entity_type, entity_id)] = found.get(entity_id, f"已删除{entity_type}")
+    return names
+
+
+# 关系网络缓存：键包含关系表与实体表在世界范围内的版本号，任一进程提交的修改都会使旧缓存失效
+RELATION_NETWORK_CACHE_SIZE = 64
+_relation_network_cache = LRUCache(RELATION_NETWORK_CACHE_SIZE)
+
+# 关系变化，或者节点名称来源的实体变化，都会使网络数据过期
+RELATION_NETWORK_TABLES = [EntityRelation.__tablename__] + [model.__tablename__ for model in ENTITY_MODEL_MAP.values()]
+
+
+def relation_network_version(world_id):
+    """
+    关系网络相关各表在世界范围内的版本号；先读版本号再构建网络，缓存的网络不会比键中的版本旧
+    """
+    versions, _ = get_versions(RELATION_NETWORK_TABLES, ('world', world_id))
+    return versions
+
+
+def build_relation_network(world_id, entity_types=None, relation_types=None):
+    """组装关系网络的节点、边和统计"""
+    # 只查询组装网络需要的列
+    query = db.session.query(
+        EntityRelation.source_type, EntityRelation.source_id,
+        EntityRelation.target_type, EntityRelation.target_id,
+        EntityRelation.relation_type, EntityRelation.strength,
+        EntityRelation.description
+    ).filter(EntityRelation.world_id == world_id, EntityRelation.status == 'active')
+    if relation_types:
+        query = query.filter(EntityRelation.relation_type.in_(relation_types))
+    relations = query.all()
+
+    # 先按出现顺序收集全部节点，再批量解析名称
+    entity_keys = {}
+    for relation in relations:
+        entity_keys.setdefault((relation.source_type, relation.source_id), None)
+        entity_keys.setdefault((relation.target_type, relation.target_id), None)
+    entity_names = get_entity_names(entity_keys)
+
+    nodes = {}
+    for entity_type, entity_id in entity_keys:
+        node_key = f"{entity_type}_{entity_id}"
+        type_config = ENTITY_TYPE_CONFIG.get(entity_type, {'name': entity_type, 'color': '#999', 'icon': 'question'})
+        nodes[node_key] = {
+            'id': node_key,
+            'name': entity_names[(entity_type, entity_id)],
+            'type': entity_type,
+            'type_name': type_config['name'],
+            'entity_id': entity_id,
+            'category': entity_type,
+            'itemStyle': {'color': type_config['color']},
+            'symbol': type_config['icon']
+        }
+
+    edges = []
+    relation_type_stats = {}
+    for relation in relations:
+        edges.append({
+            'source': f"{relation.source_type}_{relation.source_id}",
+            'target': f"{relation.target_type}_{relation.target_id}",
+            'relation_type': relation.relation_type,
+            'strength': relation.strength,
+            'description': relation.description,
+            'value': relation.strength,
+            'lineStyle': {
+                'width': max(1, relation.strength / 2),
+                'curveness': 0.2
+            }
+        })
+
+        # 统计关系类型
+        relation_type_stats[relation.relation_type] = relation_type_stats.get(relation.relation_type, 0) + 1
+
+    # 如果指定了实体类型筛选，过滤节点
+    if entity_types:
+        filtered_nodes = {k: v for k, v in nodes.items() if v['type'] in entity_types}
+        # 只保留与筛选后节点相关的边
+        filtered_node_ids = set(filtered_nodes.keys())
+        filtered_edges = [e for e in edges if e['source'] in filtered_node_ids and e['target'] in filtered_node_ids]
+        nodes = filtered_nodes
+        edges = filtered_edges
+
+    return {
+        'nodes': list(nodes.values()),
+        'edges': edges,
+        'stats': {
+            'total_nodes': len(nodes),
+            'total_edges': len(edges),
+            'relation_type_stats': relation_type_stats
+        }
+    }
+
+
 @tags_relations_bp.route('/network/<int:world_id>', methods=['GET'])
 def get_relation_network(world_id):
     """获取世界的关系网络数据（用于可视化）"""
@@ -423,85 +550,18 @@ def get_relation_network(world_id):
         entity_types = request.args.getlist('entity_type') or None
         relation_types = request.args.getlist('relation_type') or None
         
-        # 获取所有关系
-        query = EntityRelation.query.filter_by(world_id=world_id, status='active')
-        if relation_types:
-            query = query.filter(EntityRelation.relation_type.in_(relation_types))
-        relations = query.all()
-        
-        # 构建节点和边
-        nodes = {}
-        edges = []
-        relation_type_stats = {}
-        
-        for relation in relations:
-            # 添加源节点
-            source_key = f"{relation.source_type}_{relation.source_id}"
-            if source_key not in nodes:
-                entity_name = get_entity_name(relation.source_type, relation.source_id)
-                type_config = ENTITY_TYPE_CONFIG.get(relation.source_type, {'name': relation.source_type, 'color': '#999', 'icon': 'question'})
-                nodes[source_key] = {
-                    'id': source_key,
-                    'name': entity_name,
-                    'type': relation.source_type,
-                    'type_name': type_config['name'],
-                    'entity_id': relation.source_id,
-                    'category': relation.source_type,
-                    'itemStyle': {'color': type_config['color']},
-                    'symbol': type_config['icon']
-                }
-            
-            # 添加目标节点
-            target_key = f"{relation.target_type}_{relation.target_id}"
-            if target_key not in nodes:
-                entity_name = get_entity_name(relation.target_type, relation.target_id)
-                type_config = ENTITY_TYPE_CONFIG.get(relation.target_type, {'name': relation.target_type, 'color': '#999', 'icon': 'question'})
-                nodes[target_key] = {
-                    'id': target_key,
-                    'name': entity_name,
-                    'type': relation.target_type,
-                    'type_name': type_config['name'],
-                    'entity_id': relation.target_id,
-                    'category': relation.target_type,
-                    'itemStyle': {'color': type_config['color']},
-                    'symbol': type_config['icon']
-                }
-            
-            # 添加边
-            edges.append({
-                'source': source_key,
-                'target': target_key,
-                'relation_type': relation.relation_type,
-                'strength': relation.strength,
-                'description': relation.description,
-                'value': relation.strength,
-                'lineStyle': {
-                    'width': max(1, relation.strength / 2),
-                    'curveness': 0.2
-                }
-            })
-            
-            # 统计关系类型
-            relation_type_stats[relation.relation_type] = relation_type_stats.get(relation.relation_type, 0) + 1
-        
-        # 如果指定了实体类型筛选，过滤节点
-        if entity_types:
-            filtered_nodes = {k: v for k, v in nodes.items() if v['type'] in entity_types}
-            # 只保留与筛选后节点相关的边
-            filtered_node_ids = set(filtered_nodes.keys())
-            filtered_edges = [e for e in edges if e['source'] in filtered_node_ids and e['target'] in filtered_node_ids]
-            nodes = filtered_nodes
-            edges = filtered_edges
+        cache_key = (
+            world_id,
+            relation_network_version(world_id),
+            tuple(sorted(entity_types)) if entity_types else None,
+            tuple(sorted(relation_types)) if relation_types else None
+        )
+        network = _relation_network_cache.get(cache_key)
+        if network is None:
+            network = build_relation_network(world_id, entity_types, relation_types)
+            _relation_network_cache.set(cache_key, network)
         
-        return success_response({
-            'nodes': list(nodes.values()),
-            'edges': edges,
-            'stats': {
-                'total_nodes': len(nodes),
-                'total_edges': len(edges),
-                'relation_type_stats': relation_type_stats
-            }
-        }, '获取关系网络成功')
+        return success_response(network, '获取关系网络成功')
     except Exception as e:
         return error_response(f'获取关系网络失败: {str(e)}', 500)
 
@@ -514,24 +574,26 @@ def get_relation_network_stats(world_id):
         if not world:
             return error_response('世界不存在', 404)
         
-        # 获取各类实体数量
-        character_count = Character.query.filter_by(world_id=world_id).count()
-        location_count = Location.query.filter_by(world_id=world_id).count()
-        item_count = Item.query.filter_by(world_id=world_id).count()
-        faction_count = Faction.query.filter_by(world_id=world_id).count()
-        
-        # 获取关系统计
-        relations = EntityRelation.query.filter_by(world_id=world_id, status='active').all()
-        relation_count = len(relations)
+        # 获取各类实体数量（来自计数表，一次查询）
+        counts = get_world_counts(world_id)
+        character_count = counts['character']['total']
+        location_count = counts['location']['total']
+        item_count = counts['item']['total']
+        faction_count = counts['faction']['total']
+        
+        # 按关系类型统计，在数据库中聚合
+        active_relations = EntityRelation.query.filter_by(world_id=world_id, status='active')
+        relation_type_stats = dict(
+            active_relations.with_entities(EntityRelation.relation_type, func.count(EntityRelation.id))
+            .group_by(EntityRelation.relation_type).all()
+        )
+        relation_count = sum(relation_type_stats.values())
         
-        # 按类型统计关系
-        relation_type_stats = {}
+        # 按实体类型统计参与关系的次数（源端与目标端分别聚合后合并）
         entity_type_stats = {'character': 0, 'location': 0, 'item': 0, 'faction': 0}
-        
-        for relation in relations:
-            relation_type_stats[relation.relation_type] = relation_type_stats.get(relation.relation_type, 0) + 1
-            entity_type_stats[relation.source_type] = entity_type_stats.get(relation.source_type, 0) + 1
-            entity_type_stats[relation.target_type] = entity_type_stats.get(relation.target_type, 0) + 1
+        for column in (EntityRelation.source_type, EntityRelation.target_type):
+            for entity_type, count in active_relations.with_entities(column, func.count(EntityRelation.id)).group_by(column):
+                entity_type_stats[entity_type] = entity_type_stats.get(entity_type, 0) + count
         
         return success_response({
             'entity_counts': {
@@ -2,11 +2,15 @@
 世界观设定模块API
 包含维度、地理区域、天体、自然法则的管理
 """
+from collections import OrderedDict
 from flask import Blueprint, request, jsonify
+from sqlalchemy import literal
 from app.models import (
     Dimension, Region, CelestialBody, NaturalLaw,
     World, db
 )
+from app.services.cache_service import LRUCache
+from app.services.etag_service import conditional_get, get_versions, ALL_SCOPE
 
 world_setting_bp = Blueprint('world_setting', __name__, url_prefix='/world-setting')
 
@@ -31,6 +35,7 @@ def error_response(message='操作失败', code=400):
 # ==================== 维度/位面管理 ====================
 
 @world_setting_bp.route('/dimensions', methods=['GET'])
+@conditional_get(Dimension)
 def get_dimensions():
     """获取维度列表"""
     try:
@@ -83,6 +88,7 @@ def create_dimension():
 
 
 @world_setting_bp.route('/dimensions/<int:dimension_id>', methods=['GET'])
+@conditional_get(Dimension, scope=ALL_SCOPE)
 def get_dimension(dimension_id):
     """获取维度详情"""
     try:
@@ -140,6 +146,7 @@ def delete_dimension(dimension_id):
 # ==================== 地理区域管理 ====================
 
 @world_setting_bp.route('/regions', methods=['GET'])
+@conditional_get(Region)
 def get_regions():
     """获取地理区域列表"""
     try:
@@ -160,28 +167,83 @@ def get_regions():
         return error_response(f'获取地理区域列表失败: {str(e)}', 500)
 
 
+# 区域树缓存：键为 (world_id, 区域表在该世界的版本号, root_id, max_depth)，区域修改后版本号递增，旧条目自然淘汰
+REGION_TREE_CACHE_SIZE = 128
+# 递归查询的最大深度，防止错误数据形成环时无限递归
+MAX_REGION_DEPTH = 64
+
+_region_tree_cache = LRUCache(REGION_TREE_CACHE_SIZE)
+
+
+def region_tree_version(world_id):
+    """
+    区域表在世界范围内的版本号；先读版本号再构建区域树，缓存的树不会比键中的版本旧
+    """
+    versions, _ = get_versions([Region.__tablename__], ('world', world_id))
+    return versions[0]
+
+
+def build_region_tree(world_id, root_id=None, max_depth=None):
+    """
+    使用一次递归CTE查询取出整棵（子）树，再在内存中组装
+    返回根节点列表；root_id 不存在时返回 None
+    """
+    depth_limit = MAX_REGION_DEPTH if max_depth is None else min(max_depth, MAX_REGION_DEPTH)
+
+    anchor = db.session.query(Region.id.label('id'), literal(0).label('depth')).filter(Region.world_id == world_id)
+    if root_id is None:
+        anchor = anchor.filter(Region.parent_region_id.is_(None))
+    else:
+        anchor = anchor.filter(Region.id == root_id)
+    tree = anchor.cte('region_tree', recursive=True)
+    children = db.session.query(Region.id, tree.c.depth + 1).join(
+        tree, Region.parent_region_id == tree.c.id
+    ).filter(Region.world_id == world_id, tree.c.depth < depth_limit)
+    tree = tree.union_all(children)
+
+    rows = db.session.query(Region).join(tree, Region.id == tree.c.id).order_by(Region.order_index, Region.id).all()
+
+    nodes = OrderedDict()
+    for region in rows:
+        node = region.to_dict()
+        node['children'] = []
+        nodes[region.id] = node
+
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node['parent_region_id'])
+        if parent is not None and node['id'] != root_id:
+            parent['children'].append(node)
+        elif (root_id is None and node['parent_region_id'] is None) or node['id'] == root_id:
+            roots.append(node)
+
+    if root_id is not None and not roots:
+        return None
+    return roots
+
+
 @world_setting_bp.route('/regions/tree', methods=['GET'])
+@conditional_get(Region)
 def get_region_tree():
     """获取地理区域树形结构"""
     try:
         world_id = request.args.get('world_id', type=int)
         if not world_id:
             return error_response('缺少world_id参数', 400)
-        
-        def build_tree(parent_id=None):
-            regions = Region.query.filter_by(
-                world_id=world_id,
-                parent_region_id=parent_id
-            ).order_by(Region.order_index).all()
-            
-            result = []
-            for region in regions:
-                node = region.to_dict()
-                node['children'] = build_tree(region.id)
-                result.append(node)
-            return result
-        
-        return success_response(build_tree(), '获取地理区域树成功')
+        root_id = request.args.get('root_id', type=int)
+        max_depth = request.args.get('max_depth', type=int)
+        if max_depth is not None and max_depth < 0:
+            return error_response('max_depth参数无效', 400)
+        
+        cache_key = (world_id, region_tree_version(world_id), root_id, max_depth)
+        tree = _region_tree_cache.get(cache_key)
+        if tree is None:
+            tree = build_region_tree(world_id, root_id, max_depth)
+            if tree is None:
+                return error_response('地理区域不存在', 404)
+            _region_tree_cache.set(cache_key, tree)
+        
+        return success_response(tree, '获取地理区域树成功')
     except Exception as e:
         return error_response(f'获取地理区域树失败: {str(e)}', 500)
 
@@ -227,6 +289,7 @@ def create_region():
 
 
 @world_setting_bp.route('/regions/<int:region_id>', methods=['GET'])
+@conditional_get(Region, scope=ALL_SCOPE)
 def get_region(region_id):
     """获取地理区域详情"""
     try:
@@ -289,6 +352,7 @@ def delete_region(region_id):
 # ==================== 天体管理 ====================
 
 @world_setting_bp.route('/celestial-bodies', methods=['GET'])
+@conditional_get(CelestialBody)
 def get_celestial_bodies():
     """获取天体列表"""
     try:
@@ -343,6 +407,7 @@ def create_celestial_body():
 
 
 @world_setting_bp.route('/celestial-bodies/<int:body_id>', methods=['GET'])
+@conditional_get(CelestialBody, scope=ALL_SCOPE)
 def get_celestial_body(body_id):
     """获取天体详情"""
     try:
@@ -400,6 +465,7 @@ def delete_celestial_body(body_id):
 # ==================== 自然法则管理 ====================
 
 @world_setting_bp.route('/natural-laws', methods=['GET'])
+@conditional_get(NaturalLaw)
 def get_natural_laws():
     """获取自然法则列表"""
     try:
@@ -459,6 +525,7 @@ def create_natural_law():
 
 
 @world_setting_bp.route('/natural-laws/<int:law_id>', methods=['GET'])
+@conditional_get(NaturalLaw, scope=ALL_SCOPE)
 def get_natural_law(law_id):
     """获取自然法则详情"""
     try:
@@ -1,7 +1,12 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, stream_with_context
 from app import db
 from app.models import World, Character, Location, Faction, HistoricalEvent, Item
-from datetime import datetime, timedelta
+from app.services.stats_service import get_world_counts
+from app.services.etag_service import etag_matches
+from app.services.bundle_service import (
+    parse_sections, parse_version, begin_snapshot, section_versions, bundle_etag, stream_bundle
+)
+from datetime import datetime
 
 worlds_bp = Blueprint('worlds', __name__)
 
@@ -160,43 +165,19 @@ def get_world_stats(world_id):
                 'message': '世界不存在'
             }), 404
         
-        # 计算本周开始时间（周一）
-        today = datetime.utcnow()
-        week_start = today - timedelta(days=today.weekday())
-        week_start = week_start.replace(hour=0, minute=0, second=0, microsecond=0)
+        # 总数和本周新增均来自计数表，一次查询完成
+        counts = get_world_counts(world_id)
+        character_count = counts['character']['total']
+        location_count = counts['location']['total']
+        faction_count = counts['faction']['total']
+        event_count = counts['event']['total']
+        item_count = counts['item']['total']
         
-        # 统计各类数据总数
-        character_count = Character.query.filter_by(world_id=world_id).count()
-        location_count = Location.query.filter_by(world_id=world_id).count()
-        faction_count = Faction.query.filter_by(world_id=world_id).count()
-        event_count = HistoricalEvent.query.filter_by(world_id=world_id).count()
-        item_count = Item.query.filter_by(world_id=world_id).count()
-        
-        # 统计本周新增数量
-        character_weekly = Character.query.filter(
-            Character.world_id == world_id,
-            Character.created_at >= week_start
-        ).count()
-        
-        location_weekly = Location.query.filter(
-            Location.world_id == world_id,
-            Location.created_at >= week_start
-        ).count()
-        
-        faction_weekly = Faction.query.filter(
-            Faction.world_id == world_id,
-            Faction.created_at >= week_start
-        ).count()
-        
-        event_weekly = HistoricalEvent.query.filter(
-            HistoricalEvent.world_id == world_id,
-            HistoricalEvent.created_at >= week_start
-        ).count()
-        
-        item_weekly = Item.query.filter(
-            Item.world_id == world_id,
-            Item.created_at >= week_start
-        ).count()
+        character_weekly = counts['character']['weekly']
+        location_weekly = counts['location']['weekly']
+        faction_weekly = counts['faction']['weekly']
+        event_weekly = counts['event']['weekly']
+        item_weekly = counts['item']['weekly']
         
         return jsonify({
             'code': 200,
@@ -307,3 +288,45 @@ def get_world_activities(world_id):
             'code': 500,
             'message': f'获取最近活动失败: {str(e)}'
         }), 500
+
+
+@worlds_bp.route('/<int:world_id>/bundle', methods=['GET'])
+def get_world_bundle(world_id):
+    """
+    一次获取世界的全部（或指定）分区数据，流式输出
+    查询参数: sections（逗号分隔，缺省为全部）, since（上次返回的 version，只返回有变化的分区）
+    """
+    try:
+        sections = parse_sections(request.args.get('sections'))
+    except ValueError as e:
+        return jsonify({
+            'code': 400,
+            'message': str(e)
+        }), 400
+    since = parse_version(request.args.get('since'))
+
+    try:
+        # 版本号与各分区数据在同一快照中读取
+        begin_snapshot()
+        if not db.session.query(World.id).filter_by(id=world_id).first():
+            return jsonify({
+                'code': 404,
+                'message': '世界不存在'
+            }), 404
+        versions = section_versions(world_id, sections)
+    except Exception as e:
+        return jsonify({
+            'code': 500,
+            'message': f'获取世界数据包失败: {str(e)}'
+        }), 500
+
+    etag = bundle_etag(world_id, versions, since)
+    if etag_matches(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(
+            stream_with_context(stream_bundle(world_id, versions, since)), mimetype='application/json'
+        )
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,109 @@
+"""
+数据库引擎配置模块
+SQLite 生产环境调优：WAL 日志模式、连接级 PRAGMA、连接池以及 GET 请求使用的只读引擎
+"""
+import os
+import sqlite3
+from typing import Dict, Any, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+
+
+# 每个新连接建立时执行的 PRAGMA，可通过环境变量覆盖
+SQLITE_PRAGMAS = {
+    'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),  # 毫秒
+    'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', -64000)),  # 负数表示KB，约64MB
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 268435456)),  # 256MB
+    'temp_store': os.getenv('SQLITE_TEMP_STORE', 'MEMORY'),
+    'foreign_keys': os.getenv('SQLITE_FOREIGN_KEYS', 'OFF'),
+}
+
+# 连接池配置，适用于多线程服务器
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 3600))
+
+
+def is_file_sqlite(uri: str) -> bool:
+    """
+    判断是否为文件型 SQLite 数据库（内存数据库无法使用 WAL 和只读引擎）
+    """
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def get_engine_options(uri: str) -> Dict[str, Any]:
+    """
+    获取主（读写）引擎的创建参数
+    """
+    if not is_file_sqlite(uri):
+        return {}
+    return {
+        'poolclass': QueuePool,
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'connect_args': {
+            'check_same_thread': False,
+            'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000.0
+        }
+    }
+
+
+def apply_sqlite_pragmas(dbapi_connection, read_only: bool = False):
+    """
+    在 SQLite 连接上执行调优 PRAGMA
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            # 只读连接不能切换日志模式
+            if read_only and name == 'journal_mode':
+                continue
+            cursor.execute(f'PRAGMA {name}={value}')
+        if read_only:
+            cursor.execute('PRAGMA query_only=ON')
+    finally:
+        cursor.close()
+
+
+def register_sqlite_pragmas(engine: Engine, read_only: bool = False):
+    """
+    为引擎注册连接事件，每个新连接建立时执行 PRAGMA
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        if isinstance(dbapi_connection, sqlite3.Connection):
+            apply_sqlite_pragmas(dbapi_connection, read_only=read_only)
+
+
+def create_read_engine(uri: str) -> Optional[Engine]:
+    """
+    创建只读引擎，供 GET 请求使用。WAL 模式下读连接不会被写事务阻塞。
+    """
+    if not is_file_sqlite(uri):
+        return None
+
+    database = make_url(uri).database
+    engine = create_engine(
+        f'sqlite:///file:{database}?mode=ro&uri=true',
+        poolclass=QueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        connect_args={
+            'check_same_thread': False,
+            'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000.0
+        }
+    )
+    register_sqlite_pragmas(engine, read_only=True)
+    return engine
@@ -1,5 +1,6 @@
 from app import db
 from datetime import datetime
+import json
 
 class World(db.Model):
     __tablename__ = 'worlds'
@@ -68,6 +69,9 @@ class Project(db.Model):
         }
 
 class Outline(db.Model):
+    __table_args__ = (
+        db.Index('ix_outline_project_id', 'project_id'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=True)
     title = db.Column(db.String(255), nullable=False)
@@ -90,6 +94,9 @@ class Outline(db.Model):
         }
 
 class Volume(db.Model):
+    __table_args__ = (
+        db.Index('ix_volume_project_order', 'project_id', 'order_index'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
     outline_id = db.Column(db.Integer, db.ForeignKey('outline.id'), nullable=True)
@@ -116,6 +123,10 @@ class Volume(db.Model):
         }
 
 class Chapter(db.Model):
+    __table_args__ = (
+        db.Index('ix_chapter_project_order', 'project_id', 'order_index'),
+        db.Index('ix_chapter_volume_order', 'volume_id', 'order_index'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
     volume_id = db.Column(db.Integer, db.ForeignKey('volume.id'), nullable=True)
@@ -159,11 +170,15 @@ class Chapter(db.Model):
 
 class Character(db.Model):
     __tablename__ = 'character'
+    __table_args__ = (
+        db.Index('ix_character_world_created', 'world_id', 'created_at'),
+        db.Index('ix_character_project_id', 'project_id'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=True)
     world_id = db.Column(db.Integer, db.ForeignKey('worlds.id'), nullable=True)
     name = db.Column(db.String(255), nullable=False)
-    alternative_names = db.Column(db.Text, default='')  # JSON格式存储别名
+    alternative_names = db.deferred(db.Column(db.Text, default=''), group='detail')  # JSON格式存储别名
     description = db.Column(db.Text, default='')
     character_type = db.Column(db.String(50), default='配角')
     role_type = db.Column(db.String(50), default='配角')  # 主角/配角/反派/龙套
@@ -174,47 +189,47 @@ class Character(db.Model):
     age = db.Column(db.Integer, default=0)
     birth_date = db.Column(db.String(100), default='')
     death_date = db.Column(db.String(100), default='')
-    appearance = db.Column(db.Text, default='')
+    appearance = db.deferred(db.Column(db.Text, default=''), group='detail')
     appearance_age = db.Column(db.Integer, default=0)  # 外貌年龄
-    distinguishing_features = db.Column(db.Text, default='')  # 显著特征
-    personality = db.Column(db.Text, default='')
-    background = db.Column(db.Text, default='')
-    character_arc = db.Column(db.Text, default='')
-    motivation = db.Column(db.Text, default='')
-    secrets = db.Column(db.Text, default='')
+    distinguishing_features = db.deferred(db.Column(db.Text, default=''), group='detail')  # 显著特征
+    personality = db.deferred(db.Column(db.Text, default=''), group='detail')
+    background = db.deferred(db.Column(db.Text, default=''), group='detail')
+    character_arc = db.deferred(db.Column(db.Text, default=''), group='detail')
+    motivation = db.deferred(db.Column(db.Text, default=''), group='detail')
+    secrets = db.deferred(db.Column(db.Text, default=''), group='detail')
     birthplace = db.Column(db.String(255), default='')
     nationality = db.Column(db.String(255), default='')
     occupation = db.Column(db.String(255), default='')
     faction = db.Column(db.String(255), default='')
     current_location = db.Column(db.String(255), default='')
-    core_traits = db.Column(db.Text, default='')
-    psychological_fear = db.Column(db.Text, default='')
-    values = db.Column(db.Text, default='')
-    growth_experience = db.Column(db.Text, default='')
-    important_turning_points = db.Column(db.Text, default='')
-    psychological_trauma = db.Column(db.Text, default='')
-    physical_abilities = db.Column(db.Text, default='')
-    intelligence_perception = db.Column(db.Text, default='')
-    special_talents = db.Column(db.Text, default='')
+    core_traits = db.deferred(db.Column(db.Text, default=''), group='detail')
+    psychological_fear = db.deferred(db.Column(db.Text, default=''), group='detail')
+    values = db.deferred(db.Column(db.Text, default=''), group='detail')
+    growth_experience = db.deferred(db.Column(db.Text, default=''), group='detail')
+    important_turning_points = db.deferred(db.Column(db.Text, default=''), group='detail')
+    psychological_trauma = db.deferred(db.Column(db.Text, default=''), group='detail')
+    physical_abilities = db.deferred(db.Column(db.Text, default=''), group='detail')
+    intelligence_perception = db.deferred(db.Column(db.Text, default=''), group='detail')
+    special_talents = db.deferred(db.Column(db.Text, default=''), group='detail')
     current_level = db.Column(db.String(50), default='')
-    special_abilities = db.Column(db.Text, default='')
-    ability_levels = db.Column(db.Text, default='')
-    ability_limits = db.Column(db.Text, default='')
-    growth_path = db.Column(db.Text, default='')
-    common_equipment = db.Column(db.Text, default='')
-    special_items = db.Column(db.Text, default='')
-    personal_items = db.Column(db.Text, default='')
-    key_items = db.Column(db.Text, default='')
-    family_members = db.Column(db.Text, default='')
-    family_background = db.Column(db.Text, default='')
-    close_friends = db.Column(db.Text, default='')
-    mentor_student = db.Column(db.Text, default='')
-    colleagues = db.Column(db.Text, default='')
-    grudges = db.Column(db.Text, default='')
-    love_relationships = db.Column(db.Text, default='')
-    complex_emotions = db.Column(db.Text, default='')
-    unrequited_love = db.Column(db.Text, default='')
-    emotional_changes = db.Column(db.Text, default='')
+    special_abilities = db.deferred(db.Column(db.Text, default=''), group='detail')
+    ability_levels = db.deferred(db.Column(db.Text, default=''), group='detail')
+    ability_limits = db.deferred(db.Column(db.Text, default=''), group='detail')
+    growth_path = db.deferred(db.Column(db.Text, default=''), group='detail')
+    common_equipment = db.deferred(db.Column(db.Text, default=''), group='detail')
+    special_items = db.deferred(db.Column(db.Text, default=''), group='detail')
+    personal_items = db.deferred(db.Column(db.Text, default=''), group='detail')
+    key_items = db.deferred(db.Column(db.Text, default=''), group='detail')
+    family_members = db.deferred(db.Column(db.Text, default=''), group='detail')
+    family_background = db.deferred(db.Column(db.Text, default=''), group='detail')
+    close_friends = db.deferred(db.Column(db.Text, default=''), group='detail')
+    mentor_student = db.deferred(db.Column(db.Text, default=''), group='detail')
+    colleagues = db.deferred(db.Column(db.Text, default=''), group='detail')
+    grudges = db.deferred(db.Column(db.Text, default=''), group='detail')
+    love_relationships = db.deferred(db.Column(db.Text, default=''), group='detail')
+    complex_emotions = db.deferred(db.Column(db.Text, default=''), group='detail')
+    unrequited_love = db.deferred(db.Column(db.Text, default=''), group='detail')
+    emotional_changes = db.deferred(db.Column(db.Text, default=''), group='detail')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -279,9 +294,40 @@ class Character(db.Model):
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
+    
+    def to_summary_dict(self):
+        """列表摘要：不包含延迟加载的详情字段"""
+        return {
+            'id': self.id,
+            'project_id': self.project_id,
+            'world_id': self.world_id,
+            'name': self.name,
+            'description': self.description,
+            'character_type': self.character_type,
+            'role_type': self.role_type,
+            'status': self.status,
+            'importance_level': self.importance_level,
+            'race': self.race,
+            'gender': self.gender,
+            'age': self.age,
+            'birth_date': self.birth_date,
+            'death_date': self.death_date,
+            'appearance_age': self.appearance_age,
+            'birthplace': self.birthplace,
+            'nationality': self.nationality,
+            'occupation': self.occupation,
+            'faction': self.faction,
+            'current_location': self.current_location,
+            'current_level': self.current_level,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
 
 class CharacterBackground(db.Model):
     __tablename__ = 'character_backgrounds'
+    __table_args__ = (
+        db.Index('ix_character_backgrounds_character_id', 'character_id'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     character_id = db.Column(db.Integer, db.ForeignKey('character.id'), nullable=False)
     period_name = db.Column(db.String(100), default='')  # 童年/少年/成年
@@ -315,6 +361,9 @@ class CharacterBackground(db.Model):
 
 class CharacterAbilityDetail(db.Model):
     __tablename__ = 'character_ability_details'
+    __table_args__ = (
+        db.Index('ix_character_ability_details_character_id', 'character_id'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     character_id = db.Column(db.Integer, db.ForeignKey('character.id'), nullable=False)
     ability_type = db.Column(db.String(50), default='')  # 天赋/学习/觉醒/装备
@@ -346,6 +395,10 @@ class CharacterAbilityDetail(db.Model):
 
 class Location(db.Model):
     __tablename__ = 'location'
+    __table_args__ = (
+        db.Index('ix_location_world_created', 'world_id', 'created_at'),
+        db.Index('ix_location_project_id', 'project_id'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=True)
     world_id = db.Column(db.Integer, db.ForeignKey('worlds.id'), nullable=True)
@@ -353,26 +406,26 @@ class Location(db.Model):
     description = db.Column(db.Text, default='')
     location_type = db.Column(db.String(100), default='城市')
     region = db.Column(db.String(255), default='')
-    geographical_location = db.Column(db.Text, default='')
-    terrain = db.Column(db.Text, default='')
-    climate = db.Column(db.Text, default='')
-    special_environment = db.Column(db.Text, default='')
+    geographical_location = db.deferred(db.Column(db.Text, default=''), group='detail')
+    terrain = db.deferred(db.Column(db.Text, default=''), group='detail')
+    climate = db.deferred(db.Column(db.Text, default=''), group='detail')
+    special_environment = db.deferred(db.Column(db.Text, default=''), group='detail')
     controlling_faction = db.Column(db.String(255), default='')
-    population_composition = db.Column(db.Text, default='')
-    economic_status = db.Column(db.Text, default='')
-    cultural_features = db.Column(db.Text, default='')
-    overall_layout = db.Column(db.Text, default='')
-    functional_areas = db.Column(db.Text, default='')
-    key_buildings = db.Column(db.Text, default='')
-    secret_areas = db.Column(db.Text, default='')
-    defense_facilities = db.Column(db.Text, default='')
-    guard_force = db.Column(db.Text, default='')
-    defense_weaknesses = db.Column(db.Text, default='')
-    emergency_plans = db.Column(db.Text, default='')
-    main_resources = db.Column(db.Text, default='')
-    potential_dangers = db.Column(db.Text, default='')
-    access_restrictions = db.Column(db.Text, default='')
-    survival_conditions = db.Column(db.Text, default='')
+    population_composition = db.deferred(db.Column(db.Text, default=''), group='detail')
+    economic_status = db.deferred(db.Column(db.Text, default=''), group='detail')
+    cultural_features = db.deferred(db.Column(db.Text, default=''), group='detail')
+    overall_layout = db.deferred(db.Column(db.Text, default=''), group='detail')
+    functional_areas = db.deferred(db.Column(db.Text, default=''), group='detail')
+    key_buildings = db.deferred(db.Column(db.Text, default=''), group='detail')
+    secret_areas = db.deferred(db.Column(db.Text, default=''), group='detail')
+    defense_facilities = db.deferred(db.Column(db.Text, default=''), group='detail')
+    guard_force = db.deferred(db.Column(db.Text, default=''), group='detail')
+    defense_weaknesses = db.deferred(db.Column(db.Text, default=''), group='detail')
+    emergency_plans = db.deferred(db.Column(db.Text, default=''), group='detail')
+    main_resources = db.deferred(db.Column(db.Text, default=''), group='detail')
+    potential_dangers = db.deferred(db.Column(db.Text, default=''), group='detail')
+    access_restrictions = db.deferred(db.Column(db.Text, default=''), group='detail')
+    survival_conditions = db.deferred(db.Column(db.Text, default=''), group='detail')
     importance = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -410,9 +463,29 @@ class Location(db.Model):
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
+    
+    def to_summary_dict(self):
+        """列表摘要：不包含延迟加载的详情字段"""
+        return {
+            'id': self.id,
+            'project_id': self.project_id,
+            'world_id': self.world_id,
+            'name': self.name,
+            'description': self.description,
+            'location_type': self.location_type,
+            'region': self.region,
+            'controlling_faction': self.controlling_faction,
+            'importance': self.importance,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
 
 class Item(db.Model):
     __tablename__ = 'item'
+    __table_args__ = (
+        db.Index('ix_item_world_created', 'world_id', 'created_at'),
+        db.Index('ix_item_project_id', 'project_id'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
     world_id = db.Column(db.Integer, db.ForeignKey('worlds.id'), nullable=True)
@@ -420,15 +493,15 @@ class Item(db.Model):
     description = db.Column(db.Text, default='')
     item_type = db.Column(db.String(100), default='普通')
     rarity_level = db.Column(db.String(50), default='普通')
-    physical_properties = db.Column(db.Text, default='')
-    special_effects = db.Column(db.Text, default='')
-    usage_requirements = db.Column(db.Text, default='')
+    physical_properties = db.deferred(db.Column(db.Text, default=''), group='detail')
+    special_effects = db.deferred(db.Column(db.Text, default=''), group='detail')
+    usage_requirements = db.deferred(db.Column(db.Text, default=''), group='detail')
     durability = db.Column(db.Integer, default=100)
     creator = db.Column(db.String(255), default='')
-    source = db.Column(db.Text, default='')
-    historical_heritage = db.Column(db.Text, default='')
+    source = db.deferred(db.Column(db.Text, default=''), group='detail')
+    historical_heritage = db.deferred(db.Column(db.Text, default=''), group='detail')
     current_owner = db.Column(db.String(255), default='')
-    acquisition_method = db.Column(db.Text, default='')
+    acquisition_method = db.deferred(db.Column(db.Text, default=''), group='detail')
     importance = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -455,9 +528,31 @@ class Item(db.Model):
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
+    
+    def to_summary_dict(self):
+        """列表摘要：不包含延迟加载的详情字段"""
+        return {
+            'id': self.id,
+            'project_id': self.project_id,
+            'world_id': self.world_id,
+            'name': self.name,
+            'description': self.description,
+            'item_type': self.item_type,
+            'rarity_level': self.rarity_level,
+            'durability': self.durability,
+            'creator': self.creator,
+            'current_owner': self.current_owner,
+            'importance': self.importance,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
 
 class Faction(db.Model):
     __tablename__ = 'faction'
+    __table_args__ = (
+        db.Index('ix_faction_world_created', 'world_id', 'created_at'),
+        db.Index('ix_faction_project_id', 'project_id'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
     world_id = db.Column(db.Integer, db.ForeignKey('worlds.id'), nullable=True)
@@ -465,38 +560,38 @@ class Faction(db.Model):
     description = db.Column(db.Text, default='')
     faction_type = db.Column(db.String(100), default='国家')
     faction_status = db.Column(db.String(50), default='活跃')
-    logo = db.Column(db.Text, default='')
-    core_ideology = db.Column(db.Text, default='')
-    sphere_of_influence = db.Column(db.Text, default='')
+    logo = db.deferred(db.Column(db.Text, default=''), group='detail')
+    core_ideology = db.deferred(db.Column(db.Text, default=''), group='detail')
+    sphere_of_influence = db.deferred(db.Column(db.Text, default=''), group='detail')
     influence_level = db.Column(db.String(50), default='区域')
     establishment_time = db.Column(db.String(255), default='')
     member_size = db.Column(db.String(255), default='')
     headquarters_location = db.Column(db.String(255), default='')
-    economic_strength = db.Column(db.Text, default='')
-    leadership_system = db.Column(db.Text, default='')
-    hierarchy = db.Column(db.Text, default='')
-    department_setup = db.Column(db.Text, default='')
-    decision_mechanism = db.Column(db.Text, default='')
+    economic_strength = db.deferred(db.Column(db.Text, default=''), group='detail')
+    leadership_system = db.deferred(db.Column(db.Text, default=''), group='detail')
+    hierarchy = db.deferred(db.Column(db.Text, default=''), group='detail')
+    department_setup = db.deferred(db.Column(db.Text, default=''), group='detail')
+    decision_mechanism = db.deferred(db.Column(db.Text, default=''), group='detail')
     leader = db.Column(db.String(255), default='')
-    key_members = db.Column(db.Text, default='')
-    talent_reserve = db.Column(db.Text, default='')
-    defectors = db.Column(db.Text, default='')
-    recruitment_method = db.Column(db.Text, default='')
-    training_system = db.Column(db.Text, default='')
-    disciplinary_rules = db.Column(db.Text, default='')
-    promotion_path = db.Column(db.Text, default='')
-    special_abilities = db.Column(db.Text, default='')
-    heritage_system = db.Column(db.Text, default='')
-    resource_reserves = db.Column(db.Text, default='')
-    intelligence_network = db.Column(db.Text, default='')
-    short_term_goals = db.Column(db.Text, default='')
-    medium_term_plans = db.Column(db.Text, default='')
-    long_term_vision = db.Column(db.Text, default='')
-    secret_plans = db.Column(db.Text, default='')
-    ally_relationships = db.Column(db.Text, default='')
-    enemy_relationships = db.Column(db.Text, default='')
-    subordinate_relationships = db.Column(db.Text, default='')
-    neutral_relationships = db.Column(db.Text, default='')
+    key_members = db.deferred(db.Column(db.Text, default=''), group='detail')
+    talent_reserve = db.deferred(db.Column(db.Text, default=''), group='detail')
+    defectors = db.deferred(db.Column(db.Text, default=''), group='detail')
+    recruitment_method = db.deferred(db.Column(db.Text, default=''), group='detail')
+    training_system = db.deferred(db.Column(db.Text, default=''), group='detail')
+    disciplinary_rules = db.deferred(db.Column(db.Text, default=''), group='detail')
+    promotion_path = db.deferred(db.Column(db.Text, default=''), group='detail')
+    special_abilities = db.deferred(db.Column(db.Text, default=''), group='detail')
+    heritage_system = db.deferred(db.Column(db.Text, default=''), group='detail')
+    resource_reserves = db.deferred(db.Column(db.Text, default=''), group='detail')
+    intelligence_network = db.deferred(db.Column(db.Text, default=''), group='detail')
+    short_term_goals = db.deferred(db.Column(db.Text, default=''), group='detail')
+    medium_term_plans = db.deferred(db.Column(db.Text, default=''), group='detail')
+    long_term_vision = db.deferred(db.Column(db.Text, default=''), group='detail')
+    secret_plans = db.deferred(db.Column(db.Text, default=''), group='detail')
+    ally_relationships = db.deferred(db.Column(db.Text, default=''), group='detail')
+    enemy_relationships = db.deferred(db.Column(db.Text, default=''), group='detail')
+    subordinate_relationships = db.deferred(db.Column(db.Text, default=''), group='detail')
+    neutral_relationships = db.deferred(db.Column(db.Text, default=''), group='detail')
     importance = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -546,9 +641,32 @@ class Faction(db.Model):
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
+    
+    def to_summary_dict(self):
+        """列表摘要：不包含延迟加载的详情字段"""
+        return {
+            'id': self.id,
+            'project_id': self.project_id,
+            'world_id': self.world_id,
+            'name': self.name,
+            'description': self.description,
+            'faction_type': self.faction_type,
+            'faction_status': self.faction_status,
+            'influence_level': self.influence_level,
+            'establishment_time': self.establishment_time,
+            'member_size': self.member_size,
+            'headquarters_location': self.headquarters_location,
+            'leader': self.leader,
+            'importance': self.importance,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
 
 class Relationship(db.Model):
     __tablename__ = 'relationship'
+    __table_args__ = (
+        db.Index('ix_relationship_project_id', 'project_id'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
     world_id = db.Column(db.Integer, db.ForeignKey('worlds.id'), nullable=True)
@@ -601,6 +719,9 @@ class Version(db.Model):
         }
 
 class Note(db.Model):
+    __table_args__ = (
+        db.Index('ix_note_project_id', 'project_id'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
     chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id'), nullable=True)
@@ -1244,6 +1365,9 @@ class CharacterTrait(db.Model):
 class EnergySystem(db.Model):
     """能量体系表 - 存储世界的能量类型和体系"""
     __tablename__ = 'energy_systems'
+    __table_args__ = (
+        db.Index('ix_energy_systems_world_order', 'world_id', 'order_index'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     world_id = db.Column(db.Integer, db.ForeignKey('worlds.id'), nullable=False)
     name = db.Column(db.String(255), nullable=False)
@@ -1291,6 +1415,9 @@ class EnergySystem(db.Model):
 class PowerLevel(db.Model):
     """力量等级表 - 存储修炼等级体系"""
     __tablename__ = 'power_levels'
+    __table_args__ = (
+        db.Index('ix_power_levels_world_order', 'world_id', 'order_index'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     world_id = db.Column(db.Integer, db.ForeignKey('worlds.id'), nullable=False)
     name = db.Column(db.String(255), nullable=False)
@@ -1383,6 +1510,9 @@ class CommonSkill(db.Model):
 class Civilization(db.Model):
     """文明/文化表 - 存储世界文明类型"""
     __tablename__ = 'civilizations'
+    __table_args__ = (
+        db.Index('ix_civilizations_world_order', 'world_id', 'order_index'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     world_id = db.Column(db.Integer, db.ForeignKey('worlds.id'), nullable=False)
     name = db.Column(db.String(255), nullable=False)
@@ -1391,15 +1521,15 @@ class Civilization(db.Model):
     development_level = db.Column(db.String(100), default='中世纪')  # 发展阶段
     population_scale = db.Column(db.String(100), default='')  # 人口规模
     territory_size = db.Column(db.String(100), default='')  # 领土范围
-    political_system = db.Column(db.Text, default='')  # 政治体制
-    economic_system = db.Column(db.Text, default='')  # 经济体制
+    political_system = db.deferred(db.Column(db.Text, default=''), group='detail')  # 政治体制
+    economic_system = db.deferred(db.Column(db.Text, default=''), group='detail')  # 经济体制
     technological_level = db.Column(db.String(100), default='')  # 科技水平
     magical_level = db.Column(db.String(100), default='')  # 魔法水平
-    cultural_characteristics = db.Column(db.Text, default='')  # 文化特征
-    religious_beliefs = db.Column(db.Text, default='')  # 宗教信仰
-    taboos = db.Column(db.Text, default='')  # 禁忌
-    values = db.Column(db.Text, default='')  # 价值观
-    historical_origin = db.Column(db.Text, default='')  # 历史起源
+    cultural_characteristics = db.deferred(db.Column(db.Text, default=''), group='detail')  # 文化特征
+    religious_beliefs = db.deferred(db.Column(db.Text, default=''), group='detail')  # 宗教信仰
+    taboos = db.deferred(db.Column(db.Text, default=''), group='detail')  # 禁忌
+    values = db.deferred(db.Column(db.Text, default=''), group='detail')  # 价值观
+    historical_origin = db.deferred(db.Column(db.Text, default=''), group='detail')  # 历史起源
     status = db.Column(db.String(50), default='active')
     order_index = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -1429,6 +1559,25 @@ class Civilization(db.Model):
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
+    
+    def to_summary_dict(self):
+        """列表摘要：不包含延迟加载的详情字段"""
+        return {
+            'id': self.id,
+            'world_id': self.world_id,
+            'name': self.name,
+            'civilization_type': self.civilization_type,
+            'description': self.description,
+            'development_level': self.development_level,
+            'population_scale': self.population_scale,
+            'territory_size': self.territory_size,
+            'technological_level': self.technological_level,
+            'magical_level': self.magical_level,
+            'status': self.status,
+            'order_index': self.order_index,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
 
 
 class CivilizationRegion(db.Model):
@@ -1553,6 +1702,9 @@ class CulturalCustom(db.Model):
 class Dimension(db.Model):
     """维度/位面表 - 存储世界的不同维度或位面信息"""
     __tablename__ = 'dimensions'
+    __table_args__ = (
+        db.Index('ix_dimensions_world_order', 'world_id', 'order_index'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     world_id = db.Column(db.Integer, db.ForeignKey('worlds.id'), nullable=False)
     name = db.Column(db.String(255), nullable=False)
@@ -1596,6 +1748,10 @@ class Dimension(db.Model):
 class Region(db.Model):
     """地理区域表 - 支持自关联树状结构"""
     __tablename__ = 'regions'
+    __table_args__ = (
+        db.Index('ix_regions_world_parent_order', 'world_id', 'parent_region_id', 'order_index'),
+        db.Index('ix_regions_parent_region_id', 'parent_region_id'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     world_id = db.Column(db.Integer, db.ForeignKey('worlds.id'), nullable=False)
     parent_region_id = db.Column(db.Integer, db.ForeignKey('regions.id'), nullable=True)
@@ -1646,6 +1802,9 @@ class Region(db.Model):
 class CelestialBody(db.Model):
     """天体表 - 存储星球、卫星、恒星等天体信息"""
     __tablename__ = 'celestial_bodies'
+    __table_args__ = (
+        db.Index('ix_celestial_bodies_world_order', 'world_id', 'order_index'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     world_id = db.Column(db.Integer, db.ForeignKey('worlds.id'), nullable=False)
     name = db.Column(db.String(255), nullable=False)
@@ -1693,6 +1852,9 @@ class CelestialBody(db.Model):
 class NaturalLaw(db.Model):
     """自然法则表 - 存储世界的物理法则、魔法规则等"""
     __tablename__ = 'natural_laws'
+    __table_args__ = (
+        db.Index('ix_natural_laws_world_order', 'world_id', 'order_index'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     world_id = db.Column(db.Integer, db.ForeignKey('worlds.id'), nullable=False)
     name = db.Column(db.String(255), nullable=False)
@@ -2072,6 +2234,9 @@ class PoliticalSystem(db.Model):
 class HistoricalEra(db.Model):
     """历史纪元表 - 划分大的历史时期"""
     __tablename__ = 'historical_eras'
+    __table_args__ = (
+        db.Index('ix_historical_eras_world_order', 'world_id', 'order_index'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     world_id = db.Column(db.Integer, db.ForeignKey('worlds.id'), nullable=False)
     name = db.Column(db.String(255), nullable=False)
@@ -2113,6 +2278,10 @@ class HistoricalEra(db.Model):
 class HistoricalEvent(db.Model):
     """历史事件表 - 具体的历史事件"""
     __tablename__ = 'historical_events'
+    __table_args__ = (
+        db.Index('ix_historical_events_world_created', 'world_id', 'created_at'),
+        db.Index('ix_historical_events_era_id', 'era_id'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     world_id = db.Column(db.Integer, db.ForeignKey('worlds.id'), nullable=False)
     era_id = db.Column(db.Integer, db.ForeignKey('historical_eras.id'), nullable=True)
@@ -2164,6 +2333,9 @@ class HistoricalEvent(db.Model):
 class HistoricalFigure(db.Model):
     """历史人物表 - 历史上有记载的人物"""
     __tablename__ = 'historical_figures'
+    __table_args__ = (
+        db.Index('ix_historical_figures_world_order', 'world_id', 'order_index'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     world_id = db.Column(db.Integer, db.ForeignKey('worlds.id'), nullable=False)
     civilization_id = db.Column(db.Integer, db.ForeignKey('civilizations.id'), nullable=True)
@@ -2244,6 +2416,9 @@ class EventParticipant(db.Model):
 class Tag(db.Model):
     """标签表 - 用于分类和检索"""
     __tablename__ = 'tags'
+    __table_args__ = (
+        db.Index('ix_tags_world_name', 'world_id', 'name'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     world_id = db.Column(db.Integer, db.ForeignKey('worlds.id'), nullable=False)
     name = db.Column(db.String(255), nullable=False)
@@ -2273,6 +2448,10 @@ class Tag(db.Model):
 class EntityTag(db.Model):
     """实体标签关联表 - 多对多关联"""
     __tablename__ = 'entity_tags'
+    __table_args__ = (
+        db.Index('ix_entity_tags_entity', 'entity_type', 'entity_id'),
+        db.Index('ix_entity_tags_tag_id', 'tag_id'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     tag_id = db.Column(db.Integer, db.ForeignKey('tags.id'), nullable=False)
     entity_type = db.Column(db.String(50), nullable=False)  # character/location/item/event等
@@ -2292,6 +2471,11 @@ class EntityTag(db.Model):
 class EntityRelation(db.Model):
     """实体关系表 - 通用关系网络"""
     __tablename__ = 'entity_relations'
+    __table_args__ = (
+        db.Index('ix_entity_relations_world_status', 'world_id', 'status'),
+        db.Index('ix_entity_relations_source', 'source_type', 'source_id'),
+        db.Index('ix_entity_relations_target', 'target_type', 'target_id'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     world_id = db.Column(db.Integer, db.ForeignKey('worlds.id'), nullable=False)
     source_type = db.Column(db.String(50), nullable=False)  # character/location/item等
@@ -2321,4 +2505,160 @@ class EntityRelation(db.Model):
             'status': self.status,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
-        }
\ No newline at end of file
+        }
+
+# ==================== 统计计数 ====================
+
+class WorldStatCounter(db.Model):
+    """世界统计计数表 - 按实体类型和自然周记录新增数量，由模型事件维护"""
+    __tablename__ = 'world_stat_counters'
+    __table_args__ = (
+        db.UniqueConstraint('world_id', 'entity_type', 'period_start', name='uq_world_stat_counters_period'),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    world_id = db.Column(db.Integer, nullable=False)
+    entity_type = db.Column(db.String(50), nullable=False)  # character/location/faction/event/item
+    period_start = db.Column(db.Date, nullable=False)  # 所在周的周一
+    count = db.Column(db.Integer, default=0, nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'world_id': self.world_id,
+            'entity_type': self.entity_type,
+            'period_start': self.period_start.isoformat(),
+            'count': self.count
+        }
+
+
+class AIJob(db.Model):
+    """AI后台任务表 - 记录耗时生成任务的状态、进度与输出，由任务队列的工作线程更新"""
+    __tablename__ = 'ai_jobs'
+    __table_args__ = (
+        db.Index('ix_ai_jobs_status_created', 'status', 'created_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    job_type = db.Column(db.String(50), nullable=False)  # generate_outline/generate_world/generate_character
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued/running/succeeded/failed/cancelled
+    params = db.Column(db.Text, default='{}')  # JSON格式的任务参数
+    progress = db.Column(db.Float, default=0.0)  # 0-1
+    output = db.Column(db.Text, default='')  # 已生成的部分输出
+    result = db.Column(db.Text)  # JSON格式的最终结果
+    error = db.Column(db.Text)
+    cancel_requested = db.Column(db.Boolean, default=False, nullable=False)
+    worker_id = db.Column(db.String(100))  # 持有任务的进程标识（主机:进程号:随机后缀）
+    heartbeat_at = db.Column(db.DateTime)  # 持有进程最近一次心跳时间，超时视为进程已退出
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed', 'cancelled')
+
+    def to_dict(self, include_output=True):
+        data = {
+            'id': self.id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'progress': self.progress,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'cancel_requested': self.cancel_requested,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+        if include_output:
+            data['output'] = self.output or ''
+        return data
+
+
+class ChapterAnalysis(db.Model):
+    """章节分析结果表 - 文本分析引擎的持久化结果，正文哈希变化时重新计算"""
+    __tablename__ = 'chapter_analysis'
+    __table_args__ = (
+        db.Index('ix_chapter_analysis_project', 'project_id'),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id'), nullable=False, unique=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    content_hash = db.Column(db.String(40), nullable=False)  # 正文的SHA-1
+    analyzer_version = db.Column(db.Integer, nullable=False, default=1)
+    source_updated_at = db.Column(db.DateTime)  # 分析时章节的修改时间，相同则无需读取正文
+    char_count = db.Column(db.Integer, default=0)
+    sentence_count = db.Column(db.Integer, default=0)
+    dialogue_ratio = db.Column(db.Float, default=0.0)
+    action_ratio = db.Column(db.Float, default=0.0)
+    description_ratio = db.Column(db.Float, default=0.0)
+    sentiment = db.Column(db.Float, default=0.0)  # -1~1
+    metrics = db.Column(db.Text, default='{}')  # JSON格式的完整指标
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'chapter_id': self.chapter_id,
+            'project_id': self.project_id,
+            'content_hash': self.content_hash,
+            'analyzer_version': self.analyzer_version,
+            'metrics': json.loads(self.metrics) if self.metrics else {},
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class ChapterMention(db.Model):
+    """章节提及索引表 - 每个实体在每章中的出现次数与位置"""
+    __tablename__ = 'chapter_mention'
+    __table_args__ = (
+        db.Index('ix_chapter_mention_chapter', 'chapter_id'),
+        db.Index('ix_chapter_mention_entity', 'project_id', 'entity_type', 'entity_id'),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id'), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    entity_type = db.Column(db.String(20), nullable=False)  # character/location/item/faction
+    entity_id = db.Column(db.Integer, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    first_position = db.Column(db.Integer, default=0)  # 首次出现的字符位置
+    positions = db.Column(db.Text, default='[]')  # JSON格式的出现位置列表
+
+    def to_dict(self):
+        return {
+            'chapter_id': self.chapter_id,
+            'entity_type': self.entity_type,
+            'entity_id': self.entity_id,
+            'count': self.count,
+            'first_position': self.first_position,
+            'positions': json.loads(self.positions) if self.positions else []
+        }
+
+
+class MentionIndexState(db.Model):
+    """提及索引状态表 - 记录章节建立索引时的正文哈希与名称词典哈希"""
+    __tablename__ = 'mention_index_state'
+    __table_args__ = (
+        db.Index('ix_mention_index_state_project', 'project_id'),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id'), nullable=False, unique=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    content_hash = db.Column(db.String(40), nullable=False)  # 正文的SHA-1
+    dictionary_hash = db.Column(db.String(40), nullable=False)  # 名称词典的SHA-1
+    source_updated_at = db.Column(db.DateTime)  # 建立索引时章节的修改时间
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ResourceVersion(db.Model):
+    """资源版本表 - 每张表在每个世界/项目范围内的修改版本号，用于生成 ETag"""
+    __tablename__ = 'resource_versions'
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'scope_id', 'resource', name='uq_resource_version_scope'),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    resource = db.Column(db.String(64), nullable=False)  # 表名
+    scope = db.Column(db.String(16), nullable=False)  # world/project/all
+    scope_id = db.Column(db.Integer, nullable=False, default=0)  # scope 为 all 时为 0
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
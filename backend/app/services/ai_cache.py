@@ -0,0 +1,258 @@
+"""
+AI响应缓存
+以请求内容的规范化哈希为键，提供进程内LRU与SQLite持久化两级缓存。
+默认只缓存确定性请求（temperature=0），temperature>0 的请求需显式开启 cache=True。
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+from app.services.cache_service import LRUCache
+
+
+AI_CACHE_MEMORY_SIZE = int(os.getenv('AI_CACHE_MEMORY_SIZE', 256))
+AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', 5000))
+AI_CACHE_TTL = float(os.getenv('AI_CACHE_TTL', 7 * 24 * 3600))  # 秒
+# 缺省放在 backend/instance 目录（Flask 实例目录），不写入 Python 包内
+AI_CACHE_DB_PATH = os.getenv(
+    'AI_CACHE_DB_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                 'instance', 'ai_cache.db')
+)
+
+# 不影响生成结果、不参与缓存键的参数
+_NON_KEY_PARAMS = {'timeout', 'cache'}
+
+
+def make_cache_key(provider: str, model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+    """
+    计算请求的规范化哈希：键顺序无关、忽略超时等传输参数
+    """
+    payload = {
+        'provider': provider,
+        'model': model,
+        'messages': messages,
+        'params': {k: v for k, v in params.items() if k not in _NON_KEY_PARAMS}
+    }
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class CacheTier(ABC):
+    """
+    缓存层接口，实现 get/set/clear/size 即可接入 AIResponseCache
+    """
+    name = 'tier'
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Dict[str, Any]):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    @abstractmethod
+    def size(self) -> int:
+        pass
+
+
+class MemoryCacheTier(CacheTier):
+    """
+    进程内LRU缓存层
+    """
+    name = 'memory'
+
+    def __init__(self, maxsize: int = AI_CACHE_MEMORY_SIZE, ttl: Optional[float] = AI_CACHE_TTL):
+        self._cache = LRUCache(maxsize, ttl=ttl)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value):
+        self._cache.set(key, value)
+
+    def clear(self):
+        self._cache.clear()
+
+    def size(self):
+        return len(self._cache)
+
+
+class SQLiteCacheTier(CacheTier):
+    """
+    SQLite持久化缓存层，进程重启后仍然有效；超过容量时淘汰最久未访问的条目
+    """
+    name = 'sqlite'
+
+    def __init__(self, path: str = AI_CACHE_DB_PATH, max_entries: int = AI_CACHE_MAX_ENTRIES,
+                 ttl: Optional[float] = AI_CACHE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5)
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute('PRAGMA journal_mode=WAL')
+                    conn.execute(
+                        'CREATE TABLE IF NOT EXISTS ai_response_cache ('
+                        'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                        'created_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+                    )
+                    conn.execute(
+                        'CREATE INDEX IF NOT EXISTS ix_ai_response_cache_accessed_at '
+                        'ON ai_response_cache (accessed_at)'
+                    )
+                    conn.commit()
+                    self._initialized = True
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                'SELECT value, created_at FROM ai_response_cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.ttl and row[1] + self.ttl <= now:
+                conn.execute('DELETE FROM ai_response_cache WHERE key = ?', (key,))
+                conn.commit()
+                return None
+            conn.execute('UPDATE ai_response_cache SET accessed_at = ? WHERE key = ?', (now, key))
+            conn.commit()
+            return json.loads(row[0])
+        finally:
+            conn.close()
+
+    def set(self, key, value):
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                'INSERT OR REPLACE INTO ai_response_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            if self.ttl:
+                conn.execute('DELETE FROM ai_response_cache WHERE created_at <= ?', (now - self.ttl,))
+            overflow = conn.execute('SELECT COUNT(*) FROM ai_response_cache').fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    'DELETE FROM ai_response_cache WHERE key IN '
+                    '(SELECT key FROM ai_response_cache ORDER BY accessed_at LIMIT ?)', (overflow,)
+                )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def clear(self):
+        conn = self._connect()
+        try:
+            conn.execute('DELETE FROM ai_response_cache')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def size(self):
+        conn = self._connect()
+        try:
+            return conn.execute('SELECT COUNT(*) FROM ai_response_cache').fetchone()[0]
+        finally:
+            conn.close()
+
+
+class AIResponseCache:
+    """
+    多级AI响应缓存：按顺序查询各层，命中后回填到更靠前的层
+    """
+
+    def __init__(self, tiers: Optional[List[CacheTier]] = None, enabled: bool = True):
+        self.tiers = tiers if tiers is not None else [MemoryCacheTier(), SQLiteCacheTier()]
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._metrics = {'hits': 0, 'misses': 0, 'bypassed': 0, 'stores': 0, 'errors': 0}
+        self._tier_hits = {tier.name: 0 for tier in self.tiers}
+
+    def should_cache(self, temperature: float, opt_in: Optional[bool]) -> bool:
+        """
+        判断请求是否走缓存：cache=False 强制跳过；temperature>0 需 cache=True 显式开启
+        """
+        if not self.enabled or opt_in is False:
+            return False
+        return opt_in is True or float(temperature or 0) <= 0
+
+    def _count(self, metric: str, tier: Optional[str] = None):
+        with self._lock:
+            self._metrics[metric] += 1
+            if tier is not None:
+                self._tier_hits[tier] = self._tier_hits.get(tier, 0) + 1
+
+    def record_bypass(self):
+        self._count('bypassed')
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        for index, tier in enumerate(self.tiers):
+            try:
+                value = tier.get(key)
+            except Exception:
+                # 缓存层故障不影响正常调用
+                self._count('errors')
+                continue
+            if value is not None:
+                for upper in self.tiers[:index]:
+                    upper.set(key, value)
+                self._count('hits', tier.name)
+                return value
+        self._count('misses')
+        return None
+
+    def set(self, key: str, value: Dict[str, Any]):
+        for tier in self.tiers:
+            try:
+                tier.set(key, value)
+            except Exception:
+                self._count('errors')
+        self._count('stores')
+
+    def clear(self):
+        for tier in self.tiers:
+            tier.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        命中率等统计信息
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+            tier_hits = dict(self._tier_hits)
+        lookups = metrics['hits'] + metrics['misses']
+        sizes = {}
+        for tier in self.tiers:
+            try:
+                sizes[tier.name] = tier.size()
+            except Exception:
+                sizes[tier.name] = None
+        return {
+            **metrics,
+            'hit_rate': round(metrics['hits'] / lookups, 4) if lookups else 0.0,
+            'tier_hits': tier_hits,
+            'sizes': sizes,
+            'enabled': self.enabled
+        }
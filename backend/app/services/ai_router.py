@@ -0,0 +1,359 @@
+"""
+AI提供商路由
+按提供商/模型统计滚动延迟（p50/p95）与错误率，在限流、服务端错误或超时时自动切换到其他已配置的提供商；
+可选对慢请求发起对冲：首选提供商超过其p95仍未返回时，向次选提供商发送相同请求，先返回者胜出。
+启用切换时提供商的HTTP会话不按状态码重试，限流/服务端错误由路由器先切换到其他提供商，
+全部候选都失败后再按退避（或上游的 Retry-After）整轮重试。
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+import logging
+
+import requests
+
+from app.services.metrics_service import observe_ai_call, record_ai_usage
+
+logger = logging.getLogger(__name__)
+
+ROUTER_FAILOVER = os.getenv('AI_ROUTER_FAILOVER', '1') not in ('0', 'false', 'False')
+ROUTER_HEDGE = os.getenv('AI_ROUTER_HEDGE', '0') not in ('0', 'false', 'False')
+ROUTER_WINDOW_SIZE = int(os.getenv('AI_ROUTER_WINDOW_SIZE', 100))
+ROUTER_WINDOW_SECONDS = float(os.getenv('AI_ROUTER_WINDOW_SECONDS', 300))
+ROUTER_MIN_SAMPLES = int(os.getenv('AI_ROUTER_MIN_SAMPLES', 5))
+ROUTER_ERROR_THRESHOLD = float(os.getenv('AI_ROUTER_ERROR_THRESHOLD', 0.5))
+# 样本不足以计算p95时的对冲等待时间（秒）
+ROUTER_HEDGE_DELAY = float(os.getenv('AI_ROUTER_HEDGE_DELAY', 5))
+ROUTER_WORKERS = int(os.getenv('AI_ROUTER_WORKERS', 16))
+# 全部候选都因限流/服务端错误失败后整轮重试的次数与退避系数（秒）
+ROUTER_RETRIES = int(os.getenv('AI_ROUTER_RETRIES', 2))
+ROUTER_BACKOFF_FACTOR = float(os.getenv('AI_ROUTER_BACKOFF_FACTOR', 0.5))
+# 上游 Retry-After 的最长等待时间（秒）
+ROUTER_MAX_RETRY_AFTER = float(os.getenv('AI_ROUTER_MAX_RETRY_AFTER', 30))
+
+# 触发切换的上游状态码：限流与服务端错误
+FAILOVER_STATUSES = (429, 500, 502, 503, 504)
+# openai SDK 中表示限流/超时/服务不可用的异常类名
+_FAILOVER_SDK_ERRORS = {'RateLimitError', 'Timeout', 'APIConnectionError', 'ServiceUnavailableError', 'TryAgain'}
+
+
+def is_failover_error(exc: BaseException) -> bool:
+    """
+    判断异常是否应切换提供商。
+    提供商实现会把底层异常包装为 ValueError，这里沿异常链查找原始的 HTTP/超时错误。
+    """
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, (requests.exceptions.Timeout, requests.exceptions.ConnectionError, FutureTimeoutError)):
+            return True
+        if isinstance(exc, requests.exceptions.HTTPError) and exc.response is not None:
+            return exc.response.status_code in FAILOVER_STATUSES
+        if type(exc).__name__ in _FAILOVER_SDK_ERRORS:
+            return True
+        if getattr(exc, 'http_status', None) in FAILOVER_STATUSES:
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """沿异常链查找上游响应的 Retry-After（秒）"""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        response = getattr(exc, 'response', None)
+        value = getattr(response, 'headers', {}).get('Retry-After') if response is not None else None
+        if value is not None:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                return None
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+def _percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class ProviderStats:
+    """
+    单个提供商/模型的滚动统计窗口：最近 window_size 个且不超过 window_seconds 秒的调用
+    """
+
+    def __init__(self, window_size: int = ROUTER_WINDOW_SIZE, window_seconds: float = ROUTER_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self._samples: Deque[Tuple[float, float, bool]] = deque(maxlen=window_size)  # (时间戳, 耗时, 是否成功)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self._samples.append((time.monotonic(), latency, ok))
+
+    def _recent(self) -> List[Tuple[float, float, bool]]:
+        cutoff = time.monotonic() - self.window_seconds
+        with self._lock:
+            while self._samples and self._samples[0][0] < cutoff:
+                self._samples.popleft()
+            return list(self._samples)
+
+    def snapshot(self) -> Dict[str, Any]:
+        samples = self._recent()
+        latencies = sorted(latency for _, latency, ok in samples if ok)
+        errors = sum(1 for _, _, ok in samples if not ok)
+        return {
+            'samples': len(samples),
+            'errors': errors,
+            'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+            'p50': _percentile(latencies, 0.5),
+            'p95': _percentile(latencies, 0.95)
+        }
+
+
+class ProviderRouter:
+    """
+    在已配置的提供商之间路由聊天请求
+    """
+
+    def __init__(self, service, failover: bool = ROUTER_FAILOVER, hedge: bool = ROUTER_HEDGE,
+                 retries: int = ROUTER_RETRIES):
+        self.service = service
+        self.failover = failover
+        self.hedge = hedge
+        # 启用切换时提供商会话不按状态码重试，由路由器整轮重试
+        self.retries = retries if failover else 0
+        self._stats: Dict[Tuple[str, str], ProviderStats] = {}
+        self._stats_lock = threading.Lock()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._counters = {'failovers': 0, 'hedges': 0, 'hedge_wins': 0, 'retries': 0}
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """
+        对冲请求使用的线程池，与并发生成的线程池分开，避免互相等待
+        """
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=ROUTER_WORKERS, thread_name_prefix='ai-router')
+        return self._executor
+
+    # ==================== 统计 ====================
+
+    @staticmethod
+    def _model_of(ai_provider, kwargs: Dict[str, Any]) -> str:
+        return kwargs.get('model') or ai_provider.config.get('model') or ''
+
+    def stats_for(self, provider: str, model: str) -> ProviderStats:
+        key = (provider, model)
+        stats = self._stats.get(key)
+        if stats is None:
+            with self._stats_lock:
+                stats = self._stats.setdefault(key, ProviderStats())
+        return stats
+
+    def record(self, provider: str, model: str, latency: float, ok: bool):
+        self.stats_for(provider, model).record(latency, ok)
+        observe_ai_call(provider, model, latency, ok)
+
+    def _count(self, counter: str):
+        with self._stats_lock:
+            self._counters[counter] += 1
+
+    def is_healthy(self, ai_provider) -> bool:
+        snapshot = self.stats_for(ai_provider.provider, self._model_of(ai_provider, {})).snapshot()
+        return snapshot['samples'] < ROUTER_MIN_SAMPLES or snapshot['error_rate'] < ROUTER_ERROR_THRESHOLD
+
+    def hedge_delay(self, ai_provider, kwargs: Dict[str, Any]) -> float:
+        """
+        对冲等待时间：首选提供商的p95，样本不足时使用默认值
+        """
+        snapshot = self.stats_for(ai_provider.provider, self._model_of(ai_provider, kwargs)).snapshot()
+        if snapshot['samples'] >= ROUTER_MIN_SAMPLES and snapshot['p95'] is not None:
+            return snapshot['p95']
+        return ROUTER_HEDGE_DELAY
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            items = list(self._stats.items())
+            counters = dict(self._counters)
+        providers = {}
+        for (provider, model), stats in items:
+            providers.setdefault(provider, {})[model] = stats.snapshot()
+        return {'failover': self.failover, 'hedge': self.hedge, **counters, 'providers': providers}
+
+    # ==================== 路由 ====================
+
+    def candidates(self, primary) -> List[Any]:
+        """
+        候选提供商顺序：首选提供商（除非近期错误率过高）在前，其余已配置的提供商按健康状况与p50延迟排序
+        """
+        others = [
+            instance for name, instance in self.service.providers.items()
+            if name != primary.provider and instance.is_configured()
+        ]
+
+        def sort_key(instance):
+            snapshot = self.stats_for(instance.provider, self._model_of(instance, {})).snapshot()
+            p50 = snapshot['p50'] if snapshot['p50'] is not None else float('inf')
+            return (not self.is_healthy(instance), p50)
+
+        others.sort(key=sort_key)
+        if self.is_healthy(primary):
+            return [primary] + others
+        return [instance for instance in others if self.is_healthy(instance)] + [primary] + \
+            [instance for instance in others if not self.is_healthy(instance)]
+
+    @staticmethod
+    def _kwargs_for(ai_provider, primary, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        # model 参数只对首选提供商有效，切换后使用目标提供商自己的默认模型
+        if ai_provider is primary or 'model' not in kwargs:
+            return kwargs
+        return {k: v for k, v in kwargs.items() if k != 'model'}
+
+    def _retry_wait(self, round_index: int, error: BaseException):
+        """全部候选都失败后、下一轮重试前等待：优先使用上游的 Retry-After，否则指数退避"""
+        delay = retry_after(error)
+        if delay is None:
+            delay = ROUTER_BACKOFF_FACTOR * (2 ** round_index)
+        delay = min(delay, ROUTER_MAX_RETRY_AFTER)
+        self._count('retries')
+        logger.warning(f"全部AI提供商暂时不可用，{delay:.1f} 秒后重试")
+        time.sleep(delay)
+
+    def _attempts(self, queue: List[Any]) -> List[Tuple[int, Any]]:
+        """(轮次, 提供商)：先按候选顺序尝试一轮，全部失败后整轮重试"""
+        return [(round_index, ai_provider) for round_index in range(self.retries + 1) for ai_provider in queue]
+
+    def _timed_call(self, ai_provider, call: Callable[[], Any], model: str):
+        started = time.perf_counter()
+        try:
+            result = call()
+        except Exception as e:
+            # 只有限流/服务端错误/超时计入错误率，参数错误等不代表提供商不健康
+            if is_failover_error(e):
+                self.record(ai_provider.provider, model, time.perf_counter() - started, False)
+            raise
+        self.record(ai_provider.provider, model, time.perf_counter() - started, True)
+        record_ai_usage(ai_provider.provider, model, result)
+        return result
+
+    def chat_completion(self, primary, messages: List[Dict[str, str]], failover: Optional[bool] = None,
+                        hedge: Optional[bool] = None, **kwargs) -> Dict[str, Any]:
+        """
+        路由一次聊天完成请求，返回首个成功的结果（结果中的 provider 字段为实际响应的提供商）
+        """
+        failover = self.failover if failover is None else failover
+        hedge = self.hedge if hedge is None else hedge
+        queue = self.candidates(primary) if failover else [primary]
+
+        def submit(ai_provider):
+            call_kwargs = self._kwargs_for(ai_provider, primary, kwargs)
+            model = self._model_of(ai_provider, call_kwargs)
+            return self.executor.submit(
+                self._timed_call, ai_provider, lambda: ai_provider.chat_completion(messages, **call_kwargs), model
+            )
+
+        if not hedge or len(queue) < 2:
+            attempts = self._attempts(queue)
+            last_error = None
+            for index, (round_index, ai_provider) in enumerate(attempts):
+                if round_index and index % len(queue) == 0:
+                    self._retry_wait(round_index - 1, last_error)
+                call_kwargs = self._kwargs_for(ai_provider, primary, kwargs)
+                try:
+                    return self._timed_call(
+                        ai_provider, lambda: ai_provider.chat_completion(messages, **call_kwargs),
+                        self._model_of(ai_provider, call_kwargs)
+                    )
+                except Exception as e:
+                    if not is_failover_error(e) or index == len(attempts) - 1:
+                        raise
+                    last_error = e
+                    if len(queue) > 1:
+                        self._count('failovers')
+                        logger.warning(f"AI提供商 {ai_provider.provider} 调用失败，切换到下一个提供商: {e}")
+            raise last_error
+
+        # 对冲：首选请求超过p95未返回时，向下一个候选发送相同请求
+        remaining = list(queue)
+        first = remaining.pop(0)
+        running = {submit(first): first}
+        try:
+            done, _ = wait(running, timeout=self.hedge_delay(first, kwargs))
+            if not done and remaining:
+                hedged = remaining.pop(0)
+                running[submit(hedged)] = hedged
+                self._count('hedges')
+                logger.info(f"AI提供商 {first.provider} 超过p95未返回，对冲请求 {hedged.provider}")
+
+            last_error = None
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    ai_provider = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        if not is_failover_error(e):
+                            raise
+                        last_error = e
+                        if remaining:
+                            next_provider = remaining.pop(0)
+                            running[submit(next_provider)] = next_provider
+                            self._count('failovers')
+                        continue
+                    if ai_provider is not first:
+                        self._count('hedge_wins')
+                    return result
+            raise last_error
+        finally:
+            # 未完成的请求结果被丢弃：尚未开始的直接取消，已在进行中的在后台结束并计入统计
+            for future in running:
+                future.cancel()
+
+    def stream_chat_completion(self, primary, messages: List[Dict[str, str]], failover: Optional[bool] = None,
+                               **kwargs) -> Iterator[Dict[str, Any]]:
+        """
+        路由流式请求：在收到首个增量之前失败时切换提供商，之后的错误直接抛出
+        """
+        failover = self.failover if failover is None else failover
+        queue = self.candidates(primary) if failover else [primary]
+        attempts = self._attempts(queue)
+        last_error = None
+        for index, (round_index, ai_provider) in enumerate(attempts):
+            if round_index and index % len(queue) == 0:
+                self._retry_wait(round_index - 1, last_error)
+            call_kwargs = self._kwargs_for(ai_provider, primary, kwargs)
+            model = self._model_of(ai_provider, call_kwargs)
+            started = time.perf_counter()
+            stream = iter(ai_provider.stream_chat_completion(messages, **call_kwargs))
+            try:
+                first = next(stream)
+            except StopIteration:
+                self.record(ai_provider.provider, model, time.perf_counter() - started, True)
+                return
+            except Exception as e:
+                if is_failover_error(e):
+                    self.record(ai_provider.provider, model, time.perf_counter() - started, False)
+                if not is_failover_error(e) or index == len(attempts) - 1:
+                    raise
+                last_error = e
+                if len(queue) > 1:
+                    self._count('failovers')
+                    logger.warning(f"AI提供商 {ai_provider.provider} 流式调用失败，切换到下一个提供商: {e}")
+                continue
+            # 流式请求以首个增量的耗时作为延迟样本
+            self.record(ai_provider.provider, model, time.perf_counter() - started, True)
+            yield first
+            yield from stream
+            return
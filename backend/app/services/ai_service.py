@@ -3,12 +3,34 @@
 支持多种AI服务提供商的统一调用
 """
 from abc import ABC, abstractmethod
-from typing import Dict, Optional, Any, List
+from typing import Dict, Optional, Any, List, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from app.config.ai_config import ai_config
+from app.services.ai_cache import AIResponseCache, make_cache_key
+from app.services.ai_router import ProviderRouter
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 上游HTTP连接池默认配置，可在提供商配置中按需覆盖（pool_size/max_retries/backoff_factor/connect_timeout）
+HTTP_POOL_SIZE = int(os.getenv('AI_HTTP_POOL_SIZE', 10))
+HTTP_MAX_RETRIES = int(os.getenv('AI_HTTP_MAX_RETRIES', 3))
+HTTP_BACKOFF_FACTOR = float(os.getenv('AI_HTTP_BACKOFF_FACTOR', 0.5))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('AI_HTTP_CONNECT_TIMEOUT', 5))
+# 限流与服务端临时错误时重试
+HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# 并发生成（多候选）默认配置
+FANOUT_CONCURRENCY = int(os.getenv('AI_FANOUT_CONCURRENCY', 4))
+FANOUT_TIMEOUT = float(os.getenv('AI_FANOUT_TIMEOUT', 120))
+FANOUT_WORKERS = int(os.getenv('AI_FANOUT_WORKERS', 16))
+
 
 class AIServiceProvider(ABC):
     """
@@ -21,6 +43,67 @@ class AIServiceProvider(ABC):
         """
         self.provider = provider
         self.config = ai_config.get_provider_config(provider)
+        # 是否在HTTP层按状态码（429/5xx）重试；由路由器负责重试与切换时关闭
+        self.status_retries = True
+        self._session = None
+        self._session_lock = threading.Lock()
+    
+    @property
+    def session(self) -> requests.Session:
+        """
+        提供商共享的HTTP会话，复用keep-alive连接，首次使用时创建
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+    
+    def _create_session(self) -> requests.Session:
+        """
+        创建带连接池和重试策略的HTTP会话
+        """
+        pool_size = int(self.config.get('pool_size', HTTP_POOL_SIZE))
+        retry = Retry(
+            total=int(self.config.get('max_retries', HTTP_MAX_RETRIES)),
+            connect=None,
+            read=0,  # 请求体可能已被上游处理，读超时不重试
+            status=None if self.status_retries else 0,
+            backoff_factor=float(self.config.get('backoff_factor', HTTP_BACKOFF_FACTOR)),
+            status_forcelist=HTTP_RETRY_STATUSES,
+            allowed_methods=None,  # 包括POST，上游的429/5xx表示请求未被处理
+            respect_retry_after_header=True,
+            raise_on_status=False  # 重试耗尽后返回最后一次响应，由 raise_for_status 统一处理
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers['Connection'] = 'keep-alive'
+        return session
+    
+    def close(self):
+        """
+        关闭HTTP会话，释放连接池
+        """
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+    
+    def get_timeout(self, timeout: Optional[float] = None) -> Tuple[float, float]:
+        """
+        返回 (连接超时, 读取超时)；读取超时沿用提供商的 timeout 配置
+        """
+        read_timeout = float(timeout if timeout is not None else self.config.get('timeout', 30))
+        connect_timeout = float(self.config.get('connect_timeout', HTTP_CONNECT_TIMEOUT))
+        return min(connect_timeout, read_timeout), read_timeout
+    
+    def post(self, url: str, timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        """
+        通过共享会话发送POST请求
+        """
+        return self.session.post(url, timeout=self.get_timeout(timeout), **kwargs)
     
     @abstractmethod
     def chat_completion(self, messages: List[Dict[str, str]], **kwargs) -> Dict[str, Any]:
@@ -60,7 +143,16 @@ class AIService:
         初始化AI服务
         """
         self.providers = {}
+        self.response_cache = AIResponseCache()
+        self.router = ProviderRouter(self)
+        self._executor = None
+        self._executor_lock = threading.Lock()
         self._load_providers()
+        # 路由器启用切换时由路由器统一重试与切换，提供商会话不再按状态码重试，
+        # 否则限流时会先在首选提供商上退避重试（并等待 Retry-After），切换迟迟不能发生
+        if self.router.failover:
+            for instance in self.providers.values():
+                instance.status_retries = False
     
     def _load_providers(self):
         """
@@ -104,9 +196,15 @@ class AIService:
         provider = provider or ai_config.get_default_provider()
         return self.providers.get(provider)
     
-    def chat_completion(self, messages: List[Dict[str, str]], provider: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+    def chat_completion(self, messages: List[Dict[str, str]], provider: Optional[str] = None,
+                        cache: Optional[bool] = None, failover: Optional[bool] = None,
+                        hedge: Optional[bool] = None, **kwargs) -> Dict[str, Any]:
         """
         统一聊天完成接口
+        
+        确定性请求（temperature=0）默认走响应缓存；cache=True 对 temperature>0 也启用缓存，cache=False 强制跳过。
+        请求经 ProviderRouter 路由：failover 控制限流/服务端错误/超时时是否切换提供商，
+        hedge 控制是否在首选提供商超过p95时发起对冲请求，未指定时使用路由器的默认设置。
         """
         ai_provider = self.get_provider(provider)
         if not ai_provider:
@@ -115,7 +213,27 @@ class AIService:
         if not ai_provider.is_configured():
             raise ValueError(f"AI服务提供商未配置: {provider}")
         
-        return ai_provider.chat_completion(messages, **kwargs)
+        temperature = kwargs.get('temperature', ai_provider.config.get('temperature', 0.7))
+        if not self.response_cache.should_cache(temperature, cache):
+            self.response_cache.record_bypass()
+            return self.router.chat_completion(ai_provider, messages, failover=failover, hedge=hedge, **kwargs)
+        
+        # 缓存键使用解析后的提供商、模型和生成参数，保证与实际请求一致
+        params = dict(kwargs)
+        params['temperature'] = temperature
+        params.setdefault('max_tokens', ai_provider.config.get('max_tokens', 1000))
+        model = params.pop('model', ai_provider.config.get('model'))
+        key = make_cache_key(ai_provider.provider, model, messages, params)
+        
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            return {**cached, 'cached': True}
+        
+        result = self.router.chat_completion(ai_provider, messages, failover=failover, hedge=hedge, **kwargs)
+        # 切换到其他提供商得到的结果不写入首选提供商的缓存键
+        if result.get('success', True) is not False and result.get('provider', ai_provider.provider) == ai_provider.provider:
+            self.response_cache.set(key, result)
+        return result
     
     def get_available_providers(self) -> List[str]:
         """
@@ -142,9 +260,10 @@ class AIService:
         
         return ai_provider.test_connection()
     
-    def stream_chat_completion(self, messages: List[Dict[str, str]], provider: Optional[str] = None, **kwargs) -> Any:
+    def stream_chat_completion(self, messages: List[Dict[str, str]], provider: Optional[str] = None,
+                               failover: Optional[bool] = None, **kwargs) -> Any:
         """
-        流式聊天完成接口
+        流式聊天完成接口，首个增量到达前失败时按路由切换提供商
         """
         ai_provider = self.get_provider(provider)
         if not ai_provider:
@@ -153,7 +272,76 @@ class AIService:
         if not ai_provider.is_configured():
             raise ValueError(f"AI服务提供商未配置: {provider}")
         
-        return ai_provider.stream_chat_completion(messages, **kwargs)
+        return self.router.stream_chat_completion(ai_provider, messages, failover=failover, **kwargs)
+
+    
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """
+        执行同步提供商调用的线程池，供异步接口使用
+        """
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix='ai-fanout')
+        return self._executor
+    
+    async def achat_completion(self, messages: List[Dict[str, str]], provider: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        """
+        异步聊天完成接口：在线程池中执行提供商的同步调用
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, lambda: self.chat_completion(messages, provider=provider, **kwargs)
+        )
+    
+    async def agather_completions(self, calls: List[Dict[str, Any]], concurrency: Optional[int] = None,
+                                  timeout: Optional[float] = None) -> List[Union[Dict[str, Any], BaseException]]:
+        """
+        并发执行多个相互独立的聊天完成请求
+        
+        calls 中每项为 {'messages': [...], 'provider': 可选, 其余为生成参数}。
+        返回与 calls 顺序一致的列表，失败或超时的位置为异常对象。
+        """
+        concurrency = max(1, concurrency or FANOUT_CONCURRENCY)
+        timeout = timeout or FANOUT_TIMEOUT
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def run(call):
+            call = dict(call)
+            messages = call.pop('messages')
+            provider = call.pop('provider', None)
+            # 单次请求的读取超时不超过整体截止时间，避免线程在截止后长时间占用
+            call['timeout'] = min(float(call.get('timeout', timeout)), timeout)
+            async with semaphore:
+                return await self.achat_completion(messages, provider=provider, **call)
+        
+        tasks = [asyncio.ensure_future(run(call)) for call in calls]
+        if not tasks:
+            return []
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        # 截止时间到达后取消尚未完成的请求
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        
+        results = []
+        for task in tasks:
+            if task in pending:
+                results.append(asyncio.TimeoutError(f"AI请求超时（{timeout}秒）"))
+            elif task.exception() is not None:
+                results.append(task.exception())
+            else:
+                results.append(task.result())
+        return results
+    
+    def gather_completions(self, calls: List[Dict[str, Any]], concurrency: Optional[int] = None,
+                           timeout: Optional[float] = None) -> List[Union[Dict[str, Any], BaseException]]:
+        """
+        并发执行多个聊天完成请求的同步入口（供Flask视图调用）
+        """
+        return asyncio.run(self.agather_completions(calls, concurrency=concurrency, timeout=timeout))
 
 
 # 创建全局AI服务实例
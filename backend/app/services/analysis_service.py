@@ -0,0 +1,339 @@
+"""
+文本分析引擎
+单次扫描章节正文，按引号与句末标点切分，计算对话/动作/描写比例、句长分布与基于词典的情感倾向。
+分析结果按章节持久化在 chapter_analysis 表中，只有正文哈希变化（或分析算法版本升级）时才重新计算，
+整部作品的情绪、节奏曲线只需一次联表查询。
+"""
+import hashlib
+import json
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, List
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import db
+from app.models import Chapter, ChapterAnalysis
+
+# 分析算法版本，修改词典或计算方法时递增，已保存的结果随之失效
+ANALYZER_VERSION = 2
+# 每批读取待分析章节的数量
+ANALYSIS_BATCH_SIZE = 200
+
+# ==================== 词典 ====================
+
+ACTION_WORDS = (
+    '打', '踢', '砍', '劈', '斩', '刺', '挥', '抓', '扑', '冲', '跑', '跳', '跃', '追', '逃', '闪', '躲',
+    '拔', '推', '拉', '扔', '掷', '射', '撞', '击', '攻', '杀', '抢', '夺', '转身', '奔', '拽', '按住',
+    '握紧', '抬手', '出手', '出拳', '飞身', '翻身', '后退', '上前', '扑向', '冲向', '一拳', '一掌', '一剑',
+)
+DESCRIPTION_WORDS = (
+    '仿佛', '好像', '宛如', '如同', '似乎', '犹如', '一般', '般的', '静静', '缓缓', '淡淡', '隐隐',
+    '阳光', '月光', '微风', '天空', '云', '山', '水', '树', '花', '夜色', '雾', '雨', '雪',
+    '颜色', '红色', '白色', '黑色', '金色', '青色', '古老', '巨大', '宽阔', '幽深', '寂静', '安静',
+)
+POSITIVE_WORDS = (
+    '喜', '笑', '欢', '乐', '爱', '暖', '美', '甜', '好', '赞', '幸福', '高兴', '开心', '快乐', '兴奋',
+    '温柔', '温暖', '希望', '满意', '感激', '感动', '欣慰', '骄傲', '自豪', '安心', '放心', '轻松',
+    '胜利', '成功', '惊喜', '期待', '喜悦', '欢喜', '欣喜', '微笑', '大笑', '美好', '平静', '坚定',
+)
+NEGATIVE_WORDS = (
+    '怒', '恨', '哭', '泪', '痛', '悲', '怕', '恐', '惧', '苦', '恼', '烦', '冷', '死', '血', '伤',
+    '愤怒', '悲伤', '痛苦', '恐惧', '害怕', '绝望', '失望', '焦虑', '紧张', '不安', '孤独', '寂寞',
+    '后悔', '愧疚', '嫉妒', '厌恶', '憎恨', '委屈', '沮丧', '崩溃', '杀意', '危险', '失败', '背叛',
+)
+# 否定词按词匹配；“非常”“无比”等程度副词以否定字开头，先从上下文中去掉程度副词再查否定词
+NEGATIONS = ('不', '没', '未', '别', '莫', '无法')
+INTENSIFIERS = ('很', '非常', '极', '十分', '太', '格外', '分外', '无比', '特别')
+# 情感词前查找否定词的字数（不含程度副词）
+NEGATION_WINDOW = 2
+INTENSIFIER_WEIGHT = 1.5
+
+OPEN_QUOTES = '“「『‘'
+CLOSE_QUOTES = '”」』’'
+SENTENCE_ENDS = '。！？!?；;…\n'
+
+# 句长分布的分桶上限（字）
+SENTENCE_LENGTH_BUCKETS = (10, 20, 40, 80)
+
+
+def _build_lexicon() -> Dict[str, frozenset]:
+    lexicon: Dict[str, set] = {}
+    for category, words in (('action', ACTION_WORDS), ('description', DESCRIPTION_WORDS),
+                            ('positive', POSITIVE_WORDS), ('negative', NEGATIVE_WORDS)):
+        for word in words:
+            lexicon.setdefault(word, set()).add(category)
+    return {word: frozenset(categories) for word, categories in lexicon.items()}
+
+
+_LEXICON = _build_lexicon()
+_MAX_WORD_LENGTH = max(len(word) for word in _LEXICON)
+_INTENSIFIERS_LONGEST_FIRST = sorted(INTENSIFIERS, key=len, reverse=True)
+_MAX_INTENSIFIER_LENGTH = len(_INTENSIFIERS_LONGEST_FIRST[0])
+# 一个正则完成全部切分：引号、句末标点与词典词的首字（首字命中后再查词典，长词优先），
+# 只用字符集合而不是词的多选分支，避免在每个位置逐个尝试全部词条
+_SCAN_RE = re.compile(
+    f'(?P<open>[{OPEN_QUOTES}])|(?P<close>[{CLOSE_QUOTES}])|(?P<quote>")'
+    f'|(?P<end>[{re.escape(SENTENCE_ENDS)}]+)'
+    f'|(?P<word>[{re.escape("".join(sorted({word[0] for word in _LEXICON})))}])'
+)
+_BLANK_RE = re.compile(r'[ \t　\r]+')
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1((text or '').encode('utf-8')).hexdigest()
+
+
+def _percentile(sorted_values: List[int], ratio: float) -> float:
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(round(ratio * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def analyze_text(text: str) -> Dict[str, Any]:
+    """
+    单次扫描分析正文
+
+    - 引号内的文字计为对话；引号外的句子按动作词与描写词的命中数归为动作或描写
+    - 句长按可见字符计，统计平均值、中位数、P90 与分桶分布
+    - 情感：正负面词典命中，有程度副词时加权，去掉程度副词后前两个字内有否定词时取反；
+      sentiment 为 (正-负)/(正+负+1)，范围 -1~1
+    """
+    # 先去掉空白，之后各段的可见字数就是下标之差
+    text = _BLANK_RE.sub('', text or '')
+    dialogue = action = description = 0
+    lengths: List[int] = []
+    positive = negative = 0.0
+
+    in_quote = False
+    sentence_chars = sentence_dialogue = 0
+    action_hits = description_hits = 0
+    position = 0
+
+    def consume(end):
+        # 把 position 到 end 之间的文字计入当前句子
+        nonlocal position, sentence_chars, sentence_dialogue
+        if end > position:
+            length = end - position
+            sentence_chars += length
+            if in_quote:
+                sentence_dialogue += length
+            position = end
+
+    def finish_sentence():
+        nonlocal dialogue, action, description, sentence_chars, sentence_dialogue, action_hits, description_hits
+        if sentence_chars:
+            lengths.append(sentence_chars)
+            dialogue += sentence_dialogue
+            narrative = sentence_chars - sentence_dialogue
+            if action_hits > description_hits:
+                action += narrative
+            else:
+                description += narrative
+        sentence_chars = sentence_dialogue = action_hits = description_hits = 0
+
+    for match in _SCAN_RE.finditer(text):
+        kind = match.lastgroup
+        consume(match.start())
+        if kind == 'open':
+            in_quote = True
+            position = match.end()
+        elif kind == 'close':
+            in_quote = False
+            position = match.end()
+        elif kind == 'quote':
+            in_quote = not in_quote
+            position = match.end()
+        elif kind == 'end':
+            # 标点计入句子长度，引号内的句末标点结束句子但不结束对话
+            consume(match.end())
+            finish_sentence()
+            if '\n' in match.group():
+                in_quote = False
+        else:
+            start = match.start()
+            if start < position:
+                # 位于上一个词典词内部
+                continue
+            for length in range(_MAX_WORD_LENGTH, 0, -1):
+                word = text[start:start + length]
+                categories = _LEXICON.get(word)
+                if categories is not None:
+                    break
+            if categories is None:
+                continue
+            if not in_quote:
+                if 'action' in categories:
+                    action_hits += 1
+                if 'description' in categories:
+                    description_hits += 1
+            if 'positive' in categories or 'negative' in categories:
+                before = text[max(0, start - NEGATION_WINDOW - _MAX_INTENSIFIER_LENGTH):start]
+                weight = 1.0
+                for intensifier in _INTENSIFIERS_LONGEST_FIRST:
+                    if intensifier in before:
+                        weight = INTENSIFIER_WEIGHT
+                        before = before.replace(intensifier, '')
+                before = before[-NEGATION_WINDOW:]
+                negated = any(negation in before for negation in NEGATIONS)
+                is_positive = ('positive' in categories) != negated
+                if is_positive:
+                    positive += weight
+                else:
+                    negative += weight
+            consume(start + len(word))
+    consume(len(text))
+    finish_sentence()
+
+    total = dialogue + action + description
+    lengths.sort()
+    buckets = {}
+    lower = 1
+    for upper in SENTENCE_LENGTH_BUCKETS:
+        buckets[f'{lower}-{upper}'] = sum(1 for n in lengths if lower <= n <= upper)
+        lower = upper + 1
+    buckets[f'{lower}+'] = sum(1 for n in lengths if n >= lower)
+    mean = sum(lengths) / len(lengths) if lengths else 0
+    variance = sum((n - mean) ** 2 for n in lengths) / len(lengths) if lengths else 0
+    sentiment = (positive - negative) / (positive + negative + 1)
+
+    return {
+        'char_count': total,
+        'dialogue_ratio': round(dialogue / total, 4) if total else 0,
+        'action_ratio': round(action / total, 4) if total else 0,
+        'description_ratio': round(description / total, 4) if total else 0,
+        'sentence_count': len(lengths),
+        'sentence_length': {
+            'mean': round(mean, 2),
+            'median': _percentile(lengths, 0.5),
+            'p90': _percentile(lengths, 0.9),
+            'max': lengths[-1] if lengths else 0,
+            'stdev': round(variance ** 0.5, 2),
+            'distribution': buckets
+        },
+        'sentiment': round(sentiment, 4),
+        'positive_hits': round(positive, 1),
+        'negative_hits': round(negative, 1),
+    }
+
+
+# ==================== 持久化 ====================
+
+def _save_analyses(rows: List[Dict[str, Any]]):
+    """写入分析结果；并发请求同时分析同一章节时以后写入的为准"""
+    if not rows:
+        return
+    table = ChapterAnalysis.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.chapter_id],
+        set_={name: stmt.excluded[name] for name in rows[0] if name != 'chapter_id'}
+    )
+    db.session.execute(stmt, rows)
+
+
+def _analysis_row(chapter_id, project_id, updated_at, digest, metrics) -> Dict[str, Any]:
+    return {
+        'chapter_id': chapter_id,
+        'project_id': project_id,
+        'content_hash': digest,
+        'analyzer_version': ANALYZER_VERSION,
+        'source_updated_at': updated_at,
+        'char_count': metrics['char_count'],
+        'sentence_count': metrics['sentence_count'],
+        'dialogue_ratio': metrics['dialogue_ratio'],
+        'action_ratio': metrics['action_ratio'],
+        'description_ratio': metrics['description_ratio'],
+        'sentiment': metrics['sentiment'],
+        'metrics': json.dumps(metrics, ensure_ascii=False),
+        'updated_at': datetime.utcnow(),
+    }
+
+
+def refresh_analyses(stale: Iterable[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    """
+    重新分析过期的章节：先比较正文哈希，正文未变（如只改了标题）时只更新记录的修改时间
+    stale: [{'id', 'project_id', 'content_hash'(已保存的哈希或None)}]
+    返回 章节ID -> 最新指标
+    """
+    stale = {item['id']: item for item in stale}
+    ids = list(stale)
+    results: Dict[int, Dict[str, Any]] = {}
+    for offset in range(0, len(ids), ANALYSIS_BATCH_SIZE):
+        batch = ids[offset:offset + ANALYSIS_BATCH_SIZE]
+        rows = []
+        for chapter_id, content, updated_at in db.session.query(
+                Chapter.id, Chapter.content, Chapter.updated_at).filter(Chapter.id.in_(batch)):
+            item = stale[chapter_id]
+            digest = content_hash(content)
+            if digest == item.get('content_hash') and item.get('metrics') is not None:
+                metrics = item['metrics']
+            else:
+                metrics = analyze_text(content)
+            rows.append(_analysis_row(chapter_id, item['project_id'], updated_at, digest, metrics))
+            results[chapter_id] = metrics
+        _save_analyses(rows)
+    if results:
+        db.session.commit()
+    return results
+
+
+def get_project_analyses(project_id: int) -> List[Dict[str, Any]]:
+    """
+    按章节顺序返回项目全部章节的分析指标，只重新分析正文有变化的章节
+    返回 [{'chapter_id', 'chapter_title', 'word_count', 'metrics'}]
+    """
+    analysis = ChapterAnalysis.__table__.c
+    rows = db.session.query(
+        Chapter.id, Chapter.title, Chapter.word_count, Chapter.updated_at,
+        analysis.content_hash, analysis.analyzer_version, analysis.source_updated_at, analysis.metrics
+    ).outerjoin(ChapterAnalysis.__table__, analysis.chapter_id == Chapter.id) \
+        .filter(Chapter.project_id == project_id) \
+        .order_by(Chapter.order_index, Chapter.id).all()
+
+    results = []
+    stale = []
+    for row in rows:
+        metrics = json.loads(row.metrics) if row.metrics else None
+        fresh = (metrics is not None and row.analyzer_version == ANALYZER_VERSION
+                 and row.source_updated_at == row.updated_at)
+        if not fresh:
+            stale.append({
+                'id': row.id, 'project_id': project_id,
+                # 算法版本变化时不能复用旧指标
+                'content_hash': row.content_hash if row.analyzer_version == ANALYZER_VERSION else None,
+                'metrics': metrics
+            })
+        results.append({
+            'chapter_id': row.id,
+            'chapter_title': row.title,
+            'word_count': row.word_count,
+            'metrics': metrics
+        })
+
+    if stale:
+        refreshed = refresh_analyses(stale)
+        for item in results:
+            if item['chapter_id'] in refreshed:
+                item['metrics'] = refreshed[item['chapter_id']]
+    return results
+
+
+def get_chapter_analysis(chapter: Chapter) -> Dict[str, Any]:
+    """单个章节的分析指标"""
+    record = ChapterAnalysis.query.filter_by(chapter_id=chapter.id).first()
+    if (record is not None and record.analyzer_version == ANALYZER_VERSION
+            and record.source_updated_at == chapter.updated_at):
+        return json.loads(record.metrics)
+    return refresh_analyses([{
+        'id': chapter.id, 'project_id': chapter.project_id,
+        'content_hash': record.content_hash if record and record.analyzer_version == ANALYZER_VERSION else None,
+        'metrics': json.loads(record.metrics) if record and record.metrics else None
+    }])[chapter.id]
+
+
+@event.listens_for(Chapter, 'after_delete')
+def _delete_chapter_analysis(mapper, connection, target):
+    connection.execute(
+        ChapterAnalysis.__table__.delete().where(ChapterAnalysis.__table__.c.chapter_id == target.id)
+    )
@@ -0,0 +1,181 @@
+"""
+批量写入
+按业务键一次查询出作用域内已存在的记录，再以 bulk mappings 在同一事务中完成插入与更新，
+写入语句数量与条目数无关。bulk mappings 不触发模型事件，世界统计计数与版本号（ETag 及按版本号失效的缓存）在此处显式维护。
+"""
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import select
+from app import db
+from app.services.etag_service import bump_model_versions
+from app.services.search_service import SEARCH_SOURCES, reindex_entities
+from app.services.stats_service import COUNTED_MODELS, adjust_counters_bulk
+
+# 模型 -> 世界统计中的实体类型
+_COUNTED_TYPES = {model: entity_type for entity_type, model in COUNTED_MODELS.items()}
+# 模型 -> 检索索引中的实体类型
+_SEARCH_TYPES = {source.model: entity_type for entity_type, source in SEARCH_SOURCES.items()}
+
+
+def _column_default(column):
+    default = column.default
+    if default is not None and default.is_scalar:
+        return default.arg
+    return None
+
+
+def _coerce(column, value):
+    """AI生成的设定中文本字段可能是数组或对象，统一存为JSON字符串"""
+    if isinstance(value, (list, dict)) and isinstance(column.type, db.Text):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def bulk_upsert(model, rows: Sequence[Dict[str, Any]], key_fields: Sequence[str], fields: Iterable[str],
+                scope: Sequence[Any] = (), defaults: Optional[Dict[str, Any]] = None,
+                bump_version: bool = False) -> Tuple[List[Any], int, int]:
+    """
+    按业务键批量插入或更新，不提交事务
+
+    rows: 待写入的字典列表，须包含 key_fields 中的全部字段
+    key_fields: 业务键，如 ('project_id', 'volume_id', 'order_index')
+    fields: 允许写入的字段；更新时只写入条目中出现的字段
+    scope: 查询已有记录的过滤条件，应将查询限制在 rows 所属的范围内
+    defaults: 新建时缺省字段的默认值（优先于列默认值）
+    bump_version: 更新时 version + 1
+    返回 (按 rows 顺序排列的模型对象, 新建数, 更新数)；同一业务键重复出现时以最后一条为准
+    """
+    table = model.__table__
+    columns = table.columns
+    fields = [name for name in fields if name in columns and name not in key_fields]
+    defaults = defaults or {}
+    has_world = 'world_id' in columns
+    entity_type = _COUNTED_TYPES.get(model)
+
+    def key_of(row):
+        return tuple(row.get(name) for name in key_fields)
+
+    # 一次查询作用域内已有记录的ID及维护计数所需的列
+    selected = [columns['id']] + [columns[name] for name in key_fields]
+    if 'version' in columns:
+        selected.append(columns['version'])
+    if has_world:
+        selected += [columns['created_at']] + ([] if 'world_id' in key_fields else [columns['world_id']])
+    existing = {}
+    for record in db.session.execute(select(*selected).where(*scope)).mappings():
+        existing[key_of(record)] = record
+
+    now = datetime.utcnow()
+    inserts: Dict[tuple, Dict[str, Any]] = {}
+    updates: Dict[tuple, Dict[str, Any]] = {}
+    order = []
+    for row in rows:
+        key = key_of(row)
+        order.append(key)
+        record = existing.get(key)
+        if record is None:
+            mapping = inserts.setdefault(key, {})
+            for name in fields:
+                if name in row:
+                    mapping[name] = _coerce(columns[name], row[name])
+                elif name not in mapping:
+                    mapping[name] = defaults.get(name, _column_default(columns[name]))
+            mapping.update(zip(key_fields, key))
+            for name in ('created_at', 'updated_at'):
+                if name in columns:
+                    mapping[name] = now
+            if 'version' in columns:
+                mapping['version'] = 1
+        else:
+            mapping = updates.setdefault(key, {'id': record['id']})
+            mapping.update({name: _coerce(columns[name], row[name]) for name in fields if name in row})
+            if bump_version:
+                mapping['version'] = (record['version'] or 0) + 1
+
+    if inserts:
+        db.session.bulk_insert_mappings(model, list(inserts.values()))
+    if updates:
+        db.session.bulk_update_mappings(model, list(updates.values()))
+
+    if has_world:
+        # 新建计入所属世界；修改 world_id 的记录从原世界移到新世界
+        changes = []
+        for mapping in inserts.values():
+            changes.append((mapping.get('world_id'), now, 1))
+        for key, mapping in updates.items():
+            record = existing[key]
+            if 'world_id' in mapping and mapping['world_id'] != record['world_id']:
+                changes += [(record['world_id'], record['created_at'], -1),
+                            (mapping['world_id'], record['created_at'], 1)]
+        if entity_type is not None:
+            adjust_counters_bulk(entity_type, changes)
+
+    # 重新读取写入后的记录（覆盖会话中可能已过期的对象）
+    objects = {}
+    for obj in model.query.filter(*scope).populate_existing():
+        objects[tuple(getattr(obj, name) for name in key_fields)] = obj
+
+    written = set(inserts) | set(updates)
+    if written:
+        # 写入后的记录与更新前的记录（可能属于其他世界/项目）所在范围的 ETag 均失效
+        scope_columns = [name for name in ('id', 'world_id', 'project_id') if name in columns]
+        bump_model_versions(db.session.connection(), model, [
+            {name: getattr(obj, name) for name in scope_columns}
+            for key, obj in objects.items() if key in written
+        ] + [dict(existing[key]) for key in updates])
+
+    search_type = _SEARCH_TYPES.get(model)
+    if search_type is not None and written:
+        reindex_entities(db.session.connection(), search_type,
+                         [obj.id for key, obj in objects.items() if key in written])
+    seen = set()
+    result = []
+    for key in order:
+        if key not in seen and key in objects:
+            seen.add(key)
+            result.append(objects[key])
+    return result, len(inserts), len(updates)
+
+
+def upsert_project_settings(model, items: Sequence[Dict[str, Any]],
+                            require_project: bool = False) -> Tuple[List[Any], int, int]:
+    """
+    批量导入角色/地点/物品等设定：同一项目（及同一世界）中同名的设定更新，其余新建，不提交事务
+
+    校验失败抛出 ValueError，引用的项目不存在抛出 LookupError
+    """
+    from app.models import Project
+
+    if not isinstance(items, list):
+        raise ValueError('请求体应为数组')
+    has_world = 'world_id' in model.__table__.columns
+    scope_fields = ('project_id', 'world_id') if has_world else ('project_id',)
+    rows = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not item.get('name'):
+            raise ValueError(f'第{index + 1}项缺少name')
+        if require_project and not item.get('project_id'):
+            raise ValueError(f'第{index + 1}项缺少project_id')
+        rows.append(dict(item, **{name: item.get(name) or None for name in scope_fields}))
+
+    project_ids = {row['project_id'] for row in rows} - {None}
+    if project_ids:
+        found = {project_id for (project_id,) in
+                 db.session.query(Project.id).filter(Project.id.in_(project_ids))}
+        missing = project_ids - found
+        if missing:
+            raise LookupError(f'项目不存在: {sorted(missing)}')
+
+    # 按项目、世界分别限定查询范围，避免匹配到其他世界中的同名设定
+    scope = [model.name.in_({row['name'] for row in rows})]
+    for name in scope_fields:
+        column = getattr(model, name)
+        values = {row[name] for row in rows} - {None}
+        conditions = [column.in_(values)] if values else []
+        if any(row[name] is None for row in rows):
+            conditions.append(column.is_(None))
+        scope.append(db.or_(*conditions))
+    fields = [name for name in model.__table__.columns.keys()
+              if name not in ('id', 'created_at', 'updated_at', 'version')]
+    return bulk_upsert(model, rows, key_fields=scope_fields + ('name',), fields=fields, scope=scope)
@@ -0,0 +1,180 @@
+"""
+世界数据包
+一次请求按分区读取世界的角色、地点、势力、物品、世界观设定、历史、能量与社会体系、标签与关系等数据，
+在同一个只读事务（同一快照）中完成全部查询，并按分区流式输出一个 JSON 文档。
+每个分区的版本号取自 resource_versions 中该世界范围的版本号，客户端携带上次的 version 时只返回有变化的分区。
+"""
+import hashlib
+import json
+import sqlite3
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+from app import db
+from app.models import (
+    World, Character, Location, Faction, Item,
+    Dimension, Region, CelestialBody, NaturalLaw,
+    HistoricalEra, HistoricalEvent, HistoricalFigure,
+    EnergySystem, PowerLevel, EnergyForm, CommonSkill, PowerCost,
+    Civilization, SocialClass, CulturalCustom, EconomicSystem, PoliticalSystem,
+    Tag, EntityRelation
+)
+from app.services.etag_service import get_versions
+from app.services.stats_service import COUNTED_MODELS, get_world_counts
+
+# 每批从游标读取并序列化的记录数
+BUNDLE_BATCH_SIZE = 200
+
+
+class BundleSection:
+    """
+    数据包中的一个分区：依赖的模型（决定版本号）与读取函数
+    loader(world_id) 返回单个对象（dict）或记录迭代器
+    """
+
+    def __init__(self, name: str, models: Sequence[Any], loader: Callable[[int], Any]):
+        self.name = name
+        self.models = tuple(models)
+        self.loader = loader
+
+    @property
+    def resources(self) -> List[str]:
+        return [model.__table__.name for model in self.models]
+
+
+def _rows(model, order_by: Sequence[Any] = (), serializer: str = 'to_dict'):
+    """按世界过滤的列表分区，按批读取"""
+    def load(world_id: int) -> Iterator[Dict[str, Any]]:
+        query = model.query.filter(model.world_id == world_id).order_by(*order_by, model.id)
+        for obj in query.yield_per(BUNDLE_BATCH_SIZE):
+            yield getattr(obj, serializer)()
+    return load
+
+
+def _load_world(world_id: int) -> Optional[Dict[str, Any]]:
+    world = World.query.get(world_id)
+    return world.to_dict() if world else None
+
+
+def _load_region_tree(world_id: int) -> List[Dict[str, Any]]:
+    from app.api.world_setting import build_region_tree
+    return build_region_tree(world_id) or []
+
+
+BUNDLE_SECTIONS = {section.name: section for section in (
+    BundleSection('world', [World], _load_world),
+    BundleSection('stats', COUNTED_MODELS.values(), get_world_counts),
+    BundleSection('characters', [Character], _rows(Character, serializer='to_summary_dict')),
+    BundleSection('locations', [Location], _rows(Location, serializer='to_summary_dict')),
+    BundleSection('factions', [Faction], _rows(Faction, serializer='to_summary_dict')),
+    BundleSection('items', [Item], _rows(Item, serializer='to_summary_dict')),
+    BundleSection('dimensions', [Dimension], _rows(Dimension, [Dimension.order_index])),
+    BundleSection('regions', [Region], _load_region_tree),
+    BundleSection('celestial_bodies', [CelestialBody], _rows(CelestialBody, [CelestialBody.order_index])),
+    BundleSection('natural_laws', [NaturalLaw], _rows(NaturalLaw, [NaturalLaw.order_index])),
+    BundleSection('eras', [HistoricalEra], _rows(HistoricalEra, [HistoricalEra.order_index])),
+    BundleSection('events', [HistoricalEvent], _rows(HistoricalEvent, [HistoricalEvent.order_index])),
+    BundleSection('figures', [HistoricalFigure], _rows(HistoricalFigure, [HistoricalFigure.importance_level.desc()])),
+    BundleSection('energy_systems', [EnergySystem], _rows(EnergySystem, [EnergySystem.order_index])),
+    BundleSection('power_levels', [PowerLevel], _rows(PowerLevel, [PowerLevel.level])),
+    BundleSection('energy_forms', [EnergyForm], _rows(EnergyForm, [EnergyForm.order_index])),
+    BundleSection('common_skills', [CommonSkill], _rows(CommonSkill, [CommonSkill.order_index])),
+    BundleSection('power_costs', [PowerCost], _rows(PowerCost, [PowerCost.order_index])),
+    BundleSection('civilizations', [Civilization], _rows(Civilization, [Civilization.order_index],
+                                                         serializer='to_summary_dict')),
+    BundleSection('social_classes', [SocialClass], _rows(SocialClass, [SocialClass.class_level])),
+    BundleSection('cultural_customs', [CulturalCustom], _rows(CulturalCustom, [CulturalCustom.importance_level.desc()])),
+    BundleSection('economic_systems', [EconomicSystem], _rows(EconomicSystem, [EconomicSystem.order_index])),
+    BundleSection('political_systems', [PoliticalSystem], _rows(PoliticalSystem, [PoliticalSystem.order_index])),
+    BundleSection('tags', [Tag], _rows(Tag, [Tag.usage_count.desc()])),
+    BundleSection('relations', [EntityRelation], _rows(EntityRelation)),
+)}
+
+
+def parse_sections(value: Optional[str]) -> List[str]:
+    """解析 sections 参数（逗号分隔），缺省为全部分区；包含未知分区时抛出 ValueError"""
+    if not value:
+        return list(BUNDLE_SECTIONS)
+    names = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in names if name not in BUNDLE_SECTIONS]
+    if unknown:
+        raise ValueError(f'未知的分区: {", ".join(unknown)}')
+    return names
+
+
+def parse_version(token: Optional[str]) -> Dict[str, int]:
+    """解析数据包版本 "characters:3,regions:5"，无法解析的部分忽略（视为有变化）"""
+    versions = {}
+    for part in (token or '').split(','):
+        name, _, value = part.partition(':')
+        if name and value.isdigit():
+            versions[name] = int(value)
+    return versions
+
+
+def format_version(versions: Dict[str, int]) -> str:
+    return ','.join(f'{name}:{version}' for name, version in versions.items())
+
+
+def begin_snapshot():
+    """
+    在会话当前使用的 SQLite 连接上显式开始事务：pysqlite 执行 SELECT 时不会自动开启事务，
+    不显式开始时每条查询各自读取最新提交的数据，分区之间可能不一致
+    """
+    # 按映射取连接：只读请求中得到只读引擎的连接，即随后各分区查询所用的连接
+    connection = db.session.connection(bind_arguments={'mapper': World.__mapper__})
+    raw = connection.connection.dbapi_connection
+    if isinstance(raw, sqlite3.Connection) and not raw.in_transaction:
+        connection.exec_driver_sql('BEGIN')
+
+
+def section_versions(world_id: int, names: Sequence[str]) -> Dict[str, int]:
+    """
+    一次查询取出各分区依赖的表在世界范围内的版本号；分区版本为其各表版本号之和（各表版本号只增不减）
+    """
+    resources = list(dict.fromkeys(name for section in names for name in BUNDLE_SECTIONS[section].resources))
+    values, _ = get_versions(resources, ('world', world_id))
+    by_resource = dict(zip(resources, values))
+    return {name: sum(by_resource[resource] for resource in BUNDLE_SECTIONS[name].resources) for name in names}
+
+
+def bundle_etag(world_id: int, versions: Dict[str, int], since: Dict[str, int]) -> str:
+    changed = sorted(name for name, version in versions.items() if since.get(name) != version)
+    return hashlib.sha1(repr((world_id, format_version(versions), changed)).encode('utf-8')).hexdigest()
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def stream_bundle(world_id: int, versions: Dict[str, int], since: Dict[str, int]) -> Iterator[str]:
+    """
+    按分区流式输出数据包：
+    {"code": 200, "message": ..., "data": {"world_id", "version", "versions", "unchanged", "sections": {...}}}
+    列表分区逐批序列化输出，单个对象分区（world、stats、regions）整体输出
+    """
+    unchanged = [name for name, version in versions.items() if since.get(name) == version]
+    yield ('{"code": 200, "message": "获取世界数据包成功", "data": {'
+           f'"world_id": {world_id}, "version": {_dumps(format_version(versions))}, '
+           f'"versions": {_dumps(versions)}, "unchanged": {_dumps(unchanged)}, "sections": {{')
+    first_section = True
+    for name in versions:
+        if name in unchanged:
+            continue
+        yield ('' if first_section else ', ') + f'{_dumps(name)}: '
+        first_section = False
+        value = BUNDLE_SECTIONS[name].loader(world_id)
+        if isinstance(value, (dict, list)) or value is None:
+            yield _dumps(value)
+            continue
+        yield '['
+        batch: List[str] = []
+        first_row = True
+        for row in value:
+            batch.append(_dumps(row))
+            if len(batch) >= BUNDLE_BATCH_SIZE:
+                yield ('' if first_row else ', ') + ', '.join(batch)
+                first_row = False
+                batch = []
+        if batch:
+            yield ('' if first_row else ', ') + ', '.join(batch)
+        yield ']'
+    yield '}}}'
@@ -0,0 +1,308 @@
+"""
+写作上下文组装
+根据 chapter_id 在服务端组装续写/润色的提示上下文：本章末尾、上一章摘要以及本章涉及的角色/地点设定，
+并按提供商的上下文窗口估算token，保证提示长度不随客户端提交的正文无限增长。
+"""
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional
+from app import db
+from app.models import Chapter, Volume, Character, Location, World
+from app.config.ai_config import ai_config
+from app.services.cache_service import LRUCache
+
+
+# 各提供商默认可用的输入上下文（token），可在提供商配置中用 context_window 覆盖
+PROVIDER_CONTEXT_WINDOWS = {
+    'openai': 16000,
+    'azure': 16000,
+    'anthropic': 100000,
+    'google': 32000,
+    'siliconflow': 32000,
+}
+DEFAULT_CONTEXT_WINDOW = 8000
+# 单次提示的上限，避免上下文窗口很大的提供商带来过高延迟与成本
+CONTEXT_MAX_TOKENS = int(os.getenv('AI_CONTEXT_MAX_TOKENS', 6000))
+# 上一章摘要与设定各自最多占用的预算比例，其余留给本章正文
+SUMMARY_BUDGET_RATIO = 0.15
+SETTINGS_BUDGET_RATIO = 0.25
+SUMMARY_CACHE_SIZE = int(os.getenv('AI_SUMMARY_CACHE_SIZE', 512))
+
+# 中日韩文字每字约计1个token，其余字符约4个计1个token
+_CJK_RE = re.compile(r'[　-〿぀-ヿ㐀-䶿一-鿿豈-﫿＀-￯]')
+_SPACE_RE = re.compile(r'\s+')
+
+_summary_cache = LRUCache(SUMMARY_CACHE_SIZE)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    快速估算文本的token数（不依赖分词器），中文按字计，其他字符按长度/4计
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    other = len(_SPACE_RE.sub('', text)) - cjk
+    return cjk + (other + 3) // 4
+
+
+def get_context_budget(provider: Optional[str] = None, max_tokens: int = 1000) -> int:
+    """
+    提示上下文的token预算：提供商上下文窗口扣除输出预留，且不超过 CONTEXT_MAX_TOKENS
+    """
+    provider = provider or ai_config.get_default_provider()
+    config = ai_config.get_provider_config(provider)
+    window = int(config.get('context_window') or PROVIDER_CONTEXT_WINDOWS.get(provider, DEFAULT_CONTEXT_WINDOW))
+    return max(0, min(window - int(max_tokens or 0), CONTEXT_MAX_TOKENS))
+
+
+def truncate_head(text: str, max_tokens: int) -> str:
+    """保留开头不超过 max_tokens 的部分"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low]
+
+
+def truncate_tail(text: str, max_tokens: int) -> str:
+    """
+    保留末尾不超过 max_tokens 的部分，尽量从段落开头截断
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ''
+    # 每个token至少对应1个字符、至多约4个字符，先粗截再二分
+    text = text[-max_tokens * 4:]
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high) // 2
+        if estimate_tokens(text[mid:]) <= max_tokens:
+            high = mid
+        else:
+            low = mid + 1
+    tail = text[low:]
+    newline = tail.find('\n')
+    if 0 <= newline < len(tail) // 4:
+        tail = tail[newline + 1:]
+    return tail
+
+
+# ==================== 章节摘要 ====================
+
+def _paragraphs(text: str) -> List[str]:
+    return [p.strip() for p in (text or '').split('\n') if p.strip()]
+
+
+def summarize_chapter(chapter: Chapter, max_tokens: int = 400) -> str:
+    """
+    章节摘要（抽取式）：核心事件与情感目标，加上开头段落与结尾段落。
+    以 (章节ID, 更新时间) 缓存，章节修改后自动失效。
+    """
+    key = (chapter.id, chapter.updated_at, max_tokens)
+    cached = _summary_cache.get(key)
+    if cached is not None:
+        return cached
+
+    parts = [f'《{chapter.title}》']
+    if chapter.core_event:
+        parts.append(f'核心事件：{chapter.core_event}')
+    if chapter.emotional_goal:
+        parts.append(f'情感目标：{chapter.emotional_goal}')
+    header = '\n'.join(parts)
+
+    paragraphs = _paragraphs(chapter.content)
+    remaining = max_tokens - estimate_tokens(header)
+    body = ''
+    if paragraphs and remaining > 0:
+        # 结尾与下一章衔接最紧密，分配更多预算
+        opening = truncate_head(paragraphs[0], remaining // 3)
+        ending = truncate_tail('\n'.join(paragraphs[1:]), remaining - estimate_tokens(opening))
+        body = '\n……\n'.join(p for p in (opening, ending) if p)
+    summary = truncate_head('\n'.join(p for p in (header, body) if p), max_tokens)
+    _summary_cache.set(key, summary)
+    return summary
+
+
+def get_previous_chapter(chapter: Chapter) -> Optional[Chapter]:
+    """
+    上一章：同一卷中顺序靠前的最后一章；本卷第一章则取上一卷的最后一章
+    """
+    previous = Chapter.query.filter(
+        Chapter.project_id == chapter.project_id,
+        Chapter.volume_id == chapter.volume_id,
+        Chapter.order_index < chapter.order_index
+    ).order_by(Chapter.order_index.desc()).first()
+    if previous is not None or chapter.volume_id is None:
+        return previous
+
+    volume = Volume.query.get(chapter.volume_id)
+    if volume is None:
+        return None
+    previous_volume = Volume.query.filter(
+        Volume.project_id == chapter.project_id,
+        Volume.order_index < volume.order_index
+    ).order_by(Volume.order_index.desc()).first()
+    if previous_volume is None:
+        return None
+    return Chapter.query.filter_by(volume_id=previous_volume.id).order_by(Chapter.order_index.desc()).first()
+
+
+# ==================== 设定 ====================
+
+def _chapter_character_names(chapter: Chapter) -> List[str]:
+    """解析章节中记录的出场角色（JSON数组，元素为名称或含 name 的对象）"""
+    try:
+        values = json.loads(chapter.characters or '[]')
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(values, list):
+        return []
+    names = []
+    for value in values:
+        if isinstance(value, dict):
+            value = value.get('name')
+        if isinstance(value, str) and value.strip():
+            names.append(value.strip())
+    return names
+
+
+def _mentioned(names: Iterable[tuple], text: str, explicit: Iterable[str] = ()) -> List[int]:
+    explicit = set(explicit)
+    return [row_id for row_id, name in names if name and (name in explicit or name in text)]
+
+
+def _format_character(character: Character) -> str:
+    fields = [
+        ('身份', character.role_type),
+        ('简介', character.description),
+        ('性格', character.personality),
+        ('核心特质', character.core_traits),
+        ('动机', character.motivation),
+        ('当前位置', character.current_location),
+    ]
+    details = '；'.join(f'{label}：{value}' for label, value in fields if value)
+    return f'- {character.name}：{details}' if details else f'- {character.name}'
+
+
+def _format_location(location: Location) -> str:
+    fields = [
+        ('类型', location.location_type),
+        ('区域', location.region),
+        ('简介', location.description),
+    ]
+    details = '；'.join(f'{label}：{value}' for label, value in fields if value)
+    return f'- {location.name}：{details}' if details else f'- {location.name}'
+
+
+def _project_settings_filter(model, project_id: int):
+    """
+    属于项目的设定：直接关联项目的，以及属于项目所在世界的（世界管理中创建的设定通常只有 world_id）
+    """
+    world_ids = [world_id for (world_id,) in db.session.query(World.id).filter(World.project_id == project_id)]
+    if not world_ids:
+        return model.project_id == project_id
+    return db.or_(model.project_id == project_id, model.world_id.in_(world_ids))
+
+
+def collect_settings(project_id: int, text: str, explicit_characters: Iterable[str] = (),
+                     max_tokens: int = 1000) -> str:
+    """
+    收集正文中提及（或章节记录为出场）的角色与地点设定，按重要程度排序并截断到预算内
+    """
+    if max_tokens <= 0:
+        return ''
+    character_names = db.session.query(Character.id, Character.name).filter(
+        _project_settings_filter(Character, project_id)).all()
+    character_ids = _mentioned(character_names, text, explicit_characters)
+    location_names = db.session.query(Location.id, Location.name).filter(
+        _project_settings_filter(Location, project_id)).all()
+    location_ids = _mentioned(location_names, text)
+
+    lines = []
+    if character_ids:
+        characters = Character.query.options(
+            db.undefer(Character.personality), db.undefer(Character.core_traits), db.undefer(Character.motivation)
+        ).filter(Character.id.in_(character_ids)).order_by(Character.importance_level.desc()).all()
+        lines.append('【角色设定】')
+        lines.extend(_format_character(c) for c in characters)
+    if location_ids:
+        locations = Location.query.filter(Location.id.in_(location_ids)).order_by(Location.importance.desc()).all()
+        lines.append('【地点设定】')
+        lines.extend(_format_location(l) for l in locations)
+
+    result = []
+    used = 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > max_tokens:
+            break
+        result.append(line)
+        used += cost
+    # 去掉末尾没有条目的分组标题
+    while result and result[-1].startswith('【'):
+        result.pop()
+    return '\n'.join(result)
+
+
+# ==================== 组装 ====================
+
+def build_writing_context(chapter_id: Optional[int] = None, text: Optional[str] = None,
+                          provider: Optional[str] = None, max_tokens: int = 1000,
+                          budget: Optional[int] = None, include_body: bool = True) -> Dict[str, Any]:
+    """
+    组装写作上下文
+
+    chapter_id: 章节ID，提供时附加上一章摘要与相关设定
+    text: 客户端提交的正文（编辑器中可能尚未保存），未提供时使用章节已保存的正文
+    include_body: 是否在上下文中包含正文末尾（润色时正文单独发送，只需要背景信息）
+    返回 {'context', 'body', 'summary', 'settings', 'tokens', 'budget'}
+    """
+    budget = get_context_budget(provider, max_tokens) if budget is None else budget
+    chapter = Chapter.query.get(chapter_id) if chapter_id else None
+    if chapter_id and chapter is None:
+        raise LookupError(f'章节不存在: {chapter_id}')
+
+    source = text if text is not None else (chapter.content if chapter else '')
+    source = source or ''
+    summary = settings = ''
+    if chapter is not None:
+        previous = get_previous_chapter(chapter)
+        if previous is not None:
+            summary = summarize_chapter(previous, int(budget * SUMMARY_BUDGET_RATIO))
+        # 只在正文末尾检索提及的设定，与实际放入提示的内容一致
+        scope = truncate_tail(source, budget) if include_body else source
+        settings = collect_settings(
+            chapter.project_id, scope, _chapter_character_names(chapter),
+            min(int(budget * SETTINGS_BUDGET_RATIO), budget - estimate_tokens(summary))
+        )
+
+    sections = []
+    if summary:
+        sections.append(f'【上一章摘要】\n{summary}')
+    if settings:
+        sections.append(settings)
+
+    body = ''
+    if include_body:
+        # 正文预算扣除已放入的摘要、设定及分节标题
+        overhead = estimate_tokens('\n\n'.join(sections + ['【正文】\n'])) if sections else 0
+        body = truncate_tail(source, budget - overhead)
+        if body:
+            sections.append(f'【正文】\n{body}' if sections else body)
+    context = '\n\n'.join(sections)
+    return {
+        'context': context,
+        'body': body,
+        'summary': summary,
+        'settings': settings,
+        'tokens': estimate_tokens(context),
+        'budget': budget
+    }
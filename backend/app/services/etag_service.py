@@ -0,0 +1,279 @@
+"""
+条件请求
+按表、按世界/项目范围维护修改版本号（resource_versions），GET 接口据此生成 ETag：
+客户端携带的 If-None-Match 未过期时，只需一次索引查询即可返回 304，不再执行业务查询与序列化；
+同一 ETag 的响应体（含 gzip 压缩后的内容）缓存在进程内，其他客户端的相同请求直接复用。
+版本号随模型事件在同一事务中递增；ORM 批量 update/delete 在执行前查出受影响的范围，
+bulk mappings 等绕过两者的写入需调用 bump_versions。
+"""
+import gzip
+import hashlib
+from datetime import datetime
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+from flask import current_app, make_response, request
+from sqlalchemy import event, select, inspect as sa_inspect
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Project, World, ResourceVersion
+from app.services.cache_service import LRUCache
+
+# 响应体缓存的条目数与单条上限（字节），超过上限的响应不缓存
+ETAG_BODY_CACHE_SIZE = 256
+ETAG_BODY_MAX_BYTES = 2 * 1024 * 1024
+
+ALL_SCOPE = ('all', 0)
+
+# 派生数据或任务状态表，不参与版本号维护
+UNVERSIONED_TABLES = {
+    'resource_versions', 'world_stat_counters', 'ai_jobs',
+    'chapter_analysis', 'chapter_mention', 'mention_index_state',
+}
+
+# 范围 -> 表中对应的列
+_SCOPE_COLUMNS = (('world', 'world_id'), ('project', 'project_id'))
+# 世界表、项目表本身的记录以自身ID作为范围
+_SELF_SCOPES = {World.__tablename__: 'world', Project.__tablename__: 'project'}
+
+_PENDING_KEY = 'resource_versions_pending'
+
+_body_cache = LRUCache(ETAG_BODY_CACHE_SIZE)
+
+Scope = Tuple[str, int]
+
+
+# ==================== 版本号维护 ====================
+
+def _table_name(mapper) -> Optional[str]:
+    name = mapper.local_table.name
+    return None if name in UNVERSIONED_TABLES else name
+
+
+def _scopes_of(table_name: str, values: Dict[str, Any]) -> Set[Scope]:
+    scopes = {ALL_SCOPE}
+    for scope, column in _SCOPE_COLUMNS:
+        if values.get(column) is not None:
+            scopes.add((scope, values[column]))
+    self_scope = _SELF_SCOPES.get(table_name)
+    if self_scope and values.get('id') is not None:
+        scopes.add((self_scope, values['id']))
+    return scopes
+
+
+def bump_versions(connection, table_name: str, scopes: Iterable[Scope]):
+    """递增指定表在各范围内的版本号（全表范围总是一并递增）"""
+    if table_name in UNVERSIONED_TABLES:
+        return
+    now = datetime.utcnow()
+    rows = [{'resource': table_name, 'scope': scope, 'scope_id': scope_id, 'version': 1, 'updated_at': now}
+            for scope, scope_id in set(scopes) | {ALL_SCOPE}]
+    table = ResourceVersion.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.scope, table.c.scope_id, table.c.resource],
+        set_={'version': table.c.version + 1, 'updated_at': stmt.excluded.updated_at}
+    )
+    connection.execute(stmt, rows)
+
+
+def bump_model_versions(connection, model, rows: Iterable[Dict[str, Any]]):
+    """批量写入后按记录的 world_id/project_id 递增版本号"""
+    table_name = model.__table__.name
+    scopes: Set[Scope] = set()
+    for row in rows:
+        scopes |= _scopes_of(table_name, row)
+    bump_versions(connection, table_name, scopes)
+
+
+def _mark_pending(mapper, connection, target):
+    table_name = _table_name(mapper)
+    session = Session.object_session(target)
+    if table_name is None or session is None:
+        return
+    state = sa_inspect(target)
+    values = {'id': getattr(target, 'id', None)}
+    pending = session.info.setdefault(_PENDING_KEY, {}).setdefault(table_name, set())
+    for _, column in _SCOPE_COLUMNS:
+        if column in state.mapper.columns:
+            values[column] = getattr(target, column)
+            # 记录被移到其他世界/项目时，原范围同样失效
+            for old_value in state.attrs[column].history.deleted or ():
+                pending |= _scopes_of(table_name, {column: old_value})
+    pending |= _scopes_of(table_name, values)
+
+
+for _event_name in ('after_insert', 'after_update', 'before_delete'):
+    event.listen(db.Model, _event_name, _mark_pending, propagate=True)
+
+
+@event.listens_for(Session, 'after_flush')
+def _flush_versions(session, flush_context):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    connection = session.connection()
+    for table_name, scopes in pending.items():
+        bump_versions(connection, table_name, scopes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_versions_pending(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_bulk_statements(orm_execute_state):
+    """Query.update()/delete() 不触发模型事件：执行前查出受影响记录的范围，执行后递增版本号"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    table_name = _table_name(mapper) if mapper is not None else None
+    if table_name is None:
+        return None
+    session = orm_execute_state.session
+    statement = orm_execute_state.statement
+    connection = session.connection(bind_arguments={'mapper': mapper, 'clause': statement})
+    table = mapper.local_table
+    columns = [table.c[column] for _, column in _SCOPE_COLUMNS if column in table.c]
+    if table_name in _SELF_SCOPES:
+        columns.append(table.c.id)
+    scopes: Set[Scope] = set()
+    if columns:
+        query = select(*columns).distinct()
+        if statement.whereclause is not None:
+            query = query.where(statement.whereclause)
+        parameters = orm_execute_state.parameters if isinstance(orm_execute_state.parameters, dict) else {}
+        for row in connection.execute(query, parameters).mappings():
+            scopes |= _scopes_of(table_name, row)
+    result = orm_execute_state.invoke_statement()
+    bump_versions(connection, table_name, scopes)
+    return result
+
+
+def get_versions(resources: Iterable[str], scope: Scope) -> Tuple[Tuple[int, ...], Optional[datetime]]:
+    """
+    一次索引查询取出各表在范围内的版本号，返回 (按 resources 顺序的版本号, 最后修改时间)
+    从未修改过的表版本号为 0
+    """
+    resources = list(resources)
+    table = ResourceVersion.__table__
+    rows = db.session.execute(
+        select(table.c.resource, table.c.version, table.c.updated_at).where(
+            table.c.scope == scope[0], table.c.scope_id == scope[1], table.c.resource.in_(resources)
+        )
+    ).all()
+    found = {row.resource: row for row in rows}
+    versions = tuple(found[name].version if name in found else 0 for name in resources)
+    updated = [row.updated_at for row in rows if row.updated_at is not None]
+    return versions, max(updated) if updated else None
+
+
+# ==================== 条件GET ====================
+
+def scope_from_args(tables: Iterable[Any] = ()) -> Scope:
+    """
+    按查询参数确定范围：world_id 优先，其次 project_id，都没有时为全表；
+    参数对应的列不在全部 tables 中时（按该列过滤的版本号不会递增）同样退回全表
+    """
+    for scope, column in _SCOPE_COLUMNS:
+        value = request.args.get(column, type=int)
+        if value and all(column in table.c for table in tables):
+            return scope, value
+    return ALL_SCOPE
+
+
+def path_scope(scope: str, kwarg: str) -> Callable[[Dict[str, Any]], Scope]:
+    """从路由参数取范围，如 path_scope('project', 'project_id')"""
+    return lambda view_args: (scope, view_args[kwarg])
+
+
+def _strip_encoding(tag: str) -> str:
+    # Flask-Compress 压缩响应时在 ETag 后追加 ":gzip" 等后缀
+    base, _, suffix = tag.rpartition(':')
+    return base if base and suffix in ('gzip', 'br', 'deflate') else tag
+
+
+def etag_matches(digest: str) -> bool:
+    """请求的 If-None-Match 是否包含该 ETag（忽略弱校验标记与压缩后缀）"""
+    if request.if_none_match.star_tag:
+        return True
+    return digest in {_strip_encoding(tag) for tag in request.if_none_match.as_set(include_weak=True)}
+
+
+def _not_modified(digest: str, last_modified: Optional[datetime]) -> bool:
+    if request.if_none_match:
+        return etag_matches(digest)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+class _CachedBody:
+    __slots__ = ('body', 'gzipped', 'mimetype')
+
+    def __init__(self, body: bytes, gzipped: Optional[bytes], mimetype: str):
+        self.body = body
+        self.gzipped = gzipped
+        self.mimetype = mimetype
+
+
+def conditional_get(*models, scope: Optional[Any] = None):
+    """
+    为 GET 接口启用 ETag/Last-Modified 条件请求
+
+    models: 响应依赖的模型，任一模型在范围内有修改时 ETag 改变
+    scope: 固定的 (范围, ID)，如详情接口使用 ALL_SCOPE；或接收路由参数、返回 (范围, ID) 的函数；
+           缺省按查询参数中的 world_id/project_id 确定
+    只缓存 200 的 JSON 响应，错误响应原样返回
+    """
+    tables = [model.__table__ for model in models]
+    resources = [table.name for table in tables]
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+            if scope is None:
+                current_scope = scope_from_args(tables)
+            else:
+                current_scope = scope(kwargs) if callable(scope) else scope
+            versions, last_modified = get_versions(resources, current_scope)
+            digest = hashlib.sha1(repr((
+                current_app.config['SQLALCHEMY_DATABASE_URI'], request.path,
+                sorted(request.args.items(multi=True)), current_scope, versions
+            )).encode('utf-8')).hexdigest()
+            etag = digest
+
+            if _not_modified(digest, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                cached = _body_cache.get(digest)
+                if cached is None:
+                    response = make_response(view(*args, **kwargs))
+                    if (response.status_code != 200 or response.mimetype != 'application/json'
+                            or response.is_streamed):
+                        return response
+                    body = response.get_data()
+                    gzipped = None
+                    if len(body) >= current_app.config.get('COMPRESS_MIN_SIZE', 500):
+                        gzipped = gzip.compress(body, compresslevel=current_app.config.get('COMPRESS_LEVEL', 6))
+                    cached = _CachedBody(body, gzipped, response.mimetype)
+                    if len(body) <= ETAG_BODY_MAX_BYTES:
+                        _body_cache.set(digest, cached)
+                response = current_app.response_class(mimetype=cached.mimetype)
+                if cached.gzipped is not None and 'gzip' in request.accept_encodings:
+                    response.set_data(cached.gzipped)
+                    response.headers['Content-Encoding'] = 'gzip'
+                    etag = f'{digest}:gzip'
+                else:
+                    response.set_data(cached.body)
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'no-cache'
+            response.headers['Vary'] = 'Accept-Encoding'
+            if last_modified is not None:
+                response.last_modified = last_modified
+            return response
+        return wrapper
+    return decorator
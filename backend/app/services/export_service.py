@@ -0,0 +1,329 @@
+"""
+书稿导出
+按 project_id（可选卷、章节范围）从数据库分批读取章节，逐章写出目标格式：
+文本类格式直接以生成器流式写入响应，DOCX 写入溢出到磁盘的临时文件后再分块发送。
+导出过程中任一时刻只持有当前一批章节的正文。
+渲染结果按 (项目, 格式, 章节范围, 内容版本) 缓存在磁盘上，内容未变化的重复导出直接发送文件。
+"""
+import hashlib
+import html
+import os
+import tempfile
+import threading
+from typing import IO, Iterable, Iterator, Optional, Sequence, Tuple
+from docx import Document
+from sqlalchemy import func
+from app import db
+from app.models import Chapter, Volume, Project
+
+# 每批从数据库读取的章节数
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 20))
+# DOCX 临时文件在内存中保留的最大字节数，超过后写入磁盘
+EXPORT_SPOOL_MAX_SIZE = int(os.getenv('EXPORT_SPOOL_MAX_SIZE', 8 * 1024 * 1024))
+# 导出产物缓存目录与总大小上限
+EXPORT_CACHE_DIR = os.getenv('EXPORT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'novel_editor_exports'))
+EXPORT_CACHE_MAX_BYTES = int(os.getenv('EXPORT_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+# 导出格式的渲染版本，修改写出逻辑时递增以使旧产物失效
+EXPORT_RENDER_VERSION = 1
+
+# 导出条目：(层级, 标题, 正文)；层级 1 为书名，2 为卷，3 为章，卷条目的正文为 None
+Section = Tuple[int, str, Optional[str]]
+
+# 格式 -> (扩展名, MIME类型)
+EXPORT_FORMATS = {
+    'text': ('txt', 'text/plain; charset=utf-8'),
+    'markdown': ('md', 'text/markdown; charset=utf-8'),
+    'html': ('html', 'text/html; charset=utf-8'),
+    'docx': ('docx', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'),
+}
+FORMAT_ALIASES = {'txt': 'text', 'md': 'markdown', 'word': 'docx', 'pdf': 'html'}
+
+
+def normalize_format(fmt: str) -> str:
+    fmt = (fmt or '').lower()
+    fmt = FORMAT_ALIASES.get(fmt, fmt)
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'不支持的导出格式: {fmt}')
+    return fmt
+
+
+def _filter_chapters(query, project_id: int, volume_id: Optional[int] = None,
+                     chapter_ids: Optional[Sequence[int]] = None,
+                     start: Optional[int] = None, end: Optional[int] = None):
+    query = query.filter(Chapter.project_id == project_id)
+    if volume_id is not None:
+        query = query.filter(Chapter.volume_id == volume_id)
+    if chapter_ids:
+        query = query.filter(Chapter.id.in_(chapter_ids))
+    if start is not None:
+        query = query.filter(Chapter.order_index >= start)
+    if end is not None:
+        query = query.filter(Chapter.order_index <= end)
+    return query
+
+
+def iter_project_sections(project: Project, volume_id: Optional[int] = None,
+                          chapter_ids: Optional[Sequence[int]] = None,
+                          start: Optional[int] = None, end: Optional[int] = None) -> Iterator[Section]:
+    """
+    按卷顺序、章节顺序产出书名、卷标题与章节，章节正文以 yield_per 分批读取
+
+    volume_id: 只导出该卷
+    chapter_ids: 只导出指定章节
+    start / end: 章节 order_index 范围（含两端）
+    """
+    yield 1, project.title, None
+
+    volumes = {}
+    volume_order = {}
+    for index, (volume_id_, volume_title) in enumerate(
+            db.session.query(Volume.id, Volume.title).filter_by(project_id=project.id)
+            .order_by(Volume.order_index, Volume.id)):
+        volumes[volume_id_] = volume_title
+        volume_order[volume_id_] = index
+
+    query = _filter_chapters(
+        db.session.query(Chapter.volume_id, Chapter.title, Chapter.content),
+        project.id, volume_id, chapter_ids, start, end
+    )
+    # 未分卷的章节排在最前，其余按卷顺序排列
+    order = db.case(volume_order, value=Chapter.volume_id, else_=-1) if volume_order else db.literal(0)
+    query = query.order_by(order, Chapter.order_index, Chapter.id)
+
+    current_volume = None
+    for chapter_volume_id, title, content in query.yield_per(EXPORT_BATCH_SIZE):
+        if chapter_volume_id != current_volume and chapter_volume_id in volumes:
+            yield 2, volumes[chapter_volume_id], None
+        current_volume = chapter_volume_id
+        yield 3, title, content or ''
+
+
+def content_sections(title: str, content: str) -> Iterator[Section]:
+    """客户端直接提交正文时的导出条目"""
+    yield 1, title, None
+    yield 3, '', content or ''
+
+
+def _paragraphs(content: str) -> Iterator[str]:
+    for line in content.split('\n'):
+        line = line.strip()
+        if line:
+            yield line
+
+
+# ==================== 文本类格式（流式） ====================
+
+def write_text(sections: Iterable[Section]) -> Iterator[str]:
+    for level, title, content in sections:
+        parts = [title] if title else []
+        if content:
+            parts.append(content.strip('\n'))
+        if parts:
+            yield '\n\n'.join(parts) + '\n\n'
+
+
+def write_markdown(sections: Iterable[Section]) -> Iterator[str]:
+    for level, title, content in sections:
+        parts = [f"{'#' * level} {title}"] if title else []
+        if content:
+            parts.append('\n\n'.join(_paragraphs(content)))
+        if parts:
+            yield '\n\n'.join(parts) + '\n\n'
+
+
+_HTML_HEAD = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: Arial, sans-serif; margin: 20px; }}
+h1, h2, h3 {{ color: #333; }}
+p {{ line-height: 1.6; margin-bottom: 10px; text-indent: 2em; }}
+</style>
+</head>
+<body>
+'''
+
+
+def write_html(sections: Iterable[Section]) -> Iterator[str]:
+    started = False
+    for level, title, content in sections:
+        if not started:
+            yield _HTML_HEAD.format(title=html.escape(title if level == 1 else ''))
+            started = True
+        parts = [f'<h{level}>{html.escape(title)}</h{level}>'] if title else []
+        if content:
+            parts.extend(f'<p>{html.escape(paragraph)}</p>' for paragraph in _paragraphs(content))
+        if parts:
+            yield '\n'.join(parts) + '\n'
+    if not started:
+        yield _HTML_HEAD.format(title='')
+    yield '</body>\n</html>\n'
+
+
+_TEXT_WRITERS = {
+    'text': write_text,
+    'markdown': write_markdown,
+    'html': write_html,
+}
+
+
+def stream_export(fmt: str, sections: Iterable[Section]) -> Iterator[bytes]:
+    """
+    以UTF-8字节块流式产出文本类格式，每个章节一个块
+    """
+    for chunk in _TEXT_WRITERS[fmt](sections):
+        yield chunk.encode('utf-8')
+
+
+# ==================== DOCX ====================
+
+def write_docx(sections: Iterable[Section], output: Optional[IO[bytes]] = None) -> IO[bytes]:
+    """
+    逐章写入 DOCX。未指定 output 时保存到超过 EXPORT_SPOOL_MAX_SIZE 即溢出到磁盘的临时文件，
+    返回已定位到开头的文件对象
+    """
+    document = Document()
+    for level, title, content in sections:
+        if title:
+            document.add_heading(title, level=level)
+        if content:
+            for paragraph in _paragraphs(content):
+                document.add_paragraph(paragraph)
+    if output is None:
+        output = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE, suffix='.docx')
+    document.save(output)
+    output.seek(0)
+    return output
+
+
+def export_file(fmt: str, sections: Iterable[Section]):
+    """
+    生成导出内容：文本类格式返回字节块生成器，DOCX 返回文件对象
+    """
+    if fmt == 'docx':
+        return write_docx(sections)
+    return stream_export(fmt, sections)
+
+
+def render_to_file(fmt: str, sections: Iterable[Section], output: IO[bytes]):
+    """将导出内容逐块写入文件"""
+    if fmt == 'docx':
+        write_docx(sections, output)
+        return
+    for chunk in stream_export(fmt, sections):
+        output.write(chunk)
+
+
+# ==================== 导出产物缓存 ====================
+
+def content_version(project: Project, volume_id: Optional[int] = None,
+                    chapter_ids: Optional[Sequence[int]] = None,
+                    start: Optional[int] = None, end: Optional[int] = None) -> str:
+    """
+    导出内容的版本：由所选章节的数量、ID、版本号与最后修改时间，以及卷与项目的修改时间聚合而成，
+    任一章节增删改、卷或书名修改后都会变化。只执行两条聚合查询，不读取正文。
+    """
+    chapters = _filter_chapters(
+        db.session.query(func.count(Chapter.id), func.sum(Chapter.id), func.sum(Chapter.version),
+                         func.max(Chapter.updated_at)),
+        project.id, volume_id, chapter_ids, start, end
+    ).one()
+    volumes = db.session.query(func.count(Volume.id), func.sum(Volume.id), func.max(Volume.updated_at)) \
+        .filter(Volume.project_id == project.id).one()
+    fingerprint = repr((EXPORT_RENDER_VERSION, project.title, project.updated_at, tuple(chapters), tuple(volumes)))
+    return hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()
+
+
+class ArtifactCache:
+    """
+    磁盘上的导出产物缓存：以内容键命名文件，按总大小上限淘汰最久未使用的文件（以修改时间记录最近使用）
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def path_for(self, key: str, extension: str) -> str:
+        return os.path.join(self.directory, f'{key}.{extension}')
+
+    def get(self, key: str, extension: str) -> Optional[str]:
+        """命中时刷新最近使用时间并返回文件路径"""
+        path = self.path_for(key, extension)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def put(self, key: str, extension: str, render) -> str:
+        """
+        render(file) 写入产物；先写临时文件再原子替换，避免并发下载读到写了一半的文件
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(key, extension)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as output:
+                render(output)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        self.evict()
+        return path
+
+    def evict(self):
+        """总大小超过上限时删除最久未使用的产物"""
+        with self._lock:
+            entries = []
+            total = 0
+            with os.scandir(self.directory) as iterator:
+                for entry in iterator:
+                    if not entry.is_file() or entry.name.endswith('.part'):
+                        continue
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+            entries.sort()
+            # 至少保留最近写入的一个产物
+            for mtime, size, path in entries[:-1]:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+
+artifact_cache = ArtifactCache(EXPORT_CACHE_DIR, EXPORT_CACHE_MAX_BYTES)
+
+
+def export_artifact(project: Project, fmt: str, version: str, volume_id: Optional[int] = None,
+                    chapter_ids: Optional[Sequence[int]] = None,
+                    start: Optional[int] = None, end: Optional[int] = None) -> Tuple[str, bool]:
+    """
+    获取导出产物文件：相同 (项目, 格式, 章节范围, 内容版本) 只渲染一次
+    返回 (文件路径, 是否命中缓存)
+    """
+    key = artifact_key(project.id, fmt, version, volume_id, chapter_ids, start, end)
+    extension = EXPORT_FORMATS[fmt][0]
+    path = artifact_cache.get(key, extension)
+    if path is not None:
+        return path, True
+    sections = iter_project_sections(project, volume_id, chapter_ids, start, end)
+    return artifact_cache.put(key, extension, lambda output: render_to_file(fmt, sections, output)), False
+
+
+def artifact_key(project_id: int, fmt: str, version: str, volume_id: Optional[int] = None,
+                 chapter_ids: Optional[Sequence[int]] = None,
+                 start: Optional[int] = None, end: Optional[int] = None) -> str:
+    """产物键，同时用作下载的 ETag"""
+    scope = repr((project_id, fmt, version, volume_id, sorted(chapter_ids or ()), start, end))
+    return hashlib.sha1(scope.encode('utf-8')).hexdigest()
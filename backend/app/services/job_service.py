@@ -0,0 +1,425 @@
+"""
+AI后台任务队列
+耗时的AI生成任务写入 ai_jobs 表后交给固定大小的工作线程池执行，请求线程立即返回任务ID，
+吞吐量由线程池大小而非Web工作线程数决定。运行中的输出保存在内存中供流式读取，并定期写回数据库供轮询。
+每个进程以 worker_id 标识自己持有的任务并定期写入心跳；只有心跳超时（持有进程已退出）的任务才会被其他进程回收，
+多个 Web 工作进程可以同时运行而不会互相中断任务。
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from flask import current_app
+from sqlalchemy import func
+from app import db
+from app.models import AIJob
+from app.services.ai_service import ai_service
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv('AI_JOB_WORKERS', 4))
+# 运行中的输出与进度写回数据库的最小间隔（秒）
+JOB_FLUSH_INTERVAL = float(os.getenv('AI_JOB_FLUSH_INTERVAL', 1.0))
+# 已结束任务的保留天数，回收时清理
+JOB_RETENTION_DAYS = int(os.getenv('AI_JOB_RETENTION_DAYS', 7))
+# 持有任务的进程写入心跳的间隔（秒）
+JOB_HEARTBEAT_INTERVAL = float(os.getenv('AI_JOB_HEARTBEAT_INTERVAL', 10))
+# 心跳超过该时长（秒）未更新的任务视为持有进程已退出，可被回收
+JOB_STALE_SECONDS = float(os.getenv('AI_JOB_STALE_SECONDS', 60))
+
+FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled')
+
+_handlers: Dict[str, Callable[[Dict[str, Any], 'JobContext'], Any]] = {}
+
+
+class JobCancelled(Exception):
+    """任务已被取消"""
+
+
+def register_job(job_type: str):
+    """
+    注册任务处理函数：handler(params, job) 返回可JSON序列化的结果，
+    通过 job.append/job.set_progress 报告部分输出与进度
+    """
+    def decorator(handler):
+        _handlers[job_type] = handler
+        return handler
+    return decorator
+
+
+class JobContext:
+    """
+    单个任务的运行状态：部分输出、进度与取消标记
+    """
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self.status = 'queued'
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.finished = False
+        self.cancel_event = threading.Event()
+        self._chunks: List[str] = []
+        self._condition = threading.Condition()
+        self._flushed_at = time.monotonic()
+
+    @property
+    def output(self) -> str:
+        with self._condition:
+            return ''.join(self._chunks)
+
+    def append(self, text: str):
+        """追加部分输出"""
+        if not text:
+            return
+        with self._condition:
+            self._chunks.append(text)
+            self._condition.notify_all()
+        self.flush()
+
+    def set_progress(self, progress: float):
+        with self._condition:
+            self.progress = max(0.0, min(1.0, progress))
+            self._condition.notify_all()
+        self.flush()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def flush(self, force: bool = False):
+        """
+        将输出与进度写回数据库（按 JOB_FLUSH_INTERVAL 节流），同时读取其他进程提交的取消请求
+        """
+        now = time.monotonic()
+        if not force and now - self._flushed_at < JOB_FLUSH_INTERVAL:
+            return
+        output = self.output
+        self._flushed_at = now
+        AIJob.query.filter_by(id=self.job_id).update(
+            {'output': output, 'progress': self.progress, 'heartbeat_at': datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.session.commit()
+        cancel_requested = db.session.query(AIJob.cancel_requested).filter_by(id=self.job_id).scalar()
+        if cancel_requested:
+            self.cancel_event.set()
+
+    def finish(self, status: str, result: Any = None, error: Optional[str] = None):
+        with self._condition:
+            self.status = status
+            self.result = result
+            self.error = error
+            if status == 'succeeded':
+                self.progress = 1.0
+            self.finished = True
+            self._condition.notify_all()
+
+    def final_event(self) -> Dict[str, Any]:
+        return {'status': self.status, 'progress': self.progress, 'result': self.result, 'error': self.error}
+
+    def events(self) -> Iterator[Dict[str, Any]]:
+        """
+        增量事件：每次有新输出时产出 {'content', 'progress', 'status'}，结束时产出最终状态
+        """
+        sent = 0
+        while True:
+            with self._condition:
+                while len(self._chunks) == sent and not self.finished:
+                    self._condition.wait()
+                new = ''.join(self._chunks[sent:])
+                sent = len(self._chunks)
+                finished = self.finished
+            if new:
+                yield {'content': new, 'progress': self.progress, 'status': self.status}
+            if finished:
+                yield self.final_event()
+                return
+
+    def complete(self, messages: List[Dict[str, str]], provider: Optional[str] = None,
+                 cache: Optional[bool] = None, max_tokens: int = 1000, temperature: float = 0.7,
+                 **kwargs) -> Dict[str, Any]:
+        """
+        执行一次聊天完成：可缓存的请求走响应缓存，否则以流式调用逐段追加输出，并在每个增量之间检查取消
+        """
+        self.check_cancelled()
+        if ai_service.response_cache.should_cache(temperature, cache):
+            result = ai_service.chat_completion(
+                messages, provider=provider, cache=cache, max_tokens=max_tokens, temperature=temperature, **kwargs
+            )
+            self.append(result['content'])
+            return result
+
+        parts = []
+        size = 0
+        provider_name = provider
+        stream = ai_service.stream_chat_completion(
+            messages, provider=provider, max_tokens=max_tokens, temperature=temperature, **kwargs
+        )
+        try:
+            for delta in stream:
+                self.check_cancelled()
+                provider_name = delta.get('provider', provider_name)
+                content = delta.get('content')
+                if content:
+                    parts.append(content)
+                    size += len(content)
+                    # 以已输出长度相对 max_tokens 粗略估计进度，完成前不超过0.95
+                    self.progress = min(0.95, size / max(1, max_tokens))
+                    self.append(content)
+        finally:
+            # 取消时关闭上游流，释放连接
+            close = getattr(stream, 'close', None)
+            if close is not None:
+                close()
+        return {'content': ''.join(parts).strip(), 'provider': provider_name}
+
+
+class JobQueue:
+    """
+    固定大小线程池执行的后台任务队列
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS):
+        self.workers = workers
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._live: Dict[int, JobContext] = {}
+        self._app = None
+        self._reaping = False
+        self._heartbeat_thread = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ai-job')
+        return self._executor
+
+    def submit(self, job_type: str, params: Dict[str, Any]) -> AIJob:
+        """
+        创建任务并加入队列，立即返回任务记录
+        """
+        if job_type not in _handlers:
+            raise ValueError(f'未知的任务类型: {job_type}')
+        job = AIJob(job_type=job_type, status='queued', params=json.dumps(params, ensure_ascii=False),
+                    worker_id=self.worker_id, heartbeat_at=datetime.utcnow())
+        db.session.add(job)
+        db.session.commit()
+        self._enqueue(current_app._get_current_object(), job.id)
+        return job
+
+    def _enqueue(self, app, job_id: int):
+        self._live[job_id] = JobContext(job_id)
+        self._ensure_heartbeat(app)
+        self.executor.submit(self._run, app, job_id)
+
+    def _run(self, app, job_id: int):
+        with app.app_context():
+            context = self._live.get(job_id) or JobContext(job_id)
+            try:
+                # 只领取仍在排队的任务；排队期间被取消的任务直接跳过
+                now = datetime.utcnow()
+                claimed = AIJob.query.filter_by(id=job_id, status='queued', worker_id=self.worker_id).update(
+                    {'status': 'running', 'started_at': now, 'heartbeat_at': now}, synchronize_session=False
+                )
+                db.session.commit()
+                if not claimed:
+                    return
+                job = AIJob.query.get(job_id)
+                context.status = 'running'
+                result = _handlers[job.job_type](json.loads(job.params or '{}'), context)
+                self._finish(context, 'succeeded', result=result)
+            except JobCancelled:
+                self._finish(context, 'cancelled')
+            except Exception as e:
+                logger.exception(f'AI任务 {job_id} 执行失败')
+                self._finish(context, 'failed', error=str(e))
+            finally:
+                if not context.finished:
+                    context.finish('cancelled')
+                self._live.pop(job_id, None)
+                db.session.remove()
+
+    def _finish(self, context: JobContext, status: str, result: Any = None, error: Optional[str] = None):
+        db.session.rollback()
+        values = {
+            'status': status,
+            'output': context.output,
+            'result': json.dumps(result, ensure_ascii=False) if result is not None else None,
+            'error': error,
+            'finished_at': datetime.utcnow()
+        }
+        if status == 'succeeded':
+            values['progress'] = 1.0
+        AIJob.query.filter_by(id=context.job_id).update(values, synchronize_session=False)
+        db.session.commit()
+        context.finish(status, result=result, error=error)
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """
+        任务详情；本进程中运行的任务使用内存中的最新输出与进度
+        """
+        job = AIJob.query.get(job_id)
+        if job is None:
+            return None
+        data = job.to_dict()
+        context = self._live.get(job_id)
+        if context is not None and not job.is_finished:
+            data['output'] = context.output
+            data['progress'] = context.progress
+        return data
+
+    def cancel(self, job_id: int) -> Optional[AIJob]:
+        """
+        取消任务：排队中的任务立即取消，运行中的任务在下一个输出增量时停止
+        """
+        job = AIJob.query.get(job_id)
+        if job is None or job.is_finished:
+            return job
+        job.cancel_requested = True
+        if job.status == 'queued':
+            job.status = 'cancelled'
+            job.finished_at = datetime.utcnow()
+        db.session.commit()
+        context = self._live.get(job_id)
+        if context is not None:
+            context.cancel_event.set()
+            if job.status == 'cancelled':
+                context.finish('cancelled')
+        return job
+
+    def events(self, job_id: int) -> Optional[Iterator[Dict[str, Any]]]:
+        """
+        任务的增量事件流（须在请求线程中调用；返回的迭代器可在其他线程中消费）
+        """
+        context = self._live.get(job_id)
+        if context is not None:
+            return context.events()
+        job = AIJob.query.get(job_id)
+        if job is None:
+            return None
+        if job.is_finished:
+            events = []
+            if job.output:
+                events.append({'content': job.output, 'progress': job.progress, 'status': job.status})
+            events.append({
+                'status': job.status, 'progress': job.progress,
+                'result': json.loads(job.result) if job.result else None, 'error': job.error
+            })
+            return iter(events)
+        # 任务在其他进程中运行：轮询数据库中写回的输出
+        return self._poll_events(current_app._get_current_object(), job_id)
+
+    def _poll_events(self, app, job_id: int) -> Iterator[Dict[str, Any]]:
+        sent = 0
+        with app.app_context():
+            try:
+                while True:
+                    job = AIJob.query.get(job_id)
+                    output = job.output or ''
+                    if len(output) > sent:
+                        yield {'content': output[sent:], 'progress': job.progress, 'status': job.status}
+                        sent = len(output)
+                    if job.is_finished:
+                        yield {
+                            'status': job.status, 'progress': job.progress,
+                            'result': json.loads(job.result) if job.result else None, 'error': job.error
+                        }
+                        return
+                    db.session.remove()
+                    time.sleep(JOB_FLUSH_INTERVAL)
+            finally:
+                db.session.remove()
+
+    def start(self, app):
+        """
+        进程启动时调用：回收心跳超时的任务，并在心跳线程中定期重复回收
+        """
+        self._reaping = True
+        self.recover(app)
+        self._ensure_heartbeat(app)
+
+    def _ensure_heartbeat(self, app):
+        self._app = app
+        if self._heartbeat_thread is not None:
+            return
+        with self._executor_lock:
+            if self._heartbeat_thread is None:
+                self._heartbeat_thread = threading.Thread(
+                    target=self._heartbeat_loop, name='ai-job-heartbeat', daemon=True
+                )
+                self._heartbeat_thread.start()
+
+    def _heartbeat_loop(self):
+        while True:
+            time.sleep(JOB_HEARTBEAT_INTERVAL)
+            try:
+                self.heartbeat(self._app)
+                if self._reaping:
+                    self.recover(self._app)
+            except Exception:
+                logger.exception('AI任务心跳失败')
+
+    def heartbeat(self, app):
+        """为本进程持有的未结束任务写入心跳"""
+        job_ids = list(self._live)
+        if not job_ids:
+            return
+        with app.app_context():
+            try:
+                AIJob.query.filter(
+                    AIJob.id.in_(job_ids), AIJob.worker_id == self.worker_id,
+                    AIJob.status.in_(('queued', 'running'))
+                ).update({'heartbeat_at': datetime.utcnow()}, synchronize_session=False)
+                db.session.commit()
+            finally:
+                db.session.remove()
+
+    def recover(self, app):
+        """
+        回收持有进程已退出（心跳超时）的任务：运行中的标记为失败，排队中的由本进程接管并重新入队；
+        同时清理过期的已结束任务。心跳未超时的任务属于仍在运行的其他进程，不做处理
+        """
+        with app.app_context():
+            try:
+                now = datetime.utcnow()
+                stale = func.coalesce(AIJob.heartbeat_at, AIJob.started_at, AIJob.created_at) < (
+                    now - timedelta(seconds=JOB_STALE_SECONDS))
+                AIJob.query.filter(AIJob.status == 'running', stale).update(
+                    {'status': 'failed', 'error': '任务所在进程已退出，任务中断', 'finished_at': now},
+                    synchronize_session=False
+                )
+                AIJob.query.filter(
+                    AIJob.status.in_(FINISHED_STATUSES),
+                    AIJob.finished_at < now - timedelta(days=JOB_RETENTION_DAYS)
+                ).delete(synchronize_session=False)
+                db.session.commit()
+                orphaned = [job_id for (job_id,) in db.session.query(AIJob.id).filter(AIJob.status == 'queued', stale)
+                            .order_by(AIJob.created_at).all()]
+                queued = []
+                for job_id in orphaned:
+                    # 条件更新接管任务，多个进程同时回收时只有一个成功
+                    taken = AIJob.query.filter(AIJob.id == job_id, AIJob.status == 'queued', stale).update(
+                        {'worker_id': self.worker_id, 'heartbeat_at': now}, synchronize_session=False
+                    )
+                    db.session.commit()
+                    if taken:
+                        queued.append(job_id)
+            finally:
+                db.session.remove()
+        for job_id in queued:
+            self._enqueue(app, job_id)
+
+
+# 全局任务队列
+job_queue = JobQueue()
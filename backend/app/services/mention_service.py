@@ -0,0 +1,363 @@
+"""
+提及索引
+把项目（及其世界）中角色的名称与别名、地点/物品/势力名称编译成 Aho-Corasick 自动机，
+对章节正文做一次线性扫描，保存每个实体在每章中的出现位置。
+只有正文哈希或名称词典变化的章节才重新扫描，出场时间线与共现矩阵直接读取索引。
+"""
+import hashlib
+import json
+import os
+import re
+from collections import defaultdict, deque
+from datetime import datetime
+from itertools import combinations
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import event, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import db
+from app.models import Chapter, Character, Location, Item, Faction, World, ChapterMention, MentionIndexState
+from app.services.analysis_service import content_hash
+from app.services.cache_service import LRUCache
+
+# 每个实体在一章中最多保存的出现位置数（次数不受限制）
+MENTION_MAX_POSITIONS = int(os.getenv('MENTION_MAX_POSITIONS', 500))
+# 每批读取待扫描章节的数量
+MENTION_BATCH_SIZE = 200
+# 名称最短长度，过短的名称（如单字）误匹配太多
+MENTION_MIN_NAME_LENGTH = 2
+
+# 可索引的实体类型与模型
+MENTION_MODELS = {
+    'character': Character,
+    'location': Location,
+    'item': Item,
+    'faction': Faction,
+}
+
+_ALIAS_SPLIT_RE = re.compile(r'[,，、;；/|\s]+')
+
+_automaton_cache = LRUCache(32)
+
+
+class AhoCorasick:
+    """
+    多模式串匹配自动机：构建复杂度与模式串总长成正比，扫描文本为一次线性遍历
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        self.patterns: List[str] = []
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str):
+        index = len(self.patterns)
+        self.patterns.append(pattern)
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state].append(index)
+
+    def _build(self):
+        # 广度优先计算失败指针，并把失败状态的输出合并到当前状态
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """产出所有（可能重叠的）匹配 (起始位置, 模式串序号)"""
+        goto, fail, output, patterns = self._goto, self._fail, self._output, self.patterns
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in output[state]:
+                yield position - len(patterns[index]) + 1, index
+
+    def find(self, text: str) -> List[Tuple[int, int]]:
+        """
+        不重叠的匹配：同一位置取最长的模式串，与已选匹配重叠的较短匹配丢弃（如“林动天”不再计为“林动”）
+        """
+        matches = sorted(self.iter_matches(text), key=lambda m: (m[0], -len(self.patterns[m[1]])))
+        result = []
+        covered = 0
+        for start, index in matches:
+            if start >= covered:
+                result.append((start, index))
+                covered = start + len(self.patterns[index])
+        return result
+
+
+# ==================== 名称词典 ====================
+
+def _parse_aliases(value: Optional[str]) -> List[str]:
+    """别名按JSON数组保存，也兼容手工输入的以逗号、顿号等分隔的文本"""
+    if not value:
+        return []
+    try:
+        parsed = json.loads(value)
+    except (TypeError, ValueError):
+        parsed = None
+    if isinstance(parsed, list):
+        return [str(alias).strip() for alias in parsed if str(alias).strip()]
+    if isinstance(parsed, str):
+        value = parsed
+    return [alias for alias in _ALIAS_SPLIT_RE.split(value) if alias]
+
+
+def _scope_filter(model, project_id: int):
+    """项目中的实体，以及属于该项目世界的实体"""
+    table = model.__table__
+    world_ids = select(World.__table__.c.id).where(World.__table__.c.project_id == project_id)
+    return or_(table.c.project_id == project_id, table.c.world_id.in_(world_ids))
+
+
+def load_dictionary(project_id: int, entity_types: Sequence[str] = tuple(MENTION_MODELS)) \
+        -> Tuple[Dict[str, List[Tuple[str, int]]], Dict[Tuple[str, int], str], str]:
+    """
+    加载名称词典：名称 -> [(实体类型, 实体ID)]，同名实体共享一个模式串
+    返回 (词典, 实体 -> 显示名称, 词典哈希)
+    """
+    dictionary: Dict[str, List[Tuple[str, int]]] = defaultdict(list)
+    names: Dict[Tuple[str, int], str] = {}
+    for entity_type in entity_types:
+        table = MENTION_MODELS[entity_type].__table__
+        columns = [table.c.id, table.c.name]
+        if 'alternative_names' in table.c:
+            columns.append(table.c.alternative_names)
+        for row in db.session.execute(select(*columns).where(_scope_filter(MENTION_MODELS[entity_type], project_id))):
+            key = (entity_type, row[0])
+            names[key] = row[1]
+            aliases = [row[1]] + (_parse_aliases(row[2]) if len(row) > 2 else [])
+            for alias in dict.fromkeys(alias.strip() for alias in aliases if alias):
+                if len(alias) >= MENTION_MIN_NAME_LENGTH:
+                    dictionary[alias].append(key)
+    digest = hashlib.sha1(json.dumps(sorted(dictionary.items()), ensure_ascii=False).encode('utf-8')).hexdigest()
+    return dict(dictionary), names, digest
+
+
+def get_automaton(dictionary: Dict[str, Any], digest: str) -> AhoCorasick:
+    """按词典哈希缓存编译好的自动机"""
+    automaton = _automaton_cache.get(digest)
+    if automaton is None:
+        automaton = AhoCorasick(sorted(dictionary))
+        _automaton_cache.set(digest, automaton)
+    return automaton
+
+
+def scan_text(text: str, automaton: AhoCorasick, dictionary: Dict[str, List[Tuple[str, int]]]) \
+        -> Dict[Tuple[str, int], List[int]]:
+    """一次扫描正文，返回 实体 -> 出现位置列表"""
+    mentions: Dict[Tuple[str, int], List[int]] = defaultdict(list)
+    for start, index in automaton.find(text or ''):
+        for key in dictionary[automaton.patterns[index]]:
+            mentions[key].append(start)
+    return mentions
+
+
+# ==================== 索引维护 ====================
+
+def _replace_chapter_mentions(chapter_id: int, project_id: int, mentions: Dict[Tuple[str, int], List[int]]):
+    mention_table = ChapterMention.__table__
+    db.session.execute(mention_table.delete().where(mention_table.c.chapter_id == chapter_id))
+    rows = [{
+        'chapter_id': chapter_id,
+        'project_id': project_id,
+        'entity_type': entity_type,
+        'entity_id': entity_id,
+        'count': len(positions),
+        'first_position': positions[0],
+        'positions': json.dumps(positions[:MENTION_MAX_POSITIONS])
+    } for (entity_type, entity_id), positions in mentions.items()]
+    if rows:
+        db.session.execute(mention_table.insert(), rows)
+
+
+def _save_states(rows: List[Dict[str, Any]]):
+    if not rows:
+        return
+    table = MentionIndexState.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.chapter_id],
+        set_={name: stmt.excluded[name] for name in rows[0] if name != 'chapter_id'}
+    )
+    db.session.execute(stmt, rows)
+
+
+def refresh_project_mentions(project_id: int) -> Dict[str, Any]:
+    """
+    增量更新项目的提及索引：章节修改时间与词典都未变化的章节直接跳过；
+    修改时间变化但正文哈希相同（如只改了标题）的章节只更新记录
+    返回 {'scanned', 'skipped', 'dictionary_hash'}
+    """
+    dictionary, _, digest = load_dictionary(project_id)
+    state = MentionIndexState.__table__.c
+    rows = db.session.query(
+        Chapter.id, Chapter.updated_at, state.content_hash, state.dictionary_hash, state.source_updated_at
+    ).outerjoin(MentionIndexState.__table__, state.chapter_id == Chapter.id) \
+        .filter(Chapter.project_id == project_id).all()
+    stale = {row.id: row for row in rows
+             if row.dictionary_hash != digest or row.source_updated_at != row.updated_at}
+    if not stale:
+        return {'scanned': 0, 'skipped': len(rows), 'dictionary_hash': digest}
+
+    automaton = get_automaton(dictionary, digest) if dictionary else None
+    scanned = 0
+    ids = list(stale)
+    for offset in range(0, len(ids), MENTION_BATCH_SIZE):
+        batch = ids[offset:offset + MENTION_BATCH_SIZE]
+        states = []
+        for chapter_id, content, updated_at in db.session.query(
+                Chapter.id, Chapter.content, Chapter.updated_at).filter(Chapter.id.in_(batch)):
+            previous = stale[chapter_id]
+            digest_content = content_hash(content)
+            if previous.content_hash != digest_content or previous.dictionary_hash != digest:
+                mentions = scan_text(content, automaton, dictionary) if automaton else {}
+                _replace_chapter_mentions(chapter_id, project_id, mentions)
+                scanned += 1
+            states.append({
+                'chapter_id': chapter_id,
+                'project_id': project_id,
+                'content_hash': digest_content,
+                'dictionary_hash': digest,
+                'source_updated_at': updated_at,
+                'updated_at': datetime.utcnow()
+            })
+        _save_states(states)
+    db.session.commit()
+    return {'scanned': scanned, 'skipped': len(rows) - scanned, 'dictionary_hash': digest}
+
+
+@event.listens_for(Chapter, 'after_delete')
+def _delete_chapter_mentions(mapper, connection, target):
+    for table in (ChapterMention.__table__, MentionIndexState.__table__):
+        connection.execute(table.delete().where(table.c.chapter_id == target.id))
+
+
+# ==================== 查询 ====================
+
+def _chapter_order(project_id: int) -> List[Tuple[int, str, int]]:
+    return db.session.query(Chapter.id, Chapter.title, Chapter.order_index) \
+        .filter(Chapter.project_id == project_id).order_by(Chapter.order_index, Chapter.id).all()
+
+
+def get_appearance_timeline(project_id: int, entity_type: Optional[str] = None,
+                            entity_ids: Optional[Sequence[int]] = None,
+                            include_positions: bool = False) -> List[Dict[str, Any]]:
+    """
+    出场时间线：每个实体按章节顺序列出出现的章节、次数，以及首次/最后出场章节
+    """
+    refresh_project_mentions(project_id)
+    _, names, _ = load_dictionary(project_id, [entity_type] if entity_type else tuple(MENTION_MODELS))
+    chapters = _chapter_order(project_id)
+    order = {chapter_id: index for index, (chapter_id, _, _) in enumerate(chapters)}
+    titles = {chapter_id: title for chapter_id, title, _ in chapters}
+
+    columns = [ChapterMention.entity_type, ChapterMention.entity_id, ChapterMention.chapter_id, ChapterMention.count]
+    if include_positions:
+        columns.append(ChapterMention.positions)
+    query = db.session.query(*columns).filter(ChapterMention.project_id == project_id)
+    if entity_type:
+        query = query.filter(ChapterMention.entity_type == entity_type)
+    if entity_ids:
+        query = query.filter(ChapterMention.entity_id.in_(entity_ids))
+
+    timelines: Dict[Tuple[str, int], List[Dict[str, Any]]] = defaultdict(list)
+    for row in query:
+        appearance = {'chapter_id': row.chapter_id, 'chapter_title': titles.get(row.chapter_id), 'count': row.count}
+        if include_positions:
+            appearance['positions'] = json.loads(row.positions or '[]')
+        timelines[(row.entity_type, row.entity_id)].append(appearance)
+
+    result = []
+    for key, appearances in timelines.items():
+        if key not in names:
+            continue
+        appearances.sort(key=lambda item: order.get(item['chapter_id'], len(order)))
+        result.append({
+            'entity_type': key[0],
+            'entity_id': key[1],
+            'name': names[key],
+            'total_mentions': sum(item['count'] for item in appearances),
+            'chapter_count': len(appearances),
+            'first_chapter_id': appearances[0]['chapter_id'],
+            'last_chapter_id': appearances[-1]['chapter_id'],
+            'chapters': appearances
+        })
+    result.sort(key=lambda item: -item['total_mentions'])
+    return result
+
+
+def get_cooccurrence(project_id: int, entity_type: str = 'character', window: Optional[int] = None,
+                     limit: int = 50) -> Dict[str, Any]:
+    """
+    共现矩阵：window 为空时统计两个实体同时出现的章节数；
+    指定 window 时统计两个实体的出现位置相距不超过 window 个字的次数（基于保存的位置）
+    只取出现次数最多的 limit 个实体
+    """
+    refresh_project_mentions(project_id)
+    _, names, _ = load_dictionary(project_id, [entity_type])
+    columns = [ChapterMention.chapter_id, ChapterMention.entity_id, ChapterMention.count]
+    if window:
+        columns.append(ChapterMention.positions)
+    rows = db.session.query(*columns).filter(
+        ChapterMention.project_id == project_id, ChapterMention.entity_type == entity_type
+    ).all()
+
+    totals: Dict[int, int] = defaultdict(int)
+    for row in rows:
+        totals[row.entity_id] += row.count
+    top = [entity_id for entity_id, _ in sorted(totals.items(), key=lambda item: -item[1])
+           if (entity_type, entity_id) in names][:limit]
+    index = {entity_id: i for i, entity_id in enumerate(top)}
+    matrix = [[0] * len(top) for _ in top]
+
+    by_chapter: Dict[int, List[Any]] = defaultdict(list)
+    for row in rows:
+        if row.entity_id in index:
+            by_chapter[row.chapter_id].append(row)
+    for chapter_rows in by_chapter.values():
+        if window:
+            # 合并本章所有实体的位置后按位置排序，滑动窗口统计相邻出现
+            events = sorted((position, index[row.entity_id])
+                            for row in chapter_rows for position in json.loads(row.positions or '[]'))
+            start = 0
+            for end in range(len(events)):
+                while events[end][0] - events[start][0] > window:
+                    start += 1
+                position, current = events[end]
+                for other_position, other in events[start:end]:
+                    if other != current:
+                        matrix[current][other] += 1
+                        matrix[other][current] += 1
+        else:
+            for a, b in combinations(sorted(index[row.entity_id] for row in chapter_rows), 2):
+                matrix[a][b] += 1
+                matrix[b][a] += 1
+
+    return {
+        'entity_type': entity_type,
+        'window': window,
+        'entities': [{'entity_id': entity_id, 'name': names[(entity_type, entity_id)], 'total_mentions': totals[entity_id]}
+                     for entity_id in top],
+        'matrix': matrix
+    }
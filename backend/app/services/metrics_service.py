@@ -0,0 +1,277 @@
+"""
+运行指标
+进程内的计数器与直方图，以 Prometheus 文本格式从 /api/metrics 导出：
+- 每个请求的 SQL 查询数与耗时（通过引擎的 before/after_cursor_execute 事件统计）
+- 按路由的请求延迟直方图与请求数
+- AI 提供商调用延迟与 token 用量
+- N+1 检测：同一请求中相同形状的语句执行次数超过阈值时记录警告
+单个请求的数据库耗时与总耗时同时写入 Server-Timing 响应头。
+请求指标在响应关闭时记录，流式响应（数据包、导出）在输出正文期间执行的查询同样计入。
+"""
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# 同一请求中相同形状语句的执行次数超过该值时视为 N+1
+METRICS_N_PLUS_ONE_THRESHOLD = int(os.getenv('METRICS_N_PLUS_ONE_THRESHOLD', 20))
+# 是否在 Server-Timing 响应头中输出数据库耗时
+METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', '1') not in ('0', 'false', 'False')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+AI_LATENCY_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+# 语句形状：IN 列表展开后的占位符与字面量数字归一，使仅参数个数不同的语句视为同一形状
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_NUMBER_RE = re.compile(r'\b\d+\b')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """按标签累加的计数器"""
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: Any, amount: float = 1):
+        with self._lock:
+            self._values[label_values] += amount
+
+    def value(self, *label_values: Any) -> float:
+        return self._values.get(label_values, 0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            yield f'{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}'
+
+
+class Histogram:
+    """按标签分桶的直方图（累计桶，与 Prometheus 的 histogram 类型一致）"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # 标签 -> [各桶计数..., +Inf 计数, 总和]
+        self._values: Dict[Tuple, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: Any):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[index] += 1
+            entry[-1] += value
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((key, list(entry)) for key, entry in self._values.items())
+        for label_values, entry in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), entry[:-1]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _format_value(bound)
+                yield f'{self.name}_bucket{_format_labels(self.labels, label_values, ("le", le))} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.labels, label_values)} {_format_value(entry[-1])}'
+            yield f'{self.name}_count{_format_labels(self.labels, label_values)} {cumulative}'
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        """Prometheus 文本格式（0.0.4）"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+http_requests_total = registry.counter(
+    'http_requests_total', 'HTTP requests by route, method and status', ('method', 'route', 'status'))
+http_request_duration = registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route', ('method', 'route'))
+http_request_queries = registry.histogram(
+    'http_request_db_queries', 'SQL statements executed per request', ('route',), QUERY_COUNT_BUCKETS)
+db_queries_total = registry.counter(
+    'db_queries_total', 'SQL statements executed, by route (background work is labelled "-")', ('route',))
+db_query_seconds_total = registry.counter(
+    'db_query_seconds_total', 'Time spent executing SQL statements, by route', ('route',))
+n_plus_one_total = registry.counter(
+    'db_n_plus_one_total', 'Requests that repeated one statement shape more than the threshold', ('route',))
+ai_request_duration = registry.histogram(
+    'ai_request_duration_seconds', 'AI provider call latency', ('provider', 'model', 'status'), AI_LATENCY_BUCKETS)
+ai_tokens_total = registry.counter(
+    'ai_tokens_total', 'Tokens reported by AI providers', ('provider', 'model', 'kind'))
+
+
+# ==================== SQL 统计 ====================
+
+def statement_shape(statement: str) -> str:
+    statement = _IN_LIST_RE.sub('(?)', statement)
+    statement = _NUMBER_RE.sub('N', statement)
+    return _SPACE_RE.sub(' ', statement).strip()
+
+
+class RequestStats:
+    """单个请求内的 SQL 统计"""
+    __slots__ = ('started', 'queries', 'sql_time', 'shapes')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.shapes: Dict[str, int] = defaultdict(int)
+
+
+def _route_label() -> str:
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+
+def current_stats() -> Optional[RequestStats]:
+    if not has_request_context():
+        return None
+    return g.get('_request_stats')
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('query_started')
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    stats = current_stats()
+    if stats is None:
+        db_queries_total.inc('-')
+        db_query_seconds_total.inc('-', amount=elapsed)
+        return
+    stats.queries += 1
+    stats.sql_time += elapsed
+    shape = statement_shape(statement)
+    stats.shapes[shape] += 1
+    if stats.shapes[shape] == METRICS_N_PLUS_ONE_THRESHOLD + 1:
+        n_plus_one_total.inc(_route_label())
+        logger.warning(f'可能的N+1查询: {request.method} {request.path} 重复执行超过 '
+                       f'{METRICS_N_PLUS_ONE_THRESHOLD} 次: {shape[:200]}')
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+    # 执行失败的语句不会触发 after_cursor_execute，取出对应的开始时间，避免在池化连接上累积
+    connection = context.connection
+    started = connection.info.get('query_started') if connection is not None else None
+    if started:
+        started.pop()
+
+
+# ==================== 请求统计 ====================
+
+def start_request():
+    g._request_stats = RequestStats()
+
+
+def finish_request(response, elapsed: float):
+    """
+    写入 Server-Timing 响应头（此时的统计），并在响应关闭时记录请求指标：
+    流式响应的正文在 after_request 之后才生成，其间执行的查询要到响应关闭时才统计完整
+    """
+    stats = current_stats()
+    method = request.method
+    route = _route_label()
+    status = response.status_code
+    if stats is not None and METRICS_SERVER_TIMING:
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={stats.sql_time * 1000:.2f};desc="{stats.queries} queries", app;dur={elapsed * 1000:.2f}'
+        )
+
+    def record():
+        total = time.perf_counter() - stats.started if stats is not None else elapsed
+        http_requests_total.inc(method, route, status)
+        http_request_duration.observe(total, method, route)
+        if stats is not None:
+            http_request_queries.observe(stats.queries, route)
+            db_queries_total.inc(route, amount=stats.queries)
+            db_query_seconds_total.inc(route, amount=stats.sql_time)
+
+    response.call_on_close(record)
+    return response
+
+
+# ==================== AI 调用 ====================
+
+def observe_ai_call(provider: str, model: str, latency: float, ok: bool):
+    ai_request_duration.observe(latency, provider, model or '-', 'ok' if ok else 'error')
+
+
+def record_ai_usage(provider: str, model: str, result: Any):
+    """记录提供商返回的 usage（prompt/completion token 数）"""
+    usage = result.get('usage') if isinstance(result, dict) else None
+    if not isinstance(usage, dict):
+        return
+    for kind in ('prompt', 'completion'):
+        tokens = usage.get(f'{kind}_tokens')
+        if tokens:
+            ai_tokens_total.inc(provider, model or '-', kind, amount=tokens)
@@ -5,6 +5,7 @@ import os
 from typing import Dict, List, Any
 import requests
 from app.services.ai_service import AIServiceProvider
+from app.services.stream_decoder import iter_sse_deltas
 import logging
 
 logger = logging.getLogger(__name__)
@@ -75,7 +76,7 @@ class AnthropicProvider(AIServiceProvider):
             
             # 发送请求
             timeout = kwargs.get('timeout', self.config.get('timeout', 30))
-            response = requests.post(url, headers=headers, json=data, timeout=timeout)
+            response = self.post(url, headers=headers, json=data, timeout=timeout)
             response.raise_for_status()
             
             # 处理响应
@@ -139,7 +140,7 @@ class AnthropicProvider(AIServiceProvider):
             
             # 发送请求
             timeout = self.config.get('timeout', 10)
-            response = requests.post(url, headers=headers, json=data, timeout=timeout)
+            response = self.post(url, headers=headers, json=data, timeout=timeout)
             response.raise_for_status()
             
             # 处理响应
@@ -222,33 +223,11 @@ class AnthropicProvider(AIServiceProvider):
             
             # 发送请求
             timeout = kwargs.get('timeout', self.config.get('timeout', 30))
-            response = requests.post(url, headers=headers, json=data, timeout=timeout, stream=True)
-            response.raise_for_status()
+            with self.post(url, headers=headers, json=data, timeout=timeout, stream=True) as response:
+                response.raise_for_status()
             
-            # 处理流式响应
-            for chunk in response.iter_lines():
-                if chunk:
-                    # 移除数据前缀
-                    chunk_str = chunk.decode('utf-8')
-                    if chunk_str.startswith('data: '):
-                        chunk_str = chunk_str[6:]
-                    if chunk_str == '[DONE]':
-                        break
-                    if chunk_str:
-                        try:
-                            import json
-                            chunk_data = json.loads(chunk_str)
-                            if 'content' in chunk_data and chunk_data['content']:
-                                for content_block in chunk_data['content']:
-                                    if content_block['type'] == 'text':
-                                        yield {
-                                            'content': content_block['text'],
-                                            'finish_reason': chunk_data.get('stop_reason'),
-                                            'provider': 'anthropic'
-                                        }
-                        except json.JSONDecodeError as e:
-                            logger.warning(f"解析流式响应失败: {e}")
-                            continue
+                # 处理流式响应：按到达的字节块增量解码
+                yield from iter_sse_deltas(response.iter_content(chunk_size=None), 'anthropic')
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Anthropic HTTP错误: {e}")
@@ -4,6 +4,7 @@ Google服务提供商实现
 from typing import Dict, List, Any
 import requests
 from app.services.ai_service import AIServiceProvider
+from app.services.stream_decoder import iter_sse_deltas
 import logging
 
 logger = logging.getLogger(__name__)
@@ -76,7 +77,7 @@ class GoogleProvider(AIServiceProvider):
             
             # 发送请求
             timeout = kwargs.get('timeout', self.config.get('timeout', 30))
-            response = requests.post(url, headers=headers, json=data, timeout=timeout)
+            response = self.post(url, headers=headers, json=data, timeout=timeout)
             response.raise_for_status()
             
             # 处理响应
@@ -163,7 +164,7 @@ class GoogleProvider(AIServiceProvider):
             
             # 发送请求
             timeout = self.config.get('timeout', 10)
-            response = requests.post(url, headers=headers, json=data, timeout=timeout)
+            response = self.post(url, headers=headers, json=data, timeout=timeout)
             response.raise_for_status()
             
             # 处理响应
@@ -207,7 +208,7 @@ class GoogleProvider(AIServiceProvider):
             
             model = kwargs.get('model', self.config.get('model', 'gemini-1.5-flash'))
             url = f"{self.config.get('api_base', 'https://generativelanguage.googleapis.com/v1')}/models/{model}:streamGenerateContent"
-            url += f"?key={api_key}"
+            url += f"?alt=sse&key={api_key}"
             
             headers = {
                 'Content-Type': 'application/json'
@@ -249,35 +250,11 @@ class GoogleProvider(AIServiceProvider):
             
             # 发送请求
             timeout = kwargs.get('timeout', self.config.get('timeout', 30))
-            response = requests.post(url, headers=headers, json=data, timeout=timeout, stream=True)
-            response.raise_for_status()
+            with self.post(url, headers=headers, json=data, timeout=timeout, stream=True) as response:
+                response.raise_for_status()
             
-            # 处理流式响应
-            for chunk in response.iter_lines():
-                if chunk:
-                    # 移除数据前缀
-                    chunk_str = chunk.decode('utf-8')
-                    if chunk_str.startswith('data: '):
-                        chunk_str = chunk_str[6:]
-                    if chunk_str == '[DONE]':
-                        break
-                    if chunk_str:
-                        try:
-                            import json
-                            chunk_data = json.loads(chunk_str)
-                            if 'candidates' in chunk_data and chunk_data['candidates']:
-                                for candidate in chunk_data['candidates']:
-                                    if 'content' in candidate and candidate['content']:
-                                        for part in candidate['content']['parts']:
-                                            if 'text' in part:
-                                                yield {
-                                                    'content': part['text'],
-                                                    'finish_reason': candidate.get('finishReason'),
-                                                    'provider': 'google'
-                                                }
-                        except json.JSONDecodeError as e:
-                            logger.warning(f"解析流式响应失败: {e}")
-                            continue
+                # 处理流式响应：按到达的字节块增量解码
+                yield from iter_sse_deltas(response.iter_content(chunk_size=None), 'google')
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Google HTTP错误: {e}")
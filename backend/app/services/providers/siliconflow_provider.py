@@ -3,6 +3,7 @@
 """
 import requests
 from app.services.ai_service import AIServiceProvider
+from app.services.stream_decoder import iter_sse_deltas
 from typing import Dict, List, Any
 import logging
 
@@ -63,7 +64,7 @@ class SiliconFlowProvider(AIServiceProvider):
             }
             
             # 发送请求
-            response = requests.post(
+            response = self.post(
                 f"{api_base}/chat/completions",
                 json=params,
                 headers=headers,
@@ -144,7 +145,7 @@ class SiliconFlowProvider(AIServiceProvider):
             }
             
             # 发送请求
-            response = requests.post(
+            response = self.post(
                 f"{api_base}/chat/completions",
                 json=params,
                 headers=headers,
@@ -240,41 +241,19 @@ class SiliconFlowProvider(AIServiceProvider):
             }
             
             # 发送流式请求
-            response = requests.post(
+            with self.post(
                 f"{api_base}/chat/completions",
                 json=params,
                 headers=headers,
                 timeout=params['timeout'],
                 stream=True
-            )
+            ) as response:
             
-            # 检查响应状态
-            response.raise_for_status()
+                # 检查响应状态
+                response.raise_for_status()
             
-            # 处理流式响应
-            for chunk in response.iter_lines():
-                if chunk:
-                    # 移除数据前缀
-                    chunk_str = chunk.decode('utf-8')
-                    if chunk_str.startswith('data: '):
-                        chunk_str = chunk_str[6:]
-                    if chunk_str == '[DONE]':
-                        break
-                    if chunk_str:
-                        try:
-                            import json
-                            chunk_data = json.loads(chunk_str)
-                            if 'choices' in chunk_data and chunk_data['choices']:
-                                choice = chunk_data['choices'][0]
-                                if 'delta' in choice and 'content' in choice['delta']:
-                                    yield {
-                                        'content': choice['delta']['content'],
-                                        'finish_reason': choice.get('finish_reason'),
-                                        'provider': 'siliconflow'
-                                    }
-                        except json.JSONDecodeError as e:
-                            logger.warning(f"解析流式响应失败: {e}")
-                            continue
+                # 处理流式响应：按到达的字节块增量解码
+                yield from iter_sse_deltas(response.iter_content(chunk_size=None), 'siliconflow')
             
         except requests.exceptions.HTTPError as e:
             error_details = ""
@@ -0,0 +1,300 @@
+"""
+全文检索
+基于 SQLite FTS5 的检索索引，覆盖章节正文、角色、地点、物品、势力、历史事件与笔记。
+FTS5 自带的分词器不会切分连续的中文，写入索引前先把中日韩文字逐字用空格隔开，
+查询时每个检索词作为短语匹配，因此任意长度的中文词（包括单字、双字人名）都能命中。
+索引随模型事件在同一事务中更新；绕过模型事件的批量写入需调用 reindex_entities。
+"""
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import event, select, literal, text
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Chapter, Character, Location, Item, Faction, HistoricalEvent, Note, World
+
+SEARCH_TABLE = 'search_index'
+# 标题命中的权重高于正文
+TITLE_WEIGHT = 10.0
+SNIPPET_LENGTH = 80
+MAX_PER_PAGE = 100
+
+_PENDING_KEY = 'search_pending'
+
+# 中日韩文字（不含标点），逐字成词
+_CJK_CHARS = '぀-ヿ㐀-䶿一-鿿豈-﫿가-힯'
+_CJK_RE = re.compile(f'([{_CJK_CHARS}])')
+_WORD_RE = re.compile(rf'[{_CJK_CHARS}]|[^\W_]+')
+
+
+class SearchSource:
+    """
+    一种可检索的实体：标题列、正文列以及用于过滤的项目/世界列
+    """
+
+    def __init__(self, entity_type: str, model, title: str, body: Sequence[str]):
+        self.entity_type = entity_type
+        self.model = model
+        self.title = title
+        self.body = tuple(body)
+
+    def select_documents(self, ids: Optional[Iterable[int]] = None):
+        """
+        查询实体的 (id, title, body..., project_id, world_id)，直接读表而不经过ORM对象，
+        延迟加载的长文本列也只在这里读取一次
+        """
+        table = self.model.__table__
+        columns = table.columns
+        if 'project_id' in columns:
+            project_id = columns['project_id']
+        else:
+            # 历史事件只属于世界，项目取所属世界的项目
+            project_id = (select(World.__table__.c.project_id)
+                          .where(World.__table__.c.id == columns['world_id'])
+                          .scalar_subquery())
+        world_id = columns['world_id'] if 'world_id' in columns else literal(None)
+        stmt = select(
+            columns['id'], columns[self.title], *[columns[name] for name in self.body],
+            project_id.label('project_id'), world_id.label('world_id')
+        )
+        if ids is not None:
+            stmt = stmt.where(columns['id'].in_(list(ids)))
+        return stmt
+
+    def document(self, row) -> Dict[str, Any]:
+        body = '\n'.join(value for value in row[2:2 + len(self.body)] if value)
+        return {
+            'entity_type': self.entity_type,
+            'entity_id': row[0],
+            'title': row[1] or '',
+            'body': body,
+            'project_id': row[-2],
+            'world_id': row[-1],
+        }
+
+
+SEARCH_SOURCES = {
+    source.entity_type: source for source in (
+        SearchSource('chapter', Chapter, 'title', ('content', 'core_event')),
+        SearchSource('character', Character, 'name', (
+            'alternative_names', 'description', 'personality', 'background',
+            'appearance', 'motivation', 'core_traits', 'special_abilities'
+        )),
+        SearchSource('location', Location, 'name', (
+            'description', 'geographical_location', 'cultural_features', 'key_buildings'
+        )),
+        SearchSource('item', Item, 'name', (
+            'description', 'special_effects', 'source', 'historical_heritage'
+        )),
+        SearchSource('faction', Faction, 'name', (
+            'description', 'core_ideology', 'key_members', 'secret_plans'
+        )),
+        SearchSource('event', HistoricalEvent, 'name', (
+            'description', 'key_participants', 'event_sequence', 'historical_significance'
+        )),
+        SearchSource('note', Note, 'title', ('content',)),
+    )
+}
+_SOURCE_BY_MODEL = {source.model: source for source in SEARCH_SOURCES.values()}
+
+
+# ==================== 分词 ====================
+
+def tokenize(value: str) -> str:
+    """写入索引前的预处理：中日韩文字逐字以空格隔开，其余文本交给 FTS5 的 unicode61 分词器"""
+    return _CJK_RE.sub(r' \1 ', value or '')
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    把用户输入转换为 FTS5 查询：按空白切分检索词，每个检索词作为短语，多个检索词同时满足
+    """
+    phrases = []
+    for term in (query or '').split():
+        tokens = _WORD_RE.findall(term)
+        if tokens:
+            phrases.append('"' + ' '.join(token.replace('"', '""') for token in tokens) + '"')
+    return ' '.join(phrases) or None
+
+
+def make_snippet(body: str, terms: Sequence[str], length: int = SNIPPET_LENGTH) -> str:
+    """
+    截取正文中第一个命中位置附近的片段，命中的检索词以 <mark> 标记
+    """
+    if not body:
+        return ''
+    lowered = body.lower()
+    positions = [lowered.find(term) for term in terms if term]
+    positions = [p for p in positions if p >= 0]
+    start = max(0, min(positions) - length // 4) if positions else 0
+    snippet = body[start:start + length]
+    snippet = re.sub(r'\s+', ' ', snippet).strip()
+    if terms:
+        pattern = re.compile('|'.join(re.escape(term) for term in sorted(set(terms), key=len, reverse=True)),
+                             re.IGNORECASE)
+        snippet = pattern.sub(lambda m: f'<mark>{m.group(0)}</mark>', snippet)
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if start + length < len(body) else ''
+    return f'{prefix}{snippet}{suffix}'
+
+
+# ==================== 索引维护 ====================
+
+def ensure_search_index(connection) -> bool:
+    """
+    创建检索索引虚拟表（FTS5 表不能由 create_all 创建），返回是否为新建
+    """
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': SEARCH_TABLE}
+    ).first()
+    if exists:
+        return False
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+        "title, body, entity_type UNINDEXED, entity_id UNINDEXED, "
+        "project_id UNINDEXED, world_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')"
+    ))
+    return True
+
+
+def _insert_documents(connection, source: SearchSource, rows):
+    documents = [source.document(row) for row in rows]
+    if not documents:
+        return
+    connection.execute(
+        text(f"INSERT INTO {SEARCH_TABLE} (title, body, entity_type, entity_id, project_id, world_id) "
+             "VALUES (:title, :body, :entity_type, :entity_id, :project_id, :world_id)"),
+        [dict(doc, title=tokenize(doc['title']), body=tokenize(doc['body'])) for doc in documents]
+    )
+
+
+def reindex_entities(connection, entity_type: str, ids: Iterable[int]):
+    """
+    重建指定实体的索引：先删除旧条目，再按表中当前数据写入（已删除的实体不再写入）
+    """
+    ids = [entity_id for entity_id in set(ids) if entity_id is not None]
+    if not ids:
+        return
+    source = SEARCH_SOURCES[entity_type]
+    placeholders = ', '.join(f':id{i}' for i in range(len(ids)))
+    connection.execute(
+        text(f"DELETE FROM {SEARCH_TABLE} WHERE entity_type = :entity_type AND entity_id IN ({placeholders})"),
+        dict({'entity_type': entity_type}, **{f'id{i}': entity_id for i, entity_id in enumerate(ids)})
+    )
+    _insert_documents(connection, source, connection.execute(source.select_documents(ids)))
+
+
+def rebuild_search_index(connection=None):
+    """
+    根据现有数据重建全部检索索引
+    """
+    connection = connection or db.session.connection()
+    connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    for source in SEARCH_SOURCES.values():
+        _insert_documents(connection, source, connection.execute(source.select_documents()))
+
+
+def _mark_pending(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        source = _SOURCE_BY_MODEL[mapper.class_]
+        session.info.setdefault(_PENDING_KEY, set()).add((source.entity_type, target.id))
+
+
+for _source in SEARCH_SOURCES.values():
+    for _event_name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_source.model, _event_name, _mark_pending)
+
+
+@event.listens_for(Session, 'after_flush')
+def _flush_search_index(session, flush_context):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    by_type = defaultdict(list)
+    for entity_type, entity_id in pending:
+        by_type[entity_type].append(entity_id)
+    connection = session.connection()
+    for entity_type, ids in by_type.items():
+        reindex_entities(connection, entity_type, ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_search_pending(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# ==================== 检索 ====================
+
+def search(query: str, entity_types: Optional[Sequence[str]] = None, project_id: Optional[int] = None,
+           world_id: Optional[int] = None, page: int = 1, per_page: int = 20) -> Dict[str, Any]:
+    """
+    检索：按 bm25 相关度排序（标题权重更高），可按实体类型、项目、世界过滤并分页
+
+    返回 {'query', 'total', 'page', 'per_page', 'results': [{entity_type, entity_id, title, snippet, score, ...}]}
+    """
+    page = max(1, page)
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    result = {'query': query, 'total': 0, 'page': page, 'per_page': per_page, 'results': []}
+    match = build_match_query(query)
+    if match is None:
+        return result
+
+    conditions = [f'{SEARCH_TABLE} MATCH :match']
+    params: Dict[str, Any] = {'match': match}
+    if entity_types:
+        unknown = set(entity_types) - set(SEARCH_SOURCES)
+        if unknown:
+            raise ValueError(f'未知的实体类型: {", ".join(sorted(unknown))}')
+        names = []
+        for i, entity_type in enumerate(entity_types):
+            params[f'type{i}'] = entity_type
+            names.append(f':type{i}')
+        conditions.append(f"entity_type IN ({', '.join(names)})")
+    if project_id is not None:
+        conditions.append('project_id = :project_id')
+        params['project_id'] = project_id
+    if world_id is not None:
+        conditions.append('world_id = :world_id')
+        params['world_id'] = world_id
+    where = ' AND '.join(conditions)
+
+    session = db.session
+    result['total'] = session.execute(text(f'SELECT COUNT(*) FROM {SEARCH_TABLE} WHERE {where}'), params).scalar()
+    if not result['total']:
+        return result
+    hits = session.execute(
+        text(f'SELECT entity_type, entity_id, project_id, world_id, '
+             f'bm25({SEARCH_TABLE}, {TITLE_WEIGHT}, 1.0) AS score '
+             f'FROM {SEARCH_TABLE} WHERE {where} ORDER BY score LIMIT :limit OFFSET :offset'),
+        dict(params, limit=per_page, offset=(page - 1) * per_page)
+    ).all()
+
+    # 片段从原文生成：每种实体类型一次查询
+    ids_by_type = defaultdict(list)
+    for hit in hits:
+        ids_by_type[hit.entity_type].append(hit.entity_id)
+    documents: Dict[Tuple[str, int], Dict[str, Any]] = {}
+    for entity_type, ids in ids_by_type.items():
+        source = SEARCH_SOURCES[entity_type]
+        for row in session.execute(source.select_documents(ids)):
+            documents[(entity_type, row[0])] = source.document(row)
+
+    terms = [term.lower() for term in (query or '').split()]
+    results: List[Dict[str, Any]] = []
+    for hit in hits:
+        document = documents.get((hit.entity_type, hit.entity_id))
+        if document is None:
+            continue
+        results.append({
+            'entity_type': hit.entity_type,
+            'entity_id': hit.entity_id,
+            'project_id': hit.project_id,
+            'world_id': hit.world_id,
+            'title': document['title'],
+            'snippet': make_snippet(document['body'], terms),
+            # bm25 越小越相关，取反后越大越相关
+            'score': round(-hit.score, 4)
+        })
+    result['results'] = results
+    return result
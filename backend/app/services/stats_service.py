@@ -0,0 +1,131 @@
+"""
+世界统计服务
+通过模型事件维护 world_stat_counters 计数表，统计接口只需一次查询即可得到总数与本周新增
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, date
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import event, func, case, inspect as sa_inspect
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import db
+from app.models import World, Character, Location, Faction, HistoricalEvent, Item, WorldStatCounter
+
+
+# 计数的实体类型与模型映射
+COUNTED_MODELS = {
+    'character': Character,
+    'location': Location,
+    'faction': Faction,
+    'event': HistoricalEvent,
+    'item': Item
+}
+
+# SQLite 中计算某个时间所在周周一的表达式，与 week_start_of 保持一致
+_SQLITE_WEEK_START = "date({column}, '-6 days', 'weekday 1')"
+
+
+def week_start_of(value: Optional[datetime]) -> date:
+    """返回时间所在周的周一日期"""
+    value = value or datetime.utcnow()
+    return (value - timedelta(days=value.weekday())).date()
+
+
+def _adjust_counter(connection, world_id, entity_type, created_at, delta):
+    if world_id is None:
+        return
+    _upsert_counter(connection, world_id, entity_type, week_start_of(created_at), delta)
+
+
+def _upsert_counter(connection, world_id, entity_type, period_start, delta):
+    counters = WorldStatCounter.__table__
+    stmt = sqlite_insert(counters).values(
+        world_id=world_id,
+        entity_type=entity_type,
+        period_start=period_start,
+        count=delta
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[counters.c.world_id, counters.c.entity_type, counters.c.period_start],
+        set_={'count': counters.c.count + delta}
+    )
+    connection.execute(stmt)
+
+
+def _register_counter_hooks(entity_type, model):
+    @event.listens_for(model, 'after_insert')
+    def _after_insert(mapper, connection, target):
+        _adjust_counter(connection, target.world_id, entity_type, target.created_at, 1)
+
+    @event.listens_for(model, 'before_delete')
+    def _before_delete(mapper, connection, target):
+        _adjust_counter(connection, target.world_id, entity_type, target.created_at, -1)
+
+    @event.listens_for(model, 'after_update')
+    def _after_update(mapper, connection, target):
+        # 实体被移动到其他世界时，同步调整两个世界的计数
+        history = sa_inspect(target).attrs.world_id.history
+        if history.has_changes():
+            for old_world_id in history.deleted:
+                _adjust_counter(connection, old_world_id, entity_type, target.created_at, -1)
+            _adjust_counter(connection, target.world_id, entity_type, target.created_at, 1)
+
+
+for _entity_type, _model in COUNTED_MODELS.items():
+    _register_counter_hooks(_entity_type, _model)
+
+
+@event.listens_for(World, 'after_delete')
+def _delete_world_counters(mapper, connection, target):
+    connection.execute(
+        WorldStatCounter.__table__.delete().where(WorldStatCounter.__table__.c.world_id == target.id)
+    )
+
+
+def adjust_counters_bulk(entity_type, changes: Iterable[Tuple[Optional[int], datetime, int]], connection=None):
+    """
+    批量写入（bulk mappings 不触发模型事件）后调整计数：
+    changes 为 (world_id, created_at, delta) 列表，按世界和周合并后写入
+    """
+    totals = defaultdict(int)
+    for world_id, created_at, delta in changes:
+        if world_id is not None:
+            totals[(world_id, week_start_of(created_at))] += delta
+    connection = connection or db.session.connection()
+    for (world_id, period_start), delta in totals.items():
+        if delta:
+            _upsert_counter(connection, world_id, entity_type, period_start, delta)
+
+
+def rebuild_world_stat_counters(connection=None):
+    """
+    根据现有数据重建计数表（用于计数表新建或数据被绕过事件修改后）
+    """
+    connection = connection or db.session.connection()
+    counters = WorldStatCounter.__table__
+    connection.execute(counters.delete())
+    for entity_type, model in COUNTED_MODELS.items():
+        table = model.__table__
+        week_start = _SQLITE_WEEK_START.format(column=f'{table.name}.created_at')
+        connection.execute(db.text(
+            f'INSERT INTO world_stat_counters (world_id, entity_type, period_start, count) '
+            f'SELECT world_id, :entity_type, {week_start}, COUNT(*) FROM "{table.name}" '
+            f'WHERE world_id IS NOT NULL GROUP BY world_id, {week_start}'
+        ), {'entity_type': entity_type})
+
+
+def get_world_counts(world_id: int, week_start: Optional[date] = None) -> Dict[str, Dict[str, int]]:
+    """
+    一次查询获取世界各类实体的总数和本周新增
+    返回 {entity_type: {'total': n, 'weekly': m}}
+    """
+    week_start = week_start or week_start_of(datetime.utcnow())
+    rows = db.session.query(
+        WorldStatCounter.entity_type,
+        func.sum(WorldStatCounter.count),
+        func.sum(case((WorldStatCounter.period_start >= week_start, WorldStatCounter.count), else_=0))
+    ).filter(WorldStatCounter.world_id == world_id).group_by(WorldStatCounter.entity_type).all()
+
+    counts = {entity_type: {'total': 0, 'weekly': 0} for entity_type in COUNTED_MODELS}
+    for entity_type, total, weekly in rows:
+        counts[entity_type] = {'total': int(total or 0), 'weekly': int(weekly or 0)}
+    return counts
@@ -0,0 +1,262 @@
+"""
+流式响应解码
+从原始字节流增量解析 SSE / NDJSON，并将各提供商的线上格式归一化为增量事件：
+{'content': 文本增量, 'finish_reason': 结束原因或None, 'provider': 提供商}
+"""
+import json
+import logging
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class StreamDecodeError(ValueError):
+    """上游在流中返回了错误事件"""
+
+
+class SSEDecoder:
+    """
+    增量SSE解码器：feed 任意切分的字节块，返回已完整接收的 (event, data) 列表
+    """
+
+    def __init__(self):
+        self._buffer = b''
+        self._event = None
+        self._data = []
+
+    def feed(self, chunk: bytes) -> List[Tuple[Optional[str], str]]:
+        self._buffer += chunk
+        if b'\n' not in chunk:
+            return []
+        # 一次切分出所有完整行，最后一段（可能不完整）留在缓冲区
+        *lines, self._buffer = self._buffer.split(b'\n')
+        events = []
+        for line in lines:
+            if line.endswith(b'\r'):
+                line = line[:-1]
+            event = self._process_line(line)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def flush(self) -> List[Tuple[Optional[str], str]]:
+        """流结束时处理缓冲区中未以空行结尾的最后一个事件"""
+        events = []
+        if self._buffer:
+            event = self._process_line(self._buffer.rstrip(b'\r'))
+            self._buffer = b''
+            if event is not None:
+                events.append(event)
+        event = self._process_line(b'')
+        if event is not None:
+            events.append(event)
+        return events
+
+    def _process_line(self, line: bytes) -> Optional[Tuple[Optional[str], str]]:
+        if not line:
+            # 空行表示一个事件结束
+            if not self._data:
+                self._event = None
+                return None
+            event = (self._event, '\n'.join(self._data))
+            self._event = None
+            self._data = []
+            return event
+        if line.startswith(b':'):
+            # 注释（心跳）
+            return None
+        field, _, value = line.partition(b':')
+        if value.startswith(b' '):
+            value = value[1:]
+        if field == b'data':
+            self._data.append(value.decode('utf-8'))
+        elif field == b'event':
+            self._event = value.decode('utf-8')
+        return None
+
+
+class NDJSONDecoder:
+    """
+    增量NDJSON解码器：每行一个JSON对象
+    """
+
+    def __init__(self):
+        self._buffer = b''
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        self._buffer += chunk
+        if b'\n' not in chunk:
+            return []
+        *lines, self._buffer = self._buffer.split(b'\n')
+        return [json.loads(line) for line in lines if line.strip()]
+
+    def flush(self) -> List[Any]:
+        remaining, self._buffer = self._buffer, b''
+        return [json.loads(remaining)] if remaining.strip() else []
+
+
+# ==================== 各提供商事件归一化 ====================
+
+def _openai_delta(event: Optional[str], payload: Dict[str, Any]) -> Optional[Tuple[str, Optional[str]]]:
+    """OpenAI兼容格式（硅基流动等）"""
+    if 'error' in payload:
+        raise StreamDecodeError(str(payload['error']))
+    choices = payload.get('choices')
+    if not choices:
+        return None
+    choice = choices[0]
+    content = (choice.get('delta') or {}).get('content') or ''
+    finish_reason = choice.get('finish_reason')
+    if content or finish_reason:
+        return content, finish_reason
+    return None
+
+
+def _anthropic_delta(event: Optional[str], payload: Dict[str, Any]) -> Optional[Tuple[str, Optional[str]]]:
+    """Anthropic Messages 流式事件"""
+    event_type = payload.get('type', event)
+    if event_type == 'content_block_delta':
+        delta = payload.get('delta') or {}
+        if delta.get('type') == 'text_delta' and delta.get('text'):
+            return delta['text'], None
+    elif event_type == 'message_delta':
+        stop_reason = (payload.get('delta') or {}).get('stop_reason')
+        if stop_reason:
+            return '', stop_reason
+    elif event_type == 'error':
+        raise StreamDecodeError(str(payload.get('error', payload)))
+    return None
+
+
+def _google_delta(event: Optional[str], payload: Dict[str, Any]) -> Optional[Tuple[str, Optional[str]]]:
+    """Google Gemini streamGenerateContent（alt=sse）"""
+    if 'error' in payload:
+        raise StreamDecodeError(str(payload['error']))
+    candidates = payload.get('candidates')
+    if not candidates:
+        return None
+    candidate = candidates[0]
+    parts = (candidate.get('content') or {}).get('parts') or []
+    content = ''.join(part.get('text', '') for part in parts)
+    finish_reason = candidate.get('finishReason')
+    if content or finish_reason:
+        return content, finish_reason
+    return None
+
+
+DELTA_PARSERS: Dict[str, Callable[[Optional[str], Dict[str, Any]], Optional[Tuple[str, Optional[str]]]]] = {
+    'openai': _openai_delta,
+    'siliconflow': _openai_delta,
+    'azure': _openai_delta,
+    'anthropic': _anthropic_delta,
+    'google': _google_delta,
+}
+
+
+def iter_sse_deltas(chunks: Iterable[bytes], provider: str, wire_format: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    将上游原始字节块解码为归一化增量事件
+
+    chunks: 上游响应的字节块（如 response.iter_content(chunk_size=None)）
+    wire_format: 解析格式对应的提供商，默认与 provider 相同
+    """
+    parse = DELTA_PARSERS[wire_format or provider]
+    decoder = SSEDecoder()
+
+    def handle(events):
+        for event, data in events:
+            if data == '[DONE]':
+                return True
+            try:
+                payload = json.loads(data)
+            except json.JSONDecodeError as e:
+                logger.warning(f"解析流式响应失败: {e}")
+                continue
+            delta = parse(event, payload)
+            if delta is not None:
+                yield {'content': delta[0], 'finish_reason': delta[1], 'provider': provider}
+        return False
+
+    for chunk in chunks:
+        done = yield from handle(decoder.feed(chunk))
+        if done:
+            return
+    yield from handle(decoder.flush())
+
+
+def iter_ndjson_deltas(chunks: Iterable[bytes], provider: str, wire_format: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    NDJSON 格式的上游流解码为归一化增量事件
+    """
+    parse = DELTA_PARSERS[wire_format or provider]
+    decoder = NDJSONDecoder()
+    for chunk in chunks:
+        for payload in decoder.feed(chunk):
+            delta = parse(None, payload)
+            if delta is not None:
+                yield {'content': delta[0], 'finish_reason': delta[1], 'provider': provider}
+    for payload in decoder.flush():
+        delta = parse(None, payload)
+        if delta is not None:
+            yield {'content': delta[0], 'finish_reason': delta[1], 'provider': provider}
+
+
+# ==================== SSE 输出 ====================
+
+HEARTBEAT = ': keep-alive\n\n'
+DONE_EVENT = 'data: [DONE]\n\n'
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+
+def format_sse(payload: Dict[str, Any]) -> str:
+    """编码为一条SSE data事件"""
+    return f'data: {_encode(payload)}\n\n'
+
+
+_SENTINEL = object()
+
+
+def relay_with_heartbeat(stream: Iterable[Dict[str, Any]], interval: float = 15.0) -> Iterator[str]:
+    """
+    将增量事件逐条编码为SSE输出；上游在 interval 秒内无数据时发送心跳注释保持连接。
+    上游在后台线程中读取，客户端断开时通知后台线程停止并关闭上游流。
+    """
+    buffer = queue.Queue()
+    stopped = threading.Event()
+
+    def pump():
+        iterator = iter(stream)
+        try:
+            for item in iterator:
+                if stopped.is_set():
+                    break
+                buffer.put(item)
+        except Exception as e:
+            buffer.put(e)
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+            buffer.put(_SENTINEL)
+
+    threading.Thread(target=pump, name='ai-stream-relay', daemon=True).start()
+    try:
+        while True:
+            try:
+                item = buffer.get(timeout=interval)
+            except queue.Empty:
+                yield HEARTBEAT
+                continue
+            if item is _SENTINEL:
+                break
+            if isinstance(item, Exception):
+                yield format_sse({'error': str(item)})
+                break
+            yield format_sse(item)
+        yield DONE_EVENT
+    finally:
+        stopped.set()
@@ -0,0 +1,509 @@
+"""
+合成数据生成与 API 负载基准测试
+
+按可配置的规模向独立的 SQLite 数据库写入可复现的合成数据（固定随机种子）：
+多个世界，每个世界数千个角色、地点与多层区域树、数万条实体关系，以及包含数千章中文正文的项目。
+随后通过 Flask 测试客户端反复请求热点接口（章节列表、区域树、关系网络、世界统计、角色列表、
+数据包、导出），记录每个场景的 p50/p95/p99 延迟、每次请求的 SQL 语句数与进程峰值内存，
+输出为 JSON 报告。报告之间可以比较，用于发现不同提交之间的性能回归。
+
+用法：
+    python benchmark.py --scale small --output report.json
+    python benchmark.py --scale full --db /tmp/bench.db --reuse-db --baseline base.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import Engine
+
+from app import create_app, db
+from app.models import (
+    World, Project, Volume, Chapter, Character, Location, Region, EntityRelation
+)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPORT_SCHEMA = 1
+# 每批写入的记录数
+SEED_BATCH_SIZE = 2000
+
+# 各规模下每个世界的数据量
+SCALES = {
+    'tiny': dict(worlds=1, characters=40, locations=30, regions=60, region_depth=4,
+                 relations=200, chapters=20, chapter_chars=400, iterations=3),
+    'small': dict(worlds=2, characters=500, locations=300, regions=500, region_depth=6,
+                  relations=3000, chapters=300, chapter_chars=1500, iterations=10),
+    'full': dict(worlds=3, characters=3000, locations=2000, regions=3000, region_depth=8,
+                 relations=30000, chapters=2000, chapter_chars=3000, iterations=20),
+}
+
+
+# ==================== 中文文本 ====================
+
+SURNAMES = '李王张刘陈杨赵黄周吴徐孙胡朱高林何郭马罗梁宋郑谢韩唐冯于董萧程曹袁邓许傅沈曾彭吕苏卢蒋蔡贾丁魏薛叶阎'
+GIVEN_CHARS = '云风青玄明月清羽天星寒霜雪尘逸轩墨白凌霄子衡若瑶灵素心岚川远宁安昭歌影飞辰阳鸿渊'
+PLACE_HEADS = '青苍玄赤金白碧紫寒落云雾星月龙凤天幽'
+PLACE_TAILS = ['山', '城', '谷', '岭', '州', '湖', '关', '镇', '原', '海', '峰', '林']
+REGION_TYPES = ['大陆', '国家', '省份', '城市', '区域']
+RELATION_TYPES = ['友谊', '敌对', '师徒', '亲属', '恋人', '同盟', '竞争', '从属']
+
+SCENES = ['层层叠叠的群山', '被晚霞染红的天际', '城头飘扬的旗帜', '翻涌的云海', '寂静的长街', '远处的烽火']
+SPOTS = ['城门下', '山巅', '客栈二楼', '古树旁', '大殿前', '渡口']
+ACTIONS = ['并肩而行', '隔着长桌对坐', '在雨中擦肩而过', '围着篝火低声交谈', '对峙良久', '一同翻过山岭']
+MOODS = ['谁也没有先开口', '气氛一时有些凝重', '彼此心照不宣', '各自想着心事', '笑声在夜色里传得很远']
+SAYS = ['低声说道', '沉声道', '笑了笑', '叹了口气', '皱眉问道', '缓缓开口']
+LINES = [
+    '此去路途遥远，你可想清楚了', '天色不早了，我们得在入夜前赶到', '这件事没有你想的那么简单',
+    '我等这一天已经很久了', '你若不信，明日便随我去看', '那封信里究竟写了什么', '守住这里，等我回来',
+]
+NARRATION = [
+    '{a}站在{spot}，望着{scene}，许久没有说话。',
+    '{a}与{b}{action}，{mood}。',
+    '夜色渐深，{place}的灯火一盏接一盏地亮了起来。',
+    '{a}握紧了手中的剑，想起了{b}临行前的嘱托。',
+    '消息传到{place}时，{a}正在{spot}等候。',
+]
+DIALOGUE = ['“{line}。”{a}{say}。', '{a}{say}：“{line}。”', '“{line}？”{b}看着{a}，{mood}。']
+
+
+class TextGenerator:
+    """按固定随机种子生成带对话的中文正文"""
+
+    def __init__(self, rng: random.Random, names: Sequence[str], places: Sequence[str]):
+        self.rng = rng
+        self.names = list(names) or ['无名']
+        self.places = list(places) or ['远方']
+
+    def sentence(self) -> str:
+        rng = self.rng
+        template = rng.choice(DIALOGUE if rng.random() < 0.35 else NARRATION)
+        return template.format(
+            a=rng.choice(self.names), b=rng.choice(self.names), place=rng.choice(self.places),
+            spot=rng.choice(SPOTS), scene=rng.choice(SCENES), action=rng.choice(ACTIONS),
+            mood=rng.choice(MOODS), say=rng.choice(SAYS), line=rng.choice(LINES)
+        )
+
+    def chapter(self, target_chars: int) -> str:
+        paragraphs = []
+        length = 0
+        while length < target_chars:
+            paragraph = ''.join(self.sentence() for _ in range(self.rng.randint(2, 5)))
+            paragraphs.append('　　' + paragraph)
+            length += len(paragraph)
+        return '\n\n'.join(paragraphs)
+
+
+def person_name(rng: random.Random) -> str:
+    return rng.choice(SURNAMES) + ''.join(rng.choice(GIVEN_CHARS) for _ in range(rng.randint(1, 2)))
+
+
+def place_name(rng: random.Random) -> str:
+    return rng.choice(PLACE_HEADS) + rng.choice(PLACE_HEADS) + rng.choice(PLACE_TAILS)
+
+
+# ==================== 数据生成 ====================
+
+class Seeder:
+    """
+    绕过 ORM 事件按批写入合成数据（显式分配主键，关系边可以直接引用），
+    写入完成后统一重建计数表与检索索引
+    """
+
+    def __init__(self, params: Dict[str, Any], seed: int):
+        self.params = params
+        self.rng = random.Random(seed)
+        self.rows: Dict[str, int] = {}
+        self._next_ids: Dict[str, int] = {}
+
+    def _ids(self, model, count: int) -> List[int]:
+        table = model.__table__
+        start = self._next_ids.get(table.name)
+        if start is None:
+            start = (db.session.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+        self._next_ids[table.name] = start + count
+        return list(range(start, start + count))
+
+    def _insert(self, model, rows: List[Dict[str, Any]]):
+        table = model.__table__
+        for offset in range(0, len(rows), SEED_BATCH_SIZE):
+            db.session.execute(table.insert(), rows[offset:offset + SEED_BATCH_SIZE])
+        self.rows[table.name] = self.rows.get(table.name, 0) + len(rows)
+
+    def seed(self):
+        for index in range(self.params['worlds']):
+            self._seed_world(index)
+        from app.services.stats_service import rebuild_world_stat_counters
+        from app.services.search_service import rebuild_search_index
+        rebuild_world_stat_counters()
+        rebuild_search_index()
+        db.session.commit()
+
+    def _seed_world(self, index: int):
+        rng = self.rng
+        params = self.params
+        project_id, = self._ids(Project, 1)
+        world_id, = self._ids(World, 1)
+        self._insert(Project, [{
+            'id': project_id, 'title': f'合成长篇{index + 1}', 'pen_name': '基准测试', 'genre': '玄幻',
+            'target_audience': '男频', 'core_theme': '成长与抉择', 'synopsis': '用于性能基准测试的合成项目。'
+        }])
+        self._insert(World, [{'id': world_id, 'project_id': project_id, 'name': f'合成世界{index + 1}',
+                              'core_concept': '用于性能基准测试的合成世界'}])
+
+        character_ids = self._ids(Character, params['characters'])
+        names = [person_name(rng) for _ in character_ids]
+        self._insert(Character, [{
+            'id': character_id, 'world_id': world_id, 'project_id': project_id, 'name': name,
+            'role_type': rng.choice(['主角', '配角', '配角', '反派', '龙套']),
+            'importance_level': rng.randint(1, 10), 'gender': rng.choice(['男', '女']),
+            'age': rng.randint(12, 90), 'description': f'{name}出身{place_name(rng)}，性情{rng.choice(MOODS)}。'
+        } for character_id, name in zip(character_ids, names)])
+
+        location_ids = self._ids(Location, params['locations'])
+        places = [place_name(rng) for _ in location_ids]
+        self._insert(Location, [{
+            'id': location_id, 'world_id': world_id, 'project_id': project_id, 'name': place,
+            'location_type': rng.choice(['城市', '山脉', '宗门', '村落', '遗迹']),
+            'description': f'{place}位于{rng.choice(SCENES)}之间。'
+        } for location_id, place in zip(location_ids, places)])
+
+        self._insert(Region, self._region_rows(world_id, params['regions'], params['region_depth']))
+        self._insert(EntityRelation, self._relation_rows(world_id, character_ids, location_ids))
+        self._seed_chapters(project_id, TextGenerator(rng, names[:200], places[:100]))
+
+    def _region_rows(self, world_id: int, count: int, max_depth: int) -> List[Dict[str, Any]]:
+        """生成多层区域树：一半的节点挂在最近生成的节点下，使树足够深"""
+        rng = self.rng
+        ids = self._ids(Region, count)
+        roots = max(1, count // 50)
+        depths: Dict[int, int] = {}
+        rows = []
+        for position, region_id in enumerate(ids):
+            parent_id = None
+            if position >= roots:
+                recent = ids[max(0, position - 10):position] if rng.random() < 0.5 else ids[:position]
+                candidates = [candidate for candidate in recent if depths[candidate] < max_depth - 1]
+                parent_id = rng.choice(candidates) if candidates else None
+            depths[region_id] = depths[parent_id] + 1 if parent_id else 0
+            rows.append({
+                'id': region_id, 'world_id': world_id, 'parent_region_id': parent_id, 'name': place_name(rng),
+                'region_type': REGION_TYPES[min(depths[region_id], len(REGION_TYPES) - 1)],
+                'population': rng.randint(0, 1000000), 'strategic_importance': rng.randint(1, 10)
+            })
+        return rows
+
+    def _relation_rows(self, world_id: int, character_ids: List[int],
+                       location_ids: List[int]) -> List[Dict[str, Any]]:
+        rng = self.rng
+        entities = [('character', character_id) for character_id in character_ids]
+        entities += [('location', location_id) for location_id in location_ids]
+        rows = []
+        for relation_id in self._ids(EntityRelation, self.params['relations']):
+            # 关系集中在少数重要角色上，接近真实作品的分布
+            source_type, source_id = entities[int(len(character_ids) * rng.random() ** 2)]
+            target_type, target_id = rng.choice(entities)
+            rows.append({
+                'id': relation_id, 'world_id': world_id, 'source_type': source_type, 'source_id': source_id,
+                'target_type': target_type, 'target_id': target_id, 'relation_type': rng.choice(RELATION_TYPES),
+                'strength': rng.randint(1, 10), 'is_bidirectional': rng.random() < 0.6
+            })
+        return rows
+
+    def _seed_chapters(self, project_id: int, text: TextGenerator):
+        params = self.params
+        per_volume = 50
+        volume_ids = self._ids(Volume, (params['chapters'] + per_volume - 1) // per_volume)
+        self._insert(Volume, [{'id': volume_id, 'project_id': project_id, 'title': f'第{number + 1}卷',
+                               'order_index': number} for number, volume_id in enumerate(volume_ids)])
+        rows = []
+        for number, chapter_id in enumerate(self._ids(Chapter, params['chapters'])):
+            content = text.chapter(params['chapter_chars'])
+            rows.append({
+                'id': chapter_id, 'project_id': project_id, 'volume_id': volume_ids[number // per_volume],
+                'title': f'第{number + 1}章', 'content': content, 'status': '已完成',
+                'word_count': len(content.replace('\n', '').replace('　', '')), 'order_index': number
+            })
+            if len(rows) >= SEED_BATCH_SIZE:
+                self._insert(Chapter, rows)
+                rows = []
+        self._insert(Chapter, rows)
+
+
+# ==================== 场景 ====================
+
+def reset_caches():
+    """清空进程内的响应缓存，使每次请求都执行完整的查询与序列化"""
+    from app.services.etag_service import _body_cache
+    from app.api.world_setting import _region_tree_cache
+    from app.api.tags_relations import _relation_network_cache
+    for cache in (_body_cache, _region_tree_cache, _relation_network_cache):
+        cache.clear()
+
+
+class Scenario:
+    """
+    一个压测场景：path 为带 {world_id}/{project_id} 占位符的接口路径
+    cold: 每次请求前清空进程内缓存；revalidate: 携带首次响应的 ETag 发起条件请求
+    weight: 迭代次数相对 --iterations 的倍数（正文量大的接口取较小值）
+    """
+
+    def __init__(self, name: str, path: str, cold: bool = True, revalidate: bool = False, weight: float = 1.0):
+        self.name = name
+        self.path = path
+        self.cold = cold
+        self.revalidate = revalidate
+        self.weight = weight
+
+
+SCENARIOS = [
+    Scenario('chapter_list_summary', '/api/projects/{project_id}/chapters?view=summary'),
+    Scenario('chapter_list_full', '/api/projects/{project_id}/chapters', weight=0.5),
+    Scenario('region_tree', '/api/world-setting/regions/tree?world_id={world_id}'),
+    Scenario('relation_network', '/api/tags-relations/network/{world_id}'),
+    Scenario('relation_network_cached', '/api/tags-relations/network/{world_id}', cold=False),
+    Scenario('world_stats', '/api/worlds/{world_id}/stats'),
+    Scenario('character_list', '/api/characters?world_id={world_id}'),
+    Scenario('character_list_revalidate', '/api/characters?world_id={world_id}', cold=False, revalidate=True),
+    Scenario('world_bundle', '/api/worlds/{world_id}/bundle', weight=0.5),
+    Scenario('export_txt', '/api/projects/{project_id}/export/txt?cache=0', weight=0.5),
+]
+
+
+class QueryCounter:
+    """统计期间所有引擎执行的 SQL 语句数（包括流式响应在请求结束后执行的查询）"""
+
+    def __init__(self):
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(Engine, 'after_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(Engine, 'after_cursor_execute', self._on_execute)
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """最近秩百分位数"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def peak_rss_kb() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以 KB 为单位
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def run_scenario(client, scenario: Scenario, targets: Dict[str, int], iterations: int) -> Dict[str, Any]:
+    path = scenario.path.format(**targets)
+    headers = {'Accept-Encoding': 'gzip'}
+    # 预热：建立连接、编译语句，条件请求场景取得 ETag
+    response = client.get(path, headers=headers)
+    response.get_data()
+    if scenario.revalidate and response.headers.get('ETag'):
+        headers['If-None-Match'] = response.headers['ETag']
+    response.close()
+
+    latencies: List[float] = []
+    queries: List[int] = []
+    statuses: Dict[str, int] = {}
+    size = 0
+    with QueryCounter() as counter:
+        for _ in range(iterations):
+            if scenario.cold:
+                reset_caches()
+            before = counter.count
+            started = time.perf_counter()
+            response = client.get(path, headers=headers)
+            size = len(response.get_data())
+            latencies.append((time.perf_counter() - started) * 1000)
+            response.close()
+            queries.append(counter.count - before)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+    return {
+        'path': path,
+        'iterations': iterations,
+        'status': statuses,
+        'latency_ms': {
+            'min': round(min(latencies), 3),
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'max': round(max(latencies), 3),
+            'mean': round(sum(latencies) / len(latencies), 3),
+        },
+        'queries': {'min': min(queries), 'max': max(queries), 'mean': round(sum(queries) / len(queries), 2)},
+        'response_bytes': size,
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+
+# ==================== 报告 ====================
+
+def _git_revision() -> Dict[str, Any]:
+    root = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+    return {'commit': commit, 'dirty': dirty}
+
+
+def run_benchmark(params: Dict[str, Any], seed: int = 42, db_path: Optional[str] = None,
+                  reuse_db: bool = False, scenarios: Optional[Sequence[str]] = None,
+                  log: Callable[[str], None] = lambda message: None) -> Dict[str, Any]:
+    """生成数据（或复用已有数据库）并依次运行场景，返回报告"""
+    selected = [scenario for scenario in SCENARIOS if not scenarios or scenario.name in scenarios]
+    tmpdir = None
+    if db_path is None:
+        tmpdir = tempfile.TemporaryDirectory(prefix='novel-bench-')
+        db_path = os.path.join(tmpdir.name, 'bench.db')
+    reuse = reuse_db and os.path.exists(db_path)
+    if not reuse:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+    try:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.abspath(db_path)}',
+                          'AI_JOB_RECOVERY': False})
+        seed_report: Dict[str, Any] = {'reused': reuse}
+        with app.app_context():
+            if not reuse:
+                log(f'生成合成数据: {db_path}')
+                started = time.perf_counter()
+                seeder = Seeder(params, seed)
+                seeder.seed()
+                seed_report.update(seconds=round(time.perf_counter() - started, 2), rows=seeder.rows)
+            world_id, project_id = db.session.execute(
+                select(World.id, World.project_id).order_by(World.id).limit(1)
+            ).one()
+            db.session.remove()
+
+        targets = {'world_id': world_id, 'project_id': project_id}
+        client = app.test_client()
+        results = {}
+        for scenario in selected:
+            iterations = max(1, int(params['iterations'] * scenario.weight))
+            log(f'运行场景 {scenario.name}（{iterations} 次）')
+            results[scenario.name] = run_scenario(client, scenario, targets, iterations)
+        for engine in [db.get_engine(app), app.extensions.get('sqlalchemy_read_engine')]:
+            if engine is not None:
+                engine.dispose()
+    finally:
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    return {
+        'schema': REPORT_SCHEMA,
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'git': _git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+        },
+        'params': dict(params, seed=seed),
+        'seed': seed_report,
+        'scenarios': results,
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.2,
+                    min_delta_ms: float = 2.0) -> List[str]:
+    """
+    与基线报告比较，返回回归说明列表：
+    p95 延迟增长超过 threshold 比例且绝对增长超过 min_delta_ms，或每次请求的最大语句数增加
+    数据规模或随机种子不同的报告不可比较，抛出 ValueError
+    """
+    if baseline.get('params') != current.get('params'):
+        raise ValueError('基线报告的数据规模或随机种子不同，无法比较')
+    regressions = []
+    for name, result in current['scenarios'].items():
+        base = baseline['scenarios'].get(name)
+        if base is None:
+            continue
+        old_p95, new_p95 = base['latency_ms']['p95'], result['latency_ms']['p95']
+        if new_p95 > old_p95 * (1 + threshold) and new_p95 - old_p95 > min_delta_ms:
+            regressions.append(f'{name}: p95 {old_p95:.1f}ms -> {new_p95:.1f}ms')
+        if result['queries']['max'] > base['queries']['max']:
+            regressions.append(f'{name}: 语句数 {base["queries"]["max"]} -> {result["queries"]["max"]}')
+    return regressions
+
+
+def format_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    lines = [f'{"场景":<28}{"p50":>10}{"p95":>10}{"p99":>10}{"语句数":>8}{"基线p95":>10}']
+    for name, result in report['scenarios'].items():
+        latency = result['latency_ms']
+        base = (baseline or {}).get('scenarios', {}).get(name)
+        base_p95 = f'{base["latency_ms"]["p95"]:.1f}' if base else '-'
+        lines.append(f'{name:<28}{latency["p50"]:>10.1f}{latency["p95"]:>10.1f}{latency["p99"]:>10.1f}'
+                     f'{result["queries"]["max"]:>8}{base_p95:>10}')
+    lines.append(f'峰值内存: {report["peak_rss_kb"]} KB')
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='合成数据 API 负载基准测试')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small', help='预设规模（各项可单独覆盖）')
+    for name in SCALES['tiny']:
+        parser.add_argument(f'--{name.replace("_", "-")}', type=int, dest=name, help=f'每个世界的 {name}')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', help='数据库文件路径（缺省使用临时目录）')
+    parser.add_argument('--reuse-db', action='store_true', help='数据库文件已存在时跳过数据生成')
+    parser.add_argument('--scenario', action='append', choices=[scenario.name for scenario in SCENARIOS],
+                        help='只运行指定场景（可重复）')
+    parser.add_argument('--output', default='benchmark_report.json', help='JSON 报告输出路径')
+    parser.add_argument('--baseline', help='与之比较的基线报告')
+    parser.add_argument('--threshold', type=float, default=0.2, help='p95 延迟允许的增长比例')
+    args = parser.parse_args(argv)
+
+    params = dict(SCALES[args.scale])
+    params.update({name: getattr(args, name) for name in SCALES['tiny'] if getattr(args, name) is not None})
+    report = run_benchmark(params, seed=args.seed, db_path=args.db, reuse_db=args.reuse_db,
+                           scenarios=args.scenario, log=lambda message: print(message, file=sys.stderr))
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print(format_report(report, baseline))
+    if baseline is None:
+        return 0
+    regressions = compare_reports(baseline, report, args.threshold)
+    for line in regressions:
+        print(f'回归: {line}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,32 @@
+"""Add search_index full-text table
+
+Revision ID: 7e2b4d9a1c58
+Revises: 5c7a9e1f2b36
+Create Date: 2026-10-17 16:20:41.527903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.services.search_service import SEARCH_TABLE, ensure_search_index, rebuild_search_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e2b4d9a1c58'
+down_revision: Union[str, Sequence[str], None] = '5c7a9e1f2b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # FTS5 虚拟表，建立后根据已有数据建立索引（写入前需逐字切分中文，无法用纯SQL完成）
+    connection = op.get_bind()
+    if ensure_search_index(connection):
+        rebuild_search_index(connection)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
@@ -0,0 +1,32 @@
+"""Add worker_id and heartbeat_at to ai_jobs
+
+Revision ID: e4a6c8d0f2b5
+Revises: c6e8a0b2d4f7
+Create Date: 2026-10-18 10:12:41.583920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a6c8d0f2b5'
+down_revision: Union[str, Sequence[str], None] = 'c6e8a0b2d4f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('ai_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('worker_id', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('ai_jobs', schema=None) as batch_op:
+        batch_op.drop_column('heartbeat_at')
+        batch_op.drop_column('worker_id')
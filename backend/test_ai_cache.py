@@ -0,0 +1,95 @@
+"""
+AI响应缓存测试：SQLite层的过期与LRU淘汰、多级缓存回填、缓存键规范化与 should_cache 规则
+"""
+import pytest
+
+from app.services import ai_cache
+from app.services.ai_cache import AIResponseCache, MemoryCacheTier, SQLiteCacheTier, make_cache_key
+
+MESSAGES = [{'role': 'user', 'content': '写一个开篇'}]
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds=1.0):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ai_cache.time, 'time', clock)
+    return clock
+
+
+def test_sqlite_tier_expires_entries(tmp_path, clock):
+    tier = SQLiteCacheTier(path=str(tmp_path / 'cache.db'), ttl=60)
+    tier.set('a', {'content': '一'})
+    clock.advance(59)
+    assert tier.get('a') == {'content': '一'}
+    clock.advance(1)
+    assert tier.get('a') is None
+    assert tier.size() == 0
+
+
+def test_sqlite_tier_evicts_least_recently_accessed(tmp_path, clock):
+    tier = SQLiteCacheTier(path=str(tmp_path / 'cache.db'), max_entries=3, ttl=None)
+    for key in ('a', 'b', 'c'):
+        tier.set(key, {'content': key})
+        clock.advance()
+    # 访问 a 之后，b 成为最久未访问的条目
+    assert tier.get('a') == {'content': 'a'}
+    clock.advance()
+    tier.set('d', {'content': 'd'})
+    assert tier.size() == 3
+    assert tier.get('b') is None
+    assert [tier.get(key) is not None for key in ('a', 'c', 'd')] == [True, True, True]
+
+
+def test_sqlite_tier_persists_across_instances(tmp_path, clock):
+    path = str(tmp_path / 'nested' / 'cache.db')
+    SQLiteCacheTier(path=path).set('a', {'content': '一'})
+    assert SQLiteCacheTier(path=path).get('a') == {'content': '一'}
+
+
+def test_hit_in_lower_tier_back_fills_upper_tiers(tmp_path, clock):
+    memory = MemoryCacheTier(maxsize=8, ttl=None)
+    sqlite = SQLiteCacheTier(path=str(tmp_path / 'cache.db'))
+    cache = AIResponseCache(tiers=[memory, sqlite])
+    sqlite.set('a', {'content': '一'})
+
+    assert cache.get('a') == {'content': '一'}
+    assert memory.get('a') == {'content': '一'}
+    assert cache.get('a') == {'content': '一'}
+    assert cache.get('missing') is None
+
+    stats = cache.stats()
+    assert stats['tier_hits'] == {'memory': 1, 'sqlite': 1}
+    assert (stats['hits'], stats['misses']) == (2, 1)
+
+
+def test_cache_key_is_canonical():
+    key = make_cache_key('openai', 'gpt', MESSAGES, {'temperature': 0, 'max_tokens': 100})
+    # 参数顺序无关，超时与 cache 开关不参与缓存键
+    assert key == make_cache_key('openai', 'gpt', MESSAGES, {'max_tokens': 100, 'temperature': 0})
+    assert key == make_cache_key('openai', 'gpt', MESSAGES,
+                                 {'max_tokens': 100, 'temperature': 0, 'timeout': 30, 'cache': True})
+    assert key != make_cache_key('openai', 'gpt', MESSAGES, {'temperature': 0, 'max_tokens': 200})
+    assert key != make_cache_key('anthropic', 'gpt', MESSAGES, {'temperature': 0, 'max_tokens': 100})
+
+
+@pytest.mark.parametrize('temperature, opt_in, expected', [
+    (0, None, True),
+    (0, False, False),
+    (0.7, None, False),
+    (0.7, True, True),
+    (None, None, True),
+])
+def test_should_cache(temperature, opt_in, expected):
+    assert AIResponseCache(tiers=[]).should_cache(temperature, opt_in) is expected
+    assert AIResponseCache(tiers=[], enabled=False).should_cache(temperature, opt_in) is False
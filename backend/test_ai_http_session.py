@@ -0,0 +1,195 @@
+"""
+AI提供商HTTP会话测试：使用本地模拟上游验证连接复用与限流重试
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services.providers.siliconflow_provider import SiliconFlowProvider
+from app.services.providers.anthropic_provider import AnthropicProvider
+
+
+class MockUpstream(ThreadingHTTPServer):
+    """记录每个请求所用的客户端连接，可预设若干次失败响应"""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), MockHandler)
+        self.client_ports = []
+        self.failures = []  # 依次返回的错误状态码
+        self.retry_after = '0'
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/v1'
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.client_ports.append(self.client_address[1])
+        if self.server.failures:
+            self._send(self.server.failures.pop(0), {'error': 'busy'}, {'Retry-After': self.server.retry_after})
+        elif self.path.endswith('/messages'):
+            self._send(200, {
+                'content': [{'type': 'text', 'text': '你好'}],
+                'model': 'mock-model',
+                'usage': {'input_tokens': 3, 'output_tokens': 2}
+            })
+        else:
+            self._send(200, {
+                'choices': [{'message': {'content': '你好'}}],
+                'model': 'mock-model',
+                'usage': {'prompt_tokens': 3, 'completion_tokens': 2, 'total_tokens': 5}
+            })
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def upstream():
+    server = MockUpstream()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_provider(provider_class, upstream, **overrides):
+    provider = provider_class()
+    provider.config = {
+        'api_key': 'test-key',
+        'api_base': upstream.base_url,
+        'model': 'mock-model',
+        'timeout': 5,
+        'backoff_factor': 0,
+        **overrides
+    }
+    return provider
+
+
+@pytest.mark.parametrize('provider_class', [SiliconFlowProvider, AnthropicProvider])
+def test_sequential_calls_reuse_one_connection(upstream, provider_class):
+    provider = make_provider(provider_class, upstream)
+    try:
+        for _ in range(5):
+            result = provider.chat_completion([{'role': 'user', 'content': '测试'}])
+            assert result['content'] == '你好'
+    finally:
+        provider.close()
+
+    assert len(upstream.client_ports) == 5
+    assert len(set(upstream.client_ports)) == 1
+
+
+def test_retries_rate_limit_and_server_errors(upstream):
+    upstream.failures = [429, 503]
+    provider = make_provider(SiliconFlowProvider, upstream)
+    try:
+        result = provider.chat_completion([{'role': 'user', 'content': '测试'}])
+    finally:
+        provider.close()
+
+    assert result['content'] == '你好'
+    assert len(upstream.client_ports) == 3
+
+
+def test_gives_up_after_max_retries(upstream):
+    upstream.failures = [503] * 5
+    provider = make_provider(SiliconFlowProvider, upstream, max_retries=1)
+    try:
+        with pytest.raises(ValueError):
+            provider.chat_completion([{'role': 'user', 'content': '测试'}])
+    finally:
+        provider.close()
+
+    assert len(upstream.client_ports) == 2
+
+
+def test_timeout_is_split_into_connect_and_read(upstream):
+    provider = make_provider(SiliconFlowProvider, upstream, connect_timeout=2)
+    assert provider.get_timeout() == (2.0, 5.0)
+    assert provider.get_timeout(60) == (2.0, 60.0)
+    assert provider.get_timeout(1) == (1.0, 1.0)
+
+
+def test_status_retries_can_be_left_to_the_router(upstream):
+    upstream.failures = [429]
+    provider = make_provider(SiliconFlowProvider, upstream)
+    provider.status_retries = False
+    try:
+        with pytest.raises(ValueError):
+            provider.chat_completion([{'role': 'user', 'content': '测试'}])
+    finally:
+        provider.close()
+
+    assert len(upstream.client_ports) == 1
+
+
+class FakeService:
+    def __init__(self, *providers):
+        self.providers = {provider.provider: provider for provider in providers}
+        for provider in providers:
+            provider.status_retries = False
+            provider.is_configured = lambda: True
+
+
+def test_router_fails_over_on_rate_limit_without_waiting(upstream):
+    from app.services.ai_router import ProviderRouter
+
+    backup_upstream = MockUpstream()
+    threading.Thread(target=backup_upstream.serve_forever, daemon=True).start()
+    # 首选提供商限流且要求等待较长时间：应立即切换，而不是先在首选提供商上等待重试
+    upstream.failures = [429]
+    upstream.retry_after = '30'
+    primary = make_provider(SiliconFlowProvider, upstream)
+    backup = make_provider(AnthropicProvider, backup_upstream)
+    router = ProviderRouter(FakeService(primary, backup), failover=True, hedge=False)
+    try:
+        started = time.monotonic()
+        result = router.chat_completion(primary, [{'role': 'user', 'content': '测试'}])
+        elapsed = time.monotonic() - started
+    finally:
+        primary.close()
+        backup.close()
+        backup_upstream.shutdown()
+        backup_upstream.server_close()
+
+    assert result['content'] == '你好'
+    assert len(upstream.client_ports) == 1
+    assert len(backup_upstream.client_ports) == 1
+    assert elapsed < 1
+    assert router.stats()['failovers'] == 1
+
+
+def test_router_retries_single_provider_after_backoff(upstream):
+    from app.services.ai_router import ProviderRouter
+
+    upstream.failures = [503]
+    provider = make_provider(SiliconFlowProvider, upstream)
+    router = ProviderRouter(FakeService(provider), failover=True, hedge=False, retries=1)
+    try:
+        result = router.chat_completion(provider, [{'role': 'user', 'content': '测试'}])
+    finally:
+        provider.close()
+
+    assert result['content'] == '你好'
+    assert len(upstream.client_ports) == 2
+    assert router.stats()['retries'] == 1
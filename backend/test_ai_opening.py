@@ -0,0 +1,71 @@
+"""
+多候选开篇测试：客户端参数校验，以及每个候选使用不同切入角度的独立请求
+"""
+import pytest
+
+from app import create_app, db
+from app.api.ai import MAX_OPENING_COUNT, OPENING_ANGLES
+from app.services.ai_service import ai_service
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'opening.db'}", 'AI_JOB_RECOVERY': False})
+    with app.test_client() as client:
+        yield client
+    with app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def gathered(monkeypatch):
+    """替换并发请求，记录传入的调用与参数"""
+    captured = {}
+
+    def fake_gather(calls, concurrency=None, timeout=None):
+        captured.update(calls=calls, concurrency=concurrency, timeout=timeout)
+        return [{'content': call['messages'][1]['content'], 'provider': call['provider']} for call in calls]
+
+    monkeypatch.setattr(ai_service, 'gather_completions', fake_gather)
+    return captured
+
+
+def generate(client, **fields):
+    return client.post('/api/ai/generate-opening', json={'prompt': '少年拜入仙门', **fields})
+
+
+@pytest.mark.parametrize('fields', [
+    {'providers': 'deepseek'},
+    {'providers': []},
+    {'providers': ['deepseek', 'no-such-provider']},
+    {'concurrency': 'many'},
+    {'concurrency': 0},
+    {'concurrency': True},
+    {'timeout': -1},
+    {'timeout': 'soon'},
+    {'count': MAX_OPENING_COUNT + 1},
+])
+def test_invalid_fields_rejected(client, gathered, fields):
+    assert generate(client, **fields).status_code == 400
+    assert 'calls' not in gathered
+
+
+def test_numeric_strings_are_coerced(client, gathered):
+    response = generate(client, concurrency='4', timeout='30', count=2)
+    assert response.status_code == 200
+    assert gathered['concurrency'] == 4
+    assert gathered['timeout'] == 30.0
+
+
+def test_providers_assigned_round_robin(client, gathered):
+    providers = ai_service.get_available_providers()[:2]
+    response = generate(client, providers=providers, count=4)
+    assert response.status_code == 200
+    assert [call['provider'] for call in gathered['calls']] == [providers[0], providers[1]] * 2
+
+
+def test_every_candidate_gets_a_distinct_request(client, gathered):
+    response = generate(client, count=MAX_OPENING_COUNT, temperature=0)
+    assert response.status_code == 200
+    openings = response.get_json()['openings']
+    assert len(openings) == len(set(openings)) == len(OPENING_ANGLES)
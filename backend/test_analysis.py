@@ -0,0 +1,70 @@
+"""
+文本分析引擎测试：情感词的否定与程度副词、对话与叙述的切分、句长分布
+"""
+import pytest
+
+from app.services.analysis_service import INTENSIFIER_WEIGHT, analyze_text
+
+
+@pytest.mark.parametrize('text', ['他非常开心。', '她无比幸福。', '他很高兴。', '他十分满意。'])
+def test_intensifiers_weight_without_negating(text):
+    result = analyze_text(text)
+    assert result['positive_hits'] == INTENSIFIER_WEIGHT
+    assert result['negative_hits'] == 0
+    assert result['sentiment'] > 0
+
+
+@pytest.mark.parametrize('text, hits', [
+    ('他不开心。', 1.0),
+    ('他没有笑。', 1.0),
+    ('他无法开心。', 1.0),
+    ('他不会开心。', 1.0),
+    ('他不太开心。', INTENSIFIER_WEIGHT),
+    ('他很不开心。', INTENSIFIER_WEIGHT),
+])
+def test_negation_flips_polarity(text, hits):
+    result = analyze_text(text)
+    assert result['positive_hits'] == 0
+    assert result['negative_hits'] == hits
+    assert result['sentiment'] < 0
+
+
+def test_negated_negative_word_counts_as_positive():
+    result = analyze_text('她并不害怕。')
+    assert (result['positive_hits'], result['negative_hits']) == (1.0, 0)
+
+
+def test_dialogue_and_narrative_split():
+    result = analyze_text('“你好。”他转身跑了。')
+    # 引号内 3 字为对话，引号外的句子动作词多于描写词，计为动作
+    assert result['char_count'] == 9
+    assert result['sentence_count'] == 2
+    assert result['dialogue_ratio'] == round(3 / 9, 4)
+    assert result['action_ratio'] == round(6 / 9, 4)
+    assert result['description_ratio'] == 0
+
+
+def test_sentence_ends_inside_quote_keep_dialogue_open():
+    result = analyze_text('他说：“我很好。真的。”阳光静静洒在山上。')
+    # 引号内的句号结束句子但不结束对话
+    assert result['sentence_count'] == 3
+    assert result['dialogue_ratio'] == round(7 / 19, 4)
+    assert result['description_ratio'] == round(12 / 19, 4)
+
+
+def test_sentence_length_buckets():
+    text = '短句。' + '这' * 14 + '。' + '长' * 45 + '。' + '极' * 100 + '。'
+    result = analyze_text(text)
+    assert result['sentence_length']['distribution'] == {
+        '1-10': 1, '11-20': 1, '21-40': 0, '41-80': 1, '81+': 1,
+    }
+    assert result['sentence_length']['max'] == 101
+    # 空白不计入字数
+    assert analyze_text('他 转身\t跑了。')['char_count'] == 6
+
+
+def test_empty_text():
+    result = analyze_text('')
+    assert result['sentence_count'] == 0
+    assert result['sentiment'] == 0
+    assert result['dialogue_ratio'] == 0
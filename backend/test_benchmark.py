@@ -0,0 +1,64 @@
+"""
+基准测试工具的冒烟测试：以极小规模运行全部场景，检查报告结构与每次请求的语句数上限
+"""
+import copy
+import random
+
+import pytest
+
+from benchmark import SCALES, SCENARIOS, TextGenerator, compare_reports, run_benchmark
+
+# 与数据规模无关的接口，每次请求的语句数不应超过该值（数据包按分区查询，单独限制）
+MAX_QUERIES = 5
+MAX_BUNDLE_QUERIES = 40
+
+
+@pytest.fixture(scope='module')
+def report(tmp_path_factory):
+    params = dict(SCALES['tiny'], iterations=2)
+    return run_benchmark(params, seed=7, db_path=str(tmp_path_factory.mktemp('bench') / 'bench.db'))
+
+
+def test_report_covers_all_scenarios(report):
+    assert report['params']['seed'] == 7
+    assert report['seed']['rows']['chapter'] == SCALES['tiny']['chapters']
+    assert set(report['scenarios']) == {scenario.name for scenario in SCENARIOS}
+    for name, result in report['scenarios'].items():
+        latency = result['latency_ms']
+        assert latency['min'] <= latency['p50'] <= latency['p95'] <= latency['p99'] <= latency['max'], name
+        assert result['response_bytes'] > 0 or result['status'] == {'304': result['iterations']}, name
+
+
+def test_requests_succeed(report):
+    assert report['scenarios']['character_list_revalidate']['status'] == {'304': 2}
+    for name, result in report['scenarios'].items():
+        if name != 'character_list_revalidate':
+            assert set(result['status']) == {'200'}, (name, result['status'])
+
+
+def test_query_counts_do_not_grow_with_rows(report):
+    for name, result in report['scenarios'].items():
+        limit = MAX_BUNDLE_QUERIES if name == 'world_bundle' else MAX_QUERIES
+        assert 0 < result['queries']['max'] <= limit, (name, result['queries'])
+
+
+def test_text_generator_is_reproducible():
+    first = TextGenerator(random.Random(1), ['林青云', '苏若瑶'], ['青云山']).chapter(300)
+    second = TextGenerator(random.Random(1), ['林青云', '苏若瑶'], ['青云山']).chapter(300)
+    assert first == second
+    assert len(first) >= 300 and '“' in first
+
+
+def test_compare_reports_flags_regressions(report):
+    current = copy.deepcopy(report)
+    current['scenarios']['world_stats']['latency_ms']['p95'] = report['scenarios']['world_stats']['latency_ms']['p95'] * 3 + 10
+    current['scenarios']['region_tree']['queries']['max'] += 1
+    regressions = compare_reports(report, current)
+    assert any(line.startswith('world_stats') for line in regressions)
+    assert any(line.startswith('region_tree') for line in regressions)
+    assert compare_reports(report, report) == []
+
+    other_scale = copy.deepcopy(report)
+    other_scale['params']['chapters'] += 1
+    with pytest.raises(ValueError):
+        compare_reports(report, other_scale)
@@ -0,0 +1,52 @@
+"""
+批量导入测试：同名设定只在同一项目、同一世界内匹配
+"""
+import pytest
+
+from app import create_app, db
+from app.models import Character
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'bulk.db'}"})
+    with app.test_client() as client:
+        yield client
+    with app.app_context():
+        db.session.remove()
+
+
+def create_world(client, name):
+    return client.post('/api/worlds/', json={'name': name}).get_json()['data']['id']
+
+
+def character_count(client, world_id):
+    return client.get(f'/api/worlds/{world_id}/stats').get_json()['data']['character_count']
+
+
+def test_same_name_in_other_world_is_created_not_moved(client):
+    first = create_world(client, '世界一')
+    second = create_world(client, '世界二')
+    response = client.post('/api/characters/bulk', json=[{'name': '张三', 'world_id': first, 'description': '原有'}])
+    assert response.get_json()['created'] == 1
+    original_id = response.get_json()['characters'][0]['id']
+
+    response = client.post('/api/characters/bulk', json=[{'name': '张三', 'world_id': second, 'description': '导入'}])
+    body = response.get_json()
+    assert response.status_code == 201
+    assert (body['created'], body['updated']) == (1, 0)
+    assert body['characters'][0]['id'] != original_id
+
+    with client.application.app_context():
+        original = Character.query.get(original_id)
+        assert (original.world_id, original.description) == (first, '原有')
+    assert character_count(client, first) == 1
+    assert character_count(client, second) == 1
+
+
+def test_same_name_in_same_world_is_updated(client):
+    world_id = create_world(client, '世界一')
+    client.post('/api/characters/bulk', json=[{'name': '张三', 'world_id': world_id}])
+    body = client.post('/api/characters/bulk', json=[{'name': '张三', 'world_id': world_id, 'age': 30}]).get_json()
+    assert (body['created'], body['updated']) == (0, 1)
+    assert character_count(client, world_id) == 1
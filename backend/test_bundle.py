@@ -0,0 +1,83 @@
+"""
+世界数据包测试：分区筛选、since 增量返回与条件请求
+"""
+import json
+
+import pytest
+
+from app import create_app, db
+from app.services.bundle_service import BUNDLE_SECTIONS
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'bundle.db'}", 'AI_JOB_RECOVERY': False})
+    with app.test_client() as client:
+        yield client
+    with app.app_context():
+        db.session.remove()
+
+
+def create_world(client, name='世界'):
+    return client.post('/api/worlds/', json={'name': name}).get_json()['data']['id']
+
+
+def get_bundle(client, world_id, **params):
+    response = client.get(f'/api/worlds/{world_id}/bundle', query_string=params)
+    assert response.status_code == 200
+    return json.loads(response.get_data(as_text=True))['data']
+
+
+def test_full_bundle_contains_every_section(client):
+    world_id = create_world(client)
+    client.post('/api/characters', json={'name': '林青云', 'world_id': world_id})
+    data = get_bundle(client, world_id)
+    assert data['world_id'] == world_id
+    assert data['unchanged'] == []
+    assert list(data['sections']) == list(BUNDLE_SECTIONS)
+    assert [c['name'] for c in data['sections']['characters']] == ['林青云']
+    assert data['sections']['world']['name'] == '世界'
+
+
+def test_since_omits_unchanged_sections(client):
+    world_id = create_world(client)
+    version = get_bundle(client, world_id)['version']
+
+    data = get_bundle(client, world_id, since=version)
+    assert data['sections'] == {}
+    assert data['unchanged'] == list(BUNDLE_SECTIONS)
+    assert data['version'] == version
+
+    client.post('/api/characters', json={'name': '林青云', 'world_id': world_id})
+    data = get_bundle(client, world_id, since=version)
+    assert 'characters' in data['sections'] and 'stats' in data['sections']
+    assert [c['name'] for c in data['sections']['characters']] == ['林青云']
+    for name in ('locations', 'factions', 'regions', 'tags'):
+        assert name not in data['sections']
+        assert name in data['unchanged']
+    assert set(data['sections']) | set(data['unchanged']) == set(BUNDLE_SECTIONS)
+    assert data['version'] != version
+
+
+def test_sections_filter_and_unknown_section(client):
+    world_id = create_world(client)
+    data = get_bundle(client, world_id, sections='characters,locations')
+    assert list(data['sections']) == ['characters', 'locations']
+    assert list(data['versions']) == ['characters', 'locations']
+
+    response = client.get(f'/api/worlds/{world_id}/bundle', query_string={'sections': 'characters,unknown'})
+    assert response.status_code == 400
+    assert client.get('/api/worlds/999/bundle').status_code == 404
+
+
+def test_unchanged_bundle_returns_304(client):
+    world_id = create_world(client)
+    response = client.get(f'/api/worlds/{world_id}/bundle')
+    tag = response.headers['ETag']
+    response.close()
+    assert client.get(f'/api/worlds/{world_id}/bundle', headers={'If-None-Match': tag}).status_code == 304
+
+    client.post('/api/characters', json={'name': '林青云', 'world_id': world_id})
+    response = client.get(f'/api/worlds/{world_id}/bundle', headers={'If-None-Match': tag})
+    assert response.status_code == 200
+    response.close()
@@ -0,0 +1,127 @@
+"""
+章节正文增量更新测试：文本操作的应用、版本冲突与字数变化
+"""
+import pytest
+
+from app import create_app, db
+from app.api.chapter import apply_text_operations
+from app.models import Project, Chapter
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'patch.db'}", 'AI_JOB_RECOVERY': False})
+    yield app
+    with app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def chapter_id(app):
+    with app.app_context():
+        project = Project(title='长篇', pen_name='作者', genre='玄幻', target_audience='男频',
+                          core_theme='成长', synopsis='简介')
+        db.session.add(project)
+        db.session.flush()
+        chapter = Chapter(project_id=project.id, title='第一章', content='天色渐暗。', word_count=5, order_index=0)
+        db.session.add(chapter)
+        db.session.commit()
+        chapter_id = chapter.id
+        db.session.remove()
+    return chapter_id
+
+
+def patch(app, chapter_id, version, operations):
+    return app.test_client().patch(f'/api/chapters/{chapter_id}/content',
+                                   json={'version': version, 'operations': operations})
+
+
+def test_operations_chain_offsets():
+    # 第二个操作的偏移量基于第一个操作执行后的文本
+    text, delta = apply_text_operations('天色渐暗。', [
+        {'op': 'insert', 'offset': 0, 'text': '远处'},
+        {'op': 'delete', 'offset': 2, 'length': 2},
+        {'op': 'insert', 'offset': 4, 'text': '下来'},
+    ])
+    assert text == '远处渐暗下来。'
+    assert delta == 2
+
+
+@pytest.mark.parametrize('operation', [
+    {'op': 'insert', 'offset': 6, 'text': 'x'},
+    {'op': 'insert', 'offset': -1, 'text': 'x'},
+    {'op': 'insert', 'offset': True, 'text': 'x'},
+    {'op': 'insert', 'offset': 0},
+    {'op': 'delete', 'offset': 3, 'length': 3},
+    {'op': 'delete', 'offset': 0, 'length': -1},
+    {'op': 'replace', 'offset': 0, 'text': 'x'},
+    'insert',
+])
+def test_invalid_operations_rejected(operation):
+    with pytest.raises(ValueError):
+        apply_text_operations('天色渐暗。', [operation])
+
+
+def test_patch_applies_operations_and_updates_word_count(app, chapter_id):
+    response = patch(app, chapter_id, 1, [
+        {'op': 'insert', 'offset': 5, 'text': '他推开了门。'},
+        {'op': 'delete', 'offset': 0, 'length': 2},
+    ])
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['version'] == 2
+    assert body['word_count'] == len('渐暗。他推开了门。')
+    with app.app_context():
+        chapter = Chapter.query.get(chapter_id)
+        assert chapter.content == '渐暗。他推开了门。'
+        assert (chapter.version, chapter.word_count) == (2, 9)
+
+
+def test_stale_version_conflicts(app, chapter_id):
+    assert patch(app, chapter_id, 1, [{'op': 'insert', 'offset': 0, 'text': '夜'}]).status_code == 200
+    response = patch(app, chapter_id, 1, [{'op': 'insert', 'offset': 0, 'text': '晨'}])
+    assert response.status_code == 409
+    assert response.get_json()['version'] == 2
+    with app.app_context():
+        assert Chapter.query.get(chapter_id).content == '夜天色渐暗。'
+
+
+def test_out_of_range_operation_is_rejected_without_writing(app, chapter_id):
+    response = patch(app, chapter_id, 1, [
+        {'op': 'insert', 'offset': 0, 'text': '夜'},
+        {'op': 'delete', 'offset': 4, 'length': 10},
+    ])
+    assert response.status_code == 400
+    assert 'length' in response.get_json()['error']
+    assert patch(app, chapter_id, 1, [{'op': 'insert', 'offset': 99, 'text': '夜'}]).status_code == 400
+    with app.app_context():
+        chapter = Chapter.query.get(chapter_id)
+        assert (chapter.content, chapter.version, chapter.word_count) == ('天色渐暗。', 1, 5)
+
+
+@pytest.mark.parametrize('version', ['1', 1.0, True, None])
+def test_non_integer_version_rejected(app, chapter_id, version):
+    response = patch(app, chapter_id, version, [{'op': 'insert', 'offset': 0, 'text': '夜'}])
+    assert response.status_code == 400
+    with app.app_context():
+        chapter = Chapter.query.get(chapter_id)
+        assert (chapter.content, chapter.version) == ('天色渐暗。', 1)
+        assert type(chapter.version) is int
+
+
+def test_word_count_recomputed_from_content(app, chapter_id):
+    # 绕过保存接口创建的章节可能没有维护字数
+    with app.app_context():
+        Chapter.query.filter_by(id=chapter_id).update({Chapter.word_count: 0})
+        db.session.commit()
+    response = patch(app, chapter_id, 1, [{'op': 'insert', 'offset': 0, 'text': '夜'}])
+    assert response.get_json()['word_count'] == 6
+    with app.app_context():
+        assert Chapter.query.get(chapter_id).word_count == 6
+
+
+def test_missing_fields_and_unknown_chapter(app, chapter_id):
+    client = app.test_client()
+    assert client.patch(f'/api/chapters/{chapter_id}/content', json={'operations': []}).status_code == 400
+    assert client.patch(f'/api/chapters/{chapter_id}/content', json={'version': 1}).status_code == 400
+    assert patch(app, 999, 1, []).status_code == 404
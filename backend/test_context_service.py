@@ -0,0 +1,45 @@
+"""
+写作上下文测试：项目所在世界中的设定同样进入上下文
+"""
+import pytest
+
+from app import create_app, db
+from app.models import Project, World, Character, Location
+from app.services.context_service import collect_settings
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'context.db'}", 'AI_JOB_RECOVERY': False})
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+def make_project(title):
+    project = Project(title=title, pen_name='作者', genre='玄幻', target_audience='男频', core_theme='成长', synopsis='简介')
+    db.session.add(project)
+    db.session.flush()
+    return project
+
+
+def test_collect_settings_includes_world_scoped_settings(app):
+    project = make_project('长篇')
+    other = make_project('另一部')
+    world = World(name='世界', project_id=project.id)
+    other_world = World(name='别的世界', project_id=other.id)
+    db.session.add_all([world, other_world])
+    db.session.flush()
+    db.session.add_all([
+        Character(name='林青云', project_id=project.id, description='项目角色'),
+        Character(name='苏若瑶', world_id=world.id, description='世界角色'),
+        Character(name='韩霜', world_id=other_world.id, description='其他世界的角色'),
+        Location(name='青云山', world_id=world.id, description='世界地点'),
+    ])
+    db.session.commit()
+
+    settings = collect_settings(project.id, '林青云与苏若瑶、韩霜在青云山相遇。')
+    assert '林青云' in settings
+    assert '苏若瑶' in settings
+    assert '青云山' in settings
+    assert '韩霜' not in settings
@@ -0,0 +1,122 @@
+"""
+条件请求测试：未修改时返回 304，各种写入路径都会使相关范围的 ETag 失效
+"""
+import pytest
+
+from app import create_app, db
+from app.models import Project, Chapter
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'etag.db'}", 'AI_JOB_RECOVERY': False})
+    with app.test_client() as client:
+        yield client
+    with app.app_context():
+        db.session.remove()
+
+
+def create_world(client, name='世界'):
+    return client.post('/api/worlds/', json={'name': name}).get_json()['data']['id']
+
+
+def create_character(client, world_id, name='林青云'):
+    return client.post('/api/characters', json={'name': name, 'world_id': world_id}).get_json()['id']
+
+
+def etag(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    return response.headers['ETag']
+
+
+def test_unchanged_poll_returns_304(client):
+    world_id = create_world(client)
+    create_character(client, world_id)
+    path = f'/api/characters?world_id={world_id}'
+    tag = etag(client, path)
+    response = client.get(path, headers={'If-None-Match': tag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == tag
+    # 压缩响应的 ETag 带 :gzip 后缀，同样能匹配
+    gzip_tag = client.get(path, headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+    assert client.get(path, headers={'If-None-Match': gzip_tag}).status_code == 304
+
+
+def test_orm_insert_update_delete_change_etag(client):
+    world_id = create_world(client)
+    path = f'/api/characters?world_id={world_id}'
+    tags = [etag(client, path)]
+
+    character_id = create_character(client, world_id)
+    tags.append(etag(client, path))
+    client.put(f'/api/characters/{character_id}', json={'description': '新的简介'})
+    tags.append(etag(client, path))
+    client.delete(f'/api/characters/{character_id}')
+    tags.append(etag(client, path))
+
+    assert len(set(tags)) == 4
+    assert client.get(path, headers={'If-None-Match': tags[0]}).status_code == 200
+
+
+def test_query_update_changes_etag(client):
+    with client.application.app_context():
+        project = Project(title='长篇', pen_name='作者', genre='玄幻', target_audience='男频',
+                          core_theme='成长', synopsis='简介')
+        db.session.add(project)
+        db.session.flush()
+        chapter = Chapter(project_id=project.id, title='第一章', content='天色渐暗。', order_index=0)
+        db.session.add(chapter)
+        db.session.commit()
+        project_id, chapter_id = project.id, chapter.id
+        db.session.remove()
+
+    list_path = f'/api/projects/{project_id}/chapters'
+    detail_path = f'/api/chapters/{chapter_id}'
+    list_tag, detail_tag = etag(client, list_path), etag(client, detail_path)
+    # 正文增量更新使用 Query.update() 条件更新，不触发模型事件
+    response = client.patch(f'/api/chapters/{chapter_id}/content',
+                            json={'version': 1, 'operations': [{'op': 'insert', 'offset': 0, 'text': '夜'}]})
+    assert response.status_code == 200
+    assert client.get(list_path, headers={'If-None-Match': list_tag}).status_code == 200
+    response = client.get(detail_path, headers={'If-None-Match': detail_tag})
+    assert response.status_code == 200
+    assert response.get_json()['content'] == '夜天色渐暗。'
+
+
+def test_bulk_upsert_changes_etag(client):
+    world_id = create_world(client)
+    path = f'/api/characters?world_id={world_id}'
+    tag = etag(client, path)
+    client.post('/api/characters/bulk', json=[{'name': '苏若瑶', 'world_id': world_id}])
+    response = client.get(path, headers={'If-None-Match': tag})
+    assert response.status_code == 200
+    assert [character['name'] for character in response.get_json()] == ['苏若瑶']
+
+    tag = response.headers['ETag']
+    client.post('/api/characters/bulk', json=[{'name': '苏若瑶', 'world_id': world_id, 'age': 18}])
+    assert client.get(path, headers={'If-None-Match': tag}).status_code == 200
+
+
+def test_moving_a_row_between_worlds_invalidates_both(client):
+    first, second = create_world(client, '世界一'), create_world(client, '世界二')
+    character_id = create_character(client, first)
+    first_path = f'/api/characters?world_id={first}'
+    second_path = f'/api/characters?world_id={second}'
+    first_tag, second_tag = etag(client, first_path), etag(client, second_path)
+
+    client.put(f'/api/characters/{character_id}', json={'world_id': second})
+
+    response = client.get(first_path, headers={'If-None-Match': first_tag})
+    assert response.status_code == 200 and response.get_json() == []
+    response = client.get(second_path, headers={'If-None-Match': second_tag})
+    assert response.status_code == 200 and [c['id'] for c in response.get_json()] == [character_id]
+
+
+def test_write_in_other_world_keeps_etag(client):
+    first, second = create_world(client, '世界一'), create_world(client, '世界二')
+    path = f'/api/characters?world_id={first}'
+    tag = etag(client, path)
+    create_character(client, second)
+    assert client.get(path, headers={'If-None-Match': tag}).status_code == 304
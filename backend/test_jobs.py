@@ -0,0 +1,140 @@
+"""
+AI后台任务队列测试：提交、轮询、取消与按心跳回收
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import create_app, db
+from app.models import AIJob
+from app.services.job_service import JOB_STALE_SECONDS, job_queue, register_job
+
+release = threading.Event()
+
+
+@register_job('test_echo')
+def echo_job(params, job):
+    job.append(params.get('text', ''))
+    job.set_progress(0.5)
+    return {'echo': params.get('text', '')}
+
+
+@register_job('test_wait')
+def wait_job(params, job):
+    job.append('开始')
+    while not release.is_set():
+        job.check_cancelled()
+        time.sleep(0.01)
+    return {'done': True}
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'jobs.db'}", 'AI_JOB_RECOVERY': False})
+    release.clear()
+    yield app
+    release.set()
+    with app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def wait_for_status(client, job_id, statuses, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f'/api/jobs/{job_id}').get_json()['job']
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f'任务 {job_id} 未进入 {statuses}: {job}')
+
+
+def test_submit_and_poll(client):
+    response = client.post('/api/jobs', json={'type': 'test_echo', 'params': {'text': '第一章'}})
+    assert response.status_code == 202
+    job = wait_for_status(client, response.get_json()['job_id'], ('succeeded', 'failed'))
+    assert job['status'] == 'succeeded'
+    assert job['output'] == '第一章'
+    assert job['result'] == {'echo': '第一章'}
+    assert job['progress'] == 1.0
+
+
+def test_submit_validation(client):
+    assert client.post('/api/jobs', json={}).status_code == 400
+    assert client.post('/api/jobs', json={'type': 'no_such_job'}).status_code == 400
+    assert client.get('/api/jobs/999').status_code == 404
+    assert client.post('/api/jobs/999/cancel').status_code == 404
+
+
+def test_cancel_running_job(client):
+    job_id = client.post('/api/jobs', json={'type': 'test_wait'}).get_json()['job_id']
+    wait_for_status(client, job_id, ('running',))
+    body = client.post(f'/api/jobs/{job_id}/cancel').get_json()
+    assert body['success'] is True
+    job = wait_for_status(client, job_id, ('cancelled', 'failed', 'succeeded'))
+    assert job['status'] == 'cancelled'
+    assert job['cancel_requested'] is True
+    assert job['output'] == '开始'
+
+
+def test_list_jobs_filters_by_status(client):
+    job_id = client.post('/api/jobs', json={'type': 'test_echo', 'params': {'text': 'x'}}).get_json()['job_id']
+    wait_for_status(client, job_id, ('succeeded',))
+    jobs = client.get('/api/jobs?status=succeeded').get_json()['jobs']
+    assert [job['id'] for job in jobs] == [job_id]
+    assert 'output' not in jobs[0]
+
+
+def test_recover_only_touches_stale_jobs(app, client):
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=JOB_STALE_SECONDS * 2)
+    with app.app_context():
+        jobs = {
+            # 其他进程仍在运行：心跳未超时
+            'live_running': AIJob(job_type='test_echo', status='running', worker_id='other:1:a',
+                                  started_at=stale, heartbeat_at=now),
+            'live_queued': AIJob(job_type='test_echo', status='queued', worker_id='other:1:a', heartbeat_at=now),
+            # 所在进程已退出：心跳超时
+            'dead_running': AIJob(job_type='test_echo', status='running', worker_id='gone:2:b',
+                                  started_at=stale, heartbeat_at=stale),
+            'dead_queued': AIJob(job_type='test_echo', status='queued', params='{"text": "接管"}',
+                                 worker_id='gone:2:b', heartbeat_at=stale),
+        }
+        db.session.add_all(jobs.values())
+        db.session.commit()
+        ids = {name: job.id for name, job in jobs.items()}
+        db.session.remove()
+
+    job_queue.recover(app)
+
+    assert wait_for_status(client, ids['dead_queued'], ('succeeded',))['output'] == '接管'
+    with app.app_context():
+        status = {name: AIJob.query.get(job_id).status for name, job_id in ids.items()}
+        assert AIJob.query.get(ids['dead_queued']).worker_id == job_queue.worker_id
+        assert AIJob.query.get(ids['live_queued']).worker_id == 'other:1:a'
+    assert status == {'live_running': 'running', 'live_queued': 'queued',
+                      'dead_running': 'failed', 'dead_queued': 'succeeded'}
+
+
+def test_create_app_does_not_fail_running_jobs(tmp_path):
+    uri = f"sqlite:///{tmp_path / 'restart.db'}"
+    app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'AI_JOB_RECOVERY': False})
+    with app.app_context():
+        job = AIJob(job_type='test_echo', status='running', worker_id='other:1:a',
+                    started_at=datetime.utcnow(), heartbeat_at=datetime.utcnow())
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+        db.session.remove()
+
+    # 另一个工作进程启动并执行回收
+    second = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'AI_JOB_RECOVERY': True})
+    with second.app_context():
+        assert AIJob.query.get(job_id).status == 'running'
+        db.session.remove()
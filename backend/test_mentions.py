@@ -0,0 +1,134 @@
+"""
+提及索引测试：最长匹配、别名解析、按正文与词典哈希的增量扫描、章节删除与窗口共现
+"""
+import json
+
+import pytest
+
+from app import create_app, db
+from app.models import Project, Chapter, Character, ChapterMention, MentionIndexState
+from app.services.mention_service import (
+    AhoCorasick, _parse_aliases, get_appearance_timeline, get_cooccurrence, refresh_project_mentions
+)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'mentions.db'}", 'AI_JOB_RECOVERY': False})
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def project_id(app):
+    project = Project(title='长篇', pen_name='作者', genre='玄幻', target_audience='男频', core_theme='成长', synopsis='简介')
+    db.session.add(project)
+    db.session.commit()
+    return project.id
+
+
+def add_chapter(project_id, content, order_index=0):
+    chapter = Chapter(project_id=project_id, title=f'第{order_index + 1}章', content=content, order_index=order_index)
+    db.session.add(chapter)
+    db.session.commit()
+    return chapter
+
+
+def add_character(project_id, name, aliases=''):
+    character = Character(name=name, project_id=project_id, alternative_names=aliases)
+    db.session.add(character)
+    db.session.commit()
+    return character
+
+
+def mention_counts(chapter_id):
+    return {row.entity_id: row.count for row in ChapterMention.query.filter_by(chapter_id=chapter_id)}
+
+
+def test_find_prefers_longest_non_overlapping_match():
+    automaton = AhoCorasick(['林动', '林动天', '动天'])
+    matches = [(start, automaton.patterns[index]) for start, index in automaton.find('林动天来了，林动也来了')]
+    assert matches == [(0, '林动天'), (6, '林动')]
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('["小林", " 青云 "]', ['小林', '青云']),
+    ('小林、青云,阿云', ['小林', '青云', '阿云']),
+    ('"小林，青云"', ['小林', '青云']),
+    ('', []),
+    (None, []),
+])
+def test_parse_aliases(value, expected):
+    assert _parse_aliases(value) == expected
+
+
+def test_longer_name_is_not_counted_as_its_prefix(project_id):
+    lin_dong = add_character(project_id, '林动')
+    lin_dong_tian = add_character(project_id, '林动天')
+    chapter = add_chapter(project_id, '林动天看着林动。林动天笑了。')
+    refresh_project_mentions(project_id)
+    assert mention_counts(chapter.id) == {lin_dong.id: 1, lin_dong_tian.id: 2}
+
+
+def test_aliases_are_indexed(project_id):
+    character = add_character(project_id, '林青云', json.dumps(['小林', '青云'], ensure_ascii=False))
+    chapter = add_chapter(project_id, '小林回头，青云剑在手，林青云笑了。')
+    refresh_project_mentions(project_id)
+    assert mention_counts(chapter.id) == {character.id: 3}
+
+
+def test_rescans_follow_content_and_dictionary_hashes(project_id):
+    character = add_character(project_id, '林青云')
+    chapter = add_chapter(project_id, '林青云与苏若瑶。')
+    assert refresh_project_mentions(project_id)['scanned'] == 1
+    result = refresh_project_mentions(project_id)
+    assert (result['scanned'], result['skipped']) == (0, 1)
+
+    # 只改标题：修改时间变化但正文哈希不变，只更新记录、不重新扫描
+    chapter.title = '新标题'
+    db.session.commit()
+    assert refresh_project_mentions(project_id)['scanned'] == 0
+    assert MentionIndexState.query.get(chapter.id).source_updated_at == chapter.updated_at
+
+    # 新增角色改变词典哈希，章节重新扫描
+    su = add_character(project_id, '苏若瑶')
+    assert refresh_project_mentions(project_id)['scanned'] == 1
+    assert mention_counts(chapter.id) == {character.id: 1, su.id: 1}
+
+    # 角色改名同样只通过词典哈希触发重新扫描
+    su.name = '苏瑶'
+    db.session.commit()
+    assert refresh_project_mentions(project_id)['scanned'] == 1
+    assert mention_counts(chapter.id) == {character.id: 1}
+
+
+def test_deleting_a_chapter_removes_its_index_rows(project_id):
+    add_character(project_id, '林青云')
+    chapter = add_chapter(project_id, '林青云。')
+    refresh_project_mentions(project_id)
+    chapter_id = chapter.id
+    assert ChapterMention.query.filter_by(chapter_id=chapter_id).count() == 1
+
+    db.session.delete(chapter)
+    db.session.commit()
+    assert ChapterMention.query.filter_by(chapter_id=chapter_id).count() == 0
+    assert MentionIndexState.query.filter_by(chapter_id=chapter_id).count() == 0
+
+
+def test_timeline_and_windowed_cooccurrence(project_id):
+    lin = add_character(project_id, '林青云')
+    su = add_character(project_id, '苏若瑶')
+    first = add_chapter(project_id, '林青云与苏若瑶同行。', 0)
+    second = add_chapter(project_id, '林青云' + '。' * 30 + '苏若瑶', 1)
+
+    timeline = {item['entity_id']: item for item in get_appearance_timeline(project_id)}
+    assert timeline[lin.id]['chapter_count'] == 2
+    assert (timeline[lin.id]['first_chapter_id'], timeline[lin.id]['last_chapter_id']) == (first.id, second.id)
+
+    # 不指定窗口时按同章计数，两章都算共现
+    chapter_level = get_cooccurrence(project_id)
+    assert chapter_level['matrix'][0][1] == 2
+    # 窗口为 10 字时，第二章中两人相距超过窗口，不计共现
+    windowed = get_cooccurrence(project_id, window=10)
+    assert windowed['matrix'][0][1] == windowed['matrix'][1][0] == 1
@@ -0,0 +1,92 @@
+"""
+运行指标测试：直方图输出、N+1 检测、Server-Timing 响应头与流式响应的查询统计
+"""
+import logging
+
+import pytest
+
+from app import create_app, db
+from app.models import Character
+from app.services import metrics_service
+from app.services.metrics_service import Histogram, MetricsRegistry
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'metrics.db'}", 'AI_JOB_RECOVERY': False})
+    yield app
+    with app.app_context():
+        db.session.remove()
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.register(Histogram('latency_seconds', 'Latency', ('route',), buckets=(0.1, 1.0)))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, '/api/x')
+    lines = registry.render().splitlines()
+    assert '# TYPE latency_seconds histogram' in lines
+    assert 'latency_seconds_bucket{route="/api/x",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/api/x",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{route="/api/x",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{route="/api/x"} 4.05' in lines
+    assert 'latency_seconds_count{route="/api/x"} 4' in lines
+
+
+def test_n_plus_one_threshold(app, monkeypatch, caplog):
+    monkeypatch.setattr(metrics_service, 'METRICS_N_PLUS_ONE_THRESHOLD', 3)
+    with app.app_context():
+        db.session.add_all([Character(name=f'角色{index}') for index in range(5)])
+        db.session.commit()
+        ids = [character.id for character in Character.query.all()]
+        db.session.remove()
+
+    with app.test_request_context('/api/characters', method='POST'), caplog.at_level(logging.WARNING):
+        route = '/api/characters'
+        before = metrics_service.n_plus_one_total.value(route)
+        metrics_service.start_request()
+        for character_id in ids[:3]:
+            db.session.execute(db.select(Character.name).where(Character.id == character_id)).all()
+        assert metrics_service.n_plus_one_total.value(route) == before
+        db.session.execute(db.select(Character.name).where(Character.id == ids[3])).all()
+        db.session.execute(db.select(Character.name).where(Character.id == ids[4])).all()
+        # 超过阈值只记录一次
+        assert metrics_service.n_plus_one_total.value(route) == before + 1
+        assert metrics_service.current_stats().queries == 5
+        db.session.remove()
+    assert any('可能的N+1查询' in record.getMessage() for record in caplog.records)
+
+
+def test_server_timing_header(app):
+    response = app.test_client().get('/api/worlds/')
+    header = response.headers['Server-Timing']
+    assert header.startswith('db;dur=')
+    assert 'queries"' in header and 'app;dur=' in header
+    response.close()
+
+
+def test_streamed_response_queries_are_recorded_on_close(app):
+    client = app.test_client()
+    world_id = client.post('/api/worlds/', json={'name': '世界'}).get_json()['data']['id']
+    route = '/api/worlds/<int:world_id>/bundle'
+    before = metrics_service.db_queries_total.value(route)
+    requests_before = metrics_service.http_requests_total.value('GET', route, 200)
+
+    response = client.get(f'/api/worlds/{world_id}/bundle')
+    header_queries = int(response.headers['Server-Timing'].split('desc="')[1].split(' ')[0])
+    response.get_data()
+    response.close()
+
+    recorded = metrics_service.db_queries_total.value(route) - before
+    # 各分区的查询在正文生成期间执行，after_request 时尚未发生
+    assert recorded > header_queries
+    assert metrics_service.http_requests_total.value('GET', route, 200) == requests_before + 1
+
+
+def test_failed_statement_does_not_leak_start_times(app):
+    with app.app_context():
+        with db.engine.connect() as connection:
+            for _ in range(3):
+                with pytest.raises(Exception):
+                    connection.exec_driver_sql('SELECT * FROM no_such_table')
+            assert connection.info.get('query_started') == []
@@ -0,0 +1,77 @@
+"""
+查询计划回归测试：确保常用查询命中复合索引，而不是全表扫描
+"""
+from datetime import datetime
+
+import pytest
+
+from app import create_app, db
+from app.models import (
+    Chapter, Volume, Character, Location, Item, Faction, HistoricalEvent,
+    Region, EntityRelation, EntityTag
+)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'plans.db'}"})
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+def explain(query):
+    """返回查询的 EXPLAIN QUERY PLAN 明细文本"""
+    statement = query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+    rows = db.session.execute(db.text(f'EXPLAIN QUERY PLAN {statement}')).fetchall()
+    return ' | '.join(row[-1] for row in rows)
+
+
+def assert_uses_index(query, index_name):
+    plan = explain(query)
+    assert index_name in plan, plan
+
+
+def test_chapter_listing_uses_project_order_index(app):
+    query = Chapter.query.filter_by(project_id=1).order_by(Chapter.order_index)
+    assert_uses_index(query, 'ix_chapter_project_order')
+    assert 'TEMP B-TREE' not in explain(query)
+
+
+def test_volume_decompose_lookup_uses_project_order_index(app):
+    assert_uses_index(Volume.query.filter_by(project_id=1, order_index=3), 'ix_volume_project_order')
+
+
+@pytest.mark.parametrize('model, index_name', [
+    (Character, 'ix_character_world_created'),
+    (Location, 'ix_location_world_created'),
+    (Item, 'ix_item_world_created'),
+    (Faction, 'ix_faction_world_created'),
+    (HistoricalEvent, 'ix_historical_events_world_created'),
+])
+def test_weekly_stats_use_world_created_index(app, model, index_name):
+    query = model.query.filter(model.world_id == 1, model.created_at >= datetime(2026, 1, 1))
+    assert_uses_index(query, index_name)
+
+
+def test_region_children_use_world_parent_index(app):
+    query = Region.query.filter_by(world_id=1, parent_region_id=2).order_by(Region.order_index)
+    assert_uses_index(query, 'ix_regions_world_parent_order')
+
+
+def test_relation_network_uses_world_status_index(app):
+    assert_uses_index(EntityRelation.query.filter_by(world_id=1, status='active'), 'ix_entity_relations_world_status')
+
+
+def test_entity_relations_by_entity_use_source_and_target_indexes(app):
+    query = EntityRelation.query.filter(
+        ((EntityRelation.source_type == 'character') & (EntityRelation.source_id == 1)) |
+        ((EntityRelation.target_type == 'character') & (EntityRelation.target_id == 1))
+    )
+    plan = explain(query)
+    assert 'ix_entity_relations_source' in plan, plan
+    assert 'ix_entity_relations_target' in plan, plan
+
+
+def test_entity_tags_use_entity_index(app):
+    assert_uses_index(EntityTag.query.filter_by(entity_type='character', entity_id=1), 'ix_entity_tags_entity')
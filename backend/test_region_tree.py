@@ -0,0 +1,44 @@
+"""
+区域树缓存测试：缓存键包含区域表版本号，构建期间提交的修改不会留下过期的树
+"""
+import pytest
+
+from app import create_app, db
+from app.api.world_setting import _region_tree_cache, build_region_tree, region_tree_version
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'regions.db'}", 'AI_JOB_RECOVERY': False})
+    with app.test_client() as client:
+        yield client
+    with app.app_context():
+        db.session.remove()
+
+
+def tree_names(client, world_id):
+    body = client.get(f'/api/world-setting/regions/tree?world_id={world_id}').get_json()
+    return [node['name'] for node in body['data']]
+
+
+def test_tree_reflects_writes(client):
+    world_id = client.post('/api/worlds/', json={'name': '世界'}).get_json()['data']['id']
+    client.post('/api/world-setting/regions', json={'world_id': world_id, 'name': '东洲'})
+    assert tree_names(client, world_id) == ['东洲']
+    client.post('/api/world-setting/regions', json={'world_id': world_id, 'name': '西洲'})
+    assert sorted(tree_names(client, world_id)) == ['东洲', '西洲']
+
+
+def test_tree_built_before_a_commit_is_not_served_after_it(client):
+    world_id = client.post('/api/worlds/', json={'name': '世界'}).get_json()['data']['id']
+    client.post('/api/world-setting/regions', json={'world_id': world_id, 'name': '东洲'})
+    with client.application.test_request_context():
+        version = region_tree_version(world_id)
+        old_tree = build_region_tree(world_id)
+        db.session.remove()
+
+    # 构建完成后、写入缓存前，另一个请求提交了区域修改
+    client.post('/api/world-setting/regions', json={'world_id': world_id, 'name': '西洲'})
+    _region_tree_cache.set((world_id, version, None, None), old_tree)
+
+    assert sorted(tree_names(client, world_id)) == ['东洲', '西洲']
@@ -0,0 +1,73 @@
+"""
+关系网络缓存测试：缓存键包含关系表与实体表的版本号，实体改名、新增关系都会反映到网络中
+"""
+import pytest
+
+from app import create_app, db
+from app.api.tags_relations import _relation_network_cache, build_relation_network, relation_network_version
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'network.db'}", 'AI_JOB_RECOVERY': False})
+    with app.test_client() as client:
+        yield client
+    with app.app_context():
+        db.session.remove()
+
+
+def create_character(client, world_id, name):
+    return client.post('/api/characters', json={'name': name, 'world_id': world_id}).get_json()['id']
+
+
+def relate(client, world_id, source_id, target_id, relation_type='朋友'):
+    response = client.post('/api/tags-relations/relations', json={
+        'world_id': world_id, 'source_type': 'character', 'source_id': source_id,
+        'target_type': 'character', 'target_id': target_id, 'relation_type': relation_type,
+    })
+    assert response.status_code == 200
+
+
+def network(client, world_id):
+    body = client.get(f'/api/tags-relations/network/{world_id}').get_json()
+    return body['data']
+
+
+@pytest.fixture
+def world(client):
+    world_id = client.post('/api/worlds/', json={'name': '世界'}).get_json()['data']['id']
+    first = create_character(client, world_id, '林青云')
+    second = create_character(client, world_id, '苏若瑶')
+    relate(client, world_id, first, second)
+    return world_id, first, second
+
+
+def test_entity_rename_changes_network(client, world):
+    world_id, first, _ = world
+    assert sorted(node['name'] for node in network(client, world_id)['nodes']) == ['林青云', '苏若瑶']
+    client.put(f'/api/characters/{first}', json={'name': '林动'})
+    assert sorted(node['name'] for node in network(client, world_id)['nodes']) == ['林动', '苏若瑶']
+
+
+def test_relation_insert_changes_network(client, world):
+    world_id, first, second = world
+    assert network(client, world_id)['stats']['total_edges'] == 1
+    third = create_character(client, world_id, '韩霜')
+    relate(client, world_id, first, third, '师徒')
+    data = network(client, world_id)
+    assert data['stats']['total_edges'] == 2
+    assert data['stats']['relation_type_stats'] == {'朋友': 1, '师徒': 1}
+
+
+def test_network_built_before_a_commit_is_not_served_after_it(client, world):
+    world_id, first, second = world
+    with client.application.test_request_context():
+        version = relation_network_version(world_id)
+        old_network = build_relation_network(world_id)
+        db.session.remove()
+
+    # 另一个进程提交了关系修改，本进程没有收到任何通知
+    relate(client, world_id, second, first, '仇敌')
+    _relation_network_cache.set((world_id, version, None, None), old_network)
+
+    assert network(client, world_id)['stats']['total_edges'] == 2
@@ -0,0 +1,86 @@
+"""
+读写分离会话测试：GET 查询走只读引擎，写入走读写引擎，写入后的查询固定在读写引擎上
+"""
+import pytest
+from sqlalchemy import select
+
+from app import create_app, db
+from app.config.db_config import SQLITE_PRAGMAS
+from app.models import Character
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'routing.db'}", 'AI_JOB_RECOVERY': False})
+    yield app
+    with app.app_context():
+        db.session.remove()
+
+
+def read_engine(app):
+    return app.extensions['sqlalchemy_read_engine']
+
+
+def bind_for_query(model=Character):
+    return db.session.get_bind(mapper=model.__mapper__, clause=select(model.id))
+
+
+def test_get_reads_use_read_only_engine(app):
+    with app.test_request_context(method='GET'):
+        assert bind_for_query() is read_engine(app)
+        connection = db.session.connection(bind_arguments={'mapper': Character.__mapper__})
+        assert connection.exec_driver_sql('PRAGMA query_only').scalar() == 1
+        db.session.remove()
+
+
+def test_post_uses_write_engine(app):
+    with app.test_request_context(method='POST'):
+        assert bind_for_query() is db.engine
+        db.session.remove()
+
+
+def test_get_with_flush_reads_its_own_writes(app):
+    with app.test_request_context(method='GET'):
+        assert bind_for_query() is read_engine(app)
+        db.session.add(Character(name='林青云'))
+        db.session.flush()
+        assert bind_for_query() is db.engine
+        assert Character.query.filter_by(name='林青云').count() == 1
+        db.session.rollback()
+        db.session.remove()
+
+    with app.test_request_context(method='GET'):
+        # 新会话重新从只读引擎开始
+        assert bind_for_query() is read_engine(app)
+        assert Character.query.count() == 0
+        db.session.remove()
+
+
+def test_get_with_text_dml_uses_write_engine(app):
+    with app.app_context():
+        db.session.add(Character(name='林青云', age=10))
+        db.session.commit()
+        db.session.remove()
+
+    with app.test_request_context(method='GET'):
+        assert db.session.execute(db.text('SELECT COUNT(*) FROM character')).scalar() == 1
+        db.session.execute(db.text('UPDATE character SET age = 20'))
+        assert db.session.execute(db.text('SELECT age FROM character')).scalar() == 20
+        db.session.connection().exec_driver_sql('UPDATE character SET age = 30')
+        assert Character.query.one().age == 30
+        db.session.commit()
+        db.session.remove()
+
+
+def test_pragmas_applied_on_connect(app):
+    with app.app_context():
+        with db.engine.connect() as connection:
+            assert connection.exec_driver_sql('PRAGMA journal_mode').scalar().lower() == 'wal'
+            assert connection.exec_driver_sql('PRAGMA busy_timeout').scalar() == SQLITE_PRAGMAS['busy_timeout']
+            assert connection.exec_driver_sql('PRAGMA synchronous').scalar() == 1  # NORMAL
+            assert connection.exec_driver_sql('PRAGMA query_only').scalar() == 0
+        with read_engine(app).connect() as connection:
+            assert connection.exec_driver_sql('PRAGMA query_only').scalar() == 1
+            assert connection.exec_driver_sql('PRAGMA busy_timeout').scalar() == SQLITE_PRAGMAS['busy_timeout']
+            with pytest.raises(Exception, match='readonly|read-only|query_only'):
+                connection.exec_driver_sql("INSERT INTO character (name) VALUES ('x')")
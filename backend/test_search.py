@@ -0,0 +1,121 @@
+"""
+全文检索测试：中文单字与多字检索、各写入路径对索引的同步、删除后移除以及过滤与分页
+"""
+import pytest
+
+from app import create_app, db
+from app.models import Project
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'search.db'}", 'AI_JOB_RECOVERY': False})
+    with app.test_client() as client:
+        yield client
+    with app.app_context():
+        db.session.remove()
+
+
+def create_project(client, title='长篇'):
+    with client.application.app_context():
+        project = Project(title=title, pen_name='作者', genre='玄幻', target_audience='男频',
+                          core_theme='成长', synopsis='简介')
+        db.session.add(project)
+        db.session.commit()
+        project_id = project.id
+        db.session.remove()
+    return project_id
+
+
+def create_chapter(client, project_id, title, content, order_index=0):
+    response = client.post('/api/chapters', json={
+        'project_id': project_id, 'title': title, 'content': content, 'order_index': order_index,
+    })
+    assert response.status_code == 201
+    return response.get_json()['id']
+
+
+def search(client, q, **params):
+    response = client.get('/api/search', query_string={'q': q, **params})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def hits(client, q, **params):
+    return [(item['entity_type'], item['entity_id']) for item in search(client, q, **params)['results']]
+
+
+@pytest.fixture
+def project_id(client):
+    return create_project(client)
+
+
+def test_cjk_single_and_multi_character_queries(client, project_id):
+    chapter_id = create_chapter(client, project_id, '第一章', '林青云站在山门前，望着远处的云海。')
+    assert hits(client, '云') == [('chapter', chapter_id)]
+    assert hits(client, '林青云') == [('chapter', chapter_id)]
+    # 多个检索词须同时命中；短语内的字必须相邻
+    assert hits(client, '山门 云海') == [('chapter', chapter_id)]
+    assert hits(client, '林云') == []
+    result = search(client, '云海')
+    assert '云海' in result['results'][0]['snippet']
+
+
+def test_put_and_patch_update_the_index(client, project_id):
+    chapter_id = create_chapter(client, project_id, '第一章', '天色渐暗。')
+    client.put(f'/api/chapters/{chapter_id}', json={'content': '晨光初现。'})
+    assert hits(client, '渐暗') == []
+    assert hits(client, '晨光') == [('chapter', chapter_id)]
+
+    # 增量更新走条件更新，不触发模型事件
+    response = client.patch(f'/api/chapters/{chapter_id}/content',
+                            json={'version': 2, 'operations': [{'op': 'insert', 'offset': 0, 'text': '远山'}]})
+    assert response.status_code == 200
+    assert hits(client, '远山') == [('chapter', chapter_id)]
+
+
+def test_bulk_import_updates_the_index(client, project_id):
+    response = client.post('/api/characters/bulk', json=[
+        {'name': '苏若瑶', 'project_id': project_id, 'description': '药谷传人'},
+    ])
+    assert response.status_code == 201
+    assert [entity_type for entity_type, _ in hits(client, '药谷')] == ['character']
+
+    client.post('/api/characters/bulk', json=[
+        {'name': '苏若瑶', 'project_id': project_id, 'description': '剑宗弟子'},
+    ])
+    assert hits(client, '药谷') == []
+    assert [entity_type for entity_type, _ in hits(client, '剑宗')] == ['character']
+
+
+def test_deleted_rows_leave_the_index(client, project_id):
+    chapter_id = create_chapter(client, project_id, '第一章', '青云山下。')
+    character_id = client.post('/api/characters', json={'name': '青云子', 'project_id': project_id}).get_json()['id']
+    assert len(hits(client, '青云')) == 2
+
+    client.delete(f'/api/chapters/{chapter_id}')
+    assert hits(client, '青云') == [('character', character_id)]
+    client.delete(f'/api/characters/{character_id}')
+    assert hits(client, '青云') == []
+
+
+def test_project_and_type_filters_with_pagination(client, project_id):
+    other = create_project(client, '另一部')
+    for index in range(5):
+        create_chapter(client, project_id, f'第{index + 1}章', f'剑光第{index}次亮起。', index)
+    create_chapter(client, other, '第一章', '剑光一闪。')
+    client.post('/api/characters', json={'name': '剑痴', 'project_id': project_id, 'personality': '剑光如雪'})
+
+    assert search(client, '剑光')['total'] == 7
+    assert search(client, '剑光', project_id=project_id)['total'] == 6
+    assert search(client, '剑光', project_id=project_id, type='character')['total'] == 1
+
+    pages = [search(client, '剑光', project_id=project_id, type='chapter', per_page=2, page=page)
+             for page in (1, 2, 3)]
+    assert [page['total'] for page in pages] == [5, 5, 5]
+    assert [len(page['results']) for page in pages] == [2, 2, 1]
+    ids = [item['entity_id'] for page in pages for item in page['results']]
+    assert len(set(ids)) == 5
+
+    assert client.get('/api/search', query_string={'q': '剑光', 'type': 'unknown'}).status_code == 400
+    assert client.get('/api/search').status_code == 400
@@ -0,0 +1,191 @@
+"""
+流式解码测试：增量SSE/NDJSON解析、各提供商格式归一化，以及针对本地模拟上游的首字延迟与单token开销基准
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app import create_app
+from app.services.ai_service import ai_service
+from app.services.stream_decoder import (
+    SSEDecoder, NDJSONDecoder, StreamDecodeError, iter_sse_deltas, iter_ndjson_deltas, relay_with_heartbeat
+)
+
+
+def sse(event, payload):
+    return f'event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n'.encode('utf-8')
+
+
+def anthropic_stream(tokens):
+    yield sse('message_start', {'type': 'message_start', 'message': {'id': 'msg_1', 'content': []}})
+    yield sse('content_block_start', {'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}})
+    yield b': ping\n\n'
+    for token in tokens:
+        yield sse('content_block_delta', {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': token}})
+    yield sse('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+    yield sse('message_delta', {'type': 'message_delta', 'delta': {'stop_reason': 'end_turn'}})
+    yield sse('message_stop', {'type': 'message_stop'})
+
+
+def split_every(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_sse_decoder_handles_arbitrary_chunk_boundaries():
+    raw = b''.join(anthropic_stream(['你好', '，', '世界']))
+    for size in (1, 2, 3, 7, len(raw)):
+        deltas = list(iter_sse_deltas(split_every(raw, size), 'anthropic'))
+        assert [d['content'] for d in deltas] == ['你好', '，', '世界', '']
+        assert deltas[-1]['finish_reason'] == 'end_turn'
+
+
+def test_sse_decoder_crlf_multiline_and_trailing_event():
+    decoder = SSEDecoder()
+    events = decoder.feed(b'event: a\r\ndata: line1\r\ndata: line2\r\n\r\ndata: tail')
+    assert events == [('a', 'line1\nline2')]
+    assert decoder.flush() == [(None, 'tail')]
+
+
+def test_openai_format_stops_at_done():
+    raw = (
+        b'data: {"choices":[{"delta":{"role":"assistant"}}]}\n\n'
+        b'data: {"choices":[{"delta":{"content":"A"}}]}\n\n'
+        b'data: {"choices":[{"delta":{},"finish_reason":"stop"}]}\n\n'
+        b'data: [DONE]\n\n'
+        b'data: {"choices":[{"delta":{"content":"ignored"}}]}\n\n'
+    )
+    deltas = list(iter_sse_deltas(split_every(raw, 5), 'siliconflow'))
+    assert [(d['content'], d['finish_reason']) for d in deltas] == [('A', None), ('', 'stop')]
+
+
+def test_google_format():
+    raw = b'data: {"candidates":[{"content":{"parts":[{"text":"x"},{"text":"y"}]}}]}\n\n'
+    assert [d['content'] for d in iter_sse_deltas([raw], 'google')] == ['xy']
+
+
+def test_upstream_error_event_raises():
+    raw = sse('error', {'type': 'error', 'error': {'type': 'overloaded_error', 'message': 'Overloaded'}})
+    with pytest.raises(StreamDecodeError):
+        list(iter_sse_deltas([raw], 'anthropic'))
+
+
+def test_ndjson_decoder():
+    decoder = NDJSONDecoder()
+    assert decoder.feed(b'{"a":1}\n{"b"') == [{'a': 1}]
+    assert decoder.feed(b':2}\n') == [{'b': 2}]
+    raw = b'{"choices":[{"delta":{"content":"z"}}]}\n'
+    assert [d['content'] for d in iter_ndjson_deltas(split_every(raw, 4), 'openai')] == ['z']
+
+
+def test_relay_sends_heartbeat_while_upstream_is_idle():
+    def slow():
+        time.sleep(0.25)
+        yield {'content': 'a', 'finish_reason': None, 'provider': 'p'}
+
+    output = list(relay_with_heartbeat(slow(), interval=0.05))
+    assert output[0] == ': keep-alive\n\n'
+    assert output[-2] == 'data: {"content":"a","finish_reason":null,"provider":"p"}\n\n'
+    assert output[-1] == 'data: [DONE]\n\n'
+
+
+def test_relay_reports_midstream_errors():
+    def broken():
+        yield {'content': 'a', 'finish_reason': None, 'provider': 'p'}
+        raise ValueError('boom')
+
+    output = list(relay_with_heartbeat(broken(), interval=1))
+    assert json.loads(output[1][len('data: '):]) == {'error': 'boom'}
+    assert output[-1] == 'data: [DONE]\n\n'
+
+
+# ==================== 端到端基准 ====================
+
+TOKEN_COUNT = 50
+TOKEN_INTERVAL = 0.01
+
+
+class FakeAnthropicHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for index, event in enumerate(anthropic_stream([f't{i} ' for i in range(TOKEN_COUNT)])):
+            if index > 3:
+                time.sleep(TOKEN_INTERVAL)
+            self.wfile.write(f'{len(event):x}\r\n'.encode() + event + b'\r\n')
+            self.wfile.flush()
+        self.wfile.write(b'0\r\n\r\n')
+
+
+@pytest.fixture
+def fake_anthropic(monkeypatch, tmp_path):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeAnthropicHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    provider = ai_service.get_provider('anthropic')
+    monkeypatch.setattr(provider, 'config', {
+        'api_key': 'test-key',
+        'api_base': f'http://127.0.0.1:{server.server_address[1]}/v1',
+        'model': 'mock-model',
+        'timeout': 5
+    })
+    monkeypatch.setattr(provider, 'is_configured', lambda: True)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'stream.db'}"})
+    yield app
+    provider.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_stream_endpoint_relays_tokens_incrementally(fake_anthropic):
+    client = fake_anthropic.test_client()
+    started = time.perf_counter()
+    response = client.post('/api/ai/stream', json={
+        'provider': 'anthropic',
+        'messages': [{'role': 'user', 'content': '写一句话'}]
+    }, buffered=False)
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    arrivals = []
+    contents = []
+    for chunk in response.response:
+        text = chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk
+        if text.startswith('data: {'):
+            payload = json.loads(text[len('data: '):])
+            if payload['content']:
+                arrivals.append(time.perf_counter() - started)
+                contents.append(payload['content'])
+    total = time.perf_counter() - started
+
+    assert contents == [f't{i} ' for i in range(TOKEN_COUNT)]
+    ttft = arrivals[0]
+    upstream_duration = TOKEN_COUNT * TOKEN_INTERVAL
+    # 首个token应在上游生成完成之前就送达客户端
+    assert ttft < upstream_duration / 2, (ttft, total)
+    # 相邻token的到达时间应跟随上游节奏，而非在末尾一次性送达
+    assert arrivals[-1] - arrivals[0] > upstream_duration / 2
+    print(f'\nTTFT={ttft * 1000:.1f}ms total={total * 1000:.1f}ms tokens={len(contents)}')
+
+
+def test_decoder_per_token_overhead():
+    raw = b''.join(anthropic_stream([f'字{i}' for i in range(20000)]))
+    chunks = split_every(raw, 512)
+    started = time.perf_counter()
+    count = sum(1 for _ in iter_sse_deltas(chunks, 'anthropic'))
+    elapsed = time.perf_counter() - started
+    per_token_us = elapsed / count * 1e6
+    print(f'\ndecode overhead={per_token_us:.2f}us/token')
+    assert count == 20001
+    assert per_token_us < 200
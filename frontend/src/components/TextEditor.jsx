@@ -332,6 +332,7 @@ const TextEditor = ({ chapterId, initialContent, onSave, projectId }) => {
         case 'continue':
           response = await aiApi.continueWriting({
             context: content,
+            chapter_id: chapterId,
             genre: aiGenre,
             length: aiLength,
             direction: aiDirection
@@ -342,6 +343,7 @@ const TextEditor = ({ chapterId, initialContent, onSave, projectId }) => {
           const selectedText = editorRef?.getModel()?.getValueInRange(editorRef.getSelection()) || content;
           response = await aiApi.rewrite({
             text: selectedText,
+            chapter_id: chapterId,
             style: aiStyle
           });
           setAiResult(response.data.rewritten);
@@ -361,7 +363,7 @@ const TextEditor = ({ chapterId, initialContent, onSave, projectId }) => {
     } finally {
       setIsAiLoading(false);
     }
-  }, [aiFunction, aiPrompt, aiGenre, aiLength, aiDirection, aiStyle, content, editorRef]);
+  }, [aiFunction, aiPrompt, aiGenre, aiLength, aiDirection, aiStyle, content, editorRef, chapterId]);
 
   // 应用AI结果到编辑器
   const applyAiResult = useCallback(() => {
@@ -163,8 +163,19 @@ const FactionOverviewManagement = ({ worldId, projectId, quickCreateTarget, onUp
     }
   };
 
-  const showDetail = (record) => {
-    setSelectedFaction(record);
+  // 列表接口只返回摘要字段，查看和编辑前加载完整记录
+  const loadFullFaction = async (record) => {
+    try {
+      const response = await factionApi.getFaction(record.id);
+      return response.data || record;
+    } catch (error) {
+      message.error('获取势力详情失败');
+      return record;
+    }
+  };
+
+  const showDetail = async (record) => {
+    setSelectedFaction(await loadFullFaction(record));
     setDetailVisible(true);
   };
 
@@ -245,8 +256,9 @@ const FactionOverviewManagement = ({ worldId, projectId, quickCreateTarget, onUp
           <Button
             type="link"
             icon={<EditOutlined />}
-            onClick={() => {
-              setEditingFaction(record);
+            onClick={async () => {
+              const fullRecord = await loadFullFaction(record);
+              setEditingFaction(fullRecord);
               setModalVisible(true);
             }}
           >
@@ -97,8 +97,19 @@ const GeneralItemManagement = ({ worldId, projectId, quickCreateTarget, onUpdate
     }
   };
 
-  const showDetail = (record) => {
-    setSelectedItem(record);
+  // 列表接口只返回摘要字段，查看和编辑前加载完整记录
+  const loadFullItem = async (record) => {
+    try {
+      const response = await itemApi.getItem(record.id);
+      return response.data || record;
+    } catch (error) {
+      message.error('获取物品详情失败');
+      return record;
+    }
+  };
+
+  const showDetail = async (record) => {
+    setSelectedItem(await loadFullItem(record));
     setDetailVisible(true);
   };
 
@@ -180,24 +191,25 @@ const GeneralItemManagement = ({ worldId, projectId, quickCreateTarget, onUpdate
           <Button
             type="link"
             icon={<EditOutlined />}
-            onClick={() => {
-              setEditingItem(record);
+            onClick={async () => {
+              const fullRecord = await loadFullItem(record);
+              setEditingItem(fullRecord);
               // 反向字段映射
               form.setFieldsValue({
-                name: record.name,
-                item_type: record.item_type,
-                rarity_level: record.rarity_level,
-                physical_properties: record.physical_properties,
-                special_effects: record.special_effects,
-                usage_requirements: record.usage_requirements,
-                durability: record.durability,
-                creator: record.creator,
-                source: record.source,
-                historical_heritage: record.historical_heritage,
-                current_owner: record.current_owner,
-                acquisition_method: record.acquisition_method,
-                importance: record.importance || 5,
-                description: record.description,
+                name: fullRecord.name,
+                item_type: fullRecord.item_type,
+                rarity_level: fullRecord.rarity_level,
+                physical_properties: fullRecord.physical_properties,
+                special_effects: fullRecord.special_effects,
+                usage_requirements: fullRecord.usage_requirements,
+                durability: fullRecord.durability,
+                creator: fullRecord.creator,
+                source: fullRecord.source,
+                historical_heritage: fullRecord.historical_heritage,
+                current_owner: fullRecord.current_owner,
+                acquisition_method: fullRecord.acquisition_method,
+                importance: fullRecord.importance || 5,
+                description: fullRecord.description,
               });
               setModalVisible(true);
             }}
@@ -108,8 +108,19 @@ const LocationArchiveManagement = ({ worldId, projectId, quickCreateTarget, onUp
     }
   };
 
-  const showDetail = (record) => {
-    setSelectedLocation(record);
+  // 列表接口只返回摘要字段，查看和编辑前加载完整记录
+  const loadFullLocation = async (record) => {
+    try {
+      const response = await locationApi.getLocation(record.id);
+      return response.data || record;
+    } catch (error) {
+      message.error('获取地点详情失败');
+      return record;
+    }
+  };
+
+  const showDetail = async (record) => {
+    setSelectedLocation(await loadFullLocation(record));
     setDetailVisible(true);
   };
 
@@ -182,34 +193,35 @@ const LocationArchiveManagement = ({ worldId, projectId, quickCreateTarget, onUp
           <Button
             type="link"
             icon={<EditOutlined />}
-            onClick={() => {
-              setEditingLocation(record);
+            onClick={async () => {
+              const fullRecord = await loadFullLocation(record);
+              setEditingLocation(fullRecord);
               form.setFieldsValue({
-                name: record.name,
-                location_type: record.location_type,
-                region: record.region,
-                geographical_location: record.geographical_location,
-                terrain: record.terrain,
-                climate: record.climate,
-                special_environment: record.special_environment,
-                controlling_faction: record.controlling_faction,
-                population_composition: record.population_composition,
-                economic_status: record.economic_status,
-                cultural_features: record.cultural_features,
-                overall_layout: record.overall_layout,
-                functional_areas: record.functional_areas,
-                key_buildings: record.key_buildings,
-                secret_areas: record.secret_areas,
-                defense_facilities: record.defense_facilities,
-                guard_force: record.guard_force,
-                defense_weaknesses: record.defense_weaknesses,
-                emergency_plans: record.emergency_plans,
-                main_resources: record.main_resources,
-                potential_dangers: record.potential_dangers,
-                access_restrictions: record.access_restrictions,
-                survival_conditions: record.survival_conditions,
-                importance: record.importance,
-                description: record.description,
+                name: fullRecord.name,
+                location_type: fullRecord.location_type,
+                region: fullRecord.region,
+                geographical_location: fullRecord.geographical_location,
+                terrain: fullRecord.terrain,
+                climate: fullRecord.climate,
+                special_environment: fullRecord.special_environment,
+                controlling_faction: fullRecord.controlling_faction,
+                population_composition: fullRecord.population_composition,
+                economic_status: fullRecord.economic_status,
+                cultural_features: fullRecord.cultural_features,
+                overall_layout: fullRecord.overall_layout,
+                functional_areas: fullRecord.functional_areas,
+                key_buildings: fullRecord.key_buildings,
+                secret_areas: fullRecord.secret_areas,
+                defense_facilities: fullRecord.defense_facilities,
+                guard_force: fullRecord.guard_force,
+                defense_weaknesses: fullRecord.defense_weaknesses,
+                emergency_plans: fullRecord.emergency_plans,
+                main_resources: fullRecord.main_resources,
+                potential_dangers: fullRecord.potential_dangers,
+                access_restrictions: fullRecord.access_restrictions,
+                survival_conditions: fullRecord.survival_conditions,
+                importance: fullRecord.importance,
+                description: fullRecord.description,
               });
               setModalVisible(true);
             }}
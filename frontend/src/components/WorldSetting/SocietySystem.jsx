@@ -74,6 +74,17 @@ const CivilizationManagement = ({ worldId, civilizations, onRefresh, onCivilizat
     }
   };
 
+  // 列表接口只返回摘要字段，编辑前加载完整记录
+  const loadFullCivilization = async (record) => {
+    try {
+      const response = await energySocietyApi.getCivilization(record.id);
+      return response.data.code === 200 ? response.data.data : record;
+    } catch (error) {
+      message.error('获取文明详情失败');
+      return record;
+    }
+  };
+
   const handleDelete = async (id) => {
     try {
       await energySocietyApi.deleteCivilization(id);
@@ -127,16 +138,17 @@ const CivilizationManagement = ({ worldId, civilizations, onRefresh, onCivilizat
           <Button
             type="link"
             icon={<EditOutlined />}
-            onClick={() => {
-              setEditingCiv(record);
+            onClick={async () => {
+              const fullRecord = await loadFullCivilization(record);
+              setEditingCiv(fullRecord);
               // 反向字段映射
               form.setFieldsValue({
-                civilization_name: record.name,
-                civilization_type: record.civilization_type,
-                development_stage: record.development_level,
-                description: record.description,
-                history_summary: record.historical_origin,
-                cultural_features: record.cultural_characteristics,
+                civilization_name: fullRecord.name,
+                civilization_type: fullRecord.civilization_type,
+                development_stage: fullRecord.development_level,
+                description: fullRecord.description,
+                history_summary: fullRecord.historical_origin,
+                cultural_features: fullRecord.cultural_characteristics,
               });
               setModalVisible(true);
             }}
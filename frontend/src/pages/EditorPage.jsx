@@ -4,7 +4,7 @@ import { FileTextOutlined, EditOutlined, DownloadOutlined } from '@ant-design/ic
 import ChapterManagement from './ChapterManagement';
 import TextEditor from '../components/TextEditor';
 import { chapterApi } from '../services/api';
-import { exportToWord, exportToPdf, exportToMarkdown, exportToText, exportAllChapters } from '../services/exportService';
+import { exportToWord, exportToPdf, exportToMarkdown, exportToText, exportAllChapters, exportProject } from '../services/exportService';
 
 const { Content } = Layout;
 
@@ -145,16 +145,23 @@ const EditorPage = ({ projectId }) => {
       setExportProgress(0);
       setExportProgressText('准备批量导出...');
       
-      // 确保章节列表已加载
-      if (chapters.length === 0) {
-        await loadChapters();
-      }
-      
-      // 导出所有章节
-      const result = await exportAllChapters(chapters, batchExportFormat, `项目_${projectId}`, (progress, text) => {
+      const onProgress = (progress, text) => {
         setExportProgress(progress);
         setExportProgressText(text);
-      });
+      };
+      
+      let result;
+      try {
+        // 由后端直接从数据库导出所有章节
+        result = await exportProject(projectId, batchExportFormat, `项目_${projectId}`, onProgress);
+      } catch (error) {
+        console.error('Server-side export failed, falling back:', error);
+        // 确保章节列表已加载
+        if (chapters.length === 0) {
+          await loadChapters();
+        }
+        result = await exportAllChapters(chapters, batchExportFormat, `项目_${projectId}`, onProgress);
+      }
       
       if (result.success) {
         message.success(result.message);
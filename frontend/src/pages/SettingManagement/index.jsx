@@ -380,11 +380,24 @@ const CharacterManagementPanel = ({ worldId, quickCreateTarget, onUpdate }) => {
     }
   }, [quickCreateTarget]);
 
-  const showModal = (character = null) => {
-    setEditingCharacter(character);
+  // 列表接口只返回摘要字段，查看和编辑前加载完整记录
+  const loadFullCharacter = async (character) => {
+    try {
+      const response = await characterApi.getCharacter(character.id);
+      return response.data || character;
+    } catch (error) {
+      message.error('获取角色详情失败');
+      return character;
+    }
+  };
+
+  const showModal = async (character = null) => {
     if (character) {
-      form.setFieldsValue(character);
+      const fullCharacter = await loadFullCharacter(character);
+      setEditingCharacter(fullCharacter);
+      form.setFieldsValue(fullCharacter);
     } else {
+      setEditingCharacter(null);
       form.resetFields();
     }
     setModalVisible(true);
@@ -418,8 +431,8 @@ const CharacterManagementPanel = ({ worldId, quickCreateTarget, onUpdate }) => {
     }
   };
 
-  const handleView = (character) => {
-    setViewingCharacter(character);
+  const handleView = async (character) => {
+    setViewingCharacter(await loadFullCharacter(character));
     setDetailVisible(true);
   };
 
@@ -104,6 +104,9 @@ export const projectApi = {
 // 章节相关API
 export const chapterApi = {
   getChapters: (projectId) => api.get(`/projects/${projectId}/chapters`),
+  // 章节目录（仅元数据，游标分页）
+  getChapterSummaries: (projectId, params = {}) =>
+    api.get(`/projects/${projectId}/chapters`, { params: { view: 'summary', ...params } }),
   getChapter: (id) => api.get(`/chapters/${id}`),
   createChapter: async (data) => {
     const response = await api.post('/chapters', data);
@@ -115,6 +118,9 @@ export const chapterApi = {
     clearCache(); // 清除缓存以确保下次获取最新数据
     return response;
   },
+  // 增量保存正文：operations 为基于 version 的插入/删除操作，版本冲突时返回409
+  patchChapterContent: (id, version, operations) =>
+    api.patch(`/chapters/${id}/content`, { version, operations }),
   deleteChapter: async (id) => {
     const response = await api.delete(`/chapters/${id}`);
     clearCache(); // 清除缓存以确保下次获取最新数据
@@ -142,6 +148,12 @@ export const characterApi = {
     clearCache(); // 清除缓存以确保下次获取最新数据
     return response;
   },
+  // 批量导入角色（同一项目中同名的更新，其余新建）
+  bulkUpsertCharacters: async (list) => {
+    const response = await api.post('/characters/bulk', list);
+    clearCache();
+    return response;
+  },
   updateCharacter: async (id, data) => {
     const response = await api.put(`/characters/${id}`, data);
     clearCache(); // 清除缓存以确保下次获取最新数据
@@ -188,6 +200,12 @@ export const locationApi = {
     clearCache(); // 清除缓存以确保下次获取最新数据
     return response;
   },
+  // 批量导入地点（同一项目中同名的更新，其余新建）
+  bulkUpsertLocations: async (list) => {
+    const response = await api.post('/locations/bulk', list);
+    clearCache();
+    return response;
+  },
   updateLocation: async (id, data) => {
     const response = await api.put(`/locations/${id}`, data);
     clearCache(); // 清除缓存以确保下次获取最新数据
@@ -220,6 +238,12 @@ export const itemApi = {
     clearCache(); // 清除缓存以确保下次获取最新数据
     return response;
   },
+  // 批量导入物品（同一项目中同名的更新，其余新建）
+  bulkUpsertItems: async (list) => {
+    const response = await api.post('/items/bulk', list);
+    clearCache();
+    return response;
+  },
   updateItem: async (id, data) => {
     const response = await api.put(`/items/${id}`, data);
     clearCache(); // 清除缓存以确保下次获取最新数据
@@ -708,6 +732,8 @@ export const worldApi = {
   },
   getWorldStats: (id) => api.get(`/worlds/${id}/stats`),
   getWorldActivities: (id) => api.get(`/worlds/${id}/activities`),
+  // 一次获取世界的全部分区数据；params: { sections: 'characters,regions', since: 上次返回的 version }
+  getWorldBundle: (id, params) => api.get(`/worlds/${id}/bundle`, { params }),
 };
 
 // AI相关API
@@ -727,6 +753,40 @@ export const aiApi = {
   updateProviderConfig: (provider, data) => api.put(`/ai/config/provider/${provider}`, data),
   // 测试连接API
   testConnection: (provider) => api.post(`/ai/config/provider/${provider}/test`),
+  // 响应缓存相关API
+  getCacheStats: () => api.get('/ai/cache/stats'),
+  clearCache: () => api.delete('/ai/cache'),
+  // 提供商路由统计
+  getRouterStats: () => api.get('/ai/router/stats'),
+};
+
+// 后台任务API（耗时的AI生成任务）
+export const jobApi = {
+  submitJob: (type, params) => api.post('/jobs', { type, params }),
+  getJobs: (params) => api.get('/jobs', { params }),
+  getJob: (id) => api.get(`/jobs/${id}`),
+  cancelJob: (id) => api.post(`/jobs/${id}/cancel`),
+  // SSE流式读取任务输出（EventSource 直接使用该地址）
+  getStreamUrl: (id) => `${api.defaults.baseURL}/jobs/${id}/stream`,
+};
+
+// 全文检索API
+export const searchApi = {
+  // params: { q, type, project_id, world_id, page, per_page }
+  search: (params, cancelToken) => {
+    const config = { params };
+    if (cancelToken) config.cancelToken = cancelToken;
+    return api.get('/search', config);
+  },
+};
+
+// 提及索引相关API（出场时间线、共现矩阵）
+export const mentionApi = {
+  // params: { entity_type, entity_id, positions }
+  getTimeline: (projectId, params) => api.get(`/analysis/project/${projectId}/mentions`, { params }),
+  // params: { entity_type, window, limit }
+  getCooccurrence: (projectId, params) => api.get(`/analysis/project/${projectId}/cooccurrence`, { params }),
+  getCharacterAppearances: (characterId, params) => api.get(`/analysis/character/${characterId}/appearances`, { params }),
 };
 
 // 故事蓝图相关API
@@ -817,6 +877,12 @@ export const worldSettingApi = {
     if (parentId !== undefined) params.parent_id = parentId;
     return api.get('/world-setting/regions', { params });
   },
+  getRegionTree: (worldId, rootId, maxDepth) => {
+    const params = { world_id: worldId };
+    if (rootId !== undefined) params.root_id = rootId;
+    if (maxDepth !== undefined) params.max_depth = maxDepth;
+    return api.get('/world-setting/regions/tree', { params });
+  },
   createRegion: (data) => api.post('/world-setting/regions', data),
   updateRegion: (id, data) => api.put(`/world-setting/regions/${id}`, data),
   deleteRegion: (id) => api.delete(`/world-setting/regions/${id}`),
@@ -876,6 +942,7 @@ export const energySocietyApi = {
   
   // 文明管理
   getCivilizations: (worldId) => api.get('/energy-society/civilizations', { params: { world_id: worldId } }),
+  getCivilization: (id) => api.get(`/energy-society/civilizations/${id}`),
   createCivilization: (data) => api.post('/energy-society/civilizations', data),
   updateCivilization: (id, data) => api.put(`/energy-society/civilizations/${id}`, data),
   deleteCivilization: (id) => api.delete(`/energy-society/civilizations/${id}`),
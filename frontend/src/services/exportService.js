@@ -195,6 +195,43 @@ export const exportAllChapters = async (chapters, format, projectTitle, onProgre
   return result;
 };
 
+// 服务端导出整个项目：章节由后端从数据库逐章读取并流式生成，无需上传正文
+// options: { volumeId, chapterIds, start, end }
+export const exportProject = async (projectId, format, projectTitle, onProgress, options = {}) => {
+  const formats = {
+    word: { path: 'docx', ext: 'docx' },
+    pdf: { path: 'html', ext: 'html' },
+    markdown: { path: 'md', ext: 'md' },
+    text: { path: 'txt', ext: 'txt' }
+  };
+  const target = formats[format];
+  if (!target) {
+    return { success: false, message: '不支持的导出格式！' };
+  }
+
+  onProgress && onProgress(10, '正在生成导出文件...');
+  const params = {};
+  if (options.volumeId) params.volume_id = options.volumeId;
+  if (options.chapterIds && options.chapterIds.length) params.chapter_ids = options.chapterIds.join(',');
+  if (options.start) params.start = options.start;
+  if (options.end) params.end = options.end;
+
+  const response = await axios.get(`http://localhost:5000/api/projects/${projectId}/export/${target.path}`, {
+    params,
+    responseType: 'blob',
+    onDownloadProgress: (event) => {
+      if (event.total) {
+        onProgress && onProgress(10 + Math.round((event.loaded / event.total) * 80), '正在下载导出文件...');
+      }
+    }
+  });
+
+  const fileName = generateFileName(projectTitle, format).replace(/\.[^.]+$/, `.${target.ext}`);
+  saveAs(response.data, fileName);
+  onProgress && onProgress(100, '导出成功！');
+  return { success: true, message: `"${fileName}" 导出成功！` };
+};
+
 // 本地数据存储
 export const saveToLocalStorage = (key, data) => {
   try {